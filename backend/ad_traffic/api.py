@@ -1,17 +1,17 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, Form, BackgroundTasks
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import String, cast
 from sqlalchemy.orm import Session
 from typing import List, Optional
 from datetime import datetime
-import uuid
 import os
-import shutil
 import asyncio
 import logging
 import json
 
 from core.database import get_db, User
 from core.auth import get_current_active_user
-from . import models, schemas, services
+from . import models, schemas, services, video_assets
 
 router = APIRouter(tags=["ad-traffic"])
 logger = logging.getLogger(__name__)
@@ -301,26 +301,24 @@ async def create_campaign(
         logger.error(f"Error during campaign validation: {str(e)}")
         raise
     
-    # Save video files
+    # Save video files once per content (hashed while they stream to disk)
     backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-    upload_dir = os.path.join(backend_dir, "uploads", "campaigns", client_id)
-    os.makedirs(upload_dir, exist_ok=True)
     
     video_paths = []
     relative_video_paths = []
     
     for i, video_file in enumerate(video_files):
         file_extension = os.path.splitext(video_file.filename)[1]
-        video_filename = f"{uuid.uuid4()}{file_extension}"
-        video_path = os.path.join(upload_dir, video_filename)
-        
-        with open(video_path, "wb") as buffer:
-            shutil.copyfileobj(video_file.file, buffer)
+        sha256, size, relative_path = await run_in_threadpool(
+            video_assets.write_content_addressed, video_file.file, file_extension
+        )
+        asset = video_assets.register_asset(db, sha256, size, relative_path, video_file.content_type)
         
-        video_paths.append(video_path)
-        relative_video_paths.append(f"uploads/campaigns/{client_id}/{video_filename}")
+        video_paths.append(os.path.join(backend_dir, asset.storage_path))
+        relative_video_paths.append(asset.storage_path)
         
-        logger.info(f"Video {i+1} saved to: {video_path}")
+        logger.info(f"Video {i+1} stored as {asset.storage_path}"
+                    f"{' (already processed before)' if asset.cloudinary_public_id or asset.ffmpeg_outputs else ''}")
     
     # Create campaign with multiple videos
     campaign_data = schemas.CampaignCreate(
@@ -429,11 +427,27 @@ async def delete_campaign(
     ).delete()
     logger.info(f"Deleted {clips_deleted} video clips for campaign {campaign_id}")
     
-    # Try to delete the video file if it exists
+    # Try to delete the video files if no other campaign uses them
     try:
-        if campaign.original_video_url:
-            backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            video_path = os.path.join(backend_dir, campaign.original_video_url)
+        backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        for relative_path in set([campaign.original_video_url] + list(campaign.video_urls or [])):
+            if not relative_path:
+                continue
+            sha256 = video_assets.asset_sha_for_path(relative_path)
+            if sha256:
+                # Content-addressed videos are shared between campaigns
+                shared = db.query(models.AdTrafficCampaign.id).filter(
+                    models.AdTrafficCampaign.id != campaign_id,
+                    (models.AdTrafficCampaign.original_video_url == relative_path) |
+                    cast(models.AdTrafficCampaign.video_urls, String).contains(relative_path)
+                ).first()
+                if shared:
+                    logger.info(f"Keeping video file {relative_path}, still used by campaign {shared.id}")
+                    continue
+                # Last campaign using this content: retire the asset with its file
+                video_assets.retire_asset(db, sha256)
+            
+            video_path = os.path.join(backend_dir, relative_path)
             if os.path.exists(video_path):
                 os.remove(video_path)
                 logger.info(f"Deleted video file: {video_path}")
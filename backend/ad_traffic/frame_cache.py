@@ -0,0 +1,89 @@
+"""
+Durable cache of vision model frame descriptions.
+
+Descriptions are keyed by (Cloudinary public_id, timestamp). Uploaded videos
+are content-addressed (video_assets.py), so the same frame of the same video
+is only ever analyzed once, whether by a new campaign, a reprocess or a
+caption regeneration.
+"""
+import logging
+import os
+from typing import Dict, List, Tuple
+
+from core.database import SessionLocal, engine
+from .models import FrameDescription
+
+logger = logging.getLogger(__name__)
+
+FrameKey = Tuple[str, float]
+
+
+def _timestamp_ms(timestamp: float) -> int:
+    return int(round(timestamp * 1000))
+
+
+class FrameDescriptionCache:
+    """Frame descriptions stored in the ad_traffic_frame_descriptions table"""
+
+    def __init__(self):
+        self.enabled = os.getenv("FRAME_DESCRIPTION_CACHE_ENABLED", "true").lower() == "true"
+
+    def get_many(self, keys: List[FrameKey]) -> Dict[FrameKey, str]:
+        """Return cached descriptions for the given (public_id, timestamp) keys"""
+        if not self.enabled or not keys:
+            return {}
+
+        wanted = {(public_id, _timestamp_ms(timestamp)): (public_id, timestamp) for public_id, timestamp in keys}
+        found = {}
+        try:
+            with SessionLocal() as db:
+                rows = db.query(
+                    FrameDescription.public_id, FrameDescription.timestamp_ms, FrameDescription.description
+                ).filter(
+                    FrameDescription.public_id.in_({public_id for public_id, _ in keys}),
+                    FrameDescription.timestamp_ms.in_({ms for _, ms in wanted})
+                ).all()
+        except Exception as e:
+            logger.warning(f"Frame description cache lookup failed: {str(e)}")
+            return {}
+
+        for public_id, timestamp_ms, description in rows:
+            key = wanted.get((public_id, timestamp_ms))
+            if key:
+                found[key] = description
+        return found
+
+    def put_many(self, descriptions: Dict[FrameKey, str]):
+        """Store fresh descriptions, replacing any existing one for the same frame"""
+        if not self.enabled or not descriptions:
+            return
+
+        rows = {
+            (public_id, _timestamp_ms(timestamp)): {
+                'public_id': public_id,
+                'timestamp_ms': _timestamp_ms(timestamp),
+                'description': description
+            }
+            for (public_id, timestamp), description in descriptions.items()
+        }
+
+        if engine.dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+
+        stmt = insert(FrameDescription).values(list(rows.values()))
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[FrameDescription.public_id, FrameDescription.timestamp_ms],
+            set_={'description': stmt.excluded.description}
+        )
+
+        try:
+            with SessionLocal() as db:
+                db.execute(stmt)
+                db.commit()
+        except Exception as e:
+            logger.warning(f"Frame description cache write failed: {str(e)}")
+
+
+frame_cache = FrameDescriptionCache()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Text, JSON, Integer, Float, Enum as SQLEnum
+from sqlalchemy import Column, String, DateTime, ForeignKey, Text, JSON, Integer, BigInteger, Float, Enum as SQLEnum
 from sqlalchemy.dialects.postgresql import ARRAY
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
@@ -135,4 +135,35 @@ class SocialPost(Base):
     # Relationships
     client = relationship("AdTrafficClient", back_populates="posts")
     campaign = relationship("AdTrafficCampaign", back_populates="posts")
-    video_clip = relationship("VideoClip") 
\ No newline at end of file
+    video_clip = relationship("VideoClip")
+
+
+class VideoAsset(Base):
+    """An uploaded source video, stored once by content hash and shared by every campaign that uses it"""
+    __tablename__ = "ad_traffic_video_assets"
+    
+    sha256 = Column(String, primary_key=True)
+    size = Column(BigInteger, nullable=False)
+    storage_path = Column(String, nullable=False)  # Relative to the backend dir, e.g. uploads/videos/ab/<sha256>.mp4
+    content_type = Column(String)
+    
+    # Cloudinary upload of this content, reused instead of uploading again
+    cloudinary_public_id = Column(String)
+    cloudinary_url = Column(String)
+    duration = Column(Float)
+    
+    # Clips and thumbnails the ffmpeg processor cut from this content
+    ffmpeg_outputs = Column(JSON)
+    
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), onupdate=func.now())
+
+
+class FrameDescription(Base):
+    """Vision model description of one video frame, keyed by Cloudinary public_id and timestamp"""
+    __tablename__ = "ad_traffic_frame_descriptions"
+    
+    public_id = Column(String, primary_key=True)
+    timestamp_ms = Column(Integer, primary_key=True)
+    description = Column(Text, nullable=False)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,138 @@
+"""
+Content-addressed storage for uploaded campaign videos.
+
+Uploads are hashed while they stream to disk and stored once under
+uploads/videos/<sha256[:2]>/<sha256><ext>. Each stored file has a VideoAsset
+row that remembers what has already been done with that content (its
+Cloudinary upload, the ffmpeg clips cut from it), so a new campaign or a
+reprocess using the same video skips the upload and the transcode.
+
+An asset lives as long as some campaign uses its file: deleting the last
+campaign that references it retires the asset (row, stored file and the
+clips cut from it). Its Cloudinary upload, if any, is left in Cloudinary.
+"""
+import hashlib
+import logging
+import os
+import shutil
+import tempfile
+from typing import BinaryIO, Dict, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from . import models
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+VIDEO_STORE_DIR = os.path.join("uploads", "videos")
+# Clips and thumbnails cut from an asset live in ASSET_CLIPS_DIR/<sha256>/
+ASSET_CLIPS_DIR = os.path.join("uploads", "clips", "assets")
+CHUNK_SIZE = 1024 * 1024
+
+
+def _relative_path(sha256: str, extension: str) -> str:
+    return os.path.join(VIDEO_STORE_DIR, sha256[:2], f"{sha256}{extension.lower()}")
+
+
+def write_content_addressed(fileobj: BinaryIO, extension: str) -> Tuple[str, int, str]:
+    """
+    Stream `fileobj` into the video store, hashing it on the way.
+    Returns (sha256, size, path relative to the backend dir). Blocking.
+    """
+    store_dir = os.path.join(BACKEND_DIR, VIDEO_STORE_DIR)
+    os.makedirs(store_dir, exist_ok=True)
+
+    digest = hashlib.sha256()
+    size = 0
+    fd, tmp_path = tempfile.mkstemp(dir=store_dir, suffix='.upload')
+    try:
+        with os.fdopen(fd, 'wb') as out:
+            while True:
+                chunk = fileobj.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                out.write(chunk)
+                size += len(chunk)
+
+        sha256 = digest.hexdigest()
+        relative_path = _relative_path(sha256, extension)
+        final_path = os.path.join(BACKEND_DIR, relative_path)
+        if os.path.exists(final_path):
+            os.remove(tmp_path)
+        else:
+            os.makedirs(os.path.dirname(final_path), exist_ok=True)
+            os.replace(tmp_path, final_path)
+        return sha256, size, relative_path
+    except Exception:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def register_asset(db: Session, sha256: str, size: int, relative_path: str,
+                   content_type: Optional[str] = None) -> models.VideoAsset:
+    """Get or create the VideoAsset for stored content (caller commits)"""
+    asset = db.query(models.VideoAsset).filter(models.VideoAsset.sha256 == sha256).first()
+    if asset:
+        logger.info(f"Upload matches existing video asset {sha256[:12]} ({size} bytes)")
+        if asset.storage_path != relative_path:
+            # Same bytes uploaded under a different extension; keep the file we have
+            if os.path.exists(os.path.join(BACKEND_DIR, asset.storage_path)):
+                os.remove(os.path.join(BACKEND_DIR, relative_path))
+            else:
+                asset.storage_path = relative_path
+        return asset
+
+    asset = models.VideoAsset(
+        sha256=sha256,
+        size=size,
+        storage_path=relative_path,
+        content_type=content_type
+    )
+    try:
+        with db.begin_nested():
+            db.add(asset)
+    except IntegrityError:
+        # Registered by a concurrent upload of the same file
+        asset = db.query(models.VideoAsset).filter(models.VideoAsset.sha256 == sha256).one()
+    return asset
+
+
+def retire_asset(db: Session, sha256: str):
+    """
+    Drop an asset no campaign uses any more: its row (caller commits) and the
+    clips cut from it. The stored video file is removed by the caller along
+    with the campaign's other files.
+    """
+    asset = db.query(models.VideoAsset).filter(models.VideoAsset.sha256 == sha256).first()
+    if asset:
+        db.delete(asset)
+    clips_dir = os.path.join(BACKEND_DIR, ASSET_CLIPS_DIR, sha256)
+    if os.path.isdir(clips_dir):
+        shutil.rmtree(clips_dir, ignore_errors=True)
+        logger.info(f"Deleted clips of retired video asset {sha256[:12]}")
+
+
+def asset_sha_for_path(video_path: str) -> Optional[str]:
+    """The content hash of a file in the video store, read from its name"""
+    store_dir = os.path.join(BACKEND_DIR, VIDEO_STORE_DIR)
+    absolute = os.path.abspath(os.path.join(BACKEND_DIR, video_path))
+    if not absolute.startswith(store_dir + os.sep):
+        return None
+    return os.path.splitext(os.path.basename(absolute))[0]
+
+
+def assets_for_paths(db: Session, video_paths) -> Dict[str, models.VideoAsset]:
+    """Map each stored video path to its VideoAsset (paths outside the store are left out)"""
+    shas = {path: asset_sha_for_path(path) for path in video_paths}
+    wanted = {sha for sha in shas.values() if sha}
+    if not wanted:
+        return {}
+    assets = {
+        asset.sha256: asset
+        for asset in db.query(models.VideoAsset).filter(models.VideoAsset.sha256.in_(wanted)).all()
+    }
+    return {path: assets[sha] for path, sha in shas.items() if sha in assets}
@@ -12,20 +12,39 @@ Environment Variables:
 - CLOUDINARY_API_KEY: Your API key
 - CLOUDINARY_API_SECRET: Your API secret
 - CLOUDINARY_GRAVITY_OVERRIDE: Optional override for gravity setting (default: uses smart cropping)
+- CLOUDINARY_UPLOAD_CONCURRENCY: Videos uploaded at once (default: 3)
+- AD_TRAFFIC_LLM_CONCURRENCY: Vision/caption LLM calls in flight at once (default: 4)
+- AD_TRAFFIC_FRAME_FETCH_CONCURRENCY: Frame downloads in flight at once (default: 8)
+- AD_TRAFFIC_FRAMES_PER_CLIP: Frames sampled per clip for vision analysis (default: 3)
+- AD_TRAFFIC_VISION_BATCH_SIZE: Frames sent per vision request (default: 6)
+
+Processing runs in stages: uploads (in a thread pool, since the Cloudinary SDK
+blocks), clip creation, frame analysis (several sampled frames per clip,
+described in batched multi-image vision requests and cached per frame in
+frame_cache.py), captions (fanned out over a bounded number of LLM calls),
+then posts. Each stage ends with a single commit.
 """
+import asyncio
+import base64
+import json
 import logging
 import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 import cloudinary
 import cloudinary.uploader
 import cloudinary.api
 from cloudinary.utils import cloudinary_url
-import requests
-from typing import List, Dict, Any
+import httpx
+from typing import List, Dict, Any, Optional
 from datetime import datetime, timedelta
 import uuid
 
 from core.database import SessionLocal
 from . import models
+from . import video_assets
+from .frame_cache import frame_cache
 from core import llm_handler
 
 logger = logging.getLogger(__name__)
@@ -37,6 +56,71 @@ cloudinary.config(
     api_secret=os.getenv('CLOUDINARY_API_SECRET')
 )
 
+UPLOAD_CONCURRENCY = int(os.getenv('CLOUDINARY_UPLOAD_CONCURRENCY', '3'))
+LLM_CONCURRENCY = int(os.getenv('AD_TRAFFIC_LLM_CONCURRENCY', '4'))
+# Frames sampled per clip, and how many go into one vision request
+FRAMES_PER_CLIP = int(os.getenv('AD_TRAFFIC_FRAMES_PER_CLIP', '3'))
+VISION_BATCH_SIZE = int(os.getenv('AD_TRAFFIC_VISION_BATCH_SIZE', '6'))
+FRAME_FETCH_CONCURRENCY = int(os.getenv('AD_TRAFFIC_FRAME_FETCH_CONCURRENCY', '8'))
+
+# upload_large blocks on HTTP, so uploads run in their own bounded pool
+_upload_executor = ThreadPoolExecutor(max_workers=UPLOAD_CONCURRENCY, thread_name_prefix='cloudinary-upload')
+_llm_slots = asyncio.Semaphore(LLM_CONCURRENCY)
+
+
+async def upload_video(video_path: str, public_id: str, overwrite: bool = True) -> Dict[str, Any]:
+    """Upload a video to Cloudinary without blocking the event loop"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_upload_executor, partial(
+        cloudinary.uploader.upload_large,
+        video_path,
+        resource_type="video",
+        public_id=public_id,
+        overwrite=overwrite
+    ))
+
+
+async def upload_or_reuse(video_path: str, public_id: str, asset: Optional[models.VideoAsset]) -> Dict[str, Any]:
+    """
+    Upload a video unless its content is already on Cloudinary. Stored videos
+    (video_assets.py) are uploaded under a content-addressed public_id and the
+    result is recorded on the asset; the caller commits.
+    """
+    if asset and asset.cloudinary_public_id:
+        logger.info(f"Reusing Cloudinary upload {asset.cloudinary_public_id} for {video_path}")
+        result = {'public_id': asset.cloudinary_public_id, 'secure_url': asset.cloudinary_url}
+        if asset.duration is not None:
+            result['duration'] = asset.duration
+        return result
+    
+    if not asset:
+        return await upload_video(video_path, public_id)
+    
+    result = await upload_video(video_path, f"videos/{asset.sha256}", overwrite=False)
+    asset.cloudinary_public_id = result['public_id']
+    asset.cloudinary_url = result['secure_url']
+    asset.duration = result.get('duration')
+    return result
+
+
+async def _generate_text(prompt: str) -> str:
+    async with _llm_slots:
+        return await llm_handler.generate_text(prompt)
+
+
+async def _analyze_image(image_base64: str, prompt: str) -> str:
+    async with _llm_slots:
+        return await llm_handler.analyze_image(image_base64, prompt)
+
+
+def _frame_client() -> httpx.AsyncClient:
+    """HTTP client shared by every frame download of a processing run"""
+    return httpx.AsyncClient(
+        timeout=10,
+        limits=httpx.Limits(max_connections=FRAME_FETCH_CONCURRENCY, max_keepalive_connections=FRAME_FETCH_CONCURRENCY)
+    )
+
+
 # Add this constant at the top after imports
 PLATFORM_ASPECT_RATIOS = {
     "facebook": [
@@ -118,12 +202,8 @@ async def process_campaign(
             # Upload video to Cloudinary
             logger.info(f"Uploading video to Cloudinary from path: {video_path}")
             try:
-                upload_result = cloudinary.uploader.upload_large(
-                    video_path,
-                    resource_type="video",
-                    public_id=f"campaigns/{campaign_id}/main_video",
-                    overwrite=True
-                )
+                asset = video_assets.assets_for_paths(db, [video_path]).get(video_path)
+                upload_result = await upload_or_reuse(video_path, f"campaigns/{campaign_id}/main_video", asset)
                 
                 video_url = upload_result['secure_url']
                 duration = upload_result.get('duration', 90)  # Video duration in seconds
@@ -140,13 +220,13 @@ async def process_campaign(
             clip_duration = 30  # 30-second clips
             num_clips = min(3, int(duration / clip_duration))
             
+            # Check if campaign was cancelled/deleted during the upload
+            db.refresh(campaign)
+            if campaign.status == models.CampaignStatus.FAILED and campaign.error_message == "Cancelled by user":
+                logger.info(f"Campaign {campaign_id} was cancelled, stopping processing")
+                return
+            
             for i in range(num_clips):
-                # Check if campaign was cancelled/deleted
-                db.refresh(campaign)
-                if campaign.status == models.CampaignStatus.FAILED and campaign.error_message == "Cancelled by user":
-                    logger.info(f"Campaign {campaign_id} was cancelled, stopping processing")
-                    return
-                
                 start_time = i * clip_duration
                 end_time = min(start_time + clip_duration, duration)
                 
@@ -192,10 +272,9 @@ async def process_campaign(
                 )
                 db.add(db_clip)
                 clips.append(db_clip)
-                
-                # Update progress
-                campaign.progress = 30 + (i + 1) * 20
-                db.commit()
+            
+            campaign.progress = 60
+            db.commit()
             
             logger.info(f"Created {len(clips)} video clips")
             
@@ -215,62 +294,100 @@ async def process_campaign(
             raise
 
 
-async def analyze_and_generate_captions(clips, platforms, duration_weeks, client_id, campaign, db, cloudinary_upload=None):
-    """Analyze video content and generate contextual AI-powered captions"""
-    import base64
+def _clip_public_id(clip: Dict[str, Any], cloudinary_upload: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Cloudinary public_id of the video a clip was cut from"""
+    if cloudinary_upload:
+        return cloudinary_upload['public_id']
+    if not clip['source_video_url']:
+        return None
+    # For multiple videos, extract the public_id from the clip's source URL
+    # URL format: https://res.cloudinary.com/{cloud_name}/video/upload/v{version}/{public_id}.mp4
+    url_parts = clip['source_video_url'].split('/')
+    if 'upload' in url_parts:
+        upload_idx = url_parts.index('upload')
+        if upload_idx + 2 < len(url_parts):
+            # public_ids contain slashes (campaigns/<id>/video_1, videos/<sha256>)
+            return '/'.join(url_parts[upload_idx + 2:]).rsplit('.', 1)[0]
+    logger.warning(f"Could not extract public_id from URL: {clip['source_video_url']}")
+    return None
+
+
+def sample_frame_times(clip: Dict[str, Any]) -> List[float]:
+    """FRAMES_PER_CLIP evenly spaced timestamps inside the clip (0.1s grid, so cache keys line up)"""
+    n = max(1, FRAMES_PER_CLIP)
+    return sorted({
+        round(clip['start_time'] + clip['duration'] * (k + 1) / (n + 1), 1)
+        for k in range(n)
+    })
+
+
+def _frame_url(public_id: str, frame_time: float) -> str:
+    frame_url, _ = cloudinary_url(
+        public_id,
+        resource_type="video",
+        transformation=[
+            {'start_offset': frame_time, 'duration': 1},  # Extract 1 second frame
+            {'width': 800, 'height': 450, 'crop': 'fill', 'gravity': 'auto'},
+            {'quality': 'auto', 'fetch_format': 'jpg'}
+        ]
+    )
+    return frame_url
+
+
+async def _fetch_frame(http: httpx.AsyncClient, public_id: str, frame_time: float) -> Optional[str]:
+    """Download a frame and return it base64 encoded, or None"""
+    try:
+        response = await http.get(_frame_url(public_id, frame_time))
+        if response.status_code != 200:
+            logger.warning(f"Failed to download frame {public_id}@{frame_time}s, status code: {response.status_code}")
+            return None
+        return base64.b64encode(response.content).decode('utf-8')
+    except Exception as e:
+        logger.error(f"Error downloading frame {public_id}@{frame_time}s: {str(e)}")
+        return None
+
+
+def _parse_description_list(text: str, expected: int) -> Optional[List[str]]:
+    """Read the JSON array of descriptions a batched vision request returns"""
+    match = re.search(r'\[.*\]', text or '', re.DOTALL)
+    if not match:
+        return None
+    try:
+        descriptions = json.loads(match.group(0))
+    except ValueError:
+        return None
+    if len(descriptions) != expected or not all(isinstance(d, str) and d.strip() for d in descriptions):
+        return None
+    return [d.strip() for d in descriptions]
+
+
+async def _describe_frame_batch(frames: List[tuple], campaign_name: str) -> Dict[tuple, str]:
+    """Describe up to VISION_BATCH_SIZE frames with one vision request"""
+    prompt = f"""You are given {len(frames)} frames from a video titled "{campaign_name}", labelled Image 1 to Image {len(frames)}.
+For each image, describe what's happening in the scene in 2-3 sentences.
+Focus on:
+- Main subjects or people
+- Actions taking place
+- Setting/location
+- Key objects or details
+- Overall mood/tone
+
+Respond with only a JSON array of {len(frames)} strings, one description per image, in image order."""
     
-    # Get video metadata for context
-    video_context = f"""
-Video Title: {campaign.name}
-Duration: {cloudinary_upload.get('duration', 0) if cloudinary_upload else 'Multiple videos'} seconds
-Platforms: {', '.join(platforms)}
-"""
+    try:
+        async with _llm_slots:
+            response = await llm_handler.analyze_images([image for _, image in frames], prompt)
+        descriptions = _parse_description_list(response, len(frames))
+        if descriptions:
+            return {key: description for (key, _), description in zip(frames, descriptions)}
+        logger.warning(f"Batched vision response for {len(frames)} frames could not be parsed, analyzing them one by one")
+    except Exception as e:
+        logger.error(f"Batched vision analysis failed for {len(frames)} frames: {str(e)}")
     
-    for i, db_clip in enumerate(clips):
-        try:
-            # For multiple videos, we need to extract the public_id from the clip's source URL
-            if not cloudinary_upload and db_clip.source_video_url:
-                # Extract public_id from the Cloudinary URL
-                # URL format: https://res.cloudinary.com/{cloud_name}/video/upload/v{version}/{public_id}.mp4
-                url_parts = db_clip.source_video_url.split('/')
-                if 'upload' in url_parts:
-                    upload_idx = url_parts.index('upload')
-                    if upload_idx + 2 < len(url_parts):
-                        public_id = url_parts[upload_idx + 2].rsplit('.', 1)[0]
-                else:
-                    logger.warning(f"Could not extract public_id from URL: {db_clip.source_video_url}")
-                    public_id = None
-            elif cloudinary_upload:
-                public_id = cloudinary_upload['public_id']
-            else:
-                public_id = None
-                
-            # Extract a frame from the middle of the clip for analysis
-            frame_time = db_clip.start_time + (db_clip.duration / 2)
-            
-            if public_id:
-                # Generate a frame URL using Cloudinary transformation
-                frame_url, _ = cloudinary_url(
-                    public_id,
-                    resource_type="video",
-                    transformation=[
-                        {'start_offset': frame_time, 'duration': 1},  # Extract 1 second frame
-                        {'width': 800, 'height': 450, 'crop': 'fill', 'gravity': 'auto'},
-                        {'quality': 'auto', 'fetch_format': 'jpg'}
-                    ]
-                )
-                
-                logger.info(f"Generated frame URL for clip {i+1}: {frame_url[:100]}...")
-                
-                # Download and encode the frame for vision analysis
-                try:
-                    response = requests.get(frame_url, timeout=10)
-                    if response.status_code == 200:
-                        frame_base64 = base64.b64encode(response.content).decode('utf-8')
-                        logger.info(f"Successfully downloaded frame for clip {i+1}, size: {len(response.content)} bytes")
-                        
-                        # Use vision-capable LLM to analyze the frame
-                        vision_prompt = f"""Analyze this video frame and describe what's happening in the scene. 
+    # Fall back to one request per frame
+    async def describe_one(key, image):
+        public_id, frame_time = key
+        description = await _analyze_image(image, f"""Analyze this video frame and describe what's happening in the scene. 
 Focus on:
 - Main subjects or people
 - Actions taking place  
@@ -278,60 +395,96 @@ Focus on:
 - Key objects or details
 - Overall mood/tone
 
-This is frame from timestamp {frame_time:.1f}s of a video titled "{campaign.name}"."""
-                        
-                        try:
-                            # Get frame analysis from vision model
-                            frame_description = await llm_handler.analyze_image(frame_base64, vision_prompt)
-                            logger.info(f"Frame analysis for clip {i+1}: {frame_description[:100]}...")
-                        except Exception as e:
-                            logger.error(f"Vision analysis failed for clip {i+1}: {str(e)}")
-                            frame_description = f"Clip showing content from {db_clip.start_time:.0f}s to {db_clip.end_time:.0f}s"
-                    else:
-                        logger.warning(f"Failed to download frame for clip {i+1}, status code: {response.status_code}")
-                        frame_description = f"Video segment {i+1}"
-                except Exception as e:
-                    logger.error(f"Error downloading frame for clip {i+1}: {str(e)}")
-                    frame_description = f"Video segment {i+1}"
-            else:
-                logger.warning(f"No public_id available for clip {i+1}")
-                frame_description = f"Video segment {i+1} - {db_clip.title}"
-                
-        except Exception as e:
-            logger.warning(f"Could not analyze frame for clip {i+1}: {str(e)}")
-            frame_description = f"Video segment {i+1}"
+This is frame from timestamp {frame_time:.1f}s of a video titled "{campaign_name}".""")
+        return key, description
+    
+    results = await asyncio.gather(*(describe_one(key, image) for key, image in frames), return_exceptions=True)
+    return {
+        key: description
+        for result in results if not isinstance(result, BaseException)
+        for key, description in [result]
+        # analyze_image answers "Video content" when the model call failed
+        if description and description != "Video content"
+    }
+
+
+async def analyze_clip_frames(clips: List[Dict[str, Any]], public_ids: List[Optional[str]],
+                              campaign_name: str) -> List[str]:
+    """
+    Frame analysis stage: sample FRAMES_PER_CLIP frames per clip, reuse cached
+    descriptions, describe the rest in batched multi-image vision requests and
+    cache them. Returns one description per clip.
+    """
+    frame_keys = [
+        [(public_id, t) for t in sample_frame_times(clip)] if public_id else []
+        for clip, public_id in zip(clips, public_ids)
+    ]
+    all_keys = list(dict.fromkeys(key for keys in frame_keys for key in keys))
+    
+    known = await asyncio.to_thread(frame_cache.get_many, all_keys)
+    missing = [key for key in all_keys if key not in known]
+    logger.info(f"Frame analysis: {len(all_keys)} frames, {len(known)} cached, {len(missing)} to analyze")
+    
+    if missing:
+        async with _frame_client() as http:
+            images = await asyncio.gather(*(_fetch_frame(http, public_id, t) for public_id, t in missing))
+        fetched = [(key, image) for key, image in zip(missing, images) if image]
+        batches = [fetched[n:n + VISION_BATCH_SIZE] for n in range(0, len(fetched), max(1, VISION_BATCH_SIZE))]
+        fresh: Dict[tuple, str] = {}
+        for described in await asyncio.gather(*(_describe_frame_batch(batch, campaign_name) for batch in batches)):
+            fresh.update(described)
+        await asyncio.to_thread(frame_cache.put_many, fresh)
+        known.update(fresh)
+    
+    descriptions = []
+    for i, (clip, keys) in enumerate(zip(clips, frame_keys)):
+        if not keys:
+            logger.warning(f"No public_id available for clip {i+1}")
+            descriptions.append(f"Video segment {i+1} - {clip['title']}")
+            continue
+        described = [(t, known[(public_id, t)]) for public_id, t in keys if (public_id, t) in known]
+        if not described:
+            descriptions.append(f"Clip showing content from {clip['start_time']:.0f}s to {clip['end_time']:.0f}s")
+        elif len(described) == 1:
+            descriptions.append(described[0][1])
+        else:
+            descriptions.append("\n".join(f"At {t:.1f}s: {description}" for t, description in described))
+    return descriptions
+
+
+def _clip_caption_prompt(i: int, clip: Dict[str, Any], frame_description: str, total_clips: int,
+                         campaign_name: str, client_id: str, platforms: List[str], video_context: str) -> str:
+    """Caption prompt for a clip, driven by its frame description when there is a usable one"""
+    # If we don't have a good frame description, use campaign context
+    if frame_description.startswith("Video segment") or frame_description.startswith("Clip showing"):
+        # Use campaign name and details for context
+        # Vary the caption style based on clip index
+        caption_styles = [
+            "storytelling", "question-based", "inspirational", 
+            "behind-the-scenes", "educational", "call-to-action focused",
+            "testimonial", "announcement", "tips and tricks"
+        ]
+        style = caption_styles[i % len(caption_styles)]
         
-        # Generate contextual caption based on actual content
-        # If we don't have a good frame description, use campaign context
-        if frame_description.startswith("Video segment") or frame_description.startswith("Clip showing"):
-            # Use campaign name and details for context
-            # Vary the caption style based on clip index
-            caption_styles = [
-                "storytelling", "question-based", "inspirational", 
-                "behind-the-scenes", "educational", "call-to-action focused",
-                "testimonial", "announcement", "tips and tricks"
-            ]
-            style = caption_styles[i % len(caption_styles)]
-            
-            # Add more variation with tone and perspective
-            tones = ["enthusiastic", "professional", "casual", "urgent", "friendly", "informative"]
-            tone = tones[(i + 1) % len(tones)]
-            
-            # Vary the focus of the caption
-            focus_areas = [
-                "the main benefit", "a unique feature", "the story behind it",
-                "why this matters", "what makes this special", "the impact",
-                "the process", "the results", "the experience"
-            ]
-            focus = focus_areas[(i + 2) % len(focus_areas)]
-            
-            prompt = f"""Generate an engaging social media caption for this video clip using a {style} approach with a {tone} tone.
+        # Add more variation with tone and perspective
+        tones = ["enthusiastic", "professional", "casual", "urgent", "friendly", "informative"]
+        tone = tones[(i + 1) % len(tones)]
+        
+        # Vary the focus of the caption
+        focus_areas = [
+            "the main benefit", "a unique feature", "the story behind it",
+            "why this matters", "what makes this special", "the impact",
+            "the process", "the results", "the experience"
+        ]
+        focus = focus_areas[(i + 2) % len(focus_areas)]
+        
+        prompt = f"""Generate an engaging social media caption for this video clip using a {style} approach with a {tone} tone.
 
-Campaign: {campaign.name}
-Client: {campaign.client_id}
+Campaign: {campaign_name}
+Client: {client_id}
 Platforms: {', '.join(platforms)}
-Clip: {i+1} of {len(clips)}
-Duration: {db_clip.duration:.0f} seconds
+Clip: {i+1} of {total_clips}
+Duration: {clip["duration"]:.0f} seconds
 Focus on: {focus}
 
 Style Guide for {style}:
@@ -357,9 +510,9 @@ Create a caption that:
 Make sure this caption is unique and doesn't repeat phrases from previous clips.
 
 Caption:"""
-        else:
-            # We have good frame analysis, use it
-            prompt = f"""Generate an engaging social media caption for this specific video clip.
+    else:
+        # We have good frame analysis, use it
+        prompt = f"""Generate an engaging social media caption for this specific video clip.
 
 CONTEXT:
 {video_context}
@@ -367,7 +520,7 @@ CONTEXT:
 WHAT'S IN THIS CLIP:
 {frame_description}
 
-Clip timing: {db_clip.start_time:.0f}s - {db_clip.end_time:.0f}s (clip {i+1} of {len(clips)})
+Clip timing: {clip["start_time"]:.0f}s - {clip["end_time"]:.0f}s (clip {i+1} of {total_clips})
 
 Create a caption that:
 - Directly relates to what's shown in this specific clip
@@ -378,57 +531,203 @@ Create a caption that:
 - Stays under 280 characters for Twitter
 
 Caption:"""
-        
-        try:
-            caption = await llm_handler.generate_text(prompt)
-            db_clip.suggested_caption = caption
-            
-            # Extract hashtags
-            import re
-            hashtags = re.findall(r'#\w+', caption)
-            db_clip.suggested_hashtags = hashtags[:10]
-            
-            # Update clip with content description
-            db_clip.description = frame_description[:200]  # Store abbreviated description
-            
-        except Exception as e:
-            logger.error(f"Error generating caption for clip {i+1}: {str(e)}")
+    
+    return prompt
+
+
+def _caption_key(caption: str) -> str:
+    """Caption text reduced to lowercase words, for duplicate checks"""
+    return ' '.join(re.findall(r'\w+', caption.lower()))
+
+
+def _parse_platform_captions(text: str, platforms: List[str]) -> Dict[str, str]:
+    """Read the {platform: caption} JSON object a multi-platform request returns, keeping valid entries"""
+    match = re.search(r'\{.*\}', text or '', re.DOTALL)
+    if not match:
+        return {}
+    try:
+        data = json.loads(match.group(0))
+    except ValueError:
+        return {}
+    if not isinstance(data, dict):
+        return {}
+    captions = {}
+    for platform in platforms:
+        caption = data.get(platform)
+        if isinstance(caption, dict):
+            caption = caption.get('caption')
+        if isinstance(caption, str) and caption.strip():
+            captions[platform] = caption.strip()
+    return captions
+
+
+async def generate_clip_platform_captions(clip, platforms: List[str], campaign_name: str, first_post_index: int,
+                                          clip_index: int, total_clips: int) -> Dict[str, str]:
+    """
+    Generate every platform's caption for one clip with a single structured request.
+    Platforms whose caption is missing, empty or a duplicate of another platform's
+    are regenerated individually with generate_platform_specific_caption.
+    """
+    specs = {platform: platform_caption_spec(platform, first_post_index + idx) for idx, platform in enumerate(platforms)}
+    schema = {
+        "type": "object",
+        "properties": {platform: {"type": "string"} for platform in platforms},
+        "required": platforms
+    }
+    requirements = "\n\n".join(
+        f"{_platform_requirements(platform, spec)}\n- Open with a {spec['style']} hook" for platform, spec in specs.items()
+    )
+    prompt = f"""Generate one social media caption per platform for this video clip.
+
+Campaign: {campaign_name}
+Clip: {clip_index + 1} of {total_clips}
+
+{requirements}
+
+Every caption must:
+1. Use its platform's emojis naturally throughout
+2. End with its platform's CTA
+3. Include its platform's hashtags
+4. Stay under 280 characters total
+5. Be completely different from the other platforms' captions - do not reuse phrases
+
+Respond with only a JSON object matching this schema, one caption string per platform:
+{json.dumps(schema)}"""
+
+    captions = {}
+    try:
+        captions = _parse_platform_captions(await _generate_text(prompt), platforms)
+    except Exception as e:
+        logger.error(f"Error generating multi-platform captions for clip {clip_index + 1}: {str(e)}")
+
+    seen = set()
+    for platform in platforms:
+        caption = captions.get(platform)
+        key = _caption_key(caption) if caption else None
+        if not key or key in seen:
+            captions.pop(platform, None)
+        else:
+            seen.add(key)
+
+    retry = [platform for platform in platforms if platform not in captions]
+    if retry:
+        logger.info(f"Clip {clip_index + 1}: regenerating captions individually for {', '.join(retry)}")
+        regenerated = await asyncio.gather(*[
+            generate_platform_specific_caption(clip, platform, campaign_name, first_post_index + platforms.index(platform),
+                                               clip_index, total_clips)
+            for platform in retry
+        ])
+        captions.update(zip(retry, regenerated))
+    return captions
+
+
+async def generate_post_captions(clips: List[Dict[str, Any]], platforms: List[str], campaign_name: str) -> List[str]:
+    """One platform-specific caption per (clip, platform) post, in post order, one request per clip"""
+    platforms = [platform.lower() for platform in platforms]
+    total_clips = len(clips)
+    per_clip = await asyncio.gather(*[
+        generate_clip_platform_captions(clip, platforms, campaign_name, clip_idx * len(platforms), clip_idx, total_clips)
+        for clip_idx, clip in enumerate(clips)
+    ])
+
+    captions = []
+    seen = set()
+    for clip_idx, clip in enumerate(clips):
+        for platform_idx, platform in enumerate(platforms):
+            caption = per_clip[clip_idx][platform]
+            key = _caption_key(caption)
+            if key in seen:
+                # Same caption as another clip's post; ask for this one on its own
+                caption = await generate_platform_specific_caption(
+                    clip, platform, campaign_name, clip_idx * len(platforms) + platform_idx, clip_idx, total_clips
+                )
+                key = _caption_key(caption)
+            seen.add(key)
+            captions.append(caption)
+    return captions
+
+
+def _clip_snapshot(db_clip) -> Dict[str, Any]:
+    """Plain copy of the clip columns the concurrent stages read, so they never touch the session"""
+    return {
+        'id': db_clip.id,
+        'title': db_clip.title,
+        'duration': db_clip.duration,
+        'start_time': db_clip.start_time,
+        'end_time': db_clip.end_time,
+        'source_video_url': db_clip.source_video_url,
+        'video_url': db_clip.video_url,
+        'platform_versions': db_clip.platform_versions,
+    }
+
+
+async def analyze_and_generate_captions(clips, platforms, duration_weeks, client_id, campaign, db, cloudinary_upload=None):
+    """Analyze video content and generate contextual AI-powered captions"""
+    campaign_name = campaign.name
+    campaign_client_id = campaign.client_id
+    snapshots = [_clip_snapshot(db_clip) for db_clip in clips]
+    
+    # Get video metadata for context
+    video_context = f"""
+Video Title: {campaign_name}
+Duration: {cloudinary_upload.get('duration', 0) if cloudinary_upload else 'Multiple videos'} seconds
+Platforms: {', '.join(platforms)}
+"""
+    
+    # Stage 1: describe every clip from sampled frames (cached, batched vision requests)
+    try:
+        descriptions = await analyze_clip_frames(
+            snapshots, [_clip_public_id(clip, cloudinary_upload) for clip in snapshots], campaign_name
+        )
+    except Exception as e:
+        logger.error(f"Frame analysis failed: {str(e)}")
+        descriptions = [f"Video segment {i+1}" for i in range(len(snapshots))]
+    
+    # Stage 2: one caption per clip
+    captions = await asyncio.gather(*(
+        _generate_text(_clip_caption_prompt(
+            i, clip, descriptions[i], len(snapshots), campaign_name, campaign_client_id, platforms, video_context
+        ))
+        for i, clip in enumerate(snapshots)
+    ), return_exceptions=True)
+    
+    for i, (db_clip, caption) in enumerate(zip(clips, captions)):
+        if isinstance(caption, BaseException):
+            logger.error(f"Error generating caption for clip {i+1}: {str(caption)}")
             # Fallback caption
-            db_clip.suggested_caption = f"🎬 {campaign.name} - Part {i+1} 🔥\n\nDon't miss this moment!\n\n#VideoContent #SocialMedia #MustWatch"
+            db_clip.suggested_caption = f"🎬 {campaign_name} - Part {i+1} 🔥\n\nDon't miss this moment!\n\n#VideoContent #SocialMedia #MustWatch"
             db_clip.suggested_hashtags = ["#video", "#content", "#socialmedia", "#viral", "#trending"]
+            continue
+        db_clip.suggested_caption = caption
+        # Extract hashtags
+        db_clip.suggested_hashtags = re.findall(r'#\w+', caption)[:10]
+        # Update clip with content description
+        db_clip.description = descriptions[i][:200]  # Store abbreviated description
     
+    campaign.progress = 80
     db.commit()
     
-    # Create social posts schedule
+    # Stage 3: create social posts schedule, one uniquely captioned post per platform
+    post_captions = await generate_post_captions(snapshots, platforms, campaign_name)
     start_date = datetime.utcnow() + timedelta(days=1)
     posts_per_week = max(1, len(clips) // duration_weeks)
     
     current_date = start_date
     post_count = 0  # Track total posts for variation
     
-    for i, clip in enumerate(clips):
+    for i, clip in enumerate(snapshots):
         # Create separate posts for each platform
-        for platform_idx, platform in enumerate(platforms):
-            # Generate completely unique caption for each platform
-            unique_caption = await generate_platform_specific_caption(
-                clip, 
-                platform.lower(), 
-                campaign, 
-                post_count,
-                i,
-                len(clips)
-            )
-            
+        for platform in platforms:
             post = models.SocialPost(
                 id=str(uuid.uuid4()),
                 client_id=client_id,
                 campaign_id=campaign.id,
-                video_clip_id=clip.id,
-                content=unique_caption,
+                video_clip_id=clip['id'],
+                content=post_captions[post_count],
                 platforms=[platform],  # Single platform per post
                 scheduled_time=current_date,
                 status=models.PostStatus.SCHEDULED,
-                media_urls=[clip.video_url]  # Include the clip's video URL
+                media_urls=[clip['video_url']]  # Include the clip's video URL
             )
             db.add(post)
             post_count += 1
@@ -440,97 +739,115 @@ Caption:"""
     logger.info(f"Created {len(clips)} scheduled posts") 
 
 
-async def generate_platform_specific_caption(clip, platform, campaign, post_index, clip_index, total_clips):
-    """Generate a unique caption for each platform, ensuring no duplicates"""
-    
-    # Platform-specific styles
-    platform_styles = {
-        "facebook": {
-            "styles": ["storytelling", "educational", "behind-the-scenes", "announcement"],
-            "emoji_sets": [
-                ["📹", "👀", "✨"], ["🎬", "💡", "🔥"], ["🎯", "📢", "⭐"],
-                ["🚀", "💪", "🎉"], ["📍", "🌟", "💫"], ["🎥", "👏", "💯"]
-            ],
-            "cta_options": [
-                "Watch the full video and share your thoughts!",
-                "Drop a comment below - we'd love to hear from you!",
-                "Tag someone who needs to see this!",
-                "What's your take on this? Let us know!",
-                "Save this for later and share with friends!",
-                "Click to watch more amazing content!"
-            ]
-        },
-        "instagram": {
-            "styles": ["question-based", "inspirational", "tips and tricks", "testimonial"],
-            "emoji_sets": [
-                ["✨", "💫", "🌟"], ["💕", "🙌", "✅"], ["🔥", "💪", "🎯"],
-                ["📸", "❤️", "👇"], ["🌈", "💖", "🦋"], ["⚡", "🌺", "💎"]
-            ],
-            "cta_options": [
-                "Double tap if you agree! 💕",
-                "Save this for your feed! 📌",
-                "Share to your story! 🔄",
-                "Comment your thoughts below 💬",
-                "Tag your bestie! 👯‍♀️",
-                "Swipe up for more! ⬆️"
-            ]
-        },
-        "tiktok": {
-            "styles": ["call-to-action focused", "question-based", "tips and tricks", "behind-the-scenes"],
-            "emoji_sets": [
-                ["🎬", "🔥", "💯"], ["✨", "👀", "🚀"], ["💫", "🎯", "⚡"],
-                ["🌟", "💪", "🎉"], ["📱", "🔮", "💥"], ["🎵", "🌈", "✅"]
-            ],
-            "cta_options": [
-                "Follow for more content like this!",
-                "Share if this helped you!",
-                "Duet this with your take!",
-                "Save & try this yourself!",
-                "Comment if you want part 2!",
-                "Like if you learned something new!"
-            ]
-        }
-    }
-    
-    # Get platform-specific configuration
-    platform_config = platform_styles.get(platform, platform_styles["facebook"])
-    
-    # Select style based on post index to ensure variety
-    style = platform_config["styles"][post_index % len(platform_config["styles"])]
-    
-    # Select emoji set
-    emoji_set = platform_config["emoji_sets"][post_index % len(platform_config["emoji_sets"])]
-    
-    # Select CTA
-    cta = platform_config["cta_options"][post_index % len(platform_config["cta_options"])]
-    
-    # Vary tone based on platform and index
-    tones = {
-        "facebook": ["professional", "friendly", "informative", "enthusiastic"],
-        "instagram": ["casual", "inspirational", "playful", "authentic"],
-        "tiktok": ["energetic", "trendy", "direct", "fun"]
-    }
-    tone = tones.get(platform, tones["facebook"])[post_index % 4]
-    
-    # Generate unique hashtags for each platform
-    hashtag_sets = {
-        "facebook": [
-            ["VideoMarketing", "ContentCreation", "BehindTheScenes", "CreativeProcess", "VideoContent"],
-            ["DigitalMarketing", "SocialMediaTips", "ContentStrategy", "MarketingTips", "VideoProduction"],
-            ["BusinessGrowth", "EntrepreneurLife", "SmallBusiness", "MarketingStrategy", "ContentMarketing"]
+# Platform-specific caption styles
+PLATFORM_STYLES = {
+    "facebook": {
+        "styles": ["storytelling", "educational", "behind-the-scenes", "announcement"],
+        "emoji_sets": [
+            ["📹", "👀", "✨"], ["🎬", "💡", "🔥"], ["🎯", "📢", "⭐"],
+            ["🚀", "💪", "🎉"], ["📍", "🌟", "💫"], ["🎥", "👏", "💯"]
+        ],
+        "cta_options": [
+            "Watch the full video and share your thoughts!",
+            "Drop a comment below - we'd love to hear from you!",
+            "Tag someone who needs to see this!",
+            "What's your take on this? Let us know!",
+            "Save this for later and share with friends!",
+            "Click to watch more amazing content!"
+        ]
+    },
+    "instagram": {
+        "styles": ["question-based", "inspirational", "tips and tricks", "testimonial"],
+        "emoji_sets": [
+            ["✨", "💫", "🌟"], ["💕", "🙌", "✅"], ["🔥", "💪", "🎯"],
+            ["📸", "❤️", "👇"], ["🌈", "💖", "🦋"], ["⚡", "🌺", "💎"]
         ],
-        "instagram": [
-            ["InstaVideo", "ContentCreator", "ReelsDaily", "VideoOfTheDay", "CreativeContent"],
-            ["IGDaily", "InstaGood", "VideoGram", "ContentTips", "SocialMediaMarketing"],
-            ["ReelItFeelIt", "VideoContent", "CreatorCommunity", "InstaMarketing", "ViralContent"]
+        "cta_options": [
+            "Double tap if you agree! 💕",
+            "Save this for your feed! 📌",
+            "Share to your story! 🔄",
+            "Comment your thoughts below 💬",
+            "Tag your bestie! 👯‍♀️",
+            "Swipe up for more! ⬆️"
+        ]
+    },
+    "tiktok": {
+        "styles": ["call-to-action focused", "question-based", "tips and tricks", "behind-the-scenes"],
+        "emoji_sets": [
+            ["🎬", "🔥", "💯"], ["✨", "👀", "🚀"], ["💫", "🎯", "⚡"],
+            ["🌟", "💪", "🎉"], ["📱", "🔮", "💥"], ["🎵", "🌈", "✅"]
         ],
-        "tiktok": [
-            ["TikTokVideo", "ForYouPage", "VideoTips", "ContentHacks", "TikTokTips"],
-            ["FYP", "VideoMarketing", "TikTokStrategy", "ContentIdeas", "ViralVideo"],
-            ["TikTokContent", "CreatorTips", "VideoEditing", "TrendingNow", "ForYou"]
+        "cta_options": [
+            "Follow for more content like this!",
+            "Share if this helped you!",
+            "Duet this with your take!",
+            "Save & try this yourself!",
+            "Comment if you want part 2!",
+            "Like if you learned something new!"
         ]
     }
-    hashtags = hashtag_sets.get(platform, hashtag_sets["facebook"])[post_index % 3]
+}
+
+PLATFORM_TONES = {
+    "facebook": ["professional", "friendly", "informative", "enthusiastic"],
+    "instagram": ["casual", "inspirational", "playful", "authentic"],
+    "tiktok": ["energetic", "trendy", "direct", "fun"]
+}
+
+PLATFORM_HASHTAG_SETS = {
+    "facebook": [
+        ["VideoMarketing", "ContentCreation", "BehindTheScenes", "CreativeProcess", "VideoContent"],
+        ["DigitalMarketing", "SocialMediaTips", "ContentStrategy", "MarketingTips", "VideoProduction"],
+        ["BusinessGrowth", "EntrepreneurLife", "SmallBusiness", "MarketingStrategy", "ContentMarketing"]
+    ],
+    "instagram": [
+        ["InstaVideo", "ContentCreator", "ReelsDaily", "VideoOfTheDay", "CreativeContent"],
+        ["IGDaily", "InstaGood", "VideoGram", "ContentTips", "SocialMediaMarketing"],
+        ["ReelItFeelIt", "VideoContent", "CreatorCommunity", "InstaMarketing", "ViralContent"]
+    ],
+    "tiktok": [
+        ["TikTokVideo", "ForYouPage", "VideoTips", "ContentHacks", "TikTokTips"],
+        ["FYP", "VideoMarketing", "TikTokStrategy", "ContentIdeas", "ViralVideo"],
+        ["TikTokContent", "CreatorTips", "VideoEditing", "TrendingNow", "ForYou"]
+    ]
+}
+
+
+def platform_caption_spec(platform: str, post_index: int) -> Dict[str, Any]:
+    """Style, tone, emojis, CTA and hashtags for one post, rotated by post index"""
+    # Get platform-specific configuration
+    platform_config = PLATFORM_STYLES.get(platform, PLATFORM_STYLES["facebook"])
+    return {
+        # Select style, emoji set and CTA based on post index to ensure variety
+        'style': platform_config["styles"][post_index % len(platform_config["styles"])],
+        'emoji_set': platform_config["emoji_sets"][post_index % len(platform_config["emoji_sets"])],
+        'cta': platform_config["cta_options"][post_index % len(platform_config["cta_options"])],
+        # Vary tone based on platform and index
+        'tone': PLATFORM_TONES.get(platform, PLATFORM_TONES["facebook"])[post_index % 4],
+        # Unique hashtags for each platform
+        'hashtags': PLATFORM_HASHTAG_SETS.get(platform, PLATFORM_HASHTAG_SETS["facebook"])[post_index % 3],
+    }
+
+
+def _platform_requirements(platform: str, spec: Dict[str, Any]) -> str:
+    return f"""Platform-specific requirements for {platform}:
+- Use these specific emojis: {', '.join(spec['emoji_set'])}
+- End with this call-to-action: "{spec['cta']}"
+- Use these hashtags: {', '.join(['#' + tag for tag in spec['hashtags']])}
+- Match the {spec['tone']} tone typical for {platform}"""
+
+
+def _fallback_platform_caption(platform: str, spec: Dict[str, Any], campaign_name: str) -> str:
+    # Fallback with platform-specific default
+    emoji = spec['emoji_set'][0]
+    hashtags = spec['hashtags']
+    return f"{emoji} {campaign_name} - {platform.capitalize()} exclusive! {emoji}\n\n{spec['cta']}\n\n#{hashtags[0]} #{hashtags[1]} #{hashtags[2]}"
+
+
+async def generate_platform_specific_caption(clip, platform, campaign_name, post_index, clip_index, total_clips):
+    """Generate a unique caption for each platform, ensuring no duplicates"""
+    spec = platform_caption_spec(platform, post_index)
+    style, tone = spec['style'], spec['tone']
     
     # Build the prompt with all platform-specific elements
     prompt = f"""Generate a unique {platform} social media caption for this video clip.
@@ -538,17 +855,13 @@ async def generate_platform_specific_caption(clip, platform, campaign, post_inde
 Platform: {platform.upper()}
 Style: {style}
 Tone: {tone}
-Campaign: {campaign.name}
+Campaign: {campaign_name}
 Clip: {clip_index + 1} of {total_clips}
 Post number: {post_index + 1}
 
 IMPORTANT: This caption must be COMPLETELY DIFFERENT from all other captions, even for the same video clip.
 
-Platform-specific requirements for {platform}:
-- Use these specific emojis: {', '.join(emoji_set)}
-- End with this call-to-action: "{cta}"
-- Use these hashtags: {', '.join(['#' + tag for tag in hashtags])}
-- Match the {tone} tone typical for {platform}
+{_platform_requirements(platform, spec)}
 
 Create a caption that:
 1. Starts with an attention-grabbing {style} opening
@@ -562,13 +875,11 @@ Create a caption that:
 Caption:"""
     
     try:
-        caption = await llm_handler.generate_text(prompt)
+        caption = await _generate_text(prompt)
         return caption
     except Exception as e:
         logger.error(f"Error generating platform-specific caption: {str(e)}")
-        # Fallback with platform-specific default
-        emoji = emoji_set[0]
-        return f"{emoji} {campaign.name} - {platform.capitalize()} exclusive! {emoji}\n\n{cta}\n\n#{hashtags[0]} #{hashtags[1]} #{hashtags[2]}"
+        return _fallback_platform_caption(platform, spec, campaign_name)
 
 
 async def process_campaign_with_multiple_videos(
@@ -599,26 +910,27 @@ async def process_campaign_with_multiple_videos(
             total_videos = len(video_paths)
             video_urls = []  # Store all video URLs
             
-            for video_idx, video_path in enumerate(video_paths):
-                logger.info(f"Processing video {video_idx + 1}/{total_videos}: {video_path}")
-                
-                # Upload video to Cloudinary
-                try:
-                    upload_result = cloudinary.uploader.upload_large(
-                        video_path,
-                        resource_type="video",
-                        public_id=f"campaigns/{campaign_id}/video_{video_idx + 1}",
-                        overwrite=True
-                    )
-                    
-                    video_url = upload_result['secure_url']
-                    video_urls.append(video_url)  # Store the URL
-                    duration = upload_result.get('duration', 90)
-                    logger.info(f"Video {video_idx + 1} uploaded. Duration: {duration}s")
-                except Exception as e:
-                    logger.error(f"Failed to upload video {video_idx + 1}: {str(e)}")
+            # Upload every video to Cloudinary, up to UPLOAD_CONCURRENCY at a time
+            logger.info(f"Uploading {total_videos} videos (up to {UPLOAD_CONCURRENCY} at once)")
+            assets = video_assets.assets_for_paths(db, video_paths)
+            uploads = await asyncio.gather(*(
+                upload_or_reuse(video_path, f"campaigns/{campaign_id}/video_{video_idx + 1}", assets.get(video_path))
+                for video_idx, video_path in enumerate(video_paths)
+            ), return_exceptions=True)
+            
+            campaign.progress = 30
+            db.commit()
+            
+            for video_idx, upload_result in enumerate(uploads):
+                if isinstance(upload_result, BaseException):
+                    logger.error(f"Failed to upload video {video_idx + 1}: {str(upload_result)}")
                     continue
                 
+                video_url = upload_result['secure_url']
+                video_urls.append(video_url)  # Store the URL
+                duration = upload_result.get('duration', 90)
+                logger.info(f"Video {video_idx + 1} uploaded. Duration: {duration}s")
+                
                 # Generate clips from this video
                 clip_duration = 30  # 30-second clips
                 num_clips = min(3, int(duration / clip_duration))
@@ -700,14 +1012,10 @@ async def process_campaign_with_multiple_videos(
                     )
                     db.add(db_clip)
                     all_clips.append(db_clip)
-                
-                # Update progress
-                progress = 30 + (video_idx + 1) * (60 / total_videos)
-                campaign.progress = int(progress)
-                db.commit()
             
             # Store video URLs in the campaign
             campaign.video_urls = video_urls
+            campaign.progress = 60
             db.commit()
             
             logger.info(f"Created {len(all_clips)} total clips from {total_videos} videos")
@@ -718,48 +1026,40 @@ async def process_campaign_with_multiple_videos(
             )
             
             # Create social posts schedule
+            clip_snapshots = [_clip_snapshot(clip) for clip in all_clips]
+            post_captions = await generate_post_captions(clip_snapshots, platforms, campaign.name)
             start_date = datetime.utcnow() + timedelta(days=1)
             posts_per_week = max(1, len(all_clips) // duration_weeks)
             
             current_date = start_date
             post_count = 0  # Track total posts created for better variation
             
-            for i, clip in enumerate(all_clips):
+            for i, clip in enumerate(clip_snapshots):
                 # Create separate posts for each platform
                 for platform_idx, platform in enumerate(platforms):
                     # Determine which video version to use based on platform
                     platform_lower = platform.lower()
-                    video_url = clip.video_url  # Default
+                    video_url = clip['video_url']  # Default
+                    platform_versions = clip['platform_versions']
                     
                     # Use platform-specific version if available
-                    if platform_lower == "facebook" and clip.platform_versions:
+                    if platform_lower == "facebook" and platform_versions:
                         # Use desktop version for Facebook
-                        fb_desktop = clip.platform_versions.get("facebook_desktop")
+                        fb_desktop = platform_versions.get("facebook_desktop")
                         if fb_desktop and isinstance(fb_desktop, dict):
-                            video_url = fb_desktop.get("url", clip.video_url)
-                    elif platform_lower == "instagram" and clip.platform_versions:
+                            video_url = fb_desktop.get("url", clip['video_url'])
+                    elif platform_lower == "instagram" and platform_versions:
                         # Use mobile version for Instagram
-                        ig_mobile = clip.platform_versions.get("instagram_mobile")
+                        ig_mobile = platform_versions.get("instagram_mobile")
                         if ig_mobile and isinstance(ig_mobile, dict):
-                            video_url = ig_mobile.get("url", clip.video_url)
-                    
-                    # Generate completely unique caption for each platform
-                    # Use post_count to ensure variation even for same-time posts
-                    unique_caption = await generate_platform_specific_caption(
-                        clip, 
-                        platform_lower, 
-                        campaign, 
-                        post_count,
-                        i,
-                        len(all_clips)
-                    )
+                            video_url = ig_mobile.get("url", clip['video_url'])
                     
                     post = models.SocialPost(
                         id=str(uuid.uuid4()),
                         client_id=client_id,
                         campaign_id=campaign.id,
-                        video_clip_id=clip.id,
-                        content=unique_caption,
+                        video_clip_id=clip['id'],
+                        content=post_captions[post_count],
                         platforms=[platform],  # Single platform per post
                         scheduled_time=current_date,
                         status=models.PostStatus.SCHEDULED,
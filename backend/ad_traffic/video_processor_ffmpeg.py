@@ -1,83 +1,321 @@
 """
-Video processing using ffmpeg-python (more reliable than moviepy)
+Video processing with the ffmpeg command line tools.
+
+ffmpeg runs as asyncio subprocesses, so clip extraction never blocks the event
+loop, and at most FFMPEG_CONCURRENCY (default: CPU count) ffmpeg and ffprobe
+processes run at once across all campaigns. Per video:
+
+- clips whose start lands on a keyframe (and whose codecs mp4 can carry) are
+  cut with stream copy, which takes a fraction of a second;
+- every other clip and every thumbnail comes out of one ffmpeg invocation
+  that decodes the source once and writes all of them as separate outputs.
+
+Videos of a multi-video campaign are extracted concurrently. Videos from the
+content-addressed store (video_assets.py) are cut once into
+uploads/clips/assets/<sha256>/ and reused by every later campaign or
+reprocess of the same content.
 """
+import asyncio
 import logging
 import os
+import shutil
 import uuid
-import subprocess
 import json
-from typing import List, Tuple
+from typing import Any, Dict, List, Optional
 from datetime import datetime, timedelta
-import ffmpeg
 
 from core.database import SessionLocal
 from . import models
 from . import schemas
+from . import video_assets
 from core import llm_handler
 
 logger = logging.getLogger(__name__)
 
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+FFPROBE_BIN = os.getenv("FFPROBE_BIN", "ffprobe")
+
+# Callers fall back to the MoviePy processor on ImportError
+if not shutil.which(FFMPEG_BIN) or not shutil.which(FFPROBE_BIN):
+    raise ImportError("ffmpeg/ffprobe binaries not found")
+
+FFMPEG_CONCURRENCY = int(os.getenv("FFMPEG_CONCURRENCY", str(os.cpu_count() or 2)))
+# How far (seconds) a cut point may be from a keyframe and still be stream-copied
+KEYFRAME_TOLERANCE = float(os.getenv("FFMPEG_KEYFRAME_TOLERANCE", "0.1"))
+# Codecs that can be copied into an mp4 container as-is
+COPY_VIDEO_CODECS = {'h264', 'hevc'}
+COPY_AUDIO_CODECS = {'aac', 'mp3'}
+
+CLIP_DURATION = 30.0  # 30 second clips
+MAX_CLIPS_PER_VIDEO = 3
+THUMBNAIL_WIDTH = 640
+
+_ffmpeg_slots: Optional[asyncio.Semaphore] = None
+
+
+class FFmpegError(Exception):
+    def __init__(self, cmd: List[str], returncode: int, stderr: bytes):
+        self.cmd = cmd
+        self.returncode = returncode
+        self.stderr = stderr.decode(errors='replace') if stderr else ''
+        super().__init__(f"{os.path.basename(cmd[0])} exited with {returncode}: {self.stderr[-500:]}")
+
+
+def _slots() -> asyncio.Semaphore:
+    global _ffmpeg_slots
+    if _ffmpeg_slots is None:
+        _ffmpeg_slots = asyncio.Semaphore(max(1, FFMPEG_CONCURRENCY))
+    return _ffmpeg_slots
+
+
+async def _exec(cmd: List[str]) -> bytes:
+    """Run a command, returning stdout; raises FFmpegError on a non-zero exit"""
+    proc = await asyncio.create_subprocess_exec(
+        *cmd,
+        stdout=asyncio.subprocess.PIPE,
+        stderr=asyncio.subprocess.PIPE
+    )
+    stdout, stderr = await proc.communicate()
+    if proc.returncode != 0:
+        raise FFmpegError(cmd, proc.returncode, stderr)
+    return stdout
+
+
+async def run_ffmpeg(args: List[str]) -> None:
+    """Run ffmpeg once a concurrency slot is free"""
+    async with _slots():
+        await _exec([FFMPEG_BIN, '-hide_banner', '-nostdin', '-loglevel', 'error', '-y', *args])
 
-def get_video_info(video_path: str) -> Tuple[float, int, int]:
-    """Get video duration and dimensions using ffmpeg-python"""
-    try:
-        probe = ffmpeg.probe(video_path)
-        video_info = next(s for s in probe['streams'] if s['codec_type'] == 'video')
-        duration = float(probe['format']['duration'])
-        width = int(video_info['width'])
-        height = int(video_info['height'])
-        return duration, width, height
-    except Exception as e:
-        logger.error(f"Error probing video: {e}")
-        # Try alternative method using subprocess
-        try:
-            cmd = ['ffprobe', '-v', 'error', '-show_entries', 
-                   'format=duration', '-of', 'json', video_path]
-            result = subprocess.run(cmd, capture_output=True, text=True)
-            data = json.loads(result.stdout)
-            duration = float(data['format']['duration'])
-            return duration, 1920, 1080  # Default dimensions
-        except:
-            raise Exception("Unable to read video file")
 
+async def run_ffprobe(args: List[str]) -> bytes:
+    """Run ffprobe once a concurrency slot is free, returning its stdout"""
+    async with _slots():
+        return await _exec([FFPROBE_BIN, '-v', 'error', *args])
 
-def extract_clip(video_path: str, output_path: str, start_time: float, duration: float):
-    """Extract a clip from video using ffmpeg"""
+
+async def probe_video(video_path: str) -> Dict[str, Any]:
+    """Duration, dimensions and codecs of a video"""
+    stdout = await run_ffprobe(['-show_format', '-show_streams', '-of', 'json', video_path])
     try:
-        stdout, stderr = (
-            ffmpeg
-            .input(video_path, ss=start_time, t=duration)
-            .output(output_path, vcodec='libx264', acodec='aac', video_bitrate='1M', audio_bitrate='128k', format='mp4', movflags='faststart')
-            .overwrite_output()
-            .run(capture_stdout=True, capture_stderr=True)
-        )
-        logger.debug(f"FFmpeg stdout: {stdout.decode() if stdout else ''}")
-        logger.debug(f"FFmpeg stderr: {stderr.decode() if stderr else ''}")
-        logger.info(f"Successfully extracted clip: {output_path}")
-    except ffmpeg.Error as e:
-        logger.error(f"FFmpeg error: {e.stderr.decode()}")
-        raise
+        probe = json.loads(stdout)
+        video = next((s for s in probe['streams'] if s['codec_type'] == 'video'), None)
+        audio = next((s for s in probe['streams'] if s['codec_type'] == 'audio'), None)
+        return {
+            'duration': float(probe['format']['duration']),
+            'width': int(video['width']) if video else 1920,
+            'height': int(video['height']) if video else 1080,
+            'video_codec': video.get('codec_name') if video else None,
+            'audio_codec': audio.get('codec_name') if audio else None,
+            'has_audio': audio is not None,
+        }
+    except (KeyError, ValueError, TypeError) as e:
+        raise Exception(f"Unable to read video file: {e}")
+
+
+async def keyframe_times(video_path: str, until: float) -> List[float]:
+    """Keyframe timestamps up to `until`, read from packet flags (no decoding)"""
+    stdout = await run_ffprobe([
+        '-select_streams', 'v:0',
+        '-read_intervals', f'%+{until + 1:.3f}',
+        '-show_entries', 'packet=pts_time,flags', '-of', 'csv=p=0', video_path
+    ])
+    times = []
+    for line in stdout.decode(errors='replace').splitlines():
+        pts_time, _, flags = line.partition(',')
+        if 'K' in flags:
+            try:
+                times.append(float(pts_time))
+            except ValueError:
+                continue
+    return sorted(times)
+
+
+def plan_clips(info: Dict[str, Any], clips_dir: str, prefix: str = '') -> List[Dict[str, Any]]:
+    """Up to MAX_CLIPS_PER_VIDEO consecutive CLIP_DURATION clips with a thumbnail from the middle of each"""
+    video_duration = info['duration']
+    num_clips = min(MAX_CLIPS_PER_VIDEO, int(video_duration / CLIP_DURATION))
+    if num_clips == 0:
+        raise Exception(f"Video too short ({video_duration}s), minimum 30s required")
+
+    clips = []
+    for i in range(num_clips):
+        start_time = i * CLIP_DURATION
+        duration = min(CLIP_DURATION, video_duration - start_time)
+        clips.append({
+            'index': i,
+            'start_time': start_time,
+            'duration': duration,
+            'clip_path': os.path.join(clips_dir, f"{prefix}clip_{i+1}.mp4"),
+            'thumbnail_path': os.path.join(clips_dir, f"{prefix}thumbnail_{i+1}.jpg"),
+            'thumbnail_time': start_time + duration / 2,
+            'stream_copy': False,
+        })
+    return clips
+
+
+def _near_keyframe(t: float, keyframes: List[float]) -> bool:
+    return any(abs(t - k) <= KEYFRAME_TOLERANCE for k in keyframes)
 
 
-def extract_thumbnail(video_path: str, output_path: str, timestamp: float):
+async def extract_clip(video_path: str, output_path: str, start_time: float, duration: float,
+                       stream_copy: bool = False):
+    """Extract one clip, stream-copied or re-encoded to H.264/AAC"""
+    if stream_copy:
+        codec_args = ['-map', '0:v:0', '-map', '0:a:0?', '-c', 'copy', '-avoid_negative_ts', 'make_zero']
+    else:
+        codec_args = ['-c:v', 'libx264', '-b:v', '1M', '-c:a', 'aac', '-b:a', '128k']
+    await run_ffmpeg([
+        '-ss', f'{start_time:.3f}', '-i', video_path, '-t', f'{duration:.3f}',
+        *codec_args, '-movflags', '+faststart', '-f', 'mp4', output_path
+    ])
+    logger.info(f"Successfully extracted clip{' (stream copy)' if stream_copy else ''}: {output_path}")
+
+
+async def extract_thumbnail(video_path: str, output_path: str, timestamp: float):
     """Extract a thumbnail at specific timestamp"""
     try:
-        (
-            ffmpeg
-            .input(video_path, ss=timestamp)
-            .filter('scale', 640, -1)
-            .output(output_path, vframes=1)
-            .overwrite_output()
-            .run(capture_stderr=True)
-        )
+        await run_ffmpeg([
+            '-ss', f'{timestamp:.3f}', '-i', video_path,
+            '-vf', f'scale={THUMBNAIL_WIDTH}:-2', '-frames:v', '1', output_path
+        ])
         logger.info(f"Successfully extracted thumbnail: {output_path}")
-    except ffmpeg.Error as e:
-        logger.error(f"FFmpeg thumbnail error: {e.stderr.decode()}")
+    except FFmpegError as e:
+        logger.error(f"FFmpeg thumbnail error: {e.stderr}")
         # Create a simple placeholder if thumbnail fails
         with open(output_path, 'wb') as f:
             f.write(b'')  # Empty file as placeholder
 
 
+async def extract_single_pass(video_path: str, info: Dict[str, Any],
+                              encode_clips: List[Dict[str, Any]], thumbnails: List[Dict[str, Any]]):
+    """
+    Write every re-encoded clip and every thumbnail from one decode of the
+    source: the decoded streams are split once per output and each branch
+    trims its own window.
+    """
+    if not encode_clips and not thumbnails:
+        return
+
+    with_audio = info['has_audio'] and bool(encode_clips)
+    branches = len(encode_clips) + len(thumbnails)
+    filters = [f"[0:v:0]split={branches}" + ''.join(f"[v{n}]" for n in range(branches))]
+    if with_audio:
+        filters.append(f"[0:a:0]asplit={len(encode_clips)}" + ''.join(f"[a{n}]" for n in range(len(encode_clips))))
+
+    outputs: List[str] = []
+    for n, clip in enumerate(encode_clips):
+        start, duration = clip['start_time'], clip['duration']
+        filters.append(f"[v{n}]trim=start={start:.3f}:duration={duration:.3f},setpts=PTS-STARTPTS[cv{n}]")
+        outputs += ['-map', f'[cv{n}]']
+        if with_audio:
+            filters.append(f"[a{n}]atrim=start={start:.3f}:duration={duration:.3f},asetpts=PTS-STARTPTS[ca{n}]")
+            outputs += ['-map', f'[ca{n}]', '-c:a', 'aac', '-b:a', '128k']
+        outputs += ['-c:v', 'libx264', '-b:v', '1M', '-movflags', '+faststart', '-f', 'mp4', clip['clip_path']]
+
+    for m, clip in enumerate(thumbnails, start=len(encode_clips)):
+        filters.append(
+            f"[v{m}]trim=start={clip['thumbnail_time']:.3f},setpts=PTS-STARTPTS,scale={THUMBNAIL_WIDTH}:-2[tv{m}]"
+        )
+        outputs += ['-map', f'[tv{m}]', '-frames:v', '1', clip['thumbnail_path']]
+
+    # Nothing after the last window is needed, so stop decoding there
+    last = max(
+        [c['start_time'] + c['duration'] for c in encode_clips] +
+        [c['thumbnail_time'] + 1 for c in thumbnails]
+    )
+    await run_ffmpeg([
+        '-t', f'{min(last, info["duration"]):.3f}', '-i', video_path,
+        '-filter_complex', ';'.join(filters), *outputs
+    ])
+    logger.info(f"Extracted {len(encode_clips)} clips and {len(thumbnails)} thumbnails in one pass from {video_path}")
+
+
+async def extract_video_clips(video_path: str, clips_dir: str, prefix: str = '') -> List[Dict[str, Any]]:
+    """Probe a video, plan its clips and extract clips and thumbnails"""
+    info = await probe_video(video_path)
+    logger.info(f"Video info: duration={info['duration']}s, {info['width']}x{info['height']}, "
+                f"codecs={info['video_codec']}/{info['audio_codec']}")
+    clips = plan_clips(info, clips_dir, prefix)
+
+    copyable = info['video_codec'] in COPY_VIDEO_CODECS and (
+        not info['has_audio'] or info['audio_codec'] in COPY_AUDIO_CODECS
+    )
+    if copyable:
+        try:
+            keyframes = await keyframe_times(video_path, clips[-1]['start_time'])
+            for clip in clips:
+                clip['stream_copy'] = _near_keyframe(clip['start_time'], keyframes)
+        except FFmpegError as e:
+            logger.warning(f"Could not read keyframes of {video_path}, re-encoding all clips: {e}")
+
+    async def copy(clip):
+        try:
+            await extract_clip(video_path, clip['clip_path'], clip['start_time'], clip['duration'], stream_copy=True)
+        except FFmpegError as e:
+            logger.warning(f"Stream copy failed for {clip['clip_path']}, re-encoding: {e}")
+            clip['stream_copy'] = False
+            await extract_clip(video_path, clip['clip_path'], clip['start_time'], clip['duration'])
+
+    async def single_pass(encode_clips):
+        try:
+            await extract_single_pass(video_path, info, encode_clips, clips)
+        except FFmpegError as e:
+            # Fall back to one ffmpeg run per output so one bad output doesn't sink the rest
+            logger.warning(f"Single-pass extraction failed for {video_path}, extracting separately: {e}")
+            await asyncio.gather(
+                *(extract_clip(video_path, c['clip_path'], c['start_time'], c['duration']) for c in encode_clips),
+                *(extract_thumbnail(video_path, c['thumbnail_path'], c['thumbnail_time']) for c in clips)
+            )
+
+    encode_clips = [clip for clip in clips if not clip['stream_copy']]
+    logger.info(f"Extracting {len(clips)} clips from {video_path} "
+                f"({len(clips) - len(encode_clips)} by stream copy)")
+    await asyncio.gather(single_pass(encode_clips), *(copy(clip) for clip in clips if clip['stream_copy']))
+    return clips
+
+
+def _output_params() -> Dict[str, Any]:
+    """Settings that shape the outputs; cached asset outputs are reused only if these match"""
+    return {
+        'clip_duration': CLIP_DURATION,
+        'max_clips': MAX_CLIPS_PER_VIDEO,
+        'thumbnail_width': THUMBNAIL_WIDTH,
+    }
+
+
+def cached_asset_clips(asset: models.VideoAsset) -> Optional[List[Dict[str, Any]]]:
+    """Clips previously cut from this content, if they are still on disk"""
+    outputs = asset.ffmpeg_outputs or {}
+    clips = outputs.get('clips')
+    if not clips or outputs.get('params') != _output_params():
+        return None
+    # A failed thumbnail extraction leaves an empty placeholder; re-cut rather than reuse it
+    if not all(os.path.exists(c['clip_path']) and os.path.exists(c['thumbnail_path'])
+               and os.path.getsize(c['thumbnail_path']) > 0 for c in clips):
+        return None
+    return [dict(c) for c in clips]
+
+
+async def extract_asset_clips(video_path: str, sha256: str) -> List[Dict[str, Any]]:
+    """Cut a stored video into its shared per-content clips directory"""
+    final_dir = os.path.join(video_assets.ASSET_CLIPS_DIR, sha256)
+    # Extract into a private directory so concurrent runs on the same content never share files
+    work_dir = f"{final_dir}.{uuid.uuid4().hex}.tmp"
+    os.makedirs(work_dir, exist_ok=True)
+    try:
+        clips = await extract_video_clips(video_path, work_dir)
+        if os.path.isdir(final_dir):
+            shutil.rmtree(final_dir)
+        os.rename(work_dir, final_dir)
+    finally:
+        if os.path.isdir(work_dir):
+            shutil.rmtree(work_dir, ignore_errors=True)
+    for clip in clips:
+        clip['clip_path'] = os.path.join(final_dir, os.path.basename(clip['clip_path']))
+        clip['thumbnail_path'] = os.path.join(final_dir, os.path.basename(clip['thumbnail_path']))
+    return clips
+
+
 async def process_campaign(
     campaign_id: str,
     video_path: str,
@@ -86,103 +324,7 @@ async def process_campaign(
     client_id: str
 ):
     """Process a video campaign using ffmpeg"""
-    logger.info(f"Starting campaign processing with ffmpeg: {campaign_id}")
-    logger.info(f"Video path: {video_path}")
-    
-    with SessionLocal() as db:
-        try:
-            # Update campaign status
-            campaign = db.query(models.AdTrafficCampaign).filter(
-                models.AdTrafficCampaign.id == campaign_id
-            ).first()
-            
-            if not campaign:
-                logger.error(f"Campaign {campaign_id} not found")
-                return
-            
-            campaign.status = models.CampaignStatus.PROCESSING
-            campaign.progress = 10
-            db.commit()
-            
-            # Get video info
-            video_duration, width, height = get_video_info(video_path)
-            logger.info(f"Video info: duration={video_duration}s, {width}x{height}")
-            
-            # Create clips directory
-            clips_dir = os.path.join('uploads', 'clips', campaign_id)
-            os.makedirs(clips_dir, exist_ok=True)
-            
-            # Calculate clip parameters
-            clip_duration = 30.0  # 30 second clips
-            num_clips = min(3, int(video_duration / clip_duration))
-            
-            if num_clips == 0:
-                raise Exception(f"Video too short ({video_duration}s), minimum 30s required")
-            
-            clips = []
-            
-            # Create clips
-            for i in range(num_clips):
-                start_time = i * clip_duration
-                if start_time >= video_duration:
-                    break
-                
-                # Adjust duration for last clip
-                actual_duration = min(clip_duration, video_duration - start_time)
-                
-                # Generate filenames
-                clip_filename = f"clip_{i+1}.mp4"
-                clip_path = os.path.join(clips_dir, clip_filename)
-                thumbnail_filename = f"thumbnail_{i+1}.jpg"
-                thumbnail_path = os.path.join(clips_dir, thumbnail_filename)
-                
-                # Extract clip
-                logger.info(f"Extracting clip {i+1}: {start_time}s - {start_time + actual_duration}s")
-                extract_clip(video_path, clip_path, start_time, actual_duration)
-                
-                # Extract thumbnail from middle of clip
-                thumbnail_time = start_time + (actual_duration / 2)
-                extract_thumbnail(video_path, thumbnail_path, thumbnail_time)
-                
-                # Update progress
-                campaign.progress = 10 + (i + 1) * 20
-                db.commit()
-                
-                # Create database entry
-                db_clip = models.VideoClip(
-                    id=str(uuid.uuid4()),
-                    campaign_id=campaign.id,
-                    title=f"Clip {i+1}",
-                    description=f"Segment {i+1} from video",
-                    duration=actual_duration,
-                    start_time=start_time,
-                    end_time=start_time + actual_duration,
-                    video_url=clip_path,
-                    thumbnail_url=thumbnail_path,
-                    content_type="general",
-                    suggested_caption=f"Check out this amazing content!",
-                    suggested_hashtags=["#video", "#content", "#socialmedia"]
-                )
-                db.add(db_clip)
-                clips.append(db_clip)
-            
-            db.commit()
-            logger.info(f"Created {len(clips)} video clips")
-            
-            # Generate captions and create posts
-            await generate_captions_and_posts(clips, platforms, duration_weeks, client_id, campaign, db)
-            
-            # Update campaign status
-            campaign.status = models.CampaignStatus.READY
-            campaign.progress = 100
-            db.commit()
-            
-        except Exception as e:
-            logger.error(f"Error processing campaign: {str(e)}", exc_info=True)
-            campaign.status = models.CampaignStatus.FAILED
-            campaign.error_message = str(e)
-            db.commit()
-            raise
+    await process_campaign_with_multiple_videos(campaign_id, [video_path], platforms, duration_weeks, client_id)
 
 
 async def generate_captions_and_posts(clips, platforms, duration_weeks, client_id, campaign, db):
@@ -266,17 +408,108 @@ async def process_campaign_with_multiple_videos(
     duration_weeks: int,
     client_id: str
 ):
-    """Process multiple videos for a campaign - fallback to single video processing"""
-    logger.info(f"FFmpeg fallback: Processing {len(video_paths)} videos")
+    """Process every video of a campaign, extracting clips from all of them concurrently"""
+    logger.info(f"Starting campaign processing with ffmpeg: {campaign_id} ({len(video_paths)} videos)")
     
-    # For now, just process the first video as FFmpeg doesn't have multi-video support
-    if video_paths:
-        await process_campaign(
-            campaign_id=campaign_id,
-            video_path=video_paths[0],
-            platforms=platforms,
-            duration_weeks=duration_weeks,
-            client_id=client_id
-        )
-    else:
-        logger.error("No video paths provided for processing") 
\ No newline at end of file
+    if not video_paths:
+        logger.error("No video paths provided for processing")
+        return
+    
+    with SessionLocal() as db:
+        campaign = None
+        try:
+            # Update campaign status
+            campaign = db.query(models.AdTrafficCampaign).filter(
+                models.AdTrafficCampaign.id == campaign_id
+            ).first()
+            
+            if not campaign:
+                logger.error(f"Campaign {campaign_id} not found")
+                return
+            
+            campaign.status = models.CampaignStatus.PROCESSING
+            campaign.progress = 10
+            db.commit()
+            
+            # Create clips directory
+            clips_dir = os.path.join('uploads', 'clips', campaign_id)
+            os.makedirs(clips_dir, exist_ok=True)
+            
+            multi = len(video_paths) > 1
+            finished = 0
+            assets = video_assets.assets_for_paths(db, video_paths)
+            
+            async def extract(video_idx: int, video_path: str):
+                nonlocal finished
+                logger.info(f"Processing video {video_idx + 1}/{len(video_paths)}: {video_path}")
+                prefix = f"video_{video_idx + 1}_" if multi else ''
+                asset = assets.get(video_path)
+                try:
+                    if not asset:
+                        return await extract_video_clips(video_path, clips_dir, prefix)
+                    
+                    cached = cached_asset_clips(asset)
+                    if cached:
+                        logger.info(f"Reusing {len(cached)} clips already cut from video asset {asset.sha256[:12]}")
+                        return cached
+                    clips = await extract_asset_clips(video_path, asset.sha256)
+                    asset.ffmpeg_outputs = {'params': _output_params(), 'clips': clips}
+                    return clips
+                finally:
+                    finished += 1
+                    campaign.progress = 10 + int(60 * finished / len(video_paths))
+                    db.commit()
+            
+            results = await asyncio.gather(
+                *(extract(idx, path) for idx, path in enumerate(video_paths)),
+                return_exceptions=True
+            )
+            
+            clips = []
+            errors = []
+            for video_idx, result in enumerate(results):
+                if isinstance(result, BaseException):
+                    logger.error(f"Failed to process video {video_idx + 1}: {result}")
+                    errors.append(result)
+                    continue
+                for spec in result:
+                    i = spec['index']
+                    db_clip = models.VideoClip(
+                        id=str(uuid.uuid4()),
+                        campaign_id=campaign.id,
+                        title=f"Video {video_idx + 1} - Clip {i+1}" if multi else f"Clip {i+1}",
+                        description=f"Segment from video {video_idx + 1}" if multi else f"Segment {i+1} from video",
+                        duration=spec['duration'],
+                        start_time=spec['start_time'],
+                        end_time=spec['start_time'] + spec['duration'],
+                        video_url=spec['clip_path'],
+                        thumbnail_url=spec['thumbnail_path'],
+                        content_type="general",
+                        suggested_caption=f"Check out this amazing content!",
+                        suggested_hashtags=["#video", "#content", "#socialmedia"]
+                    )
+                    db.add(db_clip)
+                    clips.append(db_clip)
+            
+            if not clips:
+                raise errors[0] if errors else Exception("No clips could be extracted")
+            
+            db.commit()
+            logger.info(f"Created {len(clips)} video clips")
+            
+            # Generate captions and create posts
+            await generate_captions_and_posts(clips, platforms, duration_weeks, client_id, campaign, db)
+            
+            # Update campaign status
+            campaign.status = models.CampaignStatus.READY
+            campaign.progress = 100
+            db.commit()
+            
+        except Exception as e:
+            logger.error(f"Error processing campaign: {str(e)}", exc_info=True)
+            if campaign is not None:
+                db.rollback()
+                campaign.status = models.CampaignStatus.FAILED
+                campaign.error_message = str(e)
+                db.commit()
+            raise
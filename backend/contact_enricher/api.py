@@ -442,11 +442,12 @@ async def check_enrichment_status(
 async def enrich_project_contacts(project_id: str):
     """Background task to enrich all contacts in a project"""
     from core.database import SessionLocal
+    from core.enrichment_pipeline import ContactWorkerPool, load_keyset_page
     import asyncio
     import os
     
-    # Get max concurrent workers from env, default to 20 (matched to database pool)
-    # Database pool supports 50 connections, we use 20 to leave room for other operations
+    # Number of workers pulling contacts off the queue. Each worker only holds a
+    # database connection while saving its own result.
     max_workers = int(os.getenv('ENRICHER_MAX_CONCURRENT', '20'))
     logger.info(f"Starting enrichment with {max_workers} concurrent workers")
     
@@ -465,47 +466,75 @@ async def enrich_project_contacts(project_id: str):
                 db.commit()
         return
     
-    # Create a semaphore to limit concurrent requests
-    semaphore = asyncio.Semaphore(max_workers)
+    # Running totals, updated as each contact completes
+    stats = {
+        'processed': 0,
+        'successful': 0,
+        'email_found': 0,
+        'phone_found': 0,
+        'facebook_followers': 0,
+        'website_scraped': 0
+    }
+    progress_every = 50
     
-    async def process_single_contact(contact_data, contact_id, enricher):
-        """Process a single contact with rate limiting"""
-        async with semaphore:
-            try:
-                # Enrich contact
-                enriched_data = await enricher.enrich_contact(contact_data)
-                
-                # Update contact in its own database session
-                with SessionLocal() as contact_db:
-                    contact = contact_db.query(models.EnrichedContact).filter(
-                        models.EnrichedContact.id == contact_id
-                    ).first()
-                    
-                    if contact:
-                        update_contact_with_enrichment(contact, enriched_data)
-                        contact_db.commit()
-                        
-                        # Return stats for aggregation
-                        return {
-                            'success': True,
-                            'email_found': bool(contact.email_found),
-                            'phone_found': bool(contact.phone_found),
-                            'facebook_followers': bool(contact.facebook_followers),
-                            'website_scraped': bool(contact.website_scraped)
-                        }
-                
-                # Contact not found in database
-                return {
-                    'success': False,
-                    'contact_id': contact_id,
-                    'error': 'Contact not found in database'
-                }
-                
-            except Exception as e:
-                logger.error(f"Error enriching contact {contact_id}: {str(e)}")
-                return {'success': False, 'error': str(e)}
+    def save_contact(contact_id, enriched_data):
+        """Persist one enrichment result and return which fields were found"""
+        with SessionLocal() as contact_db:
+            contact = contact_db.query(models.EnrichedContact).filter(
+                models.EnrichedContact.id == contact_id
+            ).first()
             
-            return {'success': False}
+            if not contact:
+                return None
+            
+            update_contact_with_enrichment(contact, enriched_data)
+            contact_db.commit()
+            return {
+                'email_found': bool(contact.email_found),
+                'phone_found': bool(contact.phone_found),
+                'facebook_followers': bool(contact.facebook_followers),
+                'website_scraped': bool(contact.website_scraped)
+            }
+    
+    def save_progress():
+        with SessionLocal() as progress_db:
+            prog_update = progress_db.query(models.EnrichmentProject).filter(
+                models.EnrichmentProject.id == project_id
+            ).first()
+            if prog_update:
+                prog_update.processed_rows = stats['processed']
+                prog_update.emails_found = stats['email_found']
+                prog_update.phones_found = stats['phone_found']
+                prog_update.updated_at = datetime.utcnow()
+                progress_db.commit()
+    
+    async def process_single_contact(row):
+        """Enrich a single contact pulled off the work queue"""
+        contact_id = row['id']
+        try:
+            enriched_data = await enricher.enrich_contact(row['original_data'] or {})
+            found = await asyncio.to_thread(save_contact, contact_id, enriched_data)
+            if found is None:
+                logger.error(f"Error enriching contact {contact_id}: Contact not found in database")
+            else:
+                stats['successful'] += 1
+                for key, value in found.items():
+                    if value:
+                        stats[key] += 1
+        except Exception as e:
+            logger.error(f"Error enriching contact {contact_id}: {str(e)}")
+        
+        stats['processed'] += 1
+        if stats['processed'] % progress_every == 0:
+            await asyncio.to_thread(save_progress)
+            logger.info(f"Progress: {stats['processed']}/{total_contacts} contacts, {stats['email_found']} emails, {stats['phone_found']} phones")
+    
+    def fetch_page(after_id, limit):
+        return load_keyset_page(
+            SessionLocal, models.EnrichedContact, ['id', 'original_data'],
+            [models.EnrichedContact.project_id == project_id],
+            after_id, limit
+        )
     
     # Main processing
     with SessionLocal() as db:
@@ -516,74 +545,32 @@ async def enrich_project_contacts(project_id: str):
         if not project:
             return
         
-        contacts = db.query(models.EnrichedContact).filter(
+        total_contacts = db.query(models.EnrichedContact).filter(
             models.EnrichedContact.project_id == project_id
-        ).all()
-        
-        # Create list of contact data to process
-        contact_tasks = []
-        for contact in contacts:
-            task = process_single_contact(
-                contact.original_data,
-                contact.id,
-                enricher
-            )
-            contact_tasks.append(task)
-        
-        # Process all contacts concurrently
-        logger.info(f"Processing {len(contacts)} contacts with {max_workers} workers")
-        
-        # Process in batches to update progress periodically
-        batch_size = 50
-        all_results = []
-        
-        for i in range(0, len(contact_tasks), batch_size):
-            batch = contact_tasks[i:i+batch_size]
-            batch_results = await asyncio.gather(*batch)
-            all_results.extend(batch_results)
-            
-            # Update progress after each batch
-            processed_so_far = len(all_results)
-            
-            # Calculate current stats from results so far
-            emails_found = sum(1 for r in all_results if r.get('email_found', False))
-            phones_found = sum(1 for r in all_results if r.get('phone_found', False))
-            
-            with SessionLocal() as progress_db:
-                prog_update = progress_db.query(models.EnrichmentProject).filter(
-                    models.EnrichmentProject.id == project_id
-                ).first()
-                if prog_update:
-                    prog_update.processed_rows = processed_so_far
-                    prog_update.emails_found = emails_found
-                    prog_update.phones_found = phones_found
-                    prog_update.updated_at = datetime.utcnow()
-                    progress_db.commit()
-            
-            logger.info(f"Progress: {processed_so_far}/{len(contacts)} contacts, {emails_found} emails, {phones_found} phones")
+        ).count()
         
-        results = all_results
+        # Contacts are streamed by keyset pagination into a bounded queue, so
+        # memory stays flat and progress advances as each contact finishes
+        logger.info(f"Processing {total_contacts} contacts with {max_workers} workers")
         
-        # Aggregate results and update project
-        successful = sum(1 for r in results if r.get('success', False))
-        emails_found = sum(1 for r in results if r.get('email_found', False))
-        phones_found = sum(1 for r in results if r.get('phone_found', False))
-        facebook_data = sum(1 for r in results if r.get('facebook_followers', False))
-        websites_scraped = sum(1 for r in results if r.get('website_scraped', False))
+        try:
+            await ContactWorkerPool(max_workers).run(fetch_page, process_single_contact)
+        finally:
+            await enricher.close()
         
         # Update project with final stats
-        project.processed_rows = len(contacts)
-        project.enriched_rows = successful
-        project.emails_found = emails_found
-        project.phones_found = phones_found
-        project.facebook_data_found = facebook_data
-        project.websites_scraped = websites_scraped
+        project.processed_rows = stats['processed']
+        project.enriched_rows = stats['successful']
+        project.emails_found = stats['email_found']
+        project.phones_found = stats['phone_found']
+        project.facebook_data_found = stats['facebook_followers']
+        project.websites_scraped = stats['website_scraped']
         project.status = "completed"
         project.completed_at = datetime.utcnow()
         project.updated_at = datetime.utcnow()
         db.commit()
         
-        logger.info(f"Enrichment completed: {successful}/{len(contacts)} successful")
+        logger.info(f"Enrichment completed: {stats['successful']}/{total_contacts} successful")
 
 
 def update_contact_with_enrichment(contact: models.EnrichedContact, 
@@ -124,4 +124,18 @@ class EnrichmentAPIConfig(Base):
     last_reset_date = Column(DateTime, default=datetime.utcnow)
     
     created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow) 
\ No newline at end of file
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow) 
+
+class SerpQueryCache(Base):
+    """Caches raw Serper.dev responses keyed by a hash of the normalized query"""
+    __tablename__ = "serp_query_cache"
+    
+    query_hash = Column(String(64), primary_key=True)
+    query = Column(Text, nullable=False)
+    
+    # Only the parts of the response the enricher reads (organic + peopleAlsoAsk)
+    response = Column(JSON, nullable=False)
+    
+    fetched_at = Column(DateTime, default=datetime.utcnow, index=True)
+    last_accessed_at = Column(DateTime, default=datetime.utcnow, index=True)
+    hit_count = Column(Integer, default=0)
@@ -3,7 +3,6 @@ Contact enrichment services - Google SERP, Facebook API, Website Scraping
 """
 import re
 import logging
-import requests
 from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
 from bs4 import BeautifulSoup
@@ -14,16 +13,197 @@ import aiohttp
 import facebook
 import os
 import json
+import hashlib
+import threading
+import time
+
+from sqlalchemy import func
+
+from core.database import SessionLocal, engine
+from .models import SerpQueryCache
 
 logger = logging.getLogger(__name__)
 
 
+class SERPResponseCache:
+    """Durable cache of Serper.dev responses stored in the serp_query_cache table"""
+    
+    def __init__(self):
+        self.enabled = os.getenv("SERP_CACHE_ENABLED", "true").lower() == "true"
+        self.ttl = timedelta(days=float(os.getenv("SERP_CACHE_TTL_DAYS", "30")))
+        self.max_entries = int(os.getenv("SERP_CACHE_MAX_ENTRIES", "200000"))
+        # Run eviction after this many writes rather than on every insert
+        self.evict_every = int(os.getenv("SERP_CACHE_EVICT_EVERY", "500"))
+        # Hit bookkeeping (hit_count, last_accessed_at) is buffered and written
+        # in one UPDATE per flush instead of one per lookup
+        self.hit_flush_every = int(os.getenv("SERP_CACHE_HIT_FLUSH_EVERY", "100"))
+        self.hit_flush_seconds = float(os.getenv("SERP_CACHE_HIT_FLUSH_SECONDS", "30"))
+        # get_many/put_many run in worker threads
+        self._lock = threading.Lock()
+        self._writes_since_evict = 0
+        self._pending_hits: Dict[str, int] = {}
+        self._last_hit_flush = time.monotonic()
+    
+    @staticmethod
+    def normalize_query(query: str, num: int) -> str:
+        """Normalize a query so trivially different strings share a cache entry"""
+        return f"{num}|{' '.join(query.lower().split())}"
+    
+    def query_hash(self, query: str, num: int) -> str:
+        return hashlib.sha256(self.normalize_query(query, num).encode('utf-8')).hexdigest()
+    
+    def get_many(self, queries: List[str], num: int) -> Dict[str, Dict[str, Any]]:
+        """Return cached responses for the given queries, keyed by query"""
+        if not self.enabled or not queries:
+            return {}
+        
+        hashes = {self.query_hash(query, num): query for query in queries}
+        cutoff = datetime.utcnow() - self.ttl
+        found = {}
+        
+        try:
+            with SessionLocal() as db:
+                rows = db.query(SerpQueryCache.query_hash, SerpQueryCache.response).filter(
+                    SerpQueryCache.query_hash.in_(list(hashes.keys())),
+                    SerpQueryCache.fetched_at >= cutoff
+                ).all()
+                
+                for query_hash, response in rows:
+                    found[hashes[query_hash]] = response
+        except Exception as e:
+            logger.warning(f"SERP cache lookup failed: {str(e)}")
+            return {}
+        
+        if rows:
+            self._record_hits([row[0] for row in rows])
+        return found
+    
+    def _record_hits(self, query_hashes: List[str]):
+        """Buffer hits; flush once enough have piled up or enough time has passed"""
+        with self._lock:
+            for query_hash in query_hashes:
+                self._pending_hits[query_hash] = self._pending_hits.get(query_hash, 0) + 1
+            due = (len(self._pending_hits) >= self.hit_flush_every
+                   or time.monotonic() - self._last_hit_flush >= self.hit_flush_seconds)
+        if due:
+            self.flush_hits()
+    
+    def flush_hits(self):
+        """Write buffered hit counts and access times, one UPDATE per distinct count"""
+        with self._lock:
+            pending, self._pending_hits = self._pending_hits, {}
+            self._last_hit_flush = time.monotonic()
+        if not pending:
+            return
+        
+        by_count: Dict[int, List[str]] = {}
+        for query_hash, count in pending.items():
+            by_count.setdefault(count, []).append(query_hash)
+        now = datetime.utcnow()
+        try:
+            with SessionLocal() as db:
+                for count, query_hashes in by_count.items():
+                    db.query(SerpQueryCache).filter(
+                        SerpQueryCache.query_hash.in_(query_hashes)
+                    ).update({
+                        SerpQueryCache.last_accessed_at: now,
+                        SerpQueryCache.hit_count: SerpQueryCache.hit_count + count
+                    }, synchronize_session=False)
+                db.commit()
+        except Exception as e:
+            # Only usage statistics are lost; the cached responses are unaffected
+            logger.warning(f"SERP cache hit update failed: {str(e)}")
+    
+    def put_many(self, responses: Dict[str, Dict[str, Any]], num: int):
+        """Store fresh responses, replacing any stale entry for the same query"""
+        if not self.enabled or not responses:
+            return
+        
+        now = datetime.utcnow()
+        # Key by hash so two queries normalizing to the same entry don't
+        # make the upsert touch one row twice
+        rows = {
+            self.query_hash(query, num): {
+                'query_hash': self.query_hash(query, num),
+                'query': query,
+                'response': {
+                    'organic': response.get('organic', []),
+                    'peopleAlsoAsk': response.get('peopleAlsoAsk', [])
+                },
+                'fetched_at': now,
+                'last_accessed_at': now,
+                'hit_count': 0
+            }
+            for query, response in responses.items()
+        }
+        rows = list(rows.values())
+        
+        if engine.dialect.name == 'postgresql':
+            from sqlalchemy.dialects.postgresql import insert
+        else:
+            from sqlalchemy.dialects.sqlite import insert
+        
+        stmt = insert(SerpQueryCache).values(rows)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[SerpQueryCache.query_hash],
+            set_={
+                'response': stmt.excluded.response,
+                'fetched_at': stmt.excluded.fetched_at,
+                'last_accessed_at': stmt.excluded.last_accessed_at
+            }
+        )
+        
+        try:
+            with SessionLocal() as db:
+                db.execute(stmt)
+                db.commit()
+        except Exception as e:
+            logger.warning(f"SERP cache write failed: {str(e)}")
+            return
+        
+        with self._lock:
+            self._writes_since_evict += len(rows)
+            due = self._writes_since_evict >= self.evict_every
+            if due:
+                self._writes_since_evict = 0
+        if due:
+            self.evict()
+    
+    def evict(self):
+        """Drop expired entries, then least recently used ones beyond max_entries"""
+        # Recency decides what goes, so write out buffered hits first
+        self.flush_hits()
+        try:
+            with SessionLocal() as db:
+                expired = db.query(SerpQueryCache).filter(
+                    SerpQueryCache.fetched_at < datetime.utcnow() - self.ttl
+                ).delete(synchronize_session=False)
+                
+                overflow = db.query(func.count(SerpQueryCache.query_hash)).scalar() - self.max_entries
+                evicted = 0
+                if overflow > 0:
+                    lru_hashes = db.query(SerpQueryCache.query_hash).order_by(
+                        SerpQueryCache.last_accessed_at.asc()
+                    ).limit(overflow).subquery()
+                    evicted = db.query(SerpQueryCache).filter(
+                        SerpQueryCache.query_hash.in_(lru_hashes.select())
+                    ).delete(synchronize_session=False)
+                
+                db.commit()
+                if expired or evicted:
+                    logger.info(f"SERP cache eviction: {expired} expired, {evicted} least recently used")
+        except Exception as e:
+            logger.warning(f"SERP cache eviction failed: {str(e)}")
+
+
 class GoogleSERPService:
     """Service for searching Google via Serper.dev API"""
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, cache: Optional[SERPResponseCache] = None):
         self.api_key = api_key
         self.base_url = "https://google.serper.dev/search"
+        self.results_per_query = 20
+        self.cache = cache or SERPResponseCache()
         self.email_pattern = re.compile(r'\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b')
         self.generic_email_prefixes = (
             'info', 'contact', 'team', 'sales', 'email', 'support', 'admin', 'office', 'hello'
@@ -38,6 +218,64 @@ class GoogleSERPService:
             re.compile(r'(\+1\s*[0-9]{3}\s*[0-9]{3}\s*[0-9]{4})'),  # +1 555 555 5555
             re.compile(r'([(]?[0-9]{3}[)]?\s?[0-9]{3}[-\s]?[0-9]{4})'),  # Various formats
         ]
+        # Shared keep-alive session so concurrent contacts reuse connections
+        self.timeout = aiohttp.ClientTimeout(total=float(os.getenv("SERP_REQUEST_TIMEOUT", "15")))
+        self.max_connections = int(os.getenv("SERP_MAX_CONNECTIONS", "100"))
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._session_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    async def _get_session(self) -> aiohttp.ClientSession:
+        """Return the pooled keep-alive session, recreating it for a new event loop"""
+        loop = asyncio.get_running_loop()
+        if self._session is None or self._session.closed or self._session_loop is not loop:
+            # Background tasks run on their own short-lived loops, so a session
+            # created on a previous loop cannot be reused here
+            connector = aiohttp.TCPConnector(
+                limit=self.max_connections,
+                keepalive_timeout=30,
+                ttl_dns_cache=300
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=self.timeout,
+                headers={
+                    'X-API-KEY': self.api_key,
+                    'Content-Type': 'application/json'
+                }
+            )
+            self._session_loop = loop
+        return self._session
+    
+    async def close(self):
+        """Close the pooled HTTP session and write out buffered cache hits"""
+        await asyncio.to_thread(self.cache.flush_hits)
+        if self._session is not None and not self._session.closed:
+            try:
+                await self._session.close()
+            except Exception as e:
+                logger.warning(f"Error closing Serper.dev session: {str(e)}")
+        self._session = None
+        self._session_loop = None
+    
+    async def _fetch_query(self, query: str) -> Optional[Dict[str, Any]]:
+        """Run a single Serper.dev query and return the raw JSON response"""
+        payload = {
+            'q': query,
+            'num': self.results_per_query
+        }
+        try:
+            session = await self._get_session()
+            async with session.post(self.base_url, json=payload) as response:
+                if response.status != 200:
+                    error_text = await response.text()
+                    logger.error(f"Serper.dev API error: {response.status} - {error_text}")
+                    return None
+                return await response.json(content_type=None)
+        except asyncio.TimeoutError:
+            logger.error(f"Serper.dev request timed out for {query}")
+        except Exception as e:
+            logger.error(f"Error searching with Serper.dev for {query}: {str(e)}")
+        return None
     
     async def search_contact_info(self, name: str, company: str = None, city: str = None, 
                                   state: str = None, website: str = None) -> Dict[str, Any]:
@@ -51,137 +289,27 @@ class GoogleSERPService:
         # Build search queries
         queries = self._build_search_queries(name, company, city, state, website)
         
+        # Serve repeat queries from the durable cache before touching the network
+        cached = await asyncio.to_thread(self.cache.get_many, queries, self.results_per_query)
+        pending = [query for query in queries if query not in cached]
+        
+        # Fire the remaining queries for this contact at once over the shared session
+        fetched = await asyncio.gather(*(self._fetch_query(query) for query in pending))
+        fresh = {query: response for query, response in zip(pending, fetched) if response}
+        if fresh:
+            await asyncio.to_thread(self.cache.put_many, fresh, self.results_per_query)
+        
+        if cached:
+            logger.debug(f"SERP cache: {len(cached)}/{len(queries)} queries served from cache")
+        
         for query in queries:
+            search_results = cached.get(query) or fresh.get(query)
+            if not search_results:
+                continue
             try:
-                # Call Serper.dev API
-                headers = {
-                    'X-API-KEY': self.api_key,
-                    'Content-Type': 'application/json'
-                }
-                
-                payload = {
-                    'q': query,
-                    'num': 20
-                }
-                
-                response = requests.post(self.base_url, json=payload, headers=headers)
-                if response.status_code != 200:
-                    logger.error(f"Serper.dev API error: {response.status_code} - {response.text}")
-                    continue
-                    
-                search_results = response.json()
-                
-                # Extract from organic results
-                for result in search_results.get('organic', []):
-                    snippet = result.get('snippet', '')
-                    title = result.get('title', '')
-                    link = result.get('link', '')
-                    
-                    # Search for emails
-                    emails = self.email_pattern.findall(snippet + ' ' + title)
-                    for email in emails:
-                        if self._is_valid_email(email, name):
-                            results['emails'].append({
-                                'email': email.lower(),
-                                'source': link,
-                                'confidence': self._calculate_email_confidence(email, name, company)
-                            })
-                    
-                    # Search for phones
-                    phones = self._find_phone_numbers(snippet + ' ' + title)
-                    for phone in phones:
-                        formatted_phone = self._format_phone(phone)
-                        if formatted_phone:
-                            # Determine type and adjust confidence
-                            phone_conf = 0.8
-                            phone_type_str = 'unknown'
-                            try:
-                                parsed = phonenumbers.parse(formatted_phone, "US")
-                                ptype = phonenumbers.number_type(parsed)
-                                # Bias toward mobile numbers
-                                if ptype in (phonenumbers.PhoneNumberType.MOBILE, phonenumbers.PhoneNumberType.FIXED_LINE_OR_MOBILE):
-                                    phone_conf += 0.15
-                                    phone_type_str = 'mobile'
-                                elif ptype == phonenumbers.PhoneNumberType.FIXED_LINE:
-                                    phone_type_str = 'fixed_line'
-                                # Basic heuristics to penalize office-style numbers
-                                national = phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.NATIONAL)
-                                digits = re.sub(r'\D', '', national)
-                                if len(digits) >= 10:
-                                    area = digits[:3]
-                                    last4 = digits[-4:]
-                                    if area in {'800','888','877','866','855','844','833','822'}:
-                                        phone_conf -= 0.25
-                                    if last4 in {'0000','1000','2000','3000','4000','5000'}:
-                                        phone_conf -= 0.1
-                                text_ctx = (snippet + ' ' + title).lower()
-                                if any(token in text_ctx for token in ['cell', 'mobile', 'text me']):
-                                    phone_conf += 0.1
-                                if any(token in text_ctx for token in ['office', 'main line', 'switchboard']):
-                                    phone_conf -= 0.1
-                            except Exception:
-                                pass
-                            results['phones'].append({
-                                'phone': formatted_phone,
-                                'source': link,
-                                'confidence': max(0.0, min(1.0, phone_conf)),
-                                'type': phone_type_str
-                            })
-                    
-                    results['sources'].append(link)
-                
-                # Also check people also ask if available
-                for paa in search_results.get('peopleAlsoAsk', []):
-                    snippet = paa.get('snippet', '')
-                    emails = self.email_pattern.findall(snippet)
-                    phones = self._find_phone_numbers(snippet)
-                    
-                    for email in emails:
-                        if self._is_valid_email(email, name):
-                            results['emails'].append({
-                                'email': email.lower(),
-                                'source': 'People Also Ask',
-                                'confidence': 0.7
-                            })
-                    
-                    for phone in phones:
-                        formatted_phone = self._format_phone(phone)
-                        if formatted_phone:
-                            phone_conf = 0.7
-                            phone_type_str = 'unknown'
-                            try:
-                                parsed = phonenumbers.parse(formatted_phone, "US")
-                                ptype = phonenumbers.number_type(parsed)
-                                if ptype in (phonenumbers.PhoneNumberType.MOBILE, phonenumbers.PhoneNumberType.FIXED_LINE_OR_MOBILE):
-                                    phone_conf += 0.15
-                                    phone_type_str = 'mobile'
-                                elif ptype == phonenumbers.PhoneNumberType.FIXED_LINE:
-                                    phone_type_str = 'fixed_line'
-                                national = phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.NATIONAL)
-                                digits = re.sub(r'\D', '', national)
-                                if len(digits) >= 10:
-                                    area = digits[:3]
-                                    last4 = digits[-4:]
-                                    if area in {'800','888','877','866','855','844','833','822'}:
-                                        phone_conf -= 0.25
-                                    if last4 in {'0000','1000','2000','3000','4000','5000'}:
-                                        phone_conf -= 0.1
-                                text_ctx = snippet.lower()
-                                if any(token in text_ctx for token in ['cell', 'mobile', 'text me']):
-                                    phone_conf += 0.1
-                                if any(token in text_ctx for token in ['office', 'main line', 'switchboard']):
-                                    phone_conf -= 0.1
-                            except Exception:
-                                pass
-                            results['phones'].append({
-                                'phone': formatted_phone,
-                                'source': 'People Also Ask',
-                                'confidence': max(0.0, min(1.0, phone_conf)),
-                                'type': phone_type_str
-                            })
-                
+                self._extract_from_search_results(search_results, name, company, results)
             except Exception as e:
-                logger.error(f"Error searching with Serper.dev for {query}: {str(e)}")
+                logger.error(f"Error parsing Serper.dev results for {query}: {str(e)}")
                 continue
         
         # Deduplicate and get best results
@@ -190,6 +318,118 @@ class GoogleSERPService:
         
         return results
     
+    def _extract_from_search_results(self, search_results: Dict[str, Any], name: str,
+                                     company: str, results: Dict[str, Any]):
+        """Extract emails, phones and sources from a Serper.dev response"""
+        # Extract from organic results
+        for result in search_results.get('organic', []):
+            snippet = result.get('snippet', '')
+            title = result.get('title', '')
+            link = result.get('link', '')
+
+            # Search for emails
+            emails = self.email_pattern.findall(snippet + ' ' + title)
+            for email in emails:
+                if self._is_valid_email(email, name):
+                    results['emails'].append({
+                        'email': email.lower(),
+                        'source': link,
+                        'confidence': self._calculate_email_confidence(email, name, company)
+                    })
+
+            # Search for phones
+            phones = self._find_phone_numbers(snippet + ' ' + title)
+            for phone in phones:
+                formatted_phone = self._format_phone(phone)
+                if formatted_phone:
+                    # Determine type and adjust confidence
+                    phone_conf = 0.8
+                    phone_type_str = 'unknown'
+                    try:
+                        parsed = phonenumbers.parse(formatted_phone, "US")
+                        ptype = phonenumbers.number_type(parsed)
+                        # Bias toward mobile numbers
+                        if ptype in (phonenumbers.PhoneNumberType.MOBILE, phonenumbers.PhoneNumberType.FIXED_LINE_OR_MOBILE):
+                            phone_conf += 0.15
+                            phone_type_str = 'mobile'
+                        elif ptype == phonenumbers.PhoneNumberType.FIXED_LINE:
+                            phone_type_str = 'fixed_line'
+                        # Basic heuristics to penalize office-style numbers
+                        national = phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.NATIONAL)
+                        digits = re.sub(r'\D', '', national)
+                        if len(digits) >= 10:
+                            area = digits[:3]
+                            last4 = digits[-4:]
+                            if area in {'800','888','877','866','855','844','833','822'}:
+                                phone_conf -= 0.25
+                            if last4 in {'0000','1000','2000','3000','4000','5000'}:
+                                phone_conf -= 0.1
+                        text_ctx = (snippet + ' ' + title).lower()
+                        if any(token in text_ctx for token in ['cell', 'mobile', 'text me']):
+                            phone_conf += 0.1
+                        if any(token in text_ctx for token in ['office', 'main line', 'switchboard']):
+                            phone_conf -= 0.1
+                    except Exception:
+                        pass
+                    results['phones'].append({
+                        'phone': formatted_phone,
+                        'source': link,
+                        'confidence': max(0.0, min(1.0, phone_conf)),
+                        'type': phone_type_str
+                    })
+
+            results['sources'].append(link)
+
+        # Also check people also ask if available
+        for paa in search_results.get('peopleAlsoAsk', []):
+            snippet = paa.get('snippet', '')
+            emails = self.email_pattern.findall(snippet)
+            phones = self._find_phone_numbers(snippet)
+
+            for email in emails:
+                if self._is_valid_email(email, name):
+                    results['emails'].append({
+                        'email': email.lower(),
+                        'source': 'People Also Ask',
+                        'confidence': 0.7
+                    })
+
+            for phone in phones:
+                formatted_phone = self._format_phone(phone)
+                if formatted_phone:
+                    phone_conf = 0.7
+                    phone_type_str = 'unknown'
+                    try:
+                        parsed = phonenumbers.parse(formatted_phone, "US")
+                        ptype = phonenumbers.number_type(parsed)
+                        if ptype in (phonenumbers.PhoneNumberType.MOBILE, phonenumbers.PhoneNumberType.FIXED_LINE_OR_MOBILE):
+                            phone_conf += 0.15
+                            phone_type_str = 'mobile'
+                        elif ptype == phonenumbers.PhoneNumberType.FIXED_LINE:
+                            phone_type_str = 'fixed_line'
+                        national = phonenumbers.format_number(parsed, phonenumbers.PhoneNumberFormat.NATIONAL)
+                        digits = re.sub(r'\D', '', national)
+                        if len(digits) >= 10:
+                            area = digits[:3]
+                            last4 = digits[-4:]
+                            if area in {'800','888','877','866','855','844','833','822'}:
+                                phone_conf -= 0.25
+                            if last4 in {'0000','1000','2000','3000','4000','5000'}:
+                                phone_conf -= 0.1
+                        text_ctx = snippet.lower()
+                        if any(token in text_ctx for token in ['cell', 'mobile', 'text me']):
+                            phone_conf += 0.1
+                        if any(token in text_ctx for token in ['office', 'main line', 'switchboard']):
+                            phone_conf -= 0.1
+                    except Exception:
+                        pass
+                    results['phones'].append({
+                        'phone': formatted_phone,
+                        'source': 'People Also Ask',
+                        'confidence': max(0.0, min(1.0, phone_conf)),
+                        'type': phone_type_str
+                    })
+    
     def _build_search_queries(self, name: str, company: str, city: str, state: str, website: str) -> List[str]:
         """Build minimal search queries per spec (2 email + 2 phone)."""
         queries: List[str] = []
@@ -531,7 +771,11 @@ class ContactEnricher:
         self.facebook_service = FacebookService(facebook_token) if facebook_token else None
         self.website_scraper = WebsiteScraper()
         self.email_validator = EmailValidator()
-    
+
+    async def close(self):
+        """Release pooled HTTP connections held by the underlying services"""
+        await self.google_service.close()
+
     async def enrich_contact(self, contact_data: Dict[str, Any]) -> Dict[str, Any]:
         """Enrich a single contact with all available data"""
         enriched = {
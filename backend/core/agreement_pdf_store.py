@@ -0,0 +1,173 @@
+"""
+Storage for rendered agreement PDFs.
+
+PDFs are stored once as binary objects named by the SHA-256 of their content,
+either on local disk (AGREEMENT_PDF_DIR) or in S3 when AGREEMENT_PDF_S3_BUCKET
+is set. The agreements table only keeps the hash, size and the render version
+the PDF was produced from, so agreement queries never carry the document.
+
+Only a durable store (S3, or an AGREEMENT_PDF_DIR the operator points at a
+persistent disk) may replace the legacy base64 copy in agreements.pdf_data.
+The default directory inside the app is ephemeral on Render and not shared
+between services, so there it only acts as a cache.
+"""
+import hashlib
+import logging
+import os
+import tempfile
+from typing import Iterator, Optional
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 64 * 1024
+
+
+def content_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+class LocalPdfStore:
+    """Content-addressed files under `root`, fanned out by hash prefix"""
+
+    def __init__(self, root: str, durable: bool = False):
+        self.root = root
+        self.durable = durable
+
+    def _path(self, sha256: str) -> str:
+        return os.path.join(self.root, sha256[:2], f"{sha256}.pdf")
+
+    def exists(self, sha256: str) -> bool:
+        return os.path.exists(self._path(sha256))
+
+    def put(self, data: bytes) -> str:
+        sha256 = content_hash(data)
+        path = self._path(sha256)
+        if os.path.exists(path):
+            return sha256
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write to a temp file and rename so readers never see a partial PDF
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except Exception:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        return sha256
+
+    def read(self, sha256: str) -> bytes:
+        with open(self._path(sha256), 'rb') as f:
+            return f.read()
+
+    def iter_range(self, sha256: str, start: int, end: int) -> Iterator[bytes]:
+        """Yield bytes start..end (inclusive)"""
+        with open(self._path(sha256), 'rb') as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                chunk = f.read(min(CHUNK_SIZE, remaining))
+                if not chunk:
+                    break
+                remaining -= len(chunk)
+                yield chunk
+
+
+class S3PdfStore:
+    """Content-addressed objects in an S3 bucket"""
+
+    durable = True
+
+    def __init__(self, bucket: str, prefix: str = 'agreements/'):
+        import boto3
+        self.client = boto3.client('s3')
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def _key(self, sha256: str) -> str:
+        return f"{self.prefix}{sha256}.pdf"
+
+    def exists(self, sha256: str) -> bool:
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._key(sha256))
+            return True
+        except Exception:
+            return False
+
+    def put(self, data: bytes) -> str:
+        sha256 = content_hash(data)
+        if not self.exists(sha256):
+            self.client.put_object(
+                Bucket=self.bucket,
+                Key=self._key(sha256),
+                Body=data,
+                ContentType='application/pdf'
+            )
+        return sha256
+
+    def read(self, sha256: str) -> bytes:
+        return self.client.get_object(Bucket=self.bucket, Key=self._key(sha256))['Body'].read()
+
+    def iter_range(self, sha256: str, start: int, end: int) -> Iterator[bytes]:
+        response = self.client.get_object(
+            Bucket=self.bucket,
+            Key=self._key(sha256),
+            Range=f"bytes={start}-{end}"
+        )
+        yield from response['Body'].iter_chunks(CHUNK_SIZE)
+
+
+def verify(store, sha256: str) -> bool:
+    """Whether the stored object reads back with the expected content hash"""
+    try:
+        return content_hash(store.read(sha256)) == sha256
+    except Exception as e:
+        logger.error(f"Could not read back agreement PDF {sha256}: {e}")
+        return False
+
+
+_store = None
+
+
+def get_pdf_store():
+    global _store
+    if _store is None:
+        bucket = os.getenv("AGREEMENT_PDF_S3_BUCKET")
+        if bucket:
+            _store = S3PdfStore(bucket, os.getenv("AGREEMENT_PDF_S3_PREFIX", "agreements/"))
+        else:
+            configured_dir = os.getenv("AGREEMENT_PDF_DIR")
+            root = configured_dir or os.path.join(
+                os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "storage", "agreement_pdfs"
+            )
+            _store = LocalPdfStore(root, durable=bool(configured_dir))
+        logger.info(f"Agreement PDFs stored in {type(_store).__name__} ({'durable' if _store.durable else 'cache only'})")
+    return _store
+
+
+def parse_range(header: Optional[str], size: int):
+    """
+    Parse a single-range `Range: bytes=...` header into (start, end) inclusive.
+    Returns None to send the whole body (no header, or a malformed or
+    multi-range header, which may be ignored) and raises ValueError when the
+    range cannot be satisfied.
+    """
+    if not header or not header.startswith('bytes=') or ',' in header:
+        return None
+    first, _, last = header[len('bytes='):].strip().partition('-')
+    if not (first.isdigit() or last.isdigit()) or (first and last and not (first.isdigit() and last.isdigit())):
+        return None
+
+    if not first:
+        # Suffix range: the last N bytes
+        length = int(last)
+        if length == 0 or size == 0:
+            raise ValueError(header)
+        return max(0, size - length), size - 1
+
+    start = int(first)
+    end = int(last) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError(header)
+    return start, min(end, size - 1)
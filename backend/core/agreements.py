@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException, Response
-from sqlalchemy.orm import Session
-from sqlalchemy import Column, String, DateTime, Text, Float, Boolean
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import StreamingResponse
+from sqlalchemy.orm import Session, deferred
+from sqlalchemy import Column, String, DateTime, Text, Float, Boolean, Integer
 from sqlalchemy.ext.declarative import declarative_base
 from datetime import datetime
 from typing import Optional
@@ -18,6 +20,13 @@ import io
 import base64
 
 from .database import get_db, Base, engine
+from .agreement_pdf_store import content_hash, get_pdf_store, parse_range, verify
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Bump when generate_agreement_pdf's layout changes so cached PDFs are re-rendered
+PDF_RENDER_VERSION = "1"
 
 # Define router without a prefix; the app includes it with "/api/agreements"
 router = APIRouter(tags=["agreements"])
@@ -44,7 +53,10 @@ class Agreement(Base):
     viewed_at = Column(DateTime)
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
-    pdf_data = Column(Text)  # Store generated PDF as base64
+    pdf_data = deferred(Column(Text))  # Legacy base64 PDF, cleared by scripts/migrate_agreement_pdfs.py once a durable store holds it
+    pdf_sha256 = Column(String)  # Content hash of the stored PDF (also its ETag)
+    pdf_size = Column(Integer)
+    pdf_version = Column(String)  # agreement_render_version() the stored PDF was rendered from
     agreement_url = Column(String)
 
 # Create table if it doesn't exist
@@ -145,9 +157,14 @@ async def sign_agreement(
     agreement.signed_at = datetime.utcnow()
     agreement.status = "signed"
     
-    # Generate PDF
-    pdf_buffer = generate_agreement_pdf(agreement)
-    agreement.pdf_data = base64.b64encode(pdf_buffer.getvalue()).decode('utf-8')
+    # Render the signed PDF once; downloads are served from the PDF store, and
+    # without a durable store the row keeps the base64 original as well
+    try:
+        pdf_bytes = await run_in_threadpool(lambda: generate_agreement_pdf(agreement).getvalue())
+        await run_in_threadpool(store_agreement_pdf, agreement, pdf_bytes)
+    except Exception as e:
+        # The download endpoint renders it on first request instead
+        logger.error(f"Could not store PDF for agreement {agreement_id}: {e}")
     
     # Update related campaign contact if available
     try:
@@ -174,33 +191,133 @@ async def sign_agreement(
 @router.get("/{agreement_id}/pdf")
 async def get_agreement_pdf(
     agreement_id: str,
+    request: Request,
     db: Session = Depends(get_db)
 ):
-    """Download signed agreement PDF"""
+    """Download the agreement PDF (a preview for unsigned agreements)"""
     agreement = db.query(Agreement).filter(Agreement.id == agreement_id).first()
     
     if not agreement:
         raise HTTPException(status_code=404, detail="Agreement not found")
     
-    if agreement.status != "signed":
-        # Generate preview PDF for unsigned agreements
-        pdf_buffer = generate_agreement_pdf(agreement)
-        pdf_data = pdf_buffer.getvalue()
+    rendered = await run_in_threadpool(ensure_agreement_pdf, db, agreement)
+    return pdf_response(request, agreement, rendered)
+
+def agreement_render_version(agreement: Agreement) -> str:
+    """Hash of everything generate_agreement_pdf reads; a new value means a new PDF"""
+    signed = agreement.status == "signed"
+    inputs = [
+        PDF_RENDER_VERSION,
+        agreement.id,
+        agreement.start_date,
+        agreement.campaign_name,
+        agreement.contact_name,
+        agreement.contact_email,
+        agreement.company,
+        agreement.setup_fee,
+        agreement.monthly_fee,
+        signed,
+        agreement.signature_type if signed else None,
+        agreement.signature if signed else None,
+        agreement.signed_date if signed else None,
+        agreement.signed_at.isoformat() if signed and agreement.signed_at else None,
+    ]
+    return hashlib.sha256(json.dumps(inputs, default=str).encode('utf-8')).hexdigest()
+
+def store_agreement_pdf(agreement: Agreement, pdf_bytes: bytes, version: Optional[str] = None, clear_legacy: bool = False):
+    """
+    Write `pdf_bytes` to the PDF store and point the agreement at it (caller
+    commits). With `clear_legacy` the base64 copy in pdf_data is dropped, but
+    only when the store is durable and the stored copy reads back intact.
+    While the store is not durable, signed PDFs are also kept as base64 in
+    pdf_data, since the store is only a per-instance cache.
+    Returns whether pdf_data was cleared.
+    """
+    store = get_pdf_store()
+    agreement.pdf_sha256 = store.put(pdf_bytes)
+    agreement.pdf_size = len(pdf_bytes)
+    agreement.pdf_version = version or agreement_render_version(agreement)
+    if not store.durable:
+        if agreement.status == "signed":
+            agreement.pdf_data = base64.b64encode(pdf_bytes).decode('ascii')
+        return False
+    if clear_legacy and verify(store, agreement.pdf_sha256):
+        agreement.pdf_data = None
+        return True
+    return False
+
+def ensure_agreement_pdf(db: Session, agreement: Agreement) -> Optional[bytes]:
+    """
+    Make sure the PDF store holds the PDF for the agreement's current version,
+    rendering it only when it is missing or stale. Returns the bytes when it
+    had to render them, None when the stored copy is current.
+    """
+    store = get_pdf_store()
+    version = agreement_render_version(agreement)
+    
+    if agreement.pdf_sha256 and agreement.pdf_version == version and store.exists(agreement.pdf_sha256):
+        return None
+    
+    # A signed original still held as base64 in the row always wins over a re-render
+    legacy_pdf = agreement.pdf_data if agreement.status == "signed" else None
+    if legacy_pdf:
+        pdf_bytes = base64.b64decode(legacy_pdf)
     else:
-        # Use stored PDF for signed agreements
-        if agreement.pdf_data:
-            pdf_data = base64.b64decode(agreement.pdf_data)
-        else:
-            # Generate if not stored
-            pdf_buffer = generate_agreement_pdf(agreement)
-            pdf_data = pdf_buffer.getvalue()
+        if agreement.status == "signed" and agreement.pdf_sha256:
+            logger.error(f"Signed PDF {agreement.pdf_sha256} for agreement {agreement.id} is missing from the PDF store, re-rendering it")
+        pdf_bytes = generate_agreement_pdf(agreement).getvalue()
+    
+    try:
+        store_agreement_pdf(agreement, pdf_bytes, version, clear_legacy=bool(legacy_pdf))
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Could not store PDF for agreement {agreement.id}: {e}")
+    return pdf_bytes
+
+def _etag_matches(header: Optional[str], etag: str) -> bool:
+    if not header:
+        return False
+    if header.strip() == '*':
+        return True
+    return any(tag.strip().removeprefix('W/') == etag for tag in header.split(','))
+
+def pdf_response(request: Request, agreement: Agreement, rendered: Optional[bytes] = None) -> Response:
+    """Serve the agreement PDF with ETag / If-None-Match and single Range support"""
+    sha256 = content_hash(rendered) if rendered is not None else agreement.pdf_sha256
+    etag = f'"{sha256}"'
+    size = len(rendered) if rendered is not None else agreement.pdf_size
+    headers = {
+        "Content-Disposition": f"attachment; filename=agreement_{agreement.id}.pdf",
+        "Accept-Ranges": "bytes",
+        "Cache-Control": "private, no-cache",
+    }
+    headers["ETag"] = etag
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    
+    byte_range = None
+    if_range = request.headers.get("if-range")
+    if not if_range or if_range == etag:
+        try:
+            byte_range = parse_range(request.headers.get("range"), size)
+        except ValueError:
+            return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    
+    start, end = byte_range or (0, size - 1)
+    headers["Content-Length"] = str(end - start + 1)
+    if byte_range:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    status_code = 206 if byte_range else 200
     
-    return Response(
-        content=pdf_data,
+    if rendered is not None:
+        return Response(content=rendered[start:end + 1], status_code=status_code,
+                        media_type="application/pdf", headers=headers)
+    return StreamingResponse(
+        get_pdf_store().iter_range(sha256, start, end),
+        status_code=status_code,
         media_type="application/pdf",
-        headers={
-            "Content-Disposition": f"attachment; filename=agreement_{agreement_id}.pdf"
-        }
+        headers=headers
     )
 
 def generate_agreement_pdf(agreement: Agreement) -> io.BytesIO:
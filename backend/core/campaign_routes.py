@@ -1,6 +1,8 @@
 from fastapi import APIRouter, Depends, HTTPException, UploadFile, File, BackgroundTasks, Response
+from fastapi.responses import StreamingResponse
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
-from sqlalchemy import desc, text, func
+from sqlalchemy import desc, text, func, select
 from typing import List, Optional, Dict
 from pydantic import BaseModel, EmailStr
 from datetime import datetime
@@ -14,11 +16,18 @@ import hashlib
 import base64
 
 from . import auth
-from .database import get_db, User, Campaign, CampaignContact, CampaignTemplate, CampaignAnalytics, CampaignEmailTemplate, engine
+from .database import get_db, User, Campaign, CampaignContact, CampaignTemplate, CampaignAnalytics, CampaignEmailTemplate, engine, SessionLocal
 from contact_enricher.services import ContactEnricher
 from core.llm_handler import generate_text
 from .agreements import Agreement
 from .email_service import email_service
+from .job_queue import check_job_lease, enqueue_job, register_job_handler, report_progress, job_to_dict
+from .email_outbox import batch_counts, drain_outbox, enqueue_drainers, enqueue_emails, idempotency_key, register_delivery_hook
+from .database import BackgroundJob, EmailOutbox
+from .contact_ingest import ingest_campaign_contacts
+from .contact_stats import current_contact_stats, delete_contact_stats, refresh_contact_stats, stats_refresher, sync_contact_stats, with_coverage
+from .enrichment_pipeline import load_keyset_page
+from .mail_merge import campaign_merge_fields, compile_template, CONTACT_COLUMNS as MAIL_MERGE_CONTACT_COLUMNS
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -325,96 +334,128 @@ async def get_campaigns(
     
     return [safe_campaign_response(campaign) for campaign in campaigns]
 
+# Columns /all-contacts can return; campaign_name comes from the joined campaign
+ALL_CONTACT_FIELDS = [
+    'id', 'campaign_id', 'campaign_name', 'first_name', 'last_name', 'email',
+    'company', 'title', 'phone', 'neighborhood', 'state', 'geocoded_address',
+    # Enriched data
+    'enriched_company', 'enriched_title', 'enriched_phone', 'enriched_linkedin',
+    'enriched_website', 'enriched_industry', 'enriched_company_size', 'enriched_location',
+    # Email data
+    'personalized_email', 'personalized_subject',
+    # Status
+    'enrichment_status', 'email_status', 'excluded', 'manually_edited',
+    # Timestamps
+    'created_at', 'updated_at',
+    # RSVP fields
+    'is_rsvp', 'rsvp_status', 'rsvp_date',
+]
+ALL_CONTACTS_MAX_PAGE = 5000
+
+def _all_contacts_select(fields: List[str], campaign_ids: List[str], is_rsvp: Optional[bool],
+                         enrichment_status: Optional[str], email_status: Optional[str],
+                         excluded: Optional[bool]):
+    """Projected SELECT of only the requested columns, ordered by id for keyset paging"""
+    columns = [
+        Campaign.name.label('campaign_name') if field == 'campaign_name' else getattr(CampaignContact, field)
+        for field in fields
+    ]
+    # id is always selected (it is the cursor) even if not requested
+    if 'id' not in fields:
+        columns.append(CampaignContact.id)
+    stmt = select(*columns).join(Campaign, Campaign.id == CampaignContact.campaign_id)
+    
+    if campaign_ids:
+        stmt = stmt.where(CampaignContact.campaign_id.in_(campaign_ids))
+    if is_rsvp is not None:
+        stmt = stmt.where(CampaignContact.is_rsvp == is_rsvp)
+    if enrichment_status:
+        stmt = stmt.where(CampaignContact.enrichment_status == enrichment_status)
+    if email_status:
+        stmt = stmt.where(CampaignContact.email_status == email_status)
+    if excluded is not None:
+        stmt = stmt.where(CampaignContact.excluded == excluded)
+    return stmt.order_by(CampaignContact.id)
+
+def _fetch_contact_page(db: Session, stmt, fields: List[str], after_id: Optional[str], limit: int) -> List[dict]:
+    if after_id:
+        stmt = stmt.where(CampaignContact.id > after_id)
+    rows = db.execute(stmt.limit(limit)).all()
+    page = []
+    for row in rows:
+        mapping = row._mapping
+        item = {}
+        for field in fields:
+            value = mapping[field]
+            item[field] = value.isoformat() if isinstance(value, datetime) else value
+        item['_cursor'] = mapping['id']
+        page.append(item)
+    return page
+
 @router.get("/all-contacts")
-async def get_all_campaign_contacts(
+def get_all_campaign_contacts(
+    cursor: Optional[str] = None,
+    limit: int = 1000,
+    fields: Optional[str] = None,  # Comma-separated subset of ALL_CONTACT_FIELDS
+    campaign_id: Optional[str] = None,  # Comma-separated campaign ids
+    is_rsvp: Optional[bool] = None,
+    enrichment_status: Optional[str] = None,
+    email_status: Optional[str] = None,
+    excluded: Optional[bool] = None,
+    format: str = "json",  # "json" for one page, "ndjson" to stream every matching contact
     current_user: User = Depends(auth.get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    """Get all contacts from all campaigns (visible to all users)"""
-    try:
-        logger.info("Fetching all contacts across all campaigns")
-        
-        # Get all campaigns (no owner restriction)
-        campaigns = db.query(Campaign).all()
-        
-        logger.info(f"Found {len(campaigns)} campaigns for user {current_user.id}")
-        
-        # If no campaigns, return empty array
-        if not campaigns:
-            logger.info("No campaigns found, returning empty array")
-            return []
-        
-        # Get all contacts from these campaigns
-        campaign_ids = [c.id for c in campaigns]
-        logger.info(f"Campaign IDs: {campaign_ids}")
-        
-        contacts = db.query(CampaignContact).filter(
-            CampaignContact.campaign_id.in_(campaign_ids)
-        ).all()
-        
-        logger.info(f"Found {len(contacts)} contacts across all campaigns")
-        
-        # Add campaign names to contacts
-        campaign_map = {c.id: c.name for c in campaigns}
-        
-        # Properly serialize contacts
-        result = []
-        for i, contact in enumerate(contacts):
+    """Get contacts from all campaigns (visible to all users)
+    
+    JSON responses are one page: {"contacts": [...], "next_cursor": ...}; pass
+    next_cursor back as `cursor` until it is null. With format=ndjson every
+    matching contact is streamed, one JSON object per line.
+    """
+    if fields:
+        selected = [f.strip() for f in fields.split(',') if f.strip()]
+        unknown = [f for f in selected if f not in ALL_CONTACT_FIELDS]
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    else:
+        selected = ALL_CONTACT_FIELDS
+    
+    if format not in ("json", "ndjson"):
+        raise HTTPException(status_code=400, detail="format must be 'json' or 'ndjson'")
+    
+    limit = max(1, min(limit, ALL_CONTACTS_MAX_PAGE))
+    campaign_ids = [c.strip() for c in campaign_id.split(',') if c.strip()] if campaign_id else []
+    stmt = _all_contacts_select(selected, campaign_ids, is_rsvp, enrichment_status, email_status, excluded)
+    
+    if format == "ndjson":
+        def stream():
+            # Own session: the request-scoped one may be closed once streaming starts
+            stream_db = SessionLocal()
             try:
-                contact_dict = {
-                    'id': contact.id,
-                    'campaign_id': contact.campaign_id,
-                    'campaign_name': campaign_map.get(contact.campaign_id, ''),
-                    'first_name': contact.first_name,
-                    'last_name': contact.last_name,
-                    'email': contact.email,
-                    'company': contact.company,
-                    'title': contact.title,
-                    'phone': contact.phone,
-                    'neighborhood': contact.neighborhood,
-                    'state': getattr(contact, 'state', None),  # Safe access
-                    'geocoded_address': getattr(contact, 'geocoded_address', None),  # Safe access
-                    # Enriched data
-                    'enriched_company': contact.enriched_company,
-                    'enriched_title': contact.enriched_title,
-                    'enriched_phone': contact.enriched_phone,
-                    'enriched_linkedin': contact.enriched_linkedin,
-                    'enriched_website': contact.enriched_website,
-                    'enriched_industry': contact.enriched_industry,
-                    'enriched_company_size': contact.enriched_company_size,
-                    'enriched_location': contact.enriched_location,
-                    # Email data
-                    'personalized_email': contact.personalized_email,
-                    'personalized_subject': contact.personalized_subject,
-                    # Status
-                    'enrichment_status': contact.enrichment_status,
-                    'email_status': contact.email_status,
-                    'excluded': contact.excluded,
-                    'manually_edited': getattr(contact, 'manually_edited', False),  # Safe access
-                    # Timestamps
-                    'created_at': contact.created_at.isoformat() if contact.created_at else None,
-                    'updated_at': contact.updated_at.isoformat() if contact.updated_at else None,
-                    # RSVP fields
-                    'is_rsvp': contact.is_rsvp,
-                    'rsvp_status': contact.rsvp_status,
-                    'rsvp_date': contact.rsvp_date,
-                    # Agreement fields (safe access as they might not exist yet)
-                    'agreement_status': getattr(contact, 'agreement_status', None),
-                    'agreement_sent_at': getattr(contact, 'agreement_sent_at', None),
-                    'agreement_signed_at': getattr(contact, 'agreement_signed_at', None),
-                    'agreement_data': getattr(contact, 'agreement_data', None)
-                }
-                result.append(contact_dict)
-            except Exception as e:
-                logger.error(f"Error serializing contact {i} (ID: {contact.id}): {str(e)}")
-                logger.error(f"Contact attributes: {dir(contact)}")
-                raise
+                after_id = cursor
+                while True:
+                    page = _fetch_contact_page(stream_db, stmt, selected, after_id, limit)
+                    for item in page:
+                        after_id = item.pop('_cursor')
+                        yield json.dumps(item, default=str) + "\n"
+                    if len(page) < limit:
+                        break
+            finally:
+                stream_db.close()
         
-        logger.info(f"Successfully serialized {len(result)} contacts")
-        return result
+        return StreamingResponse(stream(), media_type="application/x-ndjson")
+    
+    try:
+        page = _fetch_contact_page(db, stmt, selected, cursor, limit)
     except Exception as e:
         logger.error(f"Error fetching all contacts: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
+    
+    next_cursor = page[-1]['_cursor'] if len(page) == limit else None
+    for item in page:
+        item.pop('_cursor')
+    
+    return {"contacts": page, "next_cursor": next_cursor}
 
 # Campaign templates - static routes before dynamic routes
 @router.post("/templates", response_model=CampaignTemplateResponse)
@@ -541,6 +582,7 @@ async def delete_campaign(
         db.query(CampaignContact).filter(
             CampaignContact.campaign_id == campaign_id
         ).delete(synchronize_session=False)
+        delete_contact_stats(db, campaign_id)
         
         # Now delete the campaign
         db.delete(campaign)
@@ -560,6 +602,8 @@ async def delete_campaign(
                           {"campaign_id": campaign_id})
                 db.execute(text("DELETE FROM campaign_contacts WHERE campaign_id = :campaign_id"), 
                           {"campaign_id": campaign_id})
+                db.execute(text("DELETE FROM campaign_contact_stats WHERE campaign_id = :campaign_id"), 
+                          {"campaign_id": campaign_id})
                 db.execute(text("DELETE FROM campaigns WHERE id = :campaign_id"), 
                           {"campaign_id": campaign_id})
                 db.commit()
@@ -589,126 +633,43 @@ async def upload_contacts(
         raise HTTPException(status_code=404, detail="Campaign not found")
     
     try:
-        # Read CSV
-        contents = await file.read()
-        csv_data = io.StringIO(contents.decode('utf-8'))
-        reader = csv.DictReader(csv_data)
-        
-        # Map possible column names to our fields (prefer explicit city/state when present)
-        column_mappings = {
-            'name': ['Name', 'name', 'full_name', 'Full Name', 'Contact Name'],
-            'first_name': ['first_name', 'firstname', 'first', 'fname', 'First Name'],
-            'last_name': ['last_name', 'lastname', 'last', 'lname', 'Last Name'],
-            'email': ['email', 'email_address', 'e-mail', 'Email', 'Email Address'],
-            'company': ['company', 'company_name', 'organization', 'Company', 'Company Name'],
-            'title': ['title', 'job_title', 'position', 'Title', 'Job Title', 'Position'],
-            'phone': ['phone', 'phone_number', 'telephone', 'Phone', 'Phone Number', 'cell', 'Cell Phone'],
-            # Use either explicit city or legacy neighborhood fields
-            'city': ['city', 'City', 'town', 'Town', 'neighborhood', 'neighborhood_1', 'Neighborhood 1', 'Neighborhood', 'area', 'district'],
-            'state': ['state', 'State', 'province', 'Province', 'region', 'Region']
-        }
-        
-        # Log CSV headers for debugging
-        if reader.fieldnames:
-            logger.info(f"CSV headers found: {reader.fieldnames}")
-        
-        contacts = []
-        for row_num, row in enumerate(reader, 1):
-            # Find the actual column names in the CSV
-            contact_data = {}
-            for field, possible_names in column_mappings.items():
-                value = None
-                for col_name in possible_names:
-                    if col_name in row:
-                        value = row[col_name]
-                        break
-                contact_data[field] = value or ''
-            
-            # Handle full name if first/last names are not provided separately
-            if contact_data.get('name') and not (contact_data['first_name'] or contact_data['last_name']):
-                name_parts = contact_data['name'].strip().split(' ', 1)
-                contact_data['first_name'] = name_parts[0] if name_parts else ''
-                contact_data['last_name'] = name_parts[1] if len(name_parts) > 1 else ''
-            
-            # Normalize city/state inputs without forcing defaults
-            # Back-compat: if legacy 'neighborhood' was mapped into 'city', keep using it as city
-            raw_city = (contact_data.get('city') or '').strip()
-            raw_state = (contact_data.get('state') or '').strip()
-
-            parsed_city = raw_city
-            parsed_state = raw_state
-
-            if raw_city:
-                # Handle patterns like "City, ST" or "City ST" or "City, ST, USA"
-                tmp = raw_city.replace(' USA', '').replace(', USA', '').strip()
-                if ',' in tmp and (not raw_state):
-                    parts = [p.strip() for p in tmp.split(',') if p.strip()]
-                    if len(parts) >= 2:
-                        parsed_city = parts[0]
-                        # Use the second token as state if it looks like 2-letter code or full name
-                        if len(parts[1]) == 2:
-                            parsed_state = parts[1].upper()
-                        else:
-                            parsed_state = parts[1]
-                else:
-                    # Check for trailing 2-letter state without comma
-                    tokens = tmp.rsplit(' ', 1)
-                    if len(tokens) == 2 and len(tokens[1]) == 2 and tokens[1].isalpha() and not raw_state:
-                        parsed_city = tokens[0]
-                        parsed_state = tokens[1].upper()
-
-            contact_data['city'] = parsed_city
-            contact_data['state'] = parsed_state
-            contact_data['geocoded_address'] = f"{parsed_city}, {parsed_state}, USA" if parsed_city and parsed_state else ''
-            
-            # Skip rows where all key fields are empty (name or company required)
-            if not any([contact_data['first_name'], contact_data['last_name'], contact_data['company']]):
-                logger.debug(f"Skipping row {row_num} - no name or company data")
-                continue
-            
-            # Log first few rows for debugging
-            if row_num <= 3:
-                logger.info(f"Row {row_num} data: {contact_data}")
-            
-            # Create contact with mapped data
-            contact = CampaignContact(
-                campaign_id=campaign_id,
-                first_name=contact_data['first_name'],
-                last_name=contact_data['last_name'],
-                email=_filter_generic_email(contact_data['email']),  # Filter generic inboxes
-                company=contact_data['company'],
-                title=contact_data['title'],
-                phone=contact_data['phone'],  # Can be empty
-                neighborhood=contact_data.get('city', ''),
-                state=contact_data.get('state', ''),  # Save state properly
-                geocoded_address=contact_data.get('geocoded_address', '')  # Save geocoded address
-            )
-            contacts.append(contact)
+        # Stream, normalize and bulk-load the CSV off the event loop
+        report = await run_in_threadpool(
+            ingest_campaign_contacts, db, campaign_id, file.file, _filter_generic_email
+        )
         
-        if not contacts:
+        if not report['rows_loaded']:
+            db.rollback()
             raise HTTPException(status_code=400, detail="No valid contacts found in CSV")
         
-        # Bulk insert contacts
-        db.bulk_save_objects(contacts)
-        
         # Update campaign stats
-        campaign.total_contacts = len(contacts)
+        campaign.total_contacts = report['rows_loaded']
         campaign.status = 'enriching'
         
         db.commit()
+        refresh_contact_stats(db, campaign_id)
         
-        # Start enrichment in background
-        background_tasks.add_task(enrich_campaign_contacts, campaign_id, current_user.id)
+        # Queue enrichment for the job workers
+        job = _enqueue_enrichment(db, campaign_id, current_user.id)
         
         return {
-            "message": f"Uploaded {len(contacts)} contacts",
+            "message": f"Uploaded {report['rows_loaded']} contacts",
             "campaign_id": campaign_id,
-            "status": "enriching"
+            "status": "enriching",
+            "job_id": job.id,
+            "rows_read": report['rows_read'],
+            "rows_loaded": report['rows_loaded'],
+            "rows_rejected": report['rows_rejected'],
+            "rejected_rows": report['rejected_rows']
         }
         
+    except HTTPException:
+        raise
     except UnicodeDecodeError:
+        db.rollback()
         raise HTTPException(status_code=400, detail="Invalid file encoding. Please ensure the CSV is UTF-8 encoded.")
     except Exception as e:
+        db.rollback()
         print(f"Error uploading contacts: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error processing CSV: {str(e)}")
 
@@ -955,22 +916,11 @@ async def reimport_enriched_contacts(
         # Commit all changes
         db.commit()
         
-        # Update campaign analytics
-        total_contacts = db.query(func.count(CampaignContact.id)).filter(
-            CampaignContact.campaign_id == campaign_id
-        ).scalar()
-        
-        contacts_with_email = db.query(func.count(CampaignContact.id)).filter(
-            CampaignContact.campaign_id == campaign_id,
-            CampaignContact.email != None,
-            CampaignContact.email != ''
-        ).scalar()
-        
-        contacts_with_phone = db.query(func.count(CampaignContact.id)).filter(
-            CampaignContact.campaign_id == campaign_id,
-            CampaignContact.phone != None,
-            CampaignContact.phone != ''
-        ).scalar()
+        # Update campaign analytics (one aggregate; also refreshes the materialised row)
+        stats = refresh_contact_stats(db, campaign_id)
+        total_contacts = stats['total_contacts']
+        contacts_with_email = stats['contacts_with_email']
+        contacts_with_phone = stats['contacts_with_phone']
         
         campaign.total_contacts = total_contacts
         db.commit()
@@ -1005,50 +955,14 @@ async def get_contact_stats(
     if not campaign:
         raise HTTPException(status_code=404, detail="Campaign not found")
     
-    total_contacts = db.query(func.count(CampaignContact.id)).filter(
-        CampaignContact.campaign_id == campaign_id
-    ).scalar()
-    
-    contacts_with_email = db.query(func.count(CampaignContact.id)).filter(
-        CampaignContact.campaign_id == campaign_id,
-        CampaignContact.email != None,
-        CampaignContact.email != ''
-    ).scalar()
-    
-    contacts_with_phone = db.query(func.count(CampaignContact.id)).filter(
-        CampaignContact.campaign_id == campaign_id,
-        ((CampaignContact.phone != None) & (CampaignContact.phone != '')) |
-        ((CampaignContact.enriched_phone != None) & (CampaignContact.enriched_phone != ''))
-    ).scalar()
+    stats = current_contact_stats(db, campaign_id)
     
-    contacts_missing_both = db.query(func.count(CampaignContact.id)).filter(
-        CampaignContact.campaign_id == campaign_id,
-        (CampaignContact.email == None) | (CampaignContact.email == ''),
-        ((CampaignContact.phone == None) | (CampaignContact.phone == '')) &
-        ((CampaignContact.enriched_phone == None) | (CampaignContact.enriched_phone == ''))
-    ).scalar()
-    
-    contacts_missing_email = db.query(func.count(CampaignContact.id)).filter(
-        CampaignContact.campaign_id == campaign_id,
-        (CampaignContact.email == None) | (CampaignContact.email == '')
-    ).scalar()
-    
-    contacts_missing_phone = db.query(func.count(CampaignContact.id)).filter(
-        CampaignContact.campaign_id == campaign_id,
-        ((CampaignContact.phone == None) | (CampaignContact.phone == '')) &
-        ((CampaignContact.enriched_phone == None) | (CampaignContact.enriched_phone == ''))
-    ).scalar()
-    
-    return {
-        "total_contacts": total_contacts,
-        "contacts_with_email": contacts_with_email,
-        "contacts_with_phone": contacts_with_phone,
-        "contacts_missing_both": contacts_missing_both,
-        "contacts_missing_email": contacts_missing_email,
-        "contacts_missing_phone": contacts_missing_phone,
-        "email_coverage_percentage": round((contacts_with_email / total_contacts * 100) if total_contacts > 0 else 0, 1),
-        "phone_coverage_percentage": round((contacts_with_phone / total_contacts * 100) if total_contacts > 0 else 0, 1)
-    }
+    return with_coverage({
+        name: stats[name] for name in (
+            'total_contacts', 'contacts_with_email', 'contacts_with_phone',
+            'contacts_missing_both', 'contacts_missing_email', 'contacts_missing_phone'
+        )
+    })
 
 @router.get("/{campaign_id}/contacts/diagnostic")
 async def get_contact_diagnostic(
@@ -1187,6 +1101,7 @@ async def bulk_update_contacts(
     )
     
     db.commit()
+    sync_contact_stats(db, campaign_id)
     
     return {"message": f"Updated {len(update_data.contact_ids)} contacts"}
 
@@ -1249,13 +1164,19 @@ async def generate_emails(
             detail="Campaign must be in 'ready_for_personalization' status"
         )
     
-    # Start email generation in background
-    background_tasks.add_task(generate_campaign_emails, campaign_id, current_user.id)
-    
     campaign.status = 'generating_emails'
     db.commit()
     
-    return {"message": "Email generation started", "status": "generating_emails"}
+    # Queue email generation for the job workers
+    job = enqueue_job(
+        db,
+        'generate_campaign_emails',
+        {'campaign_id': campaign_id, 'user_id': current_user.id},
+        campaign_id=campaign_id,
+        dedupe_key=f"generate_emails:{campaign_id}"
+    )
+    
+    return {"message": "Email generation started", "status": "generating_emails", "job_id": job.id}
 
 @router.get("/{campaign_id}/analytics")
 async def get_campaign_analytics(
@@ -1278,12 +1199,10 @@ async def get_campaign_analytics(
     ).order_by(desc(CampaignAnalytics.timestamp)).all()
     
     # Get current contact stats
-    contacts = db.query(CampaignContact).filter(
-        CampaignContact.campaign_id == campaign_id
-    ).all()
-    
-    contacts_with_email = sum(1 for c in contacts if c.email)
-    contacts_with_phone = sum(1 for c in contacts if c.enriched_phone or c.phone)
+    stats = current_contact_stats(db, campaign_id)
+    contact_count = stats['total_contacts']
+    contacts_with_email = stats['contacts_with_email']
+    contacts_with_phone = stats['contacts_with_phone']
     
     return {
         "campaign_id": campaign_id,
@@ -1298,12 +1217,12 @@ async def get_campaign_analytics(
                 if campaign.total_contacts > 0 else 0
             ),
             "email_capture_rate": (
-                contacts_with_email / len(contacts) * 100
-                if contacts else 0
+                contacts_with_email / contact_count * 100
+                if contact_count else 0
             ),
             "phone_capture_rate": (
-                contacts_with_phone / len(contacts) * 100
-                if contacts else 0
+                contacts_with_phone / contact_count * 100
+                if contact_count else 0
             ),
             "contacts_with_email": contacts_with_email,
             "contacts_with_phone": contacts_with_phone
@@ -1327,25 +1246,11 @@ async def get_enrichment_status(
         raise HTTPException(status_code=404, detail="Campaign not found")
     
     # Get contact status breakdown
-    pending = db.query(CampaignContact).filter(
-        CampaignContact.campaign_id == campaign_id,
-        CampaignContact.enrichment_status == 'pending'
-    ).count()
-    
-    processing = db.query(CampaignContact).filter(
-        CampaignContact.campaign_id == campaign_id,
-        CampaignContact.enrichment_status == 'processing'
-    ).count()
-    
-    success = db.query(CampaignContact).filter(
-        CampaignContact.campaign_id == campaign_id,
-        CampaignContact.enrichment_status == 'success'
-    ).count()
-    
-    failed = db.query(CampaignContact).filter(
-        CampaignContact.campaign_id == campaign_id,
-        CampaignContact.enrichment_status == 'failed'
-    ).count()
+    stats = current_contact_stats(db, campaign_id)
+    pending = stats['enrichment_pending']
+    processing = stats['enrichment_processing']
+    success = stats['enrichment_success']
+    failed = stats['enrichment_failed']
     
     # Get failed contacts with errors
     failed_contacts = db.query(CampaignContact).filter(
@@ -1394,6 +1299,7 @@ async def pause_enrichment(
 
     campaign.status = 'paused'
     db.commit()
+    sync_contact_stats(db, campaign_id)
 
     return {"message": "Enrichment paused"}
 
@@ -1419,15 +1325,39 @@ async def resume_enrichment(
             CampaignContact.enrichment_status == 'processing'
         ).update({CampaignContact.enrichment_status: 'pending'}, synchronize_session=False)
         db.commit()
+        sync_contact_stats(db, campaign_id)
 
     # Ensure campaign status reflects enrichment in progress
     campaign.status = 'enriching'
     db.commit()
 
-    # Kick off enrichment in background
-    background_tasks.add_task(enrich_campaign_contacts, campaign_id, current_user.id)
+    # Queue enrichment for the job workers (no-op if one is already active)
+    job = _enqueue_enrichment(db, campaign_id, current_user.id)
+
+    return {"message": "Enrichment resumed", "reset_contacts": reset_count, "job_id": job.id}
 
-    return {"message": "Enrichment resumed", "reset_contacts": reset_count}
+def _enqueue_enrichment(db: Session, campaign_id: str, user_id: str) -> BackgroundJob:
+    return enqueue_job(
+        db,
+        'enrich_campaign_contacts',
+        {'campaign_id': campaign_id, 'user_id': user_id},
+        campaign_id=campaign_id,
+        dedupe_key=f"enrich:{campaign_id}"
+    )
+
+@router.get("/{campaign_id}/jobs")
+async def get_campaign_jobs(
+    campaign_id: str,
+    limit: int = 20,
+    current_user: User = Depends(auth.get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    """List recent background jobs for a campaign with their progress"""
+    jobs = db.query(BackgroundJob).filter(
+        BackgroundJob.campaign_id == campaign_id
+    ).order_by(desc(BackgroundJob.created_at)).limit(limit).all()
+    
+    return [job_to_dict(job) for job in jobs]
 
 # Background tasks
 def enrich_campaign_contacts(campaign_id: str, user_id: str):
@@ -1445,6 +1375,17 @@ def enrich_campaign_contacts(campaign_id: str, user_id: str):
             logger.error(f"Campaign {campaign_id} not found")
             return
         
+        # Only one enrichment job runs per campaign, so anything still marked
+        # 'processing' was left behind by a worker that died mid-run
+        reset_count = db.query(CampaignContact).filter(
+            CampaignContact.campaign_id == campaign_id,
+            CampaignContact.enrichment_status == 'processing'
+        ).update({CampaignContact.enrichment_status: 'pending'}, synchronize_session=False)
+        db.commit()
+        if reset_count:
+            logger.info(f"Reset {reset_count} contacts from 'processing' to 'pending' for campaign {campaign_id}")
+            sync_contact_stats(db, campaign_id)
+        
         # Record start time
         try:
             analytics = CampaignAnalytics(
@@ -1460,13 +1401,13 @@ def enrich_campaign_contacts(campaign_id: str, user_id: str):
             # Create a minimal analytics record without new fields
             analytics = None
         
-        # Get contacts to enrich
-        contacts = db.query(CampaignContact).filter(
+        # Count contacts to enrich; the rows themselves are streamed to the workers
+        pending_count = db.query(func.count(CampaignContact.id)).filter(
             CampaignContact.campaign_id == campaign_id,
             CampaignContact.enrichment_status == 'pending'
-        ).all()
+        ).scalar() or 0
         
-        logger.info(f"Found {len(contacts)} contacts to enrich for campaign {campaign_id}")
+        logger.info(f"Found {pending_count} contacts to enrich for campaign {campaign_id}")
         
         enricher = ContactEnricher()
         
@@ -1478,7 +1419,7 @@ def enrich_campaign_contacts(campaign_id: str, user_id: str):
         try:
             enriched_count, failed_count = loop.run_until_complete(
                 enrich_contacts_concurrently(
-                    contacts, campaign_id, enricher, db, SessionLocal
+                    campaign_id, enricher, SessionLocal, pending_count
                 )
             )
         finally:
@@ -1490,13 +1431,12 @@ def enrich_campaign_contacts(campaign_id: str, user_id: str):
         campaign.status = 'ready_for_personalization'
         db.commit()  # Commit the status change immediately
         
-        # Calculate email and phone capture rates
-        all_contacts = db.query(CampaignContact).filter(
-            CampaignContact.campaign_id == campaign_id
-        ).all()
-        
-        contacts_with_email = sum(1 for c in all_contacts if c.email)
-        contacts_with_phone = sum(1 for c in all_contacts if c.enriched_phone or c.phone)
+        # Calculate email and phone capture rates (refreshes the stats row too,
+        # since the bulk writer bypasses the ORM change tracking)
+        stats = refresh_contact_stats(db, campaign_id)
+        contact_count = stats['total_contacts']
+        contacts_with_email = stats['contacts_with_email']
+        contacts_with_phone = stats['contacts_with_phone']
         
         # Record end time and capture rates
         if analytics:
@@ -1506,215 +1446,235 @@ def enrich_campaign_contacts(campaign_id: str, user_id: str):
                 analytics.contacts_with_email = contacts_with_email
                 analytics.contacts_with_phone = contacts_with_phone
                 analytics.enrichment_success_rate = (
-                    enriched_count / len(contacts) * 100 if contacts else 0
+                    enriched_count / pending_count * 100 if pending_count else 0
                 )
                 analytics.email_capture_rate = (
-                    contacts_with_email / len(all_contacts) * 100 if all_contacts else 0
+                    contacts_with_email / contact_count * 100 if contact_count else 0
                 )
                 analytics.phone_capture_rate = (
-                    contacts_with_phone / len(all_contacts) * 100 if all_contacts else 0
+                    contacts_with_phone / contact_count * 100 if contact_count else 0
                 )
                 db.commit()
             except Exception as e:
                 logger.warning(f"Could not update analytics: {e}")
                 db.rollback()
         
-        logger.info(f"Enrichment completed: {enriched_count}/{len(contacts)} successful")
-        logger.info(f"Email capture rate: {(contacts_with_email / len(all_contacts) * 100 if all_contacts else 0):.1f}%")
-        logger.info(f"Phone capture rate: {(contacts_with_phone / len(all_contacts) * 100 if all_contacts else 0):.1f}%")
+        logger.info(f"Enrichment completed: {enriched_count}/{pending_count} successful")
+        logger.info(f"Email capture rate: {(contacts_with_email / contact_count * 100 if contact_count else 0):.1f}%")
+        logger.info(f"Phone capture rate: {(contacts_with_phone / contact_count * 100 if contact_count else 0):.1f}%")
         
         # TODO: Send notification email to campaign owner
         
-    except Exception as e:
-        print(f"Error enriching contacts: {e}")
+    except Exception:
+        logger.exception(f"Error enriching contacts for campaign {campaign_id}")
+        db.rollback()
+        # Let the job queue retry the job or mark it failed
+        raise
     finally:
         db.close()
 
-async def enrich_contacts_concurrently(contacts, campaign_id, enricher, db, SessionLocal):
+# Columns enrichment reads; rows are loaded as plain dicts so workers never touch a session
+_ENRICHMENT_COLUMNS = [
+    'id', 'first_name', 'last_name', 'company', 'title', 'email', 'phone',
+    'neighborhood', 'state', 'enriched_phone', 'enriched_company',
+    'enriched_title', 'enriched_location',
+]
+
+def _build_enrichment_update(contact: dict, enriched_data: Optional[dict]) -> tuple:
     """
-    Enrich multiple contacts concurrently with rate limiting.
-    Process up to 30 contacts at once - database pool now supports 50 connections.
-    SERP API supports 300 queries/second, so API is not the bottleneck.
+    Turn enricher output into a CampaignContact update mapping.
+    Returns (mapping, success) where mapping is suitable for bulk_update_mappings.
     """
-    import asyncio
+    changes = {}
+
+    def current(field):
+        return changes[field] if field in changes else contact.get(field)
+
+    success = False
+    if enriched_data and 'enrichment_results' in enriched_data:
+        results = enriched_data['enrichment_results']
+        
+        # Process Google SERP results
+        if 'google' in results:
+            google_data = results['google']
+            
+            # Extract best email (skip generic inboxes)
+            best_email = None
+            best_email_confidence = 0
+            for email_data in google_data.get('emails', []):
+                email_value = email_data.get('email')
+                if not email_value or _is_generic_email(email_value):
+                    continue
+                if email_data.get('confidence', 0) > best_email_confidence:
+                    best_email = email_value
+                    best_email_confidence = email_data.get('confidence', 0)
+            
+            if best_email and not current('email'):
+                changes['email'] = best_email
+            
+            # Extract best phone (prefer mobile if multiple)
+            phone_candidates = [p.get('phone') for p in google_data.get('phones', []) if p.get('phone')]
+            best_phone = _prefer_mobile_phone(phone_candidates)
+            
+            if best_phone:
+                changes['enriched_phone'] = best_phone
+            
+            # Extract LinkedIn
+            for source in google_data.get('sources', []):
+                if 'linkedin.com' in source.lower():
+                    changes['enriched_linkedin'] = source
+                    break
+        
+        # Process website scraping results
+        if 'website' in results:
+            website_data = results['website']
+            
+            website_emails = [e for e in website_data.get('emails', []) if not _is_generic_email(e)]
+            if website_emails and not current('email'):
+                changes['email'] = website_emails[0]
+            
+            website_phones = website_data.get('phones', [])
+            if website_phones and not current('enriched_phone'):
+                best_site_phone = _prefer_mobile_phone(website_phones)
+                if best_site_phone:
+                    changes['enriched_phone'] = best_site_phone
+            
+            changes['enriched_company'] = website_data.get('company_name') or current('company')
+            changes['enriched_location'] = website_data.get('location') or current('enriched_location')
+            changes['enriched_industry'] = website_data.get('industry')
+            changes['enriched_website'] = website_data.get('website')
+        
+        # Process Facebook results
+        if 'facebook' in results:
+            facebook_data = results['facebook']
+            fb_emails = [e for e in facebook_data.get('emails', []) if not _is_generic_email(e)]
+            if fb_emails and not current('email'):
+                changes['email'] = fb_emails[0]
+            
+            fb_phones = facebook_data.get('phones', [])
+            if fb_phones and not current('enriched_phone'):
+                changes['enriched_phone'] = fb_phones[0]
+        
+        # Use original values as fallback
+        changes['enriched_company'] = current('enriched_company') or current('company')
+        changes['enriched_title'] = current('enriched_title') or current('title')
+        
+        changes['enrichment_status'] = 'success'
+        success = True
+    else:
+        changes['enrichment_status'] = 'failed'
+        changes['enrichment_error'] = 'No enrichment data found'
     
-    # Now we can safely process 30 concurrent with our increased database pool
-    # Database pool: 20 permanent + 30 overflow = 50 total connections
-    # We use 30 concurrent to leave room for other operations
-    MAX_CONCURRENT = 30  # Increased from 20 to 30 per request
-    semaphore = asyncio.Semaphore(MAX_CONCURRENT)
-    
-    enriched_count = 0
-    failed_count = 0
-    total_contacts = len(contacts)
-    
-    async def process_single_contact(contact, index):
-        """Process a single contact with rate limiting"""
-        async with semaphore:
-            # Use a separate session for each contact to avoid conflicts
-            contact_db = SessionLocal()
-            try:
-                # Get fresh contact from database
-                fresh_contact = contact_db.query(CampaignContact).filter(
-                    CampaignContact.id == contact.id
-                ).first()
-                
-                if not fresh_contact:
-                    logger.error(f"Contact {contact.id} not found")
-                    return 0, 1
-                
-                # Check if campaign still exists (only check every 50 contacts)
-                if index % 10 == 0 or index < 5:
-                    campaign_check = contact_db.query(Campaign).filter(
-                        Campaign.id == campaign_id
-                    ).first()
-                    if not campaign_check:
-                        logger.warning(f"Campaign {campaign_id} no longer exists, stopping enrichment")
-                        return 0, 0
-                    if campaign_check.status == 'paused':
-                        logger.warning(f"Campaign {campaign_id} paused, stopping enrichment")
-                        return 0, 0
-                
-                # Check if this contact has been cancelled
-                if fresh_contact.enrichment_status == 'cancelled':
-                    logger.info(f"Contact {fresh_contact.id} cancelled, skipping")
-                    return 0, 0
-                
-                # Log progress every 10 contacts
-                if index % 10 == 0 or index < 5:
-                    logger.info(f"Processing contact {index+1}/{total_contacts} ({(index+1)/total_contacts*100:.1f}%)")
-                
-                logger.debug(f"Enriching: {fresh_contact.first_name} {fresh_contact.last_name} at {fresh_contact.company}")
-                fresh_contact.enrichment_status = 'processing'
-                contact_db.commit()
-
-                # Prepare data for enrichment
-                state = fresh_contact.state or 'Alabama'
-                contact_data = {
-                    'Name': f"{fresh_contact.first_name} {fresh_contact.last_name}".strip(),
-                    'Company': fresh_contact.company or '',
-                    'Email': fresh_contact.email or '',
-                    'Phone': fresh_contact.phone or '',
-                    'City': fresh_contact.neighborhood or '',
-                    'State': state
-                }
-                
-                # Enrich contact
-                enriched_data = await enricher.enrich_contact(contact_data)
-                
-                # Process enrichment results
-                success = False
-                if enriched_data and 'enrichment_results' in enriched_data:
-                    results = enriched_data['enrichment_results']
-                    
-                    # Process Google SERP results
-                    if 'google' in results:
-                        google_data = results['google']
-                        
-                        # Extract best email (skip generic inboxes)
-                        best_email = None
-                        best_email_confidence = 0
-                        for email_data in google_data.get('emails', []):
-                            email_value = email_data.get('email')
-                            if not email_value or _is_generic_email(email_value):
-                                continue
-                            if email_data.get('confidence', 0) > best_email_confidence:
-                                best_email = email_value
-                                best_email_confidence = email_data.get('confidence', 0)
-                        
-                        if best_email and not fresh_contact.email:
-                            fresh_contact.email = best_email
-                        
-                        # Extract best phone (prefer mobile if multiple)
-                        phone_candidates = [p.get('phone') for p in google_data.get('phones', []) if p.get('phone')]
-                        best_phone = _prefer_mobile_phone(phone_candidates)
-                        
-                        if best_phone:
-                            fresh_contact.enriched_phone = best_phone
-                        
-                        # Extract LinkedIn
-                        for source in google_data.get('sources', []):
-                            if 'linkedin.com' in source.lower():
-                                fresh_contact.enriched_linkedin = source
-                                break
-                    
-                    # Process website scraping results
-                    if 'website' in results:
-                        website_data = results['website']
-                        
-                        website_emails = [e for e in website_data.get('emails', []) if not _is_generic_email(e)]
-                        if website_emails and not fresh_contact.email:
-                            fresh_contact.email = website_emails[0]
-                        
-                        website_phones = website_data.get('phones', [])
-                        if website_phones and not fresh_contact.enriched_phone:
-                            best_site_phone = _prefer_mobile_phone(website_phones)
-                            if best_site_phone:
-                                fresh_contact.enriched_phone = best_site_phone
-                        
-                        fresh_contact.enriched_company = website_data.get('company_name') or fresh_contact.company
-                        fresh_contact.enriched_location = website_data.get('location') or fresh_contact.enriched_location
-                        fresh_contact.enriched_industry = website_data.get('industry')
-                        fresh_contact.enriched_website = website_data.get('website')
-                    
-                    # Process Facebook results
-                    if 'facebook' in results:
-                        facebook_data = results['facebook']
-                        fb_emails = [e for e in facebook_data.get('emails', []) if not _is_generic_email(e)]
-                        if fb_emails and not fresh_contact.email:
-                            fresh_contact.email = fb_emails[0]
-                        
-                        fb_phones = facebook_data.get('phones', [])
-                        if fb_phones and not fresh_contact.enriched_phone:
-                            fresh_contact.enriched_phone = fb_phones[0]
-                    
-                    # Use original values as fallback
-                    fresh_contact.enriched_company = fresh_contact.enriched_company or fresh_contact.company
-                    fresh_contact.enriched_title = fresh_contact.enriched_title or fresh_contact.title
-                    
-                    fresh_contact.enrichment_status = 'success'
-                    success = True
-                    logger.info(f"Successfully enriched contact {index+1}/{total_contacts}")
-                    
-                    # Update progress counter for successful enrichments
-                    # processed_count += 1 # This variable is not defined in this scope
-                    if index % 25 == 0:  # Log every 25 contacts processed
-                        elapsed_time = (datetime.utcnow() - datetime.utcnow()).total_seconds()  # You'd need to track start time
-                        logger.info(f"Progress: {index+1}/{total_contacts} contacts enriched ({((index+1)/total_contacts)*100:.1f}%)")
-                else:
-                    fresh_contact.enrichment_status = 'failed'
-                    fresh_contact.enrichment_error = 'No enrichment data found'
-                    logger.warning(f"No enrichment data found for contact {index+1}/{total_contacts}")
-                    # processed_count += 1 # This variable is not defined in this scope
-                
-                fresh_contact.updated_at = datetime.utcnow()
-                contact_db.commit()
-                
-                return (1 if success else 0), (0 if success else 1)
-                
-            except Exception as e:
-                logger.error(f"Error enriching contact {index+1}/{total_contacts}: {str(e)}")
-                return 0, 1
-            finally:
-                # CRITICAL: Always close the database session to return connection to pool
-                contact_db.close()
+    changes['id'] = contact['id']
+    changes['updated_at'] = datetime.utcnow()
+    return changes, success
+
+async def enrich_contacts_concurrently(campaign_id, enricher, SessionLocal, total_contacts):
+    """
+    Enrich a campaign's pending contacts with a fixed pool of workers.
+    Contacts are streamed from the database by keyset pagination, so memory is
+    constant in the list size. Workers only hold a database connection inside
+    the write-behind stage, which flushes results in bulk, so concurrency is no
+    longer capped by the pool size.
+    """
+    from .enrichment_pipeline import BulkResultWriter, CampaignStopFlag, ContactWorkerPool, load_keyset_page
+    
+    # Network-bound workers; DB writes are funnelled through a single writer
+    MAX_CONCURRENT = int(os.getenv('CAMPAIGN_ENRICH_CONCURRENCY', '60'))
+    
+    counts = {'enriched': 0, 'failed': 0, 'started': 0}
+    
+    writer = BulkResultWriter(
+        SessionLocal,
+        CampaignContact,
+        batch_size=int(os.getenv('CAMPAIGN_ENRICH_FLUSH_ROWS', '100')),
+        flush_interval=float(os.getenv('CAMPAIGN_ENRICH_FLUSH_MS', '500')) / 1000,
+        # Bulk writes skip the stats flush events; keep the materialised counts following along
+        after_flush=stats_refresher(SessionLocal, campaign_id)
+    ).start()
+    stop_flag = CampaignStopFlag(SessionLocal, campaign_id)
+    pool = ContactWorkerPool(
+        MAX_CONCURRENT,
+        page_size=int(os.getenv('CAMPAIGN_ENRICH_PAGE_SIZE', '500')),
+        stop_flag=stop_flag
+    )
+    
+    def fetch_page(after_id, limit):
+        return load_keyset_page(
+            SessionLocal, CampaignContact, _ENRICHMENT_COLUMNS,
+            [CampaignContact.campaign_id == campaign_id, CampaignContact.enrichment_status == 'pending'],
+            after_id, limit
+        )
+    
+    async def process_single_contact(contact):
+        """Enrich one contact and hand the result to the writer"""
+        if await stop_flag.should_stop():
+            return
+        
+        index = counts['started']
+        counts['started'] += 1
+        total = max(total_contacts, index + 1)
+        
+        try:
+            # Log progress every 10 contacts
+            if index % 10 == 0 or index < 5:
+                logger.info(f"Processing contact {index+1}/{total} ({(index+1)/total*100:.1f}%)")
+            
+            logger.debug(f"Enriching: {contact['first_name']} {contact['last_name']} at {contact['company']}")
+            check_job_lease()
+            await writer.put({'id': contact['id'], 'enrichment_status': 'processing'})
+            
+            # Prepare data for enrichment
+            state = contact['state'] or 'Alabama'
+            contact_data = {
+                'Name': f"{contact['first_name'] or ''} {contact['last_name'] or ''}".strip(),
+                'Company': contact['company'] or '',
+                'Email': contact['email'] or '',
+                'Phone': contact['phone'] or '',
+                'City': contact['neighborhood'] or '',
+                'State': state
+            }
+            
+            # Enrich contact
+            enriched_data = await enricher.enrich_contact(contact_data)
+            
+            update, success = _build_enrichment_update(contact, enriched_data)
+            await writer.put(update)
+            
+            if success:
+                counts['enriched'] += 1
+                report_progress(counts['enriched'] + counts['failed'], total_contacts)
+                logger.info(f"Successfully enriched contact {index+1}/{total}")
+            else:
+                counts['failed'] += 1
+                report_progress(counts['enriched'] + counts['failed'], total_contacts)
+                logger.warning(f"No enrichment data found for contact {index+1}/{total}")
+            
+        except Exception as e:
+            counts['failed'] += 1
+            report_progress(counts['enriched'] + counts['failed'], total_contacts)
+            logger.error(f"Error enriching contact {index+1}/{total}: {str(e)}")
+            await writer.put({
+                'id': contact['id'],
+                'enrichment_status': 'failed',
+                'enrichment_error': str(e)[:500],
+                'updated_at': datetime.utcnow()
+            })
     
     # Log initial status
-    logger.info(f"Starting concurrent enrichment of {total_contacts} contacts with {MAX_CONCURRENT} workers")
-    
-    # Process all contacts concurrently
-    tasks = [process_single_contact(contact, i) for i, contact in enumerate(contacts)]
-    results = await asyncio.gather(*tasks, return_exceptions=True)
-    
-    # Count successes and failures
-    for i, result in enumerate(results):
-        if isinstance(result, tuple):
-            enriched_count += result[0]
-            failed_count += result[1]
-        elif isinstance(result, Exception):
-            # Exception occurred
-            failed_count += 1
-            logger.error(f"Task {i+1} exception: {result}")
+    logger.info(f"Starting enrichment of {total_contacts} contacts with {MAX_CONCURRENT} workers")
+    
+    try:
+        await pool.run(fetch_page, process_single_contact)
+    finally:
+        await writer.close()
+        await enricher.close()
+    
+    if writer.rows_failed:
+        logger.error(f"{writer.rows_failed} enrichment results could not be written")
+    
+    enriched_count = counts['enriched']
+    failed_count = counts['failed']
     
     # Log final results
     logger.info(f"Enrichment complete: {enriched_count} successful, {failed_count} failed out of {total_contacts} total")
@@ -1753,132 +1713,60 @@ def generate_campaign_emails(campaign_id: str, user_id: str):
         # Ensure we have a clean session state
         db.commit()
         
-        # Get contacts to generate emails for
-        contacts = db.query(CampaignContact).filter(
+        # Contacts to generate emails for, streamed in keyset pages
+        contact_filters = [
             CampaignContact.campaign_id == campaign_id,
             CampaignContact.enrichment_status == 'success',
             CampaignContact.excluded == False,
             CampaignContact.email_status == 'pending'
-        ).all()
+        ]
+        total = db.query(func.count(CampaignContact.id)).filter(*contact_filters).scalar() or 0
         
+        # Parse the templates once; each contact is then rendered in a single pass
+        merge_fields = campaign_merge_fields(campaign)
+        body_template = compile_template(campaign.email_template or '', merge_fields)
+        subject_template = compile_template(campaign.email_subject or '', merge_fields)
+        
+        batch_size = int(os.getenv("MAIL_MERGE_BATCH_SIZE", "1000"))
         generated_count = 0
+        processed = 0
+        after_id = None
         
-        for contact in contacts:
-            try:
-                # Simple mail merge - no AI personalization
-                email_body = campaign.email_template or ''
-                email_subject = campaign.email_subject or ''
-                
-                # Parse event slots into Date1/Time1, Date2/Time2, Date3/Time3
-                date1 = date2 = date3 = ""
-                time1 = time2 = time3 = ""
-                calendly1 = calendly2 = calendly3 = ""
-                
-                # Use event_slots if available, otherwise fall back to old structure
-                event_slots = getattr(campaign, 'event_slots', []) or []
-                if event_slots:
-                    if len(event_slots) > 0:
-                        date1 = event_slots[0].get('date', '')
-                        time1 = event_slots[0].get('time', '')
-                        calendly1 = event_slots[0].get('calendly_link', '')
-                    if len(event_slots) > 1:
-                        date2 = event_slots[1].get('date', '')
-                        time2 = event_slots[1].get('time', '')
-                        calendly2 = event_slots[1].get('calendly_link', '')
-                    if len(event_slots) > 2:
-                        date3 = event_slots[2].get('date', '')
-                        time3 = event_slots[2].get('time', '')
-                        calendly3 = event_slots[2].get('calendly_link', '')
-                else:
-                    # Fall back to old structure
-                    if campaign.event_times and len(campaign.event_times) > 0:
-                        date1 = campaign.event_date.strftime('%A, %B %d')
-                        time1 = campaign.event_times[0] if campaign.event_times[0] else ''
-                    if campaign.event_times and len(campaign.event_times) > 1:
-                        date2 = campaign.event_date.strftime('%A, %B %d')
-                        time2 = campaign.event_times[1]
-                    if campaign.event_times and len(campaign.event_times) > 2:
-                        date3 = campaign.event_date.strftime('%A, %B %d')
-                        time3 = campaign.event_times[2]
-                
-                # Use city and state fields directly if available
-                city = getattr(campaign, 'city', '')
-                state = getattr(campaign, 'state', '')
-                
-                # Fall back to extracting from target_cities if city/state not set
-                if not city and not state and campaign.target_cities:
-                    parts = campaign.target_cities.split(',')
-                    city = parts[0].strip() if parts else ''
-                    state = parts[1].strip() if len(parts) > 1 else ''
-                
-                # Campaign-level replacements (double square brackets)
-                campaign_replacements = {
-                    '[[VIDEO-LINK]]': getattr(campaign, 'video_link', 'https://vimeo.com/adtv-intro'),
-                    '[[City]]': city,
-                    '[[State]]': state,
-                    '[[Event-Link]]': getattr(campaign, 'event_link', campaign.calendly_link or ''),
-                    '[[Date1]]': date1,
-                    '[[Time1]]': time1,
-                    '[[Date2]]': date2,
-                    '[[Time2]]': time2,
-                    '[[Date3]]': date3,
-                    '[[Time3]]': time3,
-                    '[[Hotel Name]]': campaign.hotel_name or '',
-                    '[[Hotel Address]]': campaign.hotel_address or '',
-                    '[[Associate Name]]': campaign.owner_name,
-                    '[[Associate email]]': campaign.owner_email,
-                    '[[Associate Phone]]': getattr(campaign, 'owner_phone', ''),
-                    '[[Calendly Link]]': campaign.calendly_link or '',
-                    '[[Calendly Link 1]]': calendly1,
-                    '[[Calendly Link 2]]': calendly2,
-                    '[[Calendly Link 3]]': calendly3,
-                    # Legacy field names for backward compatibility
-                    '[[HotelName]]': campaign.hotel_name or '',
-                    '[[HotelAddress]]': campaign.hotel_address or '',
-                    '[[AssociateName]]': campaign.owner_name,
-                    '[[AssociatePhone]]': getattr(campaign, 'owner_phone', ''),
-                }
-                
-                # Contact-level replacements (double curly braces)
-                contact_replacements = {
-                    '{{FirstName}}': contact.first_name or '',
-                    '{{LastName}}': contact.last_name or '',
-                    '{{Neighborhood_1}}': contact.neighborhood or '',
-                    '{{Email}}': contact.email or '',
-                    '{{Company}}': contact.enriched_company or contact.company or '',
-                    '{{Title}}': contact.enriched_title or contact.title or '',
-                    '{{Phone}}': contact.enriched_phone or contact.phone or '',
-                    # Legacy field names for backward compatibility
-                    '{{first_name}}': contact.first_name or '',
-                    '{{last_name}}': contact.last_name or '',
-                    '{{neighborhood}}': contact.neighborhood or '',
-                    '{{email}}': contact.email or '',
-                    '{{company}}': contact.enriched_company or contact.company or '',
-                    '{{title}}': contact.enriched_title or contact.title or '',
-                    '{{phone}}': contact.enriched_phone or contact.phone or '',
-                }
-                
-                # Apply all replacements
-                for key, value in campaign_replacements.items():
-                    email_body = email_body.replace(key, value)
-                    email_subject = email_subject.replace(key, value)
-                
-                for key, value in contact_replacements.items():
-                    email_body = email_body.replace(key, value)
-                    email_subject = email_subject.replace(key, value)
-                
-                # Store the mail-merged email
-                contact.personalized_email = email_body
-                contact.personalized_subject = email_subject
-                contact.email_status = 'generated'
-                generated_count += 1
-                
-            except Exception as e:
-                contact.email_status = 'failed'
-                logger.error(f"Error generating email for contact {contact.id}: {e}")
+        while True:
+            contacts = load_keyset_page(
+                SessionLocal, CampaignContact, ['id'] + MAIL_MERGE_CONTACT_COLUMNS,
+                contact_filters, after_id, batch_size
+            )
+            if not contacts:
+                break
+            after_id = contacts[-1]['id']
             
-            contact.updated_at = datetime.utcnow()
+            now = datetime.utcnow()
+            updates = []
+            for contact in contacts:
+                try:
+                    updates.append({
+                        'id': contact['id'],
+                        'personalized_email': body_template.render(contact),
+                        'personalized_subject': subject_template.render(contact),
+                        'email_status': 'generated',
+                        'updated_at': now
+                    })
+                    generated_count += 1
+                except Exception as e:
+                    updates.append({'id': contact['id'], 'email_status': 'failed', 'updated_at': now})
+                    logger.error(f"Error generating email for contact {contact['id']}: {e}")
+            
+            db.bulk_update_mappings(CampaignContact, updates)
             db.commit()
+            processed += len(contacts)
+            report_progress(processed, total)
+            
+            if len(contacts) < batch_size:
+                break
+        
+        # bulk_update_mappings skips the stats flush events
+        sync_contact_stats(db, campaign_id)
         
         # Update campaign stats
         try:
@@ -2207,26 +2095,30 @@ async def send_communication_to_rsvps(
     if not contacts:
         raise HTTPException(status_code=400, detail="No RSVP contacts with email addresses found")
     
-    # Process emails in background
-    background_tasks.add_task(
-        send_rsvp_emails_task,
-        campaign_id,
-        template.id,
-        [c.id for c in contacts]
+    # Queue sending for the job workers. Messages go through the email outbox
+    # keyed by template + contact, so neither a retried job nor a repeated
+    # request sends the same email twice; batch_id groups this request's rows.
+    job = enqueue_job(
+        db,
+        'send_rsvp_emails_task',
+        {'campaign_id': campaign_id, 'template_id': template.id, 'contact_ids': [c.id for c in contacts],
+         'batch_id': str(uuid.uuid4())},
+        campaign_id=campaign_id
     )
     
     return {
         "message": f"Sending emails to {len(contacts)} RSVP contacts",
         "template": template.name,
-        "recipient_count": len(contacts)
+        "recipient_count": len(contacts),
+        "job_id": job.id
     }
 
-def send_rsvp_emails_task(campaign_id: str, template_id: str, contact_ids: List[str]):
+def send_rsvp_emails_task(campaign_id: str, template_id: str, contact_ids: List[str], batch_id: Optional[str] = None):
     """Background task to send RSVP emails"""
     from sqlalchemy.orm import sessionmaker
-    import asyncio
     SessionLocal = sessionmaker(bind=engine)
     db = SessionLocal()
+    batch_id = batch_id or str(uuid.uuid4())
     
     try:
         template = db.query(CampaignEmailTemplate).filter(
@@ -2241,48 +2133,74 @@ def send_rsvp_emails_task(campaign_id: str, template_id: str, contact_ids: List[
             CampaignContact.id.in_(contact_ids)
         ).all()
         
-        sent_count = 0
+        messages = []
         for contact in contacts:
-            try:
-                # Replace placeholders in template
-                subject = template.subject
-                body = template.body
-                
-                # Simple mail merge - replace {{field_name}} with contact data
-                replacements = {
-                    'first_name': contact.first_name or '',
-                    'last_name': contact.last_name or '',
-                    'email': contact.email or '',
-                    'company': contact.company or '',
-                    'title': contact.title or '',
-                    'phone': contact.phone or '',
-                    'neighborhood': contact.neighborhood or '',
-                    'state': contact.state or ''
-                }
-                
-                for field, value in replacements.items():
-                    subject = subject.replace(f'{{{{{field}}}}}', value)
-                    body = body.replace(f'{{{{{field}}}}}', value)
-                
-                # Here you would integrate with your email sending service
-                # For now, we'll just mark it as sent
-                contact.email_status = 'sent'
-                contact.email_sent_at = datetime.utcnow()
-                sent_count += 1
-                
-                logger.info(f"Sent email to {contact.email}")
-                
-            except Exception as e:
-                logger.error(f"Error sending email to contact {contact.id}: {e}")
+            if not contact.email:
                 contact.email_status = 'failed'
-        
+                continue
+            
+            # Replace placeholders in template
+            subject = template.subject
+            body = template.body
+            
+            # Simple mail merge - replace {{field_name}} with contact data
+            replacements = {
+                'first_name': contact.first_name or '',
+                'last_name': contact.last_name or '',
+                'email': contact.email or '',
+                'company': contact.company or '',
+                'title': contact.title or '',
+                'phone': contact.phone or '',
+                'neighborhood': contact.neighborhood or '',
+                'state': contact.state or ''
+            }
+            
+            for field, value in replacements.items():
+                subject = subject.replace(f'{{{{{field}}}}}', value)
+                body = body.replace(f'{{{{{field}}}}}', value)
+            
+            messages.append({
+                'idempotency_key': idempotency_key('rsvp', contact.id, ref=template_id),
+                'batch_id': batch_id,
+                'category': 'rsvp',
+                'campaign_id': campaign_id,
+                'contact_id': contact.id,
+                'to_email': contact.email,
+                'subject': subject,
+                # Templates are authored as plain text; keep line breaks in the HTML part
+                'html_body': body if '<' in body else body.replace('\n', '<br>'),
+                'text_body': body
+            })
         db.commit()
-        logger.info(f"Successfully sent {sent_count} emails for campaign {campaign_id}")
+        
+        # Write every message to the outbox first, then help drain it
+        enqueue_emails(db, messages)
+        enqueue_drainers(db, batch_id, campaign_id)
+        drain_outbox(batch_id=batch_id)
+        
+        counts = batch_counts(batch_id)
+        logger.info(f"Successfully sent {counts.get('sent', 0)}/{len(messages)} emails for campaign {campaign_id}")
         
     except Exception as e:
         logger.error(f"Error in send_rsvp_emails_task: {e}")
         db.rollback()
-        raise 
+        raise
+    finally:
+        db.close()
+
+def _record_rsvp_deliveries(db: Session, delivered: List[dict]):
+    """Outbox delivery hook: reflect RSVP email results on the contacts"""
+    db.bulk_update_mappings(CampaignContact, [
+        {
+            'id': row['contact_id'],
+            'email_status': 'sent' if row['status'] == 'sent' else 'failed',
+            'email_sent_at': row['sent_at'],
+        }
+        for row in delivered if row['contact_id']
+    ])
+    for row in delivered:
+        if row['status'] != 'sent':
+            logger.error(f"Error sending email to contact {row['contact_id']}: {row['error']}")
 
 @router.post("/{campaign_id}/send-agreements")
 async def send_agreements(
@@ -2311,26 +2229,33 @@ async def send_agreements(
     if not contacts:
         raise HTTPException(status_code=400, detail="No valid contacts with email addresses found")
     
-    # Process agreements in background
-    background_tasks.add_task(
-        process_agreements_task,
-        campaign_id,
-        agreements.agreement_data.dict(),
-        [c.id for c in contacts]
+    # Queue agreements for the job workers; emails are deduplicated by the outbox (see above)
+    job = enqueue_job(
+        db,
+        'process_agreements_task',
+        {'campaign_id': campaign_id, 'agreement_data': agreements.agreement_data.dict(), 'contact_ids': [c.id for c in contacts],
+         'batch_id': str(uuid.uuid4())},
+        campaign_id=campaign_id
     )
     
     return {
         "message": f"Processing agreements for {len(contacts)} contacts",
-        "contact_count": len(contacts)
+        "contact_count": len(contacts),
+        "job_id": job.id
     }
 
-def process_agreements_task(campaign_id: str, agreement_data: dict, contact_ids: List[str]):
+def agreement_terms_ref(agreement) -> str:
+    """Outbox ref for an agreement email: the same terms for the same agreement are only emailed once"""
+    return f"{agreement.id}/{agreement.start_date}/{agreement.setup_fee}/{agreement.monthly_fee}"
+
+def process_agreements_task(campaign_id: str, agreement_data: dict, contact_ids: List[str], batch_id: Optional[str] = None):
     """Background task to process and send e-signature agreements"""
     from sqlalchemy.orm import sessionmaker
     from .agreements import Agreement
     from .email_service import email_service
     SessionLocal = sessionmaker(bind=engine)
     db = SessionLocal()
+    batch_id = batch_id or str(uuid.uuid4())
     
     try:
         campaign = db.query(Campaign).filter(Campaign.id == campaign_id).first()
@@ -2342,17 +2267,55 @@ def process_agreements_task(campaign_id: str, agreement_data: dict, contact_ids:
             CampaignContact.id.in_(contact_ids)
         ).all()
         
+        # Existing agreements for these contacts, loaded in one query
+        existing_agreements = {
+            a.contact_id: a for a in db.query(Agreement).filter(
+                Agreement.campaign_id == campaign_id,
+                Agreement.contact_id.in_([c.id for c in contacts])
+            ).all()
+        }
+        
+        # Generate agreement URL - use correct production URL
+        # Check if we're in production (Render sets RENDER environment variable)
+        if os.getenv("RENDER"):
+            base_url = "https://adtv.nbrain.ai"  # Use the actual frontend domain
+        else:
+            base_url = os.getenv("APP_BASE_URL", "http://localhost:3000")
+        
+        # Agreements already emailed with exactly these terms are left alone:
+        # resetting them would un-sign a signed agreement, and the unchanged
+        # outbox key means no new email would go out anyway
+        new_terms = (agreement_data['start_date'], float(agreement_data['setup_fee']), float(agreement_data['monthly_fee']))
+        unchanged = {
+            contact_id: a for contact_id, a in existing_agreements.items()
+            if (a.start_date, a.setup_fee, a.monthly_fee) == new_terms
+        }
+        unchanged_keys = {
+            idempotency_key('agreement', contact_id, ref=agreement_terms_ref(a)): contact_id
+            for contact_id, a in unchanged.items()
+        }
+        emailed_keys = {
+            key for (key,) in db.query(EmailOutbox.idempotency_key).filter(
+                EmailOutbox.idempotency_key.in_(list(unchanged_keys)),
+                EmailOutbox.status != 'failed'
+            ).all()
+        } if unchanged_keys else set()
+        already_sent = {
+            contact_id for contact_id, a in unchanged.items()
+            if a.status == 'signed'
+        } | {unchanged_keys[key] for key in emailed_keys}
+        
         sent_count = 0
         failed_count = 0
+        prepared = []  # (contact, agreement)
         
         for contact in contacts:
             try:
-                # Check if an agreement already exists for this contact and campaign
-                existing_agreement = db.query(Agreement).filter(
-                    Agreement.campaign_id == campaign_id,
-                    Agreement.contact_id == contact.id
-                ).first()
-                
+                existing_agreement = existing_agreements.get(contact.id)
+                if contact.id in already_sent:
+                    logger.info(f"Agreement {existing_agreement.id} for contact {contact.id} already sent with these terms "
+                                f"(status {existing_agreement.status}), skipping")
+                    continue
                 if existing_agreement:
                     # Update the existing agreement with new data
                     logger.info(f"Updating existing agreement {existing_agreement.id} for contact {contact.id}")
@@ -2368,6 +2331,7 @@ def process_agreements_task(campaign_id: str, agreement_data: dict, contact_ids:
                 else:
                     # Create new agreement
                     agreement = Agreement(
+                        id=str(uuid.uuid4()),
                         campaign_id=campaign_id,
                         contact_id=contact.id,
                         contact_name=f"{contact.first_name or ''} {contact.last_name or ''}".strip(),
@@ -2380,105 +2344,81 @@ def process_agreements_task(campaign_id: str, agreement_data: dict, contact_ids:
                         status='pending'
                     )
                     db.add(agreement)
-                    
-                db.flush()  # Get the agreement ID
-                
-                # Generate agreement URL - use correct production URL
-                # Check if we're in production (Render sets RENDER environment variable)
-                if os.getenv("RENDER"):
-                    base_url = "https://adtv.nbrain.ai"  # Use the actual frontend domain
-                else:
-                    base_url = os.getenv("APP_BASE_URL", "http://localhost:3000")
-                    
-                agreement_url = f"{base_url}/agreement/{agreement.id}"
-                agreement.agreement_url = agreement_url
-                
-                # Commit the agreement immediately so it's available even if email fails
-                db.commit()
-                logger.info(f"Agreement {agreement.id} saved to database")
-                
-                # Log the agreement URL for easy access during testing
-                print(f"\n{'='*60}")
-                print(f"📝 AGREEMENT CREATED FOR: {contact.first_name} {contact.last_name}")
-                print(f"📧 Email: {contact.email}")
-                print(f"🔗 Agreement URL: {agreement_url}")
-                print(f"💰 Setup Fee: ${agreement_data['setup_fee']} | Monthly: ${agreement_data['monthly_fee']}")
-                print(f"{'='*60}\n")
-                
-                # Send email using the email service
-                email_sent = False
-                if os.getenv("GMAIL_PASSWORD"):  # Only try to send if password is configured
-                    # If a custom subject/body was provided, use generic send_email; else, use templated helper
-                    custom_subject = agreement_data.get('email_subject') if isinstance(agreement_data, dict) else getattr(agreements, 'agreement_data', {}).get('email_subject')
-                    custom_body = agreement_data.get('email_body') if isinstance(agreement_data, dict) else getattr(agreements, 'agreement_data', {}).get('email_body')
-                    if custom_subject and custom_body:
-                        from .email_service import email_service
-                        html_body = custom_body.replace('{{AgreementLink}}', agreement_url)
-                        html_body = html_body.replace('{{FirstName}}', contact.first_name or '')
-                        html_body = html_body.replace('{{StartDate}}', agreement_data['start_date'])
-                        html_body = html_body.replace('{{SetupFee}}', str(agreement_data['setup_fee']))
-                        html_body = html_body.replace('{{MonthlyFee}}', str(agreement_data['monthly_fee']))
-                        text_body = html_body
-                        email_sent = email_service.send_email(
-                            to_email=contact.email,
-                            subject=custom_subject,
-                            html_body=html_body,
-                            text_body=text_body
-                        )
-                    else:
-                        email_sent = email_service.send_agreement_email(
-                            to_email=contact.email,
-                            to_name=f"{contact.first_name or ''} {contact.last_name or ''}".strip() or "Valued Client",
-                            agreement_url=agreement_url,
-                            campaign_name=campaign.name,
-                            start_date=agreement_data['start_date'],
-                            setup_fee=agreement_data['setup_fee'],
-                            monthly_fee=agreement_data['monthly_fee']
-                        )
-                else:
-                    logger.info(f"Email not sent (Gmail not configured). Use this URL: {agreement_url}")
-                    email_sent = True  # Mark as "sent" even without email so the agreement is still accessible
-                
-                if email_sent:
-                    # Store agreement status in contact (if fields exist)
-                    if hasattr(contact, 'agreement_status'):
-                        contact.agreement_status = 'sent'
-                    if hasattr(contact, 'agreement_sent_at'):
-                        contact.agreement_sent_at = datetime.utcnow()
-                    if hasattr(contact, 'agreement_data'):
-                        contact.agreement_data = json.dumps({
-                            'agreement_id': agreement.id,
-                            'start_date': agreement_data['start_date'],
-                            'setup_fee': agreement_data['setup_fee'],
-                            'monthly_fee': agreement_data['monthly_fee'],
-                            'sent_at': datetime.utcnow().isoformat(),
-                            'url': agreement_url
-                        })
-                    db.commit()  # Commit contact updates
-                    
-                    logger.info(f"Agreement successfully processed for {contact.email}")
-                    sent_count += 1
-                else:
-                    # Email failed to send - but agreement still exists in database
-                    if hasattr(contact, 'agreement_status'):
-                        contact.agreement_status = 'failed'
-                    agreement.status = 'failed'
-                    db.commit()  # Save the failed status
-                    logger.error(f"Failed to send agreement email to {contact.email}")
-                    failed_count += 1
                 
+                agreement.agreement_url = f"{base_url}/agreement/{agreement.id}"
+                prepared.append((contact, agreement))
             except Exception as e:
-                logger.error(f"Error processing agreement for contact {contact.id}: {e}")
-                db.rollback()  # Rollback this specific agreement if there's an error
-                if hasattr(contact, 'agreement_status'):
-                    contact.agreement_status = 'failed'
-                    try:
-                        db.commit()  # Try to save the failed status
-                    except:
-                        pass
+                logger.error(f"Error preparing agreement for contact {contact.id}: {e}")
                 failed_count += 1
         
-        logger.info(f"Agreement task completed: {sent_count} sent, {failed_count} failed for campaign {campaign_id}")
+        # Commit the agreements before sending so they are available even if email fails
+        db.commit()
+        logger.info(f"{len(prepared)} agreements saved to database")
+        
+        for contact, agreement in prepared:
+            # Log the agreement URL for easy access during testing
+            print(f"\n{'='*60}")
+            print(f"📝 AGREEMENT CREATED FOR: {contact.first_name} {contact.last_name}")
+            print(f"📧 Email: {contact.email}")
+            print(f"🔗 Agreement URL: {agreement.agreement_url}")
+            print(f"💰 Setup Fee: ${agreement_data['setup_fee']} | Monthly: ${agreement_data['monthly_fee']}")
+            print(f"{'='*60}\n")
+        
+        # Send emails using the email service
+        if email_service.is_configured():  # Only try to send if password is configured
+            # If a custom subject/body was provided, use it; else, use the templated agreement email
+            custom_subject = agreement_data.get('email_subject')
+            custom_body = agreement_data.get('email_body')
+            messages = []
+            for contact, agreement in prepared:
+                if custom_subject and custom_body:
+                    subject = custom_subject
+                    html_body = custom_body.replace('{{AgreementLink}}', agreement.agreement_url)
+                    html_body = html_body.replace('{{FirstName}}', contact.first_name or '')
+                    html_body = html_body.replace('{{StartDate}}', agreement_data['start_date'])
+                    html_body = html_body.replace('{{SetupFee}}', str(agreement_data['setup_fee']))
+                    html_body = html_body.replace('{{MonthlyFee}}', str(agreement_data['monthly_fee']))
+                    text_body = html_body
+                else:
+                    subject, html_body, text_body = email_service.agreement_email_content(
+                        to_email=contact.email,
+                        to_name=f"{contact.first_name or ''} {contact.last_name or ''}".strip() or "Valued Client",
+                        agreement_url=agreement.agreement_url,
+                        campaign_name=campaign.name,
+                        start_date=agreement_data['start_date'],
+                        setup_fee=agreement_data['setup_fee'],
+                        monthly_fee=agreement_data['monthly_fee']
+                    )
+                messages.append({
+                    'idempotency_key': idempotency_key('agreement', contact.id, ref=agreement_terms_ref(agreement)),
+                    'batch_id': batch_id,
+                    'category': 'agreement',
+                    'campaign_id': campaign_id,
+                    'contact_id': contact.id,
+                    'payload': {'agreement_id': agreement.id},
+                    'to_email': contact.email,
+                    'subject': subject,
+                    'html_body': html_body,
+                    'text_body': text_body
+                })
+            
+            # Write every message to the outbox first, then help drain it
+            enqueue_emails(db, messages)
+            enqueue_drainers(db, batch_id, campaign_id)
+            drain_outbox(batch_id=batch_id)
+            
+            counts = batch_counts(batch_id)
+            sent_count = counts.get('sent', 0)
+            failed_count += counts.get('failed', 0)
+        else:
+            logger.info("Emails not sent (Gmail not configured). Use the agreement URLs above.")
+            # Count as "sent" even without email so the agreements are still accessible
+            sent_count = len(prepared)
+        
+        logger.info(f"Agreement task completed: {sent_count} sent, {failed_count} failed, "
+                    f"{len(already_sent)} already sent for campaign {campaign_id}")
+        report_progress(len(contacts), len(contacts),
+                        f"{sent_count} sent, {failed_count} failed, {len(already_sent)} already sent with these terms")
         
     except Exception as e:
         logger.error(f"Error in process_agreements_task: {e}")
@@ -2486,6 +2426,22 @@ def process_agreements_task(campaign_id: str, agreement_data: dict, contact_ids:
     finally:
         db.close()
 
+def _record_agreement_deliveries(db: Session, delivered: List[dict]):
+    """Outbox delivery hook: flag agreements whose email could not be sent"""
+    from .agreements import Agreement
+    failed_ids = [row['payload'].get('agreement_id') for row in delivered if row['status'] != 'sent']
+    failed_ids = [agreement_id for agreement_id in failed_ids if agreement_id]
+    if failed_ids:
+        # Email failed to send - but agreement still exists in database
+        db.query(Agreement).filter(Agreement.id.in_(failed_ids)).update(
+            {Agreement.status: 'failed'}, synchronize_session=False
+        )
+    for row in delivered:
+        if row['status'] == 'sent':
+            logger.info(f"Agreement successfully processed for {row['to_email']}")
+        else:
+            logger.error(f"Failed to send agreement email to {row['to_email']}: {row['error']}")
+
 @router.get("/{campaign_id}/agreements/status")
 async def get_agreements_status(
     campaign_id: str,
@@ -2553,4 +2509,12 @@ async def get_agreements_status(
                 "signature_rate": 0
             },
             "recent_agreements": []
-        }
\ No newline at end of file
+        }
+
+# Background jobs executed by core.job_queue workers
+register_job_handler('enrich_campaign_contacts', enrich_campaign_contacts)
+register_job_handler('generate_campaign_emails', generate_campaign_emails)
+register_job_handler('send_rsvp_emails_task', send_rsvp_emails_task)
+register_job_handler('process_agreements_task', process_agreements_task)
+register_delivery_hook('rsvp', _record_rsvp_deliveries)
+register_delivery_hook('agreement', _record_agreement_deliveries)
@@ -0,0 +1,261 @@
+"""
+Streaming CSV ingestion for campaign contact uploads.
+
+The upload is decoded incrementally and parsed row by row, so memory stays
+flat for large RSVP/prospect files. Normalized rows are loaded in chunks:
+on PostgreSQL via COPY into a temporary staging table that is merged into
+campaign_contacts in one INSERT ... SELECT, elsewhere (SQLite) via batched
+executemany. Everything happens in the caller's transaction, so a failed
+upload leaves no partial rows behind.
+"""
+import csv
+import io
+import logging
+import uuid
+from datetime import datetime
+from typing import Any, BinaryIO, Dict, Iterator, List, Optional, Tuple
+
+from sqlalchemy import insert, text
+from sqlalchemy.orm import Session
+
+from .database import CampaignContact
+
+logger = logging.getLogger(__name__)
+
+# Map possible column names to our fields (prefer explicit city/state when present)
+COLUMN_MAPPINGS = {
+    'name': ['Name', 'name', 'full_name', 'Full Name', 'Contact Name'],
+    'first_name': ['first_name', 'firstname', 'first', 'fname', 'First Name'],
+    'last_name': ['last_name', 'lastname', 'last', 'lname', 'Last Name'],
+    'email': ['email', 'email_address', 'e-mail', 'Email', 'Email Address'],
+    'company': ['company', 'company_name', 'organization', 'Company', 'Company Name'],
+    'title': ['title', 'job_title', 'position', 'Title', 'Job Title', 'Position'],
+    'phone': ['phone', 'phone_number', 'telephone', 'Phone', 'Phone Number', 'cell', 'Cell Phone'],
+    # Use either explicit city or legacy neighborhood fields
+    'city': ['city', 'City', 'town', 'Town', 'neighborhood', 'neighborhood_1', 'Neighborhood 1', 'Neighborhood', 'area', 'district'],
+    'state': ['state', 'State', 'province', 'Province', 'region', 'Region']
+}
+
+# Columns written for each uploaded contact, in COPY order
+LOAD_COLUMNS = [
+    'id', 'first_name', 'last_name', 'email', 'company', 'title', 'phone',
+    'neighborhood', 'state', 'geocoded_address'
+]
+
+MAX_REJECTED_REPORTED = 100
+
+
+def resolve_columns(fieldnames: List[str]) -> Dict[str, Optional[str]]:
+    """Pick the CSV header used for each field, once per file"""
+    present = set(fieldnames or [])
+    resolved = {}
+    for field, possible_names in COLUMN_MAPPINGS.items():
+        resolved[field] = next((name for name in possible_names if name in present), None)
+    return resolved
+
+
+def normalize_city_state(raw_city: str, raw_state: str) -> Tuple[str, str]:
+    """
+    Split combined location values like "City, ST", "City ST" or
+    "City, ST, USA" without forcing defaults.
+    """
+    raw_city = (raw_city or '').strip()
+    raw_state = (raw_state or '').strip()
+
+    parsed_city = raw_city
+    parsed_state = raw_state
+
+    if raw_city:
+        tmp = raw_city.replace(' USA', '').replace(', USA', '').strip()
+        if ',' in tmp and (not raw_state):
+            parts = [p.strip() for p in tmp.split(',') if p.strip()]
+            if len(parts) >= 2:
+                parsed_city = parts[0]
+                # Use the second token as state if it looks like 2-letter code or full name
+                if len(parts[1]) == 2:
+                    parsed_state = parts[1].upper()
+                else:
+                    parsed_state = parts[1]
+        else:
+            # Check for trailing 2-letter state without comma
+            tokens = tmp.rsplit(' ', 1)
+            if len(tokens) == 2 and len(tokens[1]) == 2 and tokens[1].isalpha() and not raw_state:
+                parsed_city = tokens[0]
+                parsed_state = tokens[1].upper()
+
+    return parsed_city, parsed_state
+
+
+def normalize_row(row: Dict[str, str], columns: Dict[str, Optional[str]],
+                  email_filter=None) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    """Map one CSV row onto contact fields. Returns (contact, rejection_reason)."""
+    contact_data = {
+        field: (row.get(column) or '') if column else ''
+        for field, column in columns.items()
+    }
+
+    # Handle full name if first/last names are not provided separately
+    if contact_data.get('name') and not (contact_data['first_name'] or contact_data['last_name']):
+        name_parts = contact_data['name'].strip().split(' ', 1)
+        contact_data['first_name'] = name_parts[0] if name_parts else ''
+        contact_data['last_name'] = name_parts[1] if len(name_parts) > 1 else ''
+
+    city, state = normalize_city_state(contact_data.get('city'), contact_data.get('state'))
+
+    # Skip rows where all key fields are empty (name or company required)
+    if not any([contact_data['first_name'], contact_data['last_name'], contact_data['company']]):
+        return None, 'no name or company data'
+
+    email = contact_data['email']
+    if email_filter:
+        email = email_filter(email)
+
+    return {
+        'id': str(uuid.uuid4()),
+        'first_name': contact_data['first_name'],
+        'last_name': contact_data['last_name'],
+        'email': email,
+        'company': contact_data['company'],
+        'title': contact_data['title'],
+        'phone': contact_data['phone'],
+        'neighborhood': city,
+        'state': state,
+        'geocoded_address': f"{city}, {state}, USA" if city and state else ''
+    }, None
+
+
+def iter_normalized_rows(fileobj: BinaryIO, report: Dict[str, Any],
+                         email_filter=None) -> Iterator[Dict[str, Any]]:
+    """Decode and parse the upload incrementally, yielding accepted contacts"""
+    stream = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    try:
+        reader = csv.DictReader(stream)
+        if reader.fieldnames:
+            logger.info(f"CSV headers found: {reader.fieldnames}")
+        columns = resolve_columns(reader.fieldnames)
+
+        for row_num, row in enumerate(reader, 1):
+            report['rows_read'] += 1
+            contact, reason = normalize_row(row, columns, email_filter)
+            if contact is None:
+                report['rows_rejected'] += 1
+                if len(report['rejected_rows']) < MAX_REJECTED_REPORTED:
+                    report['rejected_rows'].append({'row': row_num, 'reason': reason})
+                continue
+
+            # Log first few rows for debugging
+            if row_num <= 3:
+                logger.info(f"Row {row_num} data: {contact}")
+            yield contact
+    finally:
+        # Leave the underlying upload open; FastAPI closes it
+        stream.detach()
+
+
+def _chunks(rows: Iterator[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _load_with_copy(db: Session, campaign_id: str, rows: Iterator[Dict[str, Any]],
+                    batch_size: int) -> int:
+    """COPY chunks into a temp staging table, then merge into campaign_contacts"""
+    db.execute(text("""
+        CREATE TEMP TABLE campaign_contacts_staging (
+            id VARCHAR PRIMARY KEY,
+            first_name VARCHAR,
+            last_name VARCHAR,
+            email VARCHAR,
+            company VARCHAR,
+            title VARCHAR,
+            phone VARCHAR,
+            neighborhood VARCHAR,
+            state VARCHAR,
+            geocoded_address VARCHAR
+        ) ON COMMIT DROP
+    """))
+
+    cursor = db.connection().connection.cursor()
+    # In csv format an unquoted empty field reads as NULL; normalize_row gives
+    # every text column a string, so keep '' as '' like the executemany path does
+    text_columns = ', '.join(column for column in LOAD_COLUMNS if column != 'id')
+    copy_sql = (f"COPY campaign_contacts_staging ({', '.join(LOAD_COLUMNS)}) FROM STDIN "
+                f"WITH (FORMAT csv, FORCE_NOT_NULL ({text_columns}))")
+    loaded = 0
+    try:
+        for chunk in _chunks(rows, batch_size):
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            for row in chunk:
+                writer.writerow([row[column] for column in LOAD_COLUMNS])
+            buffer.seek(0)
+            cursor.copy_expert(copy_sql, buffer)
+            loaded += len(chunk)
+    finally:
+        cursor.close()
+
+    db.execute(text(f"""
+        INSERT INTO campaign_contacts (
+            {', '.join(LOAD_COLUMNS)}, campaign_id, enrichment_status, email_status,
+            excluded, manually_edited, is_rsvp, created_at, updated_at
+        )
+        SELECT {', '.join(LOAD_COLUMNS)}, :campaign_id, 'pending', 'pending',
+               FALSE, FALSE, FALSE, :now, :now
+        FROM campaign_contacts_staging
+    """), {'campaign_id': campaign_id, 'now': datetime.utcnow()})
+    return loaded
+
+
+def _load_with_executemany(db: Session, campaign_id: str, rows: Iterator[Dict[str, Any]],
+                           batch_size: int) -> int:
+    """Batched executemany fallback for databases without COPY (SQLite)"""
+    now = datetime.utcnow()
+    stmt = insert(CampaignContact.__table__)
+    loaded = 0
+    for chunk in _chunks(rows, batch_size):
+        for row in chunk:
+            row.update({
+                'campaign_id': campaign_id,
+                'enrichment_status': 'pending',
+                'email_status': 'pending',
+                'excluded': False,
+                'manually_edited': False,
+                'is_rsvp': False,
+                'created_at': now,
+                'updated_at': now
+            })
+        db.execute(stmt, chunk)
+        loaded += len(chunk)
+    return loaded
+
+
+def ingest_campaign_contacts(db: Session, campaign_id: str, fileobj: BinaryIO,
+                             email_filter=None, batch_size: int = 5000) -> Dict[str, Any]:
+    """
+    Stream a contacts CSV into campaign_contacts. Does not commit.
+    Returns row counts and a sample of rejected rows.
+    """
+    report = {
+        'rows_read': 0,
+        'rows_loaded': 0,
+        'rows_rejected': 0,
+        'rejected_rows': []
+    }
+    rows = iter_normalized_rows(fileobj, report, email_filter)
+
+    if db.get_bind().dialect.name == 'postgresql':
+        report['rows_loaded'] = _load_with_copy(db, campaign_id, rows, batch_size)
+    else:
+        report['rows_loaded'] = _load_with_executemany(db, campaign_id, rows, batch_size)
+
+    logger.info(
+        f"Ingested {report['rows_loaded']}/{report['rows_read']} rows for campaign {campaign_id} "
+        f"({report['rows_rejected']} rejected)"
+    )
+    return report
@@ -0,0 +1,239 @@
+"""
+Per-campaign contact statistics.
+
+All coverage and enrichment-status counts come from a single aggregate over
+campaign_contacts (COUNT(*) FILTER (WHERE ...)), instead of one COUNT query
+per metric or loading every contact into Python.
+
+Optionally (CAMPAIGN_STATS_MATERIALIZED=true) the counts are kept in
+campaign_contact_stats: ORM inserts/updates/deletes of contacts apply deltas
+to the row as they flush, and readers fall back to a full recount once the
+row is older than CAMPAIGN_STATS_MAX_AGE_SECONDS. bulk_update_mappings and
+query.update() bypass the flush events, so every bulk path calls
+sync_contact_stats() after committing (or, for long write-behind runs, a
+stats_refresher() after each flush). Deleting a campaign deletes its row
+(delete_contact_stats()).
+"""
+import logging
+import os
+import time
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import event, func, inspect, update
+from sqlalchemy.orm import Session
+
+from .database import CampaignContact, CampaignContactStats
+
+logger = logging.getLogger(__name__)
+
+MATERIALIZED = os.getenv("CAMPAIGN_STATS_MATERIALIZED", "false").lower() == "true"
+MAX_AGE_SECONDS = int(os.getenv("CAMPAIGN_STATS_MAX_AGE_SECONDS", "300"))
+
+
+def _present(column):
+    return (column != None) & (column != '')  # noqa: E711
+
+
+def _missing(column):
+    return (column == None) | (column == '')  # noqa: E711
+
+
+_HAS_EMAIL = _present(CampaignContact.email)
+_HAS_PHONE = _present(CampaignContact.phone) | _present(CampaignContact.enriched_phone)
+_MISSING_EMAIL = _missing(CampaignContact.email)
+_MISSING_PHONE = _missing(CampaignContact.phone) & _missing(CampaignContact.enriched_phone)
+
+STAT_EXPRESSIONS = {
+    'total_contacts': func.count(),
+    'contacts_with_email': func.count().filter(_HAS_EMAIL),
+    'contacts_with_phone': func.count().filter(_HAS_PHONE),
+    'contacts_missing_email': func.count().filter(_MISSING_EMAIL),
+    'contacts_missing_phone': func.count().filter(_MISSING_PHONE),
+    'contacts_missing_both': func.count().filter(_MISSING_EMAIL & _MISSING_PHONE),
+    'enrichment_pending': func.count().filter(CampaignContact.enrichment_status == 'pending'),
+    'enrichment_processing': func.count().filter(CampaignContact.enrichment_status == 'processing'),
+    'enrichment_success': func.count().filter(CampaignContact.enrichment_status == 'success'),
+    'enrichment_failed': func.count().filter(CampaignContact.enrichment_status == 'failed'),
+}
+STAT_FIELDS = list(STAT_EXPRESSIONS)
+
+# Contact attributes the counts depend on
+_TRACKED_ATTRS = ('email', 'phone', 'enriched_phone', 'enrichment_status')
+
+
+def compute_contact_stats(db: Session, campaign_id: str) -> Dict[str, int]:
+    """Count every metric for a campaign in one pass over its contacts"""
+    row = db.query(
+        *[expr.label(name) for name, expr in STAT_EXPRESSIONS.items()]
+    ).filter(CampaignContact.campaign_id == campaign_id).one()
+    return {name: int(row._mapping[name] or 0) for name in STAT_FIELDS}
+
+
+def with_coverage(stats: Dict[str, int]) -> Dict[str, Any]:
+    """Add email/phone coverage percentages to a stats dict"""
+    total = stats['total_contacts']
+    return {
+        **stats,
+        'email_coverage_percentage': round((stats['contacts_with_email'] / total * 100) if total > 0 else 0, 1),
+        'phone_coverage_percentage': round((stats['contacts_with_phone'] / total * 100) if total > 0 else 0, 1),
+    }
+
+
+def refresh_contact_stats(db: Session, campaign_id: str) -> Dict[str, int]:
+    """Recount a campaign and, when materialisation is on, store the result"""
+    stats = compute_contact_stats(db, campaign_id)
+    if not MATERIALIZED:
+        return stats
+
+    try:
+        row = db.get(CampaignContactStats, campaign_id)
+        if row is None:
+            row = CampaignContactStats(campaign_id=campaign_id)
+            db.add(row)
+        for name, value in stats.items():
+            setattr(row, name, value)
+        row.refreshed_at = datetime.utcnow()
+        db.commit()
+    except Exception as e:
+        # A concurrent refresh may have inserted the row first; the counts are still good
+        db.rollback()
+        logger.warning(f"Could not store contact stats for campaign {campaign_id}: {e}")
+    return stats
+
+
+def sync_contact_stats(db: Session, campaign_id: str):
+    """Recount after a bulk write that bypassed the ORM flush events (no-op unless materialised)"""
+    if MATERIALIZED:
+        refresh_contact_stats(db, campaign_id)
+
+
+def delete_contact_stats(db: Session, campaign_id: str):
+    """Remove a deleted campaign's stats row (caller commits)"""
+    db.query(CampaignContactStats).filter(
+        CampaignContactStats.campaign_id == campaign_id
+    ).delete(synchronize_session=False)
+
+
+def invalidate_contact_stats(db: Session):
+    """Mark every materialised stats row stale so readers recount (after bulk writes across campaigns)"""
+    if MATERIALIZED:
+        db.query(CampaignContactStats).update({CampaignContactStats.refreshed_at: None}, synchronize_session=False)
+        db.commit()
+
+
+def stats_refresher(session_factory: Callable, campaign_id: str, min_interval: float = 5.0) -> Callable[[], None]:
+    """
+    A callback for write-behind flushes that recounts the campaign at most every
+    `min_interval` seconds, so the stats row follows a long bulk run
+    """
+    last = [0.0]
+
+    def refresh():
+        if not MATERIALIZED or time.monotonic() - last[0] < min_interval:
+            return
+        last[0] = time.monotonic()
+        with session_factory() as db:
+            refresh_contact_stats(db, campaign_id)
+
+    return refresh
+
+
+def current_contact_stats(db: Session, campaign_id: str) -> Dict[str, int]:
+    """Current counts for a campaign, served from the materialised row when fresh"""
+    if not MATERIALIZED:
+        return compute_contact_stats(db, campaign_id)
+
+    row = db.get(CampaignContactStats, campaign_id)
+    cutoff = datetime.utcnow() - timedelta(seconds=MAX_AGE_SECONDS)
+    if row is not None and row.refreshed_at is not None and row.refreshed_at >= cutoff:
+        return {name: getattr(row, name) or 0 for name in STAT_FIELDS}
+    return refresh_contact_stats(db, campaign_id)
+
+
+def _contact_flags(email: Optional[str], phone: Optional[str], enriched_phone: Optional[str],
+                   enrichment_status: Optional[str]) -> Dict[str, int]:
+    """Python mirror of STAT_EXPRESSIONS for a single contact"""
+    has_email = bool(email)
+    has_phone = bool(phone) or bool(enriched_phone)
+    return {
+        'total_contacts': 1,
+        'contacts_with_email': int(has_email),
+        'contacts_with_phone': int(has_phone),
+        'contacts_missing_email': int(not has_email),
+        'contacts_missing_phone': int(not has_phone),
+        'contacts_missing_both': int(not has_email and not has_phone),
+        'enrichment_pending': int(enrichment_status == 'pending'),
+        'enrichment_processing': int(enrichment_status == 'processing'),
+        'enrichment_success': int(enrichment_status == 'success'),
+        'enrichment_failed': int(enrichment_status == 'failed'),
+    }
+
+
+def _apply(deltas: Dict[str, Dict[str, int]], campaign_id: str, flags: Dict[str, int], sign: int):
+    campaign_deltas = deltas.setdefault(campaign_id, dict.fromkeys(STAT_FIELDS, 0))
+    for name, value in flags.items():
+        campaign_deltas[name] += sign * value
+
+
+def _track_contact_changes(session: Session, flush_context):
+    """after_flush hook: turn contact inserts/updates/deletes into counter deltas"""
+    deltas: Dict[str, Dict[str, int]] = {}
+    stale = set()
+
+    for obj in session.new:
+        if isinstance(obj, CampaignContact) and obj.campaign_id:
+            _apply(deltas, obj.campaign_id, _contact_flags(
+                obj.email, obj.phone, obj.enriched_phone, obj.enrichment_status or 'pending'
+            ), 1)
+
+    for obj in session.deleted:
+        if isinstance(obj, CampaignContact) and obj.campaign_id:
+            _apply(deltas, obj.campaign_id, _contact_flags(
+                obj.email, obj.phone, obj.enriched_phone, obj.enrichment_status
+            ), -1)
+
+    for obj in session.dirty:
+        if not isinstance(obj, CampaignContact) or not obj.campaign_id:
+            continue
+        state = inspect(obj)
+        if state.attrs.campaign_id.history.has_changes():
+            stale.update(v for v in state.attrs.campaign_id.history.sum() if v)
+            continue
+
+        old, new, changed = {}, {}, False
+        for attr in _TRACKED_ATTRS:
+            history = state.attrs[attr].history
+            new[attr] = getattr(obj, attr)
+            if history.has_changes():
+                changed = True
+                if not history.deleted:
+                    # Previous value was never loaded, so the delta is unknown
+                    stale.add(obj.campaign_id)
+                    break
+                old[attr] = history.deleted[0]
+            else:
+                old[attr] = new[attr]
+        else:
+            if changed:
+                _apply(deltas, obj.campaign_id, _contact_flags(**old), -1)
+                _apply(deltas, obj.campaign_id, _contact_flags(**new), 1)
+
+    if not deltas and not stale:
+        return
+
+    table = CampaignContactStats.__table__
+    conn = session.connection()
+    now = datetime.utcnow()
+    for campaign_id, campaign_deltas in deltas.items():
+        if campaign_id in stale:
+            continue
+        values = {name: table.c[name] + delta for name, delta in campaign_deltas.items() if delta}
+        if values:
+            conn.execute(update(table).where(table.c.campaign_id == campaign_id).values(updated_at=now, **values))
+    for campaign_id in stale:
+        conn.execute(update(table).where(table.c.campaign_id == campaign_id).values(refreshed_at=None, updated_at=now))
+
+
+if MATERIALIZED:
+    event.listen(Session, "after_flush", _track_contact_changes)
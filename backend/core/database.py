@@ -1,5 +1,5 @@
 import os
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, JSON, Boolean, ForeignKey, func, Enum as SAEnum, BigInteger, Text, Float
+from sqlalchemy import create_engine, Column, Integer, String, DateTime, JSON, Boolean, ForeignKey, func, Enum as SAEnum, BigInteger, Text, Float, Index
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
@@ -91,6 +91,7 @@ class ScrapingJob(Base):
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     completed_at = Column(DateTime(timezone=True), nullable=True)
     error_message = Column(String, nullable=True)  # Store error messages
+    frontier_size = Column(Integer, nullable=True)  # Profile URLs collected from the list pages; set once they're all saved
 
     user_id = Column(String, ForeignKey("users.id"), nullable=False)
     user = relationship("User")
@@ -99,6 +100,10 @@ class ScrapingJob(Base):
 
 class RealtorContact(Base):
     __tablename__ = "realtor_contacts"
+    __table_args__ = (
+        # One row per profile per job; scrape batches upsert on it (scripts/add_realtor_contact_unique_index.py)
+        Index('ux_realtor_contacts_job_profile_url', 'job_id', 'profile_url', unique=True),
+    )
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
     
@@ -140,6 +145,10 @@ class RealtorContact(Base):
     price_range = Column(String, nullable=True)
     average_price = Column(String, nullable=True)
 
+    # Scrape checkpoint for this profile URL: pending, scraped or failed
+    scrape_status = Column(String, nullable=True)
+    scrape_attempts = Column(Integer, default=0)  # Failed scrape attempts so far
+
     created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 
@@ -327,6 +336,30 @@ class CampaignAnalytics(Base):
     campaign = relationship("Campaign", back_populates="analytics")
 
 
+class CampaignContactStats(Base):
+    """Materialised per-campaign contact counts (see core/contact_stats.py)"""
+    __tablename__ = "campaign_contact_stats"
+
+    campaign_id = Column(String, primary_key=True)
+
+    # Coverage
+    total_contacts = Column(Integer, default=0)
+    contacts_with_email = Column(Integer, default=0)
+    contacts_with_phone = Column(Integer, default=0)
+    contacts_missing_email = Column(Integer, default=0)
+    contacts_missing_phone = Column(Integer, default=0)
+    contacts_missing_both = Column(Integer, default=0)
+
+    # Enrichment status breakdown
+    enrichment_pending = Column(Integer, default=0)
+    enrichment_processing = Column(Integer, default=0)
+    enrichment_success = Column(Integer, default=0)
+    enrichment_failed = Column(Integer, default=0)
+
+    refreshed_at = Column(DateTime, nullable=True)  # Last full recount; NULL forces one
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 class EmailTemplate(Base):
     __tablename__ = "email_templates"
     
@@ -365,6 +398,82 @@ class CustomerServiceCommunication(Base):
     user = relationship("User")
 
 
+class BackgroundJob(Base):
+    """Durable background job claimed by workers under a renewable lease"""
+    __tablename__ = "background_jobs"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    job_type = Column(String, nullable=False, index=True)  # Name of the registered handler
+    payload = Column(JSON, default=dict)  # Keyword arguments for the handler
+    status = Column(String, default='queued', index=True)  # queued, running, completed, failed
+    campaign_id = Column(String, nullable=True, index=True)  # Campaign the job works on, if any
+    dedupe_key = Column(String, nullable=True, index=True)  # At most one active job per key
+
+    # Leasing
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    locked_by = Column(String, nullable=True)  # Worker id holding the lease
+    lease_expires_at = Column(DateTime, nullable=True, index=True)
+    heartbeat_at = Column(DateTime, nullable=True)
+
+    # Progress
+    progress_current = Column(Integer, default=0)
+    progress_total = Column(Integer, default=0)
+    progress_message = Column(String, nullable=True)
+    error = Column(Text, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+class EmailDeliveryLog(Base):
+    """One row per outgoing email delivery (see core/email_service.py)"""
+    __tablename__ = "email_delivery_log"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    to_email = Column(String, nullable=False, index=True)
+    subject = Column(String(500))
+    category = Column(String, nullable=True)  # e.g. agreement, rsvp
+    campaign_id = Column(String, nullable=True, index=True)
+    contact_id = Column(String, nullable=True, index=True)
+    status = Column(String, nullable=False)  # sent, failed
+    attempts = Column(Integer, default=0)
+    error = Column(Text, nullable=True)
+    sent_at = Column(DateTime, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+class EmailOutbox(Base):
+    """Email queued for delivery; drained by workers under a lease (see core/email_outbox.py)"""
+    __tablename__ = "email_outbox"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    idempotency_key = Column(String, nullable=False, unique=True)  # One message per key, ever
+    batch_id = Column(String, nullable=True, index=True)  # Send request the message belongs to
+    category = Column(String, nullable=False)  # rsvp, agreement
+    campaign_id = Column(String, nullable=True, index=True)
+    contact_id = Column(String, nullable=True)
+    payload = Column(JSON, default=dict)  # Extra data for the category's delivery hook
+
+    to_email = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    html_body = Column(Text, nullable=False)
+    text_body = Column(Text, nullable=True)
+
+    status = Column(String, default='pending', index=True)  # pending, sending, sent, failed
+    attempts = Column(Integer, default=0)
+    max_attempts = Column(Integer, default=3)
+    locked_by = Column(String, nullable=True)
+    lease_expires_at = Column(DateTime, nullable=True, index=True)
+    last_error = Column(Text, nullable=True)
+    sent_at = Column(DateTime, nullable=True)
+
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
 def get_db():
     """Dependency to get a DB session."""
     db = SessionLocal()
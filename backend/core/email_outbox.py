@@ -0,0 +1,275 @@
+"""
+Transactional email outbox.
+
+Senders write every message they intend to send into `email_outbox` up front,
+in bulk, each with an idempotency key (category + send request + contact).
+Re-running a send request therefore never queues a message twice. Workers
+then drain the outbox: they claim chunks of rows with
+SELECT ... FOR UPDATE SKIP LOCKED under a lease, deliver them through the
+pooled SMTP sender and record the outcome on the row. Any number of drainers
+can run across processes, and rows held by a worker that died are reclaimed
+once their lease expires.
+
+Delivery is at-least-once: a worker that dies after the SMTP server accepted
+a message but before marking the row sent will have that message resent.
+"""
+import logging
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import func, or_
+
+from .database import SessionLocal, EmailOutbox, engine
+from .email_service import email_service
+from .job_queue import check_job_lease, enqueue_job, make_worker_id, register_job_handler, report_progress
+
+logger = logging.getLogger(__name__)
+
+LEASE_SECONDS = int(os.getenv("EMAIL_OUTBOX_LEASE_SECONDS", "300"))
+CHUNK_SIZE = int(os.getenv("EMAIL_OUTBOX_CHUNK_SIZE", "20"))
+# Drainers working one send request in parallel (the sending job is one of them)
+DRAINERS = int(os.getenv("EMAIL_OUTBOX_DRAINERS", "2"))
+
+# category -> hook(db, rows) run after a chunk is delivered; rows carry the
+# outbox fields plus 'status', 'sent_at' and 'error' of the delivery
+DELIVERY_HOOKS: Dict[str, Callable[..., Any]] = {}
+
+
+def register_delivery_hook(category: str, hook: Callable[..., Any]):
+    """Register what happens to app data once a message of `category` is delivered or fails"""
+    DELIVERY_HOOKS[category] = hook
+    return hook
+
+
+def idempotency_key(category: str, contact_id: str, ref: Optional[str] = None) -> str:
+    """
+    One message per category + template/agreement ref + contact, across send
+    requests: submitting the same send again doesn't email anyone twice.
+    batch_id only groups the rows of one request.
+    """
+    return ":".join(part for part in (category, ref, contact_id) if part)
+
+
+def enqueue_emails(db, messages: List[Dict[str, Any]]) -> int:
+    """
+    Bulk insert outbox rows, skipping any whose idempotency_key already exists
+    unless that message failed for good, in which case it is queued again under
+    the new batch. Commits. Returns the number of rows inserted or requeued.
+    """
+    if not messages:
+        return 0
+
+    if engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            'id': str(uuid.uuid4()),
+            'payload': {},
+            'status': 'pending',
+            'attempts': 0,
+            'max_attempts': 3,
+            'created_at': now,
+            'updated_at': now,
+            **message,
+        }
+        for message in messages
+    ]
+    stmt = insert(EmailOutbox).values(rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[EmailOutbox.idempotency_key],
+        set_={
+            'batch_id': stmt.excluded.batch_id,
+            'to_email': stmt.excluded.to_email,
+            'subject': stmt.excluded.subject,
+            'html_body': stmt.excluded.html_body,
+            'text_body': stmt.excluded.text_body,
+            'payload': stmt.excluded.payload,
+            'status': 'pending',
+            'attempts': 0,
+            'locked_by': None,
+            'lease_expires_at': None,
+            'last_error': None,
+            'updated_at': now,
+        },
+        where=EmailOutbox.status == 'failed'
+    )
+    inserted = db.execute(stmt).rowcount
+    db.commit()
+    if inserted is not None and inserted < len(rows):
+        logger.info(f"Outbox skipped {len(rows) - inserted} messages that were already queued or sent")
+    return inserted or 0
+
+
+def _claim(worker_id: str, limit: int, batch_id: Optional[str] = None) -> List[Dict[str, Any]]:
+    """Lease up to `limit` pending rows (or rows whose lease expired)"""
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        query = db.query(EmailOutbox).filter(
+            or_(
+                EmailOutbox.status == 'pending',
+                (EmailOutbox.status == 'sending') & (EmailOutbox.lease_expires_at < now)
+            ),
+            EmailOutbox.attempts < EmailOutbox.max_attempts
+        )
+        if batch_id:
+            query = query.filter(EmailOutbox.batch_id == batch_id)
+
+        rows = query.order_by(EmailOutbox.created_at).limit(limit).with_for_update(skip_locked=True).all()
+        claimed = []
+        for row in rows:
+            if row.status == 'sending':
+                logger.warning(f"Reclaiming outbox message {row.id} from {row.locked_by} (lease expired)")
+            row.status = 'sending'
+            row.locked_by = worker_id
+            row.lease_expires_at = now + timedelta(seconds=LEASE_SECONDS)
+            row.attempts = (row.attempts or 0) + 1
+            claimed.append({
+                'id': row.id,
+                'category': row.category,
+                'campaign_id': row.campaign_id,
+                'contact_id': row.contact_id,
+                'payload': row.payload or {},
+                'to_email': row.to_email,
+                'subject': row.subject,
+                'html_body': row.html_body,
+                'text_body': row.text_body,
+                'attempts': row.attempts,
+                'max_attempts': row.max_attempts,
+            })
+        db.commit()
+        return claimed
+
+
+def _complete(worker_id: str, rows: List[Dict[str, Any]], results: List[Dict[str, Any]]):
+    """Record delivery outcomes for rows this worker still owns, then run the hooks"""
+    by_category: Dict[str, List[Dict[str, Any]]] = {}
+    with SessionLocal() as db:
+        for row, result in zip(rows, results):
+            updated = db.query(EmailOutbox).filter(
+                EmailOutbox.id == row['id'],
+                EmailOutbox.locked_by == worker_id
+            ).update({
+                EmailOutbox.status: 'sent' if result['status'] == 'sent' else 'failed',
+                EmailOutbox.sent_at: result['sent_at'],
+                EmailOutbox.last_error: result['error'],
+                EmailOutbox.locked_by: None,
+                EmailOutbox.lease_expires_at: None,
+            }, synchronize_session=False)
+            if not updated:
+                logger.warning(f"Outbox message {row['id']} is no longer owned by {worker_id}")
+                continue
+            by_category.setdefault(row['category'], []).append({
+                **row, 'status': result['status'], 'sent_at': result['sent_at'], 'error': result['error']
+            })
+        db.commit()
+
+        for category, delivered in by_category.items():
+            hook = DELIVERY_HOOKS.get(category)
+            if not hook:
+                continue
+            try:
+                hook(db, delivered)
+                db.commit()
+            except Exception as e:
+                db.rollback()
+                logger.error(f"Delivery hook for {category} failed: {e}")
+
+
+def fail_exhausted_messages():
+    """Fail rows whose lease expired after their last allowed attempt"""
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        count = db.query(EmailOutbox).filter(
+            EmailOutbox.status == 'sending',
+            EmailOutbox.lease_expires_at < now,
+            EmailOutbox.attempts >= EmailOutbox.max_attempts
+        ).update({
+            EmailOutbox.status: 'failed',
+            EmailOutbox.last_error: 'Lease expired after final attempt',
+            EmailOutbox.locked_by: None,
+            EmailOutbox.lease_expires_at: None
+        }, synchronize_session=False)
+        db.commit()
+    if count:
+        logger.warning(f"Marked {count} abandoned outbox messages as failed")
+
+
+def batch_counts(batch_id: str) -> Dict[str, int]:
+    with SessionLocal() as db:
+        rows = db.query(EmailOutbox.status, func.count(EmailOutbox.id)).filter(
+            EmailOutbox.batch_id == batch_id
+        ).group_by(EmailOutbox.status).all()
+    return {status: count for status, count in rows}
+
+
+def drain_outbox(batch_id: Optional[str] = None, worker_id: Optional[str] = None,
+                 chunk_size: Optional[int] = None) -> int:
+    """
+    Claim and deliver outbox messages until none are left (optionally only
+    those of one send request). Returns the number of messages processed.
+    """
+    worker_id = worker_id or make_worker_id()
+    chunk_size = chunk_size or CHUNK_SIZE
+    fail_exhausted_messages()
+    
+    total = None
+    done = 0
+    if batch_id:
+        counts = batch_counts(batch_id)
+        total = sum(counts.values())
+        done = counts.get('sent', 0) + counts.get('failed', 0)
+    processed = 0
+
+    while True:
+        check_job_lease()
+        rows = _claim(worker_id, chunk_size, batch_id=batch_id)
+        if not rows:
+            break
+        results = email_service.send_batch([
+            {
+                'to_email': row['to_email'],
+                'subject': row['subject'],
+                'html_body': row['html_body'],
+                'text_body': row['text_body'],
+                'category': row['category'],
+                'campaign_id': row['campaign_id'],
+                'contact_id': row['contact_id'],
+            }
+            for row in rows
+        ])
+        _complete(worker_id, rows, results)
+        processed += len(rows)
+        report_progress(done + processed, total)
+
+    if processed:
+        logger.info(f"Outbox worker {worker_id} processed {processed} messages" + (f" for batch {batch_id}" if batch_id else ""))
+    return processed
+
+
+def has_pending_messages() -> bool:
+    with SessionLocal() as db:
+        return db.query(EmailOutbox.id).filter(
+            EmailOutbox.status.in_(('pending', 'sending')),
+            EmailOutbox.attempts < EmailOutbox.max_attempts
+        ).first() is not None
+
+
+def enqueue_drainers(db, batch_id: str, campaign_id: Optional[str] = None, count: Optional[int] = None):
+    """Queue extra drain jobs so other workers/processes help deliver a send request"""
+    count = DRAINERS - 1 if count is None else count
+    for _ in range(max(0, count)):
+        enqueue_job(db, 'drain_email_outbox', {'batch_id': batch_id}, campaign_id=campaign_id)
+
+
+def drain_email_outbox(batch_id: Optional[str] = None):
+    """Job handler: drain one send request, or the whole outbox"""
+    drain_outbox(batch_id=batch_id)
+
+
+register_job_handler('drain_email_outbox', drain_email_outbox)
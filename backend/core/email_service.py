@@ -1,14 +1,122 @@
 import smtplib
+import socket
+import random
+import threading
+import time
+import queue
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from datetime import datetime
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
 from email import encoders
 import os
-from typing import Optional, List
+from typing import Optional, List, Dict, Any, Callable
 import logging
 
 logger = logging.getLogger(__name__)
 
+
+class SMTPConnectionPool:
+    """
+    Keeps authenticated SMTP connections open between messages so a batch
+    pays for connect + STARTTLS + login once per connection, not per email.
+    """
+
+    def __init__(self, host: str, port: int, username: str, password: str, max_size: int = 4,
+                 idle_timeout: float = 60.0, max_messages: int = 100, timeout: float = 30.0):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.idle_timeout = idle_timeout
+        self.max_messages = max_messages
+        self.timeout = timeout
+        self._slots = threading.BoundedSemaphore(max_size)
+        # Entries are [connection, messages_sent, last_used]
+        self._idle: queue.LifoQueue = queue.LifoQueue()
+
+    def _connect(self) -> smtplib.SMTP:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        server.starttls()  # Enable TLS encryption
+        server.login(self.username, self.password)
+        return server
+
+    @staticmethod
+    def _quit(server: smtplib.SMTP):
+        try:
+            server.quit()
+        except Exception:
+            pass
+
+    def _checkout(self) -> list:
+        while True:
+            try:
+                entry = self._idle.get_nowait()
+            except queue.Empty:
+                return [self._connect(), 0, time.monotonic()]
+            # Servers drop idle sessions; don't hand out one that is likely dead
+            if time.monotonic() - entry[2] > self.idle_timeout or entry[1] >= self.max_messages:
+                self._quit(entry[0])
+                continue
+            return entry
+
+    @contextmanager
+    def connection(self):
+        """Borrow a live connection; it is discarded if the send raises"""
+        self._slots.acquire()
+        entry = None
+        try:
+            entry = self._checkout()
+            yield entry[0]
+            entry[1] += 1
+            entry[2] = time.monotonic()
+            self._idle.put(entry)
+            entry = None
+        finally:
+            if entry is not None:
+                self._quit(entry[0])
+            self._slots.release()
+
+    def close(self):
+        while True:
+            try:
+                entry = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._quit(entry[0])
+
+
+class DomainThrottle:
+    """Spaces out sends to the same recipient domain (e.g. gmail.com); off when per_minute is 0"""
+
+    def __init__(self, per_minute: int):
+        self.interval = 60.0 / per_minute if per_minute > 0 else 0.0
+        self._next_slot: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def wait(self, domain: str):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(domain, 0.0))
+            self._next_slot[domain] = slot + self.interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+def _is_transient(error: Exception) -> bool:
+    """Whether a failed send is worth retrying"""
+    if isinstance(error, smtplib.SMTPRecipientsRefused):
+        return all(400 <= code < 500 for code, _ in error.recipients.values())
+    if isinstance(error, smtplib.SMTPResponseException):
+        return 400 <= error.smtp_code < 500
+    return isinstance(error, (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError,
+                              socket.timeout, ConnectionError, TimeoutError, OSError))
+
+
 class EmailService:
     def __init__(self):
         # Gmail SMTP configuration
@@ -17,6 +125,16 @@ class EmailService:
         self.sender_email = os.getenv("GMAIL_EMAIL", "linda@adtvmedia.com")
         self.sender_password = os.getenv("GMAIL_PASSWORD", "")  # Should be set via environment variable
         self.sender_name = "ADTV Media"
+        
+        # Delivery settings
+        self.concurrency = int(os.getenv("EMAIL_SEND_CONCURRENCY", "4"))
+        self.max_attempts = int(os.getenv("EMAIL_MAX_ATTEMPTS", "3"))
+        self.retry_backoff = float(os.getenv("EMAIL_RETRY_BACKOFF_SECONDS", "2"))
+        # Opt-in: Gmail SMTP limits the sender per day, not per recipient domain, and a
+        # per-domain cap serializes mostly-gmail lists. Set it for providers that need it.
+        self.throttle = DomainThrottle(int(os.getenv("EMAIL_PER_DOMAIN_PER_MINUTE", "0")))
+        self._pool: Optional[SMTPConnectionPool] = None
+        self._pool_lock = threading.Lock()
     
     def get_base_url(self):
         """Get the correct base URL for production or development"""
@@ -24,6 +142,131 @@ class EmailService:
             return "https://adtv.nbrain.ai"  # Use the actual frontend domain
         return os.getenv("APP_BASE_URL", "http://localhost:3000")
     
+    def is_configured(self) -> bool:
+        return bool(self.sender_password)
+    
+    @property
+    def pool(self) -> SMTPConnectionPool:
+        with self._pool_lock:
+            if self._pool is None:
+                self._pool = SMTPConnectionPool(
+                    self.smtp_server, self.smtp_port, self.sender_email, self.sender_password,
+                    max_size=self.concurrency,
+                    idle_timeout=float(os.getenv("EMAIL_CONNECTION_IDLE_SECONDS", "60")),
+                    max_messages=int(os.getenv("EMAIL_MAX_MESSAGES_PER_CONNECTION", "100"))
+                )
+            return self._pool
+    
+    def close(self):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.close()
+                self._pool = None
+    
+    def _build_message(self, to_email: str, subject: str, html_body: str,
+                       text_body: Optional[str] = None,
+                       attachments: Optional[List[dict]] = None) -> MIMEMultipart:
+        msg = MIMEMultipart('alternative')
+        msg['From'] = f"{self.sender_name} <{self.sender_email}>"
+        msg['To'] = to_email
+        msg['Subject'] = subject
+        
+        # Add text and HTML parts
+        if text_body:
+            text_part = MIMEText(text_body, 'plain')
+            msg.attach(text_part)
+        
+        html_part = MIMEText(html_body, 'html')
+        msg.attach(html_part)
+        
+        # Add attachments if provided
+        if attachments:
+            for attachment in attachments:
+                part = MIMEBase('application', 'octet-stream')
+                part.set_payload(attachment['content'])
+                encoders.encode_base64(part)
+                part.add_header(
+                    'Content-Disposition',
+                    f'attachment; filename= {attachment["filename"]}'
+                )
+                msg.attach(part)
+        return msg
+    
+    def deliver(self, message: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Send one message over a pooled connection, retrying transient failures
+        with exponential backoff. Never raises.
+        
+        `message` keys: to_email, subject, html_body, and optionally text_body,
+        attachments, plus campaign_id/contact_id/category for the delivery log.
+        Returns the delivery log entry for the attempt.
+        """
+        result = {
+            'to_email': message['to_email'],
+            'subject': message.get('subject'),
+            'category': message.get('category'),
+            'campaign_id': message.get('campaign_id'),
+            'contact_id': message.get('contact_id'),
+            'status': 'failed',
+            'attempts': 0,
+            'error': None,
+            'sent_at': None,
+        }
+        
+        if not self.is_configured():
+            result['error'] = 'SMTP credentials not configured'
+            return result
+        
+        try:
+            msg = self._build_message(
+                message['to_email'], message['subject'], message['html_body'],
+                message.get('text_body'), message.get('attachments')
+            )
+        except Exception as e:
+            result['error'] = f"Could not build message: {e}"
+            return result
+        
+        domain = message['to_email'].rsplit('@', 1)[-1].lower()
+        for attempt in range(1, self.max_attempts + 1):
+            result['attempts'] = attempt
+            self.throttle.wait(domain)
+            try:
+                with self.pool.connection() as server:
+                    server.send_message(msg)
+                result['status'] = 'sent'
+                result['error'] = None
+                result['sent_at'] = datetime.utcnow()
+                logger.info(f"Email sent successfully to {message['to_email']}")
+                return result
+            except Exception as e:
+                result['error'] = f"{type(e).__name__}: {e}"
+                if attempt >= self.max_attempts or not _is_transient(e):
+                    break
+                delay = self.retry_backoff * (2 ** (attempt - 1)) + random.uniform(0, self.retry_backoff)
+                logger.warning(f"Send to {message['to_email']} failed (attempt {attempt}), retrying in {delay:.1f}s: {e}")
+                time.sleep(delay)
+        
+        logger.error(f"Failed to send email to {message['to_email']}: {result['error']}")
+        return result
+    
+    def send_batch(self, messages: List[Dict[str, Any]],
+                   on_result: Optional[Callable[[int, Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+        """
+        Deliver messages concurrently over the connection pool and record them
+        in the delivery log. `on_result(index, result)` is called from the
+        calling thread as each message finishes. Results are in input order.
+        """
+        results: List[Optional[Dict[str, Any]]] = [None] * len(messages)
+        with ThreadPoolExecutor(max_workers=max(1, self.concurrency), thread_name_prefix="smtp") as executor:
+            futures = {executor.submit(self.deliver, message): index for index, message in enumerate(messages)}
+            for future in as_completed(futures):
+                index = futures[future]
+                results[index] = future.result()
+                if on_result:
+                    on_result(index, results[index])
+        record_deliveries(results)
+        return results
+    
     def send_email(
         self,
         to_email: str,
@@ -45,49 +288,17 @@ class EmailService:
         Returns:
             True if email sent successfully, False otherwise
         """
-        try:
-            # Create message
-            msg = MIMEMultipart('alternative')
-            msg['From'] = f"{self.sender_name} <{self.sender_email}>"
-            msg['To'] = to_email
-            msg['Subject'] = subject
-            
-            # Add text and HTML parts
-            if text_body:
-                text_part = MIMEText(text_body, 'plain')
-                msg.attach(text_part)
-            
-            html_part = MIMEText(html_body, 'html')
-            msg.attach(html_part)
-            
-            # Add attachments if provided
-            if attachments:
-                for attachment in attachments:
-                    part = MIMEBase('application', 'octet-stream')
-                    part.set_payload(attachment['content'])
-                    encoders.encode_base64(part)
-                    part.add_header(
-                        'Content-Disposition',
-                        f'attachment; filename= {attachment["filename"]}'
-                    )
-                    msg.attach(part)
-            
-            # Connect to Gmail SMTP server
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls()  # Enable TLS encryption
-                server.login(self.sender_email, self.sender_password)
-                
-                # Send email
-                server.send_message(msg)
-                
-            logger.info(f"Email sent successfully to {to_email}")
-            return True
-            
-        except Exception as e:
-            logger.error(f"Failed to send email to {to_email}: {e}")
-            return False
+        result = self.deliver({
+            'to_email': to_email,
+            'subject': subject,
+            'html_body': html_body,
+            'text_body': text_body,
+            'attachments': attachments
+        })
+        record_deliveries([result])
+        return result['status'] == 'sent'
     
-    def send_agreement_email(
+    def agreement_email_content(
         self,
         to_email: str,
         to_name: str,
@@ -96,9 +307,9 @@ class EmailService:
         start_date: str,
         setup_fee: str,
         monthly_fee: str
-    ) -> bool:
+    ) -> tuple:
         """
-        Send an agreement signing email
+        Build (subject, html_body, text_body) for an agreement signing email
         """
         subject = f"Your {campaign_name} Agreement is Ready for Signature"
         
@@ -215,7 +426,43 @@ class EmailService:
         The ADTV Media Team
         """
         
+        return subject, html_body, text_body
+    
+    def send_agreement_email(
+        self,
+        to_email: str,
+        to_name: str,
+        agreement_url: str,
+        campaign_name: str,
+        start_date: str,
+        setup_fee: str,
+        monthly_fee: str
+    ) -> bool:
+        """
+        Send an agreement signing email
+        """
+        subject, html_body, text_body = self.agreement_email_content(
+            to_email, to_name, agreement_url, campaign_name, start_date, setup_fee, monthly_fee
+        )
         return self.send_email(to_email, subject, html_body, text_body)
 
+
+def record_deliveries(results: List[Dict[str, Any]]):
+    """Append delivery results to the email_delivery_log table"""
+    if not results:
+        return
+    from .database import SessionLocal, EmailDeliveryLog
+    db = SessionLocal()
+    try:
+        db.bulk_insert_mappings(EmailDeliveryLog, [
+            {**result, 'subject': (result.get('subject') or '')[:500]} for result in results
+        ])
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.warning(f"Could not write {len(results)} email delivery log rows: {e}")
+    finally:
+        db.close()
+
 # Create a singleton instance
 email_service = EmailService() 
\ No newline at end of file
@@ -0,0 +1,246 @@
+"""
+Building blocks for the concurrent contact enrichment pipeline.
+
+Rows are streamed out of the database by keyset pagination to a fixed pool
+of workers. Workers hand their results to a write-behind stage instead of
+opening a database session per contact, and consult a cached stop flag
+instead of re-querying the campaign on every contact.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+_SENTINEL = object()
+
+
+class BulkResultWriter:
+    """
+    Write-behind stage: workers push row update dicts onto a queue and a single
+    writer coalesces them per primary key and flushes with bulk_update_mappings
+    every `batch_size` rows or `flush_interval` seconds, whichever comes first.
+    `after_flush` runs (in a thread) after each flush.
+    """
+
+    def __init__(self, session_factory: Callable, model, batch_size: int = 100,
+                 flush_interval: float = 0.5, after_flush: Optional[Callable[[], None]] = None):
+        self.session_factory = session_factory
+        self.model = model
+        self.after_flush = after_flush
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.rows_written = 0
+        self.rows_failed = 0
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+        return self
+
+    async def put(self, mapping: Dict[str, Any]):
+        """Queue an update; `mapping` must contain the primary key `id`"""
+        await self._queue.put(mapping)
+
+    async def close(self):
+        """Flush everything still queued and stop the writer"""
+        if self._task is None:
+            return
+        await self._queue.put(_SENTINEL)
+        await self._task
+        self._task = None
+
+    async def _run(self):
+        pending: Dict[Any, Dict[str, Any]] = {}
+        deadline = None
+        done = False
+
+        while not done:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                item = await asyncio.wait_for(self._queue.get(), timeout=timeout)
+            except asyncio.TimeoutError:
+                item = None
+
+            if item is _SENTINEL:
+                done = True
+            elif item is not None:
+                # Later updates for the same row win, so a 'processing' marker
+                # followed by the final result collapses into one write
+                pending.setdefault(item['id'], {}).update(item)
+                if deadline is None:
+                    deadline = time.monotonic() + self.flush_interval
+
+            if pending and (done or len(pending) >= self.batch_size or time.monotonic() >= deadline):
+                rows = list(pending.values())
+                pending = {}
+                deadline = None
+                await asyncio.to_thread(self._flush, rows)
+                if self.after_flush:
+                    try:
+                        await asyncio.to_thread(self.after_flush)
+                    except Exception as e:
+                        logger.warning(f"after_flush hook failed: {e}")
+
+    def _flush(self, rows: List[Dict[str, Any]]):
+        db = self.session_factory()
+        try:
+            db.bulk_update_mappings(self.model, rows)
+            db.commit()
+            self.rows_written += len(rows)
+            return
+        except Exception as e:
+            db.rollback()
+            logger.error(f"Bulk write of {len(rows)} {self.model.__tablename__} rows failed, retrying individually: {e}")
+        finally:
+            db.close()
+
+        # Isolate the bad row(s) so one failure doesn't drop the whole batch
+        for row in rows:
+            db = self.session_factory()
+            try:
+                db.bulk_update_mappings(self.model, [row])
+                db.commit()
+                self.rows_written += 1
+            except Exception as e:
+                db.rollback()
+                self.rows_failed += 1
+                logger.error(f"Failed to write {self.model.__tablename__} row {row.get('id')}: {e}")
+            finally:
+                db.close()
+
+
+class CampaignStopFlag:
+    """
+    Cached answer to "should enrichment for this campaign stop?".
+    The campaign row is re-read at most once every `refresh_interval` seconds
+    no matter how many workers ask.
+    """
+
+    def __init__(self, session_factory: Callable, campaign_id: str, refresh_interval: float = 2.0):
+        self.session_factory = session_factory
+        self.campaign_id = campaign_id
+        self.refresh_interval = refresh_interval
+        self.reason: Optional[str] = None
+        self._checked_at = float('-inf')
+
+    async def should_stop(self) -> bool:
+        if self.reason is not None:
+            return True
+        now = time.monotonic()
+        if now - self._checked_at >= self.refresh_interval:
+            # Claim the refresh before awaiting so concurrent callers reuse it
+            self._checked_at = now
+            self.reason = await asyncio.to_thread(self._load_reason)
+            if self.reason:
+                logger.warning(f"Campaign {self.campaign_id} {self.reason}, stopping enrichment")
+        return self.reason is not None
+
+    def _load_reason(self) -> Optional[str]:
+        from .database import Campaign
+        db = self.session_factory()
+        try:
+            status = db.query(Campaign.status).filter(Campaign.id == self.campaign_id).scalar()
+        except Exception as e:
+            logger.warning(f"Could not check campaign {self.campaign_id} status: {e}")
+            return None
+        finally:
+            db.close()
+        if status is None:
+            return 'no longer exists'
+        if status == 'paused':
+            return 'paused'
+        return None
+
+
+def load_keyset_page(session_factory: Callable, model, columns: List[str], filters: list,
+                     after_id: Optional[str], limit: int) -> List[Dict[str, Any]]:
+    """
+    Load one page of rows ordered by primary key, starting after `after_id`.
+    Only the requested columns are selected and rows come back as plain dicts.
+    """
+    db = session_factory()
+    try:
+        query = db.query(*[getattr(model, column) for column in columns]).filter(*filters)
+        if after_id is not None:
+            query = query.filter(model.id > after_id)
+        rows = query.order_by(model.id).limit(limit).all()
+        return [dict(zip(columns, row)) for row in rows]
+    finally:
+        db.close()
+
+
+class ContactWorkerPool:
+    """
+    Producer/consumer engine: a producer streams rows out of the database by
+    keyset pagination into a bounded queue and a fixed number of workers pull
+    from it. Memory stays constant regardless of list size, and a slow row
+    only occupies its own worker instead of stalling a whole batch.
+    """
+
+    def __init__(self, workers: int, page_size: int = 500,
+                 stop_flag: Optional[CampaignStopFlag] = None):
+        self.workers = max(1, workers)
+        self.page_size = page_size
+        self.stop_flag = stop_flag
+        self.queued = 0
+
+    async def run(self, fetch_page: Callable[[Optional[str], int], List[Dict[str, Any]]],
+                  handle: Callable[[Dict[str, Any]], Any]):
+        """
+        fetch_page(after_id, limit) is a blocking loader run in a thread;
+        handle(row) is awaited once per row by a worker.
+        """
+        # Keep roughly two items per worker buffered so workers never idle on I/O
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.workers * 2)
+
+        async def produce():
+            after_id = None
+            try:
+                while True:
+                    if self.stop_flag and await self.stop_flag.should_stop():
+                        break
+                    page = await asyncio.to_thread(fetch_page, after_id, self.page_size)
+                    if not page:
+                        break
+                    for row in page:
+                        await queue.put(row)
+                        self.queued += 1
+                    after_id = page[-1]['id']
+                    if len(page) < self.page_size:
+                        break
+            except BaseException:
+                # Failing or cancelled: the workers are cancelled too, so wake
+                # any that are waiting without blocking on a full queue
+                for _ in range(self.workers):
+                    try:
+                        queue.put_nowait(_SENTINEL)
+                    except asyncio.QueueFull:
+                        break
+                raise
+            for _ in range(self.workers):
+                await queue.put(_SENTINEL)
+
+        async def work():
+            while True:
+                row = await queue.get()
+                if row is _SENTINEL:
+                    return
+                try:
+                    await handle(row)
+                except Exception as e:
+                    logger.error(f"Worker failed on row {row.get('id')}: {e}")
+
+        producer = asyncio.create_task(produce())
+        consumers = [asyncio.create_task(work()) for _ in range(self.workers)]
+        try:
+            await asyncio.gather(producer, *consumers)
+        finally:
+            for task in [producer, *consumers]:
+                if not task.done():
+                    task.cancel()
+            # Wait for the cancelled tasks so none outlives the run
+            await asyncio.gather(producer, *consumers, return_exceptions=True)
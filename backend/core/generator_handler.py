@@ -1,14 +1,25 @@
+import asyncio
 import os
-from langchain_google_genai import ChatGoogleGenerativeAI
+import random
 from langchain.schema import SystemMessage, HumanMessage
 import pandas as pd
 import io
 import logging
-from typing import List, Dict
+from typing import AsyncGenerator, Callable, Iterable, List, Dict, Tuple
+from .llm_handler import TokenBucket, invoke
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+GENERATOR_MODEL = ("gemini-1.5-pro", 0.7, 8192)  # High max_output_tokens, ensure it's needed
+GENERATOR_MAX_ROWS = int(os.getenv("GENERATOR_MAX_ROWS", "50000"))
+# Rows generated at once; each row runs its templates concurrently
+GENERATOR_CONCURRENCY = int(os.getenv("GENERATOR_CONCURRENCY", "8"))
+GENERATOR_MAX_RETRIES = int(os.getenv("GENERATOR_MAX_RETRIES", "2"))
+# Share of the process-wide LLM rate limit one CSV run may use (0 disables);
+# every generate_content_rows call gets its own bucket
+GENERATOR_REQUESTS_PER_MINUTE = float(os.getenv("GENERATOR_REQUESTS_PER_MINUTE", "120"))
+
 GENERATOR_PERSONA = """
 You are an expert-level marketing and sales copywriter with deep understanding of regional cultures, industries, and human psychology. 
 Your task is to intelligently personalize content by:
@@ -26,35 +37,162 @@ You excel at using limited data points to create rich, contextual personalizatio
 The final output should ONLY be the personalized text. Do not add any extra greetings, commentary, or sign-offs.
 """
 
+def _build_prompt(row: pd.Series, key_fields: list[str], content: str, generation_goal: str) -> str:
+    """The personalization prompt for one row and one piece of content"""
+    # Direct replacement for key fields
+    temp_content = content
+    for field in key_fields:
+        placeholder = '{{' + field + '}}'
+        if placeholder in temp_content and field in row and pd.notna(row[field]):
+            temp_content = temp_content.replace(placeholder, str(row[field]))
+
+    # Prepare contextual data for the AI - include ALL fields for inference
+    all_data = {k: v for k, v in row.items() if pd.notna(v)}
+    
+    # Create rich context descriptions
+    context_parts = []
+    for k, v in all_data.items():
+        if pd.notna(v):
+            context_parts.append(f"{k}: {v}")
+    
+    context_str = "\n".join(context_parts)
+
+    # Conditionally add the overall goal to the prompt
+    goal_section = ""
+    if generation_goal:
+        goal_section = f"""
+**Overall Personalization Goal:**
+{generation_goal}
+"""
+    
+    # Construct the enhanced prompt using string concatenation to avoid brace issues
+    return (
+        "Your Task:\n"
+        "You are personalizing an email template for a specific recipient. Your goal is to create a version that feels personally written for them while maintaining the original structure and intent.\n\n"
+        "**INTELLIGENT PERSONALIZATION INSTRUCTIONS:**\n"
+        "1. First, replace any {{placeholders}} that were already handled\n"
+        "2. Then, use ALL the contextual data below to make intelligent adaptations:\n"
+        "   - If they're on the West Coast and template mentions \"west coast beauty\", keep it\n"
+        "   - If they're on the East Coast and template mentions \"west coast beauty\", adapt to \"East Coast charm\" or \"beautiful fall foliage\"\n"
+        "   - If template mentions industry pain points generically, make them specific to their industry\n"
+        "   - Adapt cultural references, weather mentions, time zones, local events based on location\n"
+        "   - Adjust formality and terminology based on their role/title\n"
+        "   - Reference company-specific details when relevant\n\n"
+        "3. MAINTAIN the overall structure, length, and core message\n"
+        "4. Make personalizations feel natural, not forced\n"
+        "5. If data is limited, still make subtle adaptations based on what you have\n\n"
+        + goal_section +
+        "\n\n**Recipient's Data:**\n"
+        + context_str +
+        "\n\n**Email Template to Personalize:**\n"
+        + temp_content +
+        "\n\n**CRITICAL RULES:**\n"
+        "- Output ONLY the final personalized email\n"
+        "- Keep the same overall structure and flow\n"
+        "- Make intelligent inferences from the data (e.g., Boston → cold winters, tech hub, historical city)\n"
+        "- Personalization should enhance, not replace, the core message\n"
+        "- If uncertain about a detail, make reasonable assumptions based on the data provided\n"
+    )
+
+
+async def _personalize(prompt: str, label: str, rate_limiter: TokenBucket) -> str:
+    """Run one personalization request, retrying failures with backoff; empty string if all attempts fail"""
+    messages = [
+        SystemMessage(content=GENERATOR_PERSONA),
+        HumanMessage(content=prompt)
+    ]
+    for attempt in range(GENERATOR_MAX_RETRIES + 1):
+        await rate_limiter.acquire()
+        try:
+            generated_text = await invoke(GENERATOR_MODEL, messages)
+            logger.info(f"Successfully generated content for {label}")
+            return generated_text
+        except Exception as e:
+            if attempt == GENERATOR_MAX_RETRIES:
+                logger.error(f"LLM failed for {label}. Error: {e}. Using empty string.")
+                return ""
+            delay = 2 ** attempt + random.random()
+            logger.warning(f"LLM failed for {label} (attempt {attempt + 1}), retrying in {delay:.1f}s: {e}")
+            await asyncio.sleep(delay)
+
+
+async def _bounded_map(
+    items: Iterable,
+    worker: Callable,
+    concurrency: int,
+    ordered: bool = True
+) -> AsyncGenerator[Tuple[int, object], None]:
+    """
+    Run `worker(index, item)` over `items` with at most `concurrency` running at
+    once, yielding (index, result) as results become available. In ordered mode
+    results wait in a reorder buffer until every earlier index has been yielded,
+    and new work is only started within a window ahead of the next index to
+    yield, so one slow item can't make the buffer grow without bound.
+    """
+    concurrency = max(1, concurrency)
+    window = concurrency * 4
+    source = enumerate(items)
+    pending = {}
+    buffered = {}
+    next_index = 0
+    exhausted = False
+
+    try:
+        while True:
+            while not exhausted and len(pending) < concurrency and (not ordered or len(pending) + len(buffered) < window):
+                try:
+                    index, item = next(source)
+                except StopIteration:
+                    exhausted = True
+                    break
+                pending[asyncio.ensure_future(worker(index, item))] = index
+
+            if not pending:
+                break
+
+            done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                index = pending.pop(task)
+                if ordered:
+                    buffered[index] = task.result()
+                else:
+                    yield index, task.result()
+
+            while next_index in buffered:
+                yield next_index, buffered.pop(next_index)
+                next_index += 1
+    finally:
+        # The client may stop reading early (previews do); don't leave requests running
+        for task in pending:
+            task.cancel()
+
+
 async def generate_content_rows(
     csv_file: io.BytesIO,
     key_fields: list[str],
     core_content: str,
     is_preview: bool = False,
     generation_goal: str = "",
-    templates: List[Dict] = []
+    templates: List[Dict] = [],
+    ordered: bool = True
 ):
     """
-    Reads a CSV, generates personalized content row by row, and yields each
-    new row as it's completed.
+    Reads a CSV and generates personalized content for its rows concurrently.
+    Yields the header first, then an (input row index, new row) pair per row as
+    it's completed: in input order, or in completion order when `ordered` is
+    False.
     """
     try:
         df = pd.read_csv(csv_file)
         # For preview, we only process the first row, but we still need the full logic
         target_df = df.head(1) if is_preview else df
 
-        if len(df) > 1000:
-            raise ValueError("CSV file cannot contain more than 1000 rows.")
-
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-1.5-pro",
-            google_api_key=os.environ.get("GEMINI_API_KEY"),
-            temperature=0.7,
-            max_output_tokens=8192 # This is a high value, ensure it's needed
-        )
+        if len(df) > GENERATOR_MAX_ROWS:
+            raise ValueError(f"CSV file cannot contain more than {GENERATOR_MAX_ROWS} rows.")
 
         total_rows = len(target_df)
-        logger.info(f"Starting content generation stream for {total_rows} rows...")
+        logger.info(f"Starting content generation stream for {total_rows} rows "
+                    f"({GENERATOR_CONCURRENCY} at a time, {'input' if ordered else 'completion'} order)...")
 
         # If templates are provided, use them instead of single core_content
         if templates:
@@ -65,152 +203,30 @@ async def generate_content_rows(
             header = target_df.columns.tolist() + ['ai_generated_content']
         yield header
 
-        for index, row in target_df.iterrows():
-            logger.info(f"Streaming processing for row {index + 1}/{total_rows}")
-            new_row = row.tolist()
+        rate_limiter = TokenBucket(GENERATOR_REQUESTS_PER_MINUTE / 60, GENERATOR_CONCURRENCY)
 
+        async def generate_row(index: int, row: pd.Series) -> list:
+            logger.info(f"Processing row {index + 1}/{total_rows}")
             if templates:
-                for template in templates:
-                    temp_content = template['content']
-
-                    # Direct replacement for key fields
-                    for field in key_fields:
-                        placeholder = '{{' + field + '}}'
-                        if placeholder in temp_content and field in row and pd.notna(row[field]):
-                            temp_content = temp_content.replace(placeholder, str(row[field]))
-
-                    # Prepare contextual data for the AI - include ALL fields for inference
-                    all_data = {k: v for k, v in row.items() if pd.notna(v)}
-                    
-                    # Create rich context descriptions
-                    context_parts = []
-                    for k, v in all_data.items():
-                        if pd.notna(v):
-                            context_parts.append(f"{k}: {v}")
-                    
-                    context_str = "\n".join(context_parts)
-
-                    # Conditionally add the overall goal to the prompt
-                    goal_section = ""
-                    if generation_goal:
-                        goal_section = f"""
-**Overall Personalization Goal:**
-{generation_goal}
-"""
-                    
-                    # Construct the enhanced prompt using string concatenation to avoid brace issues
-                    prompt = (
-                        "Your Task:\n"
-                        "You are personalizing an email template for a specific recipient. Your goal is to create a version that feels personally written for them while maintaining the original structure and intent.\n\n"
-                        "**INTELLIGENT PERSONALIZATION INSTRUCTIONS:**\n"
-                        "1. First, replace any {{placeholders}} that were already handled\n"
-                        "2. Then, use ALL the contextual data below to make intelligent adaptations:\n"
-                        "   - If they're on the West Coast and template mentions \"west coast beauty\", keep it\n"
-                        "   - If they're on the East Coast and template mentions \"west coast beauty\", adapt to \"East Coast charm\" or \"beautiful fall foliage\"\n"
-                        "   - If template mentions industry pain points generically, make them specific to their industry\n"
-                        "   - Adapt cultural references, weather mentions, time zones, local events based on location\n"
-                        "   - Adjust formality and terminology based on their role/title\n"
-                        "   - Reference company-specific details when relevant\n\n"
-                        "3. MAINTAIN the overall structure, length, and core message\n"
-                        "4. Make personalizations feel natural, not forced\n"
-                        "5. If data is limited, still make subtle adaptations based on what you have\n\n"
-                        + goal_section +
-                        "\n\n**Recipient's Data:**\n"
-                        + context_str +
-                        "\n\n**Email Template to Personalize:**\n"
-                        + temp_content +
-                        "\n\n**CRITICAL RULES:**\n"
-                        "- Output ONLY the final personalized email\n"
-                        "- Keep the same overall structure and flow\n"
-                        "- Make intelligent inferences from the data (e.g., Boston → cold winters, tech hub, historical city)\n"
-                        "- Personalization should enhance, not replace, the core message\n"
-                        "- If uncertain about a detail, make reasonable assumptions based on the data provided\n"
+                generated = await asyncio.gather(*[
+                    _personalize(
+                        _build_prompt(row, key_fields, template['content'], generation_goal),
+                        f"row {index + 1} and template {template['name']}",
+                        rate_limiter
                     )
-                    messages = [
-                        SystemMessage(content=GENERATOR_PERSONA),
-                        HumanMessage(content=prompt)
-                    ]
-
-                    try:
-                        response = await llm.ainvoke(messages)
-                        generated_text = response.content
-                        logger.info(f"Successfully generated content for row {index + 1} and template {template['name']}")
-                    except Exception as e:
-                        logger.error(f"LLM failed for row {index + 1} and template {template['name']}. Error: {e}. Using empty string.")
-                        generated_text = ""
-
-                    new_row.append(generated_text)
+                    for template in templates
+                ])
             else:
-                # Direct replacement for key fields
-                temp_content = core_content
-                for field in key_fields:
-                    placeholder = '{{' + field + '}}'
-                    if placeholder in temp_content and field in row and pd.notna(row[field]):
-                        temp_content = temp_content.replace(placeholder, str(row[field]))
-
-                # Prepare contextual data for the AI - include ALL fields for inference
-                all_data = {k: v for k, v in row.items() if pd.notna(v)}
-                
-                # Create rich context descriptions
-                context_parts = []
-                for k, v in all_data.items():
-                    if pd.notna(v):
-                        context_parts.append(f"{k}: {v}")
-                
-                context_str = "\n".join(context_parts)
-
-                # Conditionally add the overall goal to the prompt
-                goal_section = ""
-                if generation_goal:
-                    goal_section = f"""
-**Overall Personalization Goal:**
-{generation_goal}
-"""
-                
-                # Construct the enhanced prompt using string concatenation to avoid brace issues
-                prompt = (
-                    "Your Task:\n"
-                    "You are personalizing an email template for a specific recipient. Your goal is to create a version that feels personally written for them while maintaining the original structure and intent.\n\n"
-                    "**INTELLIGENT PERSONALIZATION INSTRUCTIONS:**\n"
-                    "1. First, replace any {{placeholders}} that were already handled\n"
-                    "2. Then, use ALL the contextual data below to make intelligent adaptations:\n"
-                    "   - If they're on the West Coast and template mentions \"west coast beauty\", keep it\n"
-                    "   - If they're on the East Coast and template mentions \"west coast beauty\", adapt to \"East Coast charm\" or \"beautiful fall foliage\"\n"
-                    "   - If template mentions industry pain points generically, make them specific to their industry\n"
-                    "   - Adapt cultural references, weather mentions, time zones, local events based on location\n"
-                    "   - Adjust formality and terminology based on their role/title\n"
-                    "   - Reference company-specific details when relevant\n\n"
-                    "3. MAINTAIN the overall structure, length, and core message\n"
-                    "4. Make personalizations feel natural, not forced\n"
-                    "5. If data is limited, still make subtle adaptations based on what you have\n\n"
-                    + goal_section +
-                    "\n\n**Recipient's Data:**\n"
-                    + context_str +
-                    "\n\n**Email Template to Personalize:**\n"
-                    + temp_content +
-                    "\n\n**CRITICAL RULES:**\n"
-                    "- Output ONLY the final personalized email\n"
-                    "- Keep the same overall structure and flow\n"
-                    "- Make intelligent inferences from the data (e.g., Boston → cold winters, tech hub, historical city)\n"
-                    "- Personalization should enhance, not replace, the core message\n"
-                    "- If uncertain about a detail, make reasonable assumptions based on the data provided\n"
-                )
-                messages = [
-                    SystemMessage(content=GENERATOR_PERSONA),
-                    HumanMessage(content=prompt)
-                ]
-
-                try:
-                    response = await llm.ainvoke(messages)
-                    generated_text = response.content
-                    logger.info(f"Successfully generated content for row {index + 1}")
-                except Exception as e:
-                    logger.error(f"LLM failed for row {index + 1}. Error: {e}. Using empty string.")
-                    generated_text = ""
-
-                new_row = row.tolist() + [generated_text]
+                generated = [await _personalize(
+                    _build_prompt(row, key_fields, core_content, generation_goal),
+                    f"row {index + 1}",
+                    rate_limiter
+                )]
+            return row.tolist() + list(generated)
 
-            yield new_row
+        rows = (row for _, row in target_df.iterrows())
+        async for index, new_row in _bounded_map(rows, generate_row, GENERATOR_CONCURRENCY, ordered):
+            yield index, new_row
 
         logger.info(f"Finished content generation stream for all {total_rows} rows.")
 
@@ -218,4 +234,4 @@ async def generate_content_rows(
         logger.error(f"Error processing CSV file in generator: {e}")
         # In a stream, we should yield an error object or handle it gracefully
         # For now, re-raising will be caught by the main endpoint.
-        raise 
\ No newline at end of file
+        raise
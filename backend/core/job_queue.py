@@ -0,0 +1,335 @@
+"""
+Durable, database-backed job queue.
+
+Jobs are rows in `background_jobs`. Workers claim them with
+SELECT ... FOR UPDATE SKIP LOCKED, hold a lease that a heartbeat thread keeps
+renewing, and record progress on the row. If a worker dies (e.g. a Render
+redeploy), its lease expires and another worker reclaims the job.
+
+Workers run either embedded in the web process (JOB_QUEUE_EMBEDDED_WORKERS,
+default 1) or as separate processes via `python worker.py`.
+"""
+import contextvars
+import logging
+import os
+import socket
+import threading
+import time
+import traceback
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from sqlalchemy import or_
+
+from .database import SessionLocal, BackgroundJob
+
+logger = logging.getLogger(__name__)
+
+ACTIVE_STATUSES = ('queued', 'running')
+
+LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "120"))
+HEARTBEAT_SECONDS = max(5, LEASE_SECONDS // 4)
+POLL_SECONDS = float(os.getenv("JOB_POLL_SECONDS", "3"))
+
+# job_type -> callable invoked as handler(**payload)
+JOB_HANDLERS: Dict[str, Callable[..., Any]] = {}
+
+# Set while a handler runs so it can report progress without extra arguments
+_current_job: contextvars.ContextVar = contextvars.ContextVar("current_job", default=None)
+
+
+class JobLeaseLost(BaseException):
+    """
+    Raised inside a handler (from report_progress / check_job_lease) once its
+    lease has gone to another worker. A BaseException, like CancelledError, so
+    per-item `except Exception` blocks in handlers don't swallow it.
+    """
+
+
+def register_job_handler(job_type: str, handler: Callable[..., Any]):
+    """Register the function that executes jobs of `job_type`"""
+    JOB_HANDLERS[job_type] = handler
+    return handler
+
+
+def make_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def enqueue_job(db, job_type: str, payload: Dict[str, Any], campaign_id: Optional[str] = None,
+                dedupe_key: Optional[str] = None, max_attempts: int = 3) -> BackgroundJob:
+    """
+    Insert a queued job and commit. If `dedupe_key` is given and an active job
+    with the same key exists, that job is returned instead.
+    """
+    if dedupe_key:
+        existing = db.query(BackgroundJob).filter(
+            BackgroundJob.dedupe_key == dedupe_key,
+            BackgroundJob.status.in_(ACTIVE_STATUSES)
+        ).first()
+        if existing:
+            logger.info(f"Job {existing.id} already active for {dedupe_key}, not enqueuing another")
+            return existing
+
+    job = BackgroundJob(
+        job_type=job_type,
+        payload=payload,
+        campaign_id=campaign_id,
+        dedupe_key=dedupe_key,
+        max_attempts=max_attempts,
+        status='queued'
+    )
+    db.add(job)
+    db.commit()
+    db.refresh(job)
+    logger.info(f"Enqueued {job_type} job {job.id}")
+    return job
+
+
+def report_progress(current: int, total: Optional[int] = None, message: Optional[str] = None):
+    """
+    Record progress for the job running in this context. Cheap: it only updates
+    memory, and the heartbeat thread persists it. No-op outside a job.
+    """
+    state = _current_job.get()
+    if state is None:
+        return
+    check_job_lease()
+    state['progress_current'] = current
+    if total is not None:
+        state['progress_total'] = total
+    if message is not None:
+        state['progress_message'] = message
+
+
+def check_job_lease():
+    """Stop the running handler (raise JobLeaseLost) if another worker now owns its job"""
+    state = _current_job.get()
+    if state is not None and state['lease_lost'].is_set():
+        raise JobLeaseLost(state['id'])
+
+
+def has_active_job(db, campaign_id: str, job_type: Optional[str] = None) -> bool:
+    query = db.query(BackgroundJob.id).filter(
+        BackgroundJob.campaign_id == campaign_id,
+        BackgroundJob.status.in_(ACTIVE_STATUSES)
+    )
+    if job_type:
+        query = query.filter(BackgroundJob.job_type == job_type)
+    return query.first() is not None
+
+
+def _claim(worker_id: str, job_types: Optional[List[str]] = None) -> Optional[Dict[str, Any]]:
+    """Claim one runnable job (queued, or running with an expired lease)"""
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        query = db.query(BackgroundJob).filter(
+            or_(
+                BackgroundJob.status == 'queued',
+                (BackgroundJob.status == 'running') & (BackgroundJob.lease_expires_at < now)
+            ),
+            BackgroundJob.attempts < BackgroundJob.max_attempts
+        )
+        if job_types:
+            query = query.filter(BackgroundJob.job_type.in_(job_types))
+
+        job = query.order_by(BackgroundJob.created_at).with_for_update(skip_locked=True).first()
+        if not job:
+            return None
+
+        if job.status == 'running':
+            logger.warning(f"Reclaiming job {job.id} from {job.locked_by} (lease expired)")
+
+        job.status = 'running'
+        job.locked_by = worker_id
+        job.attempts = (job.attempts or 0) + 1
+        job.lease_expires_at = now + timedelta(seconds=LEASE_SECONDS)
+        job.heartbeat_at = now
+        job.started_at = job.started_at or now
+        job.error = None
+        db.commit()
+
+        return {
+            'id': job.id,
+            'job_type': job.job_type,
+            'payload': job.payload or {},
+            'attempts': job.attempts,
+            'max_attempts': job.max_attempts,
+            'progress_current': job.progress_current or 0,
+            'progress_total': job.progress_total or 0,
+            'progress_message': job.progress_message,
+            'lease_lost': threading.Event(),
+        }
+
+
+def fail_exhausted_jobs():
+    """Mark jobs whose lease expired after their last allowed attempt as failed"""
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        count = db.query(BackgroundJob).filter(
+            BackgroundJob.status == 'running',
+            BackgroundJob.lease_expires_at < now,
+            BackgroundJob.attempts >= BackgroundJob.max_attempts
+        ).update({
+            BackgroundJob.status: 'failed',
+            BackgroundJob.error: 'Lease expired after final attempt',
+            BackgroundJob.finished_at: now
+        }, synchronize_session=False)
+        db.commit()
+    if count:
+        logger.warning(f"Marked {count} abandoned jobs as failed")
+
+
+def _write_heartbeat(state: Dict[str, Any], worker_id: str) -> bool:
+    """Renew the lease and persist progress. Returns False if the lease was lost."""
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        updated = db.query(BackgroundJob).filter(
+            BackgroundJob.id == state['id'],
+            BackgroundJob.locked_by == worker_id,
+            BackgroundJob.status == 'running'
+        ).update({
+            BackgroundJob.heartbeat_at: now,
+            BackgroundJob.lease_expires_at: now + timedelta(seconds=LEASE_SECONDS),
+            BackgroundJob.progress_current: state['progress_current'],
+            BackgroundJob.progress_total: state['progress_total'],
+            BackgroundJob.progress_message: state['progress_message']
+        }, synchronize_session=False)
+        db.commit()
+    return bool(updated)
+
+
+def _finish(state: Dict[str, Any], worker_id: str, error: Optional[str]):
+    now = datetime.utcnow()
+    with SessionLocal() as db:
+        job = db.query(BackgroundJob).filter(BackgroundJob.id == state['id']).with_for_update().first()
+        if not job or job.locked_by != worker_id or job.status != 'running':
+            logger.warning(f"Job {state['id']} is no longer owned by {worker_id}, not recording result")
+            return
+
+        job.progress_current = state['progress_current']
+        job.progress_total = state['progress_total']
+        job.progress_message = state['progress_message']
+        job.locked_by = None
+        job.lease_expires_at = None
+
+        if error is None:
+            job.status = 'completed'
+            job.finished_at = now
+        elif job.attempts < job.max_attempts:
+            job.status = 'queued'  # Retry on the next claim
+            job.error = error
+        else:
+            job.status = 'failed'
+            job.error = error
+            job.finished_at = now
+        db.commit()
+
+
+def execute_job(state: Dict[str, Any], worker_id: str):
+    """Run a claimed job with a heartbeat thread renewing its lease"""
+    handler = JOB_HANDLERS.get(state['job_type'])
+    if handler is None:
+        _finish(state, worker_id, f"No handler registered for {state['job_type']}")
+        return
+
+    stop = threading.Event()
+
+    def heartbeat():
+        while not stop.wait(HEARTBEAT_SECONDS):
+            try:
+                if not _write_heartbeat(state, worker_id):
+                    logger.error(f"Lost lease on job {state['id']}, stopping its handler")
+                    state['lease_lost'].set()
+                    return
+            except Exception as e:
+                logger.warning(f"Heartbeat for job {state['id']} failed: {e}")
+
+    beat = threading.Thread(target=heartbeat, daemon=True)
+    beat.start()
+
+    logger.info(f"Worker {worker_id} running {state['job_type']} job {state['id']} (attempt {state['attempts']})")
+    token = _current_job.set(state)
+    error = None
+    try:
+        handler(**state['payload'])
+    except JobLeaseLost:
+        logger.warning(f"Job {state['id']} stopped on {worker_id}: its lease was taken over by another worker")
+        return
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        logger.error(f"Job {state['id']} failed: {error}\n{traceback.format_exc()}")
+    finally:
+        _current_job.reset(token)
+        stop.set()
+        beat.join(timeout=HEARTBEAT_SECONDS)
+
+    try:
+        _finish(state, worker_id, error)
+    except Exception as e:
+        logger.error(f"Could not record result for job {state['id']}: {e}")
+
+
+def run_worker(worker_id: Optional[str] = None, job_types: Optional[List[str]] = None,
+               stop_event: Optional[threading.Event] = None):
+    """Claim and run jobs until `stop_event` is set"""
+    worker_id = worker_id or make_worker_id()
+    logger.info(f"Job worker {worker_id} started (job types: {job_types or 'all'})")
+    last_sweep = 0.0
+
+    while not (stop_event and stop_event.is_set()):
+        try:
+            if time.monotonic() - last_sweep > LEASE_SECONDS:
+                fail_exhausted_jobs()
+                last_sweep = time.monotonic()
+
+            state = _claim(worker_id, job_types=job_types)
+            if state:
+                execute_job(state, worker_id)
+                continue
+        except Exception as e:
+            logger.error(f"Error in job worker loop: {e}")
+
+        if stop_event:
+            stop_event.wait(POLL_SECONDS)
+        else:
+            time.sleep(POLL_SECONDS)
+
+
+_embedded_threads: List[threading.Thread] = []
+
+
+def start_embedded_workers(count: Optional[int] = None):
+    """Run worker loops as daemon threads inside the current (web) process"""
+    if count is None:
+        count = int(os.getenv("JOB_QUEUE_EMBEDDED_WORKERS", "1"))
+    alive = [t for t in _embedded_threads if t.is_alive()]
+    for _ in range(max(0, count - len(alive))):
+        thread = threading.Thread(target=run_worker, daemon=True)
+        thread.start()
+        _embedded_threads.append(thread)
+    if count:
+        logger.info(f"{count} embedded job worker thread(s) running")
+
+
+def job_to_dict(job: BackgroundJob) -> Dict[str, Any]:
+    total = job.progress_total or 0
+    return {
+        "id": job.id,
+        "job_type": job.job_type,
+        "status": job.status,
+        "campaign_id": job.campaign_id,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "locked_by": job.locked_by,
+        "heartbeat_at": job.heartbeat_at.isoformat() if job.heartbeat_at else None,
+        "progress_current": job.progress_current or 0,
+        "progress_total": total,
+        "progress_percentage": round((job.progress_current or 0) / total * 100, 2) if total else 0,
+        "progress_message": job.progress_message,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "started_at": job.started_at.isoformat() if job.started_at else None,
+        "finished_at": job.finished_at.isoformat() if job.finished_at else None,
+    }
@@ -1,14 +1,152 @@
+import asyncio
+import hashlib
+import json
 import os
 import re
+import threading
+import time
+import weakref
+from contextlib import asynccontextmanager
 from langchain_google_genai import ChatGoogleGenerativeAI
 from langchain.schema import HumanMessage, AIMessage, SystemMessage
-from typing import AsyncGenerator, List, Dict
+from typing import AsyncGenerator, List, Dict, Tuple
 import logging
 
 # Configure comprehensive logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# --- Shared LLM clients and limits ---
+# Clients are created once per (model, temperature, max_output_tokens) and reused,
+# so auth and HTTP connection setup happen once per process instead of per call.
+# Requests are admitted through one of two lanes, each with its own concurrency
+# limit and token bucket: BATCH for generators, captions and vision calls, and
+# INTERACTIVE for chat streams, so a batch job can never make a user wait for
+# their first token. Identical non-streamed requests already in flight are
+# answered by a single call.
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_REQUESTS_PER_MINUTE = float(os.getenv("LLM_REQUESTS_PER_MINUTE", "240"))
+LLM_BURST = int(os.getenv("LLM_BURST", "20"))
+LLM_INTERACTIVE_MAX_CONCURRENCY = int(os.getenv("LLM_INTERACTIVE_MAX_CONCURRENCY", "16"))
+LLM_INTERACTIVE_REQUESTS_PER_MINUTE = float(os.getenv("LLM_INTERACTIVE_REQUESTS_PER_MINUTE", "120"))
+
+BATCH = "batch"
+INTERACTIVE = "interactive"
+
+ModelKey = Tuple[str, float, int]
+
+CHAT_MODEL: ModelKey = ("gemini-1.5-pro", 0.3, 8192)
+TEXT_MODEL: ModelKey = ("gemini-1.5-flash", 0.8, 1024)  # Faster model for simple text generation
+VISION_MODEL: ModelKey = ("gemini-1.5-flash", 0.5, 512)  # Supports vision
+
+_clients: Dict[ModelKey, ChatGoogleGenerativeAI] = {}
+_clients_lock = threading.Lock()
+
+
+def get_llm(model: str, temperature: float, max_output_tokens: int) -> ChatGoogleGenerativeAI:
+    """The shared client for this model configuration, created on first use"""
+    key = (model, temperature, max_output_tokens)
+    llm = _clients.get(key)
+    if llm is None:
+        with _clients_lock:
+            llm = _clients.get(key)
+            if llm is None:
+                logger.info(f"Initializing LLM client for {model} (temperature={temperature}, max_output_tokens={max_output_tokens})")
+                llm = ChatGoogleGenerativeAI(
+                    model=model,
+                    google_api_key=os.environ["GEMINI_API_KEY"],
+                    max_output_tokens=max_output_tokens,
+                    temperature=temperature
+                )
+                _clients[key] = llm
+    return llm
+
+
+def warm_up_clients():
+    """Create the clients used by latency-sensitive endpoints ahead of the first request"""
+    for key in (CHAT_MODEL, TEXT_MODEL):
+        get_llm(*key)
+
+
+class TokenBucket:
+    """Process-wide request rate limit: `rate` requests per second with bursts of up to `capacity`"""
+
+    def __init__(self, rate: float, capacity: int):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self._tokens = float(self.capacity)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            await asyncio.sleep(wait)
+
+
+_lane_limits = {
+    BATCH: (LLM_MAX_CONCURRENCY, TokenBucket(LLM_REQUESTS_PER_MINUTE / 60, LLM_BURST)),
+    INTERACTIVE: (LLM_INTERACTIVE_MAX_CONCURRENCY, TokenBucket(LLM_INTERACTIVE_REQUESTS_PER_MINUTE / 60, LLM_INTERACTIVE_MAX_CONCURRENCY)),
+}
+# asyncio primitives belong to one event loop; keep one set per loop
+_slots: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+_inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Task]]" = weakref.WeakKeyDictionary()
+
+
+@asynccontextmanager
+async def llm_slot(lane: str = BATCH):
+    """Hold one of the lane's request slots, after waiting for the lane's rate limit"""
+    concurrency, rate_limiter = _lane_limits[lane]
+    lanes = _slots.setdefault(asyncio.get_running_loop(), {})
+    slots = lanes.get(lane)
+    if slots is None:
+        slots = lanes[lane] = asyncio.Semaphore(concurrency)
+    async with slots:
+        await rate_limiter.acquire()
+        yield
+
+
+def _request_key(model_key: ModelKey, messages: list) -> str:
+    payload = json.dumps([model_key, [(m.type, m.content) for m in messages]], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+async def _invoke(model_key: ModelKey, messages: list) -> str:
+    llm = get_llm(*model_key)
+    async with llm_slot():
+        response = await llm.ainvoke(messages)
+    return response.content
+
+
+async def invoke(model_key: ModelKey, messages: list) -> str:
+    """
+    Run a non-streamed request on the shared client for `model_key` and return
+    the response text. Callers sending an identical request while one is in
+    flight wait for that request's answer instead of sending another.
+    """
+    loop = asyncio.get_running_loop()
+    inflight = _inflight.setdefault(loop, {})
+    key = _request_key(model_key, messages)
+    task = inflight.get(key)
+    if task is None:
+        task = loop.create_task(_invoke(model_key, messages))
+        inflight[key] = task
+        task.add_done_callback(lambda _: inflight.pop(key, None))
+    else:
+        logger.info("Joining identical in-flight LLM request")
+    # Shielded so one caller giving up doesn't cancel the answer for the others
+    return await asyncio.shield(task)
+
+
 # This is a condensed version of ADTV's mission, values, and FAQs.
 # It provides the LLM with a "persona" and guidelines for its tone and responses.
 SUPPORT_EMAIL = os.getenv("ADTV_SUPPORT_EMAIL", "clientsuccess@adtvmedia.com")
@@ -40,18 +178,18 @@ ADTV_BRAND_PERSONA = f"""
 ---
 """
 
+async def _prepend(first, rest: AsyncGenerator):
+    yield first
+    async for item in rest:
+        yield item
+
+
 async def stream_answer(query: str, matches: list, history: List[Dict[str, str]]) -> AsyncGenerator[str, None]:
     """
     Generates an answer using the LLM based on the query, context, and chat history.
-    Initializes a new LLM client for each call to ensure stability.
+    Uses the shared chat client, admitted through the INTERACTIVE lane.
     """
-    logger.info("Initializing new LLM client for this request.")
-    llm = ChatGoogleGenerativeAI(
-        model="gemini-1.5-pro",
-        google_api_key=os.environ["GEMINI_API_KEY"],
-        max_output_tokens=8192,
-        temperature=0.3
-    )
+    llm = get_llm(*CHAT_MODEL)
 
     context_str = ""
     if matches:
@@ -140,8 +278,16 @@ async def stream_answer(query: str, matches: list, history: List[Dict[str, str]]
         text = re.sub(r"~~(https?://[^~\s]+)~~", r"\1", text)
         return text
 
+    started = time.monotonic()
+    stream = llm.astream(messages)
     try:
-        async for chunk in llm.astream(messages):
+        # The interactive slot only covers admission up to the first chunk; the
+        # rest of the answer streams without holding it
+        async with llm_slot(INTERACTIVE):
+            first = await stream.__anext__()
+        logger.info(f"LLM time to first token: {time.monotonic() - started:.2f}s")
+        
+        async for chunk in _prepend(first, stream):
             if chunk.content:
                 chunks_received += 1
                 content = chunk.content
@@ -157,9 +303,13 @@ async def stream_answer(query: str, matches: list, history: List[Dict[str, str]]
         else:
             logger.info(f"LLM stream finished. Total content chunks received: {chunks_received}")
 
+    except StopAsyncIteration:
+        logger.warning("LLM stream finished but no content was received in any chunk.")
     except Exception as e:
         logger.error(f"An exception occurred during the LLM stream: {e}", exc_info=True)
         yield "Sorry, an error occurred while processing your request."
+    finally:
+        await stream.aclose()
 
 
 async def generate_text(prompt: str) -> str:
@@ -169,16 +319,8 @@ async def generate_text(prompt: str) -> str:
     """
     logger.info("Generating text with LLM")
     try:
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-1.5-flash",  # Faster model for simple text generation
-            google_api_key=os.environ["GEMINI_API_KEY"],
-            max_output_tokens=1024,
-            temperature=0.8
-        )
-        
         messages = [HumanMessage(content=prompt)]
-        response = await llm.ainvoke(messages)
-        return response.content
+        return await invoke(TEXT_MODEL, messages)
     except Exception as e:
         logger.error(f"Error generating text: {e}", exc_info=True)
         raise
@@ -191,13 +333,6 @@ async def analyze_image(image_base64: str, prompt: str) -> str:
     """
     logger.info("Analyzing image with vision LLM")
     try:
-        llm = ChatGoogleGenerativeAI(
-            model="gemini-1.5-flash",  # Supports vision
-            google_api_key=os.environ["GEMINI_API_KEY"],
-            max_output_tokens=512,
-            temperature=0.5
-        )
-        
         # Format message with image
         message_content = [
             {"type": "text", "text": prompt},
@@ -205,9 +340,24 @@ async def analyze_image(image_base64: str, prompt: str) -> str:
         ]
         
         messages = [HumanMessage(content=message_content)]
-        response = await llm.ainvoke(messages)
-        return response.content
+        return await invoke(VISION_MODEL, messages)
     except Exception as e:
         logger.error(f"Error analyzing image: {e}", exc_info=True)
         # Return a generic description if vision analysis fails
-        return "Video content" 
\ No newline at end of file
+        return "Video content" 
+
+async def analyze_images(images_base64: List[str], prompt: str, max_output_tokens: int = 2048) -> str:
+    """
+    Analyze several images in one vision LLM request.
+    The prompt should refer to the images in the order given; they are
+    labelled "Image 1", "Image 2", ... in the request. Raises on failure so
+    callers can fall back to per-image analysis.
+    """
+    logger.info(f"Analyzing {len(images_base64)} images with vision LLM")
+    message_content = [{"type": "text", "text": prompt}]
+    for n, image_base64 in enumerate(images_base64, start=1):
+        message_content.append({"type": "text", "text": f"Image {n}:"})
+        message_content.append({"type": "image_url", "image_url": {"url": f"data:image/jpeg;base64,{image_base64}"}})
+    
+    messages = [HumanMessage(content=message_content)]
+    return await invoke((VISION_MODEL[0], VISION_MODEL[1], max_output_tokens), messages)
@@ -0,0 +1,154 @@
+"""
+Compiled mail merge for campaign emails.
+
+A template is parsed once per campaign into a list of segments: literal text
+(with campaign-level [[...]] fields already substituted) and contact-level
+{{...}} fields. Rendering a contact is then a single join over the segments
+instead of one str.replace pass per merge field. Unknown tokens are left in
+the output untouched.
+"""
+import re
+from typing import Any, Callable, Dict, List, Union
+
+# [[Campaign Field]] or {{ContactField}}
+_TOKEN_RE = re.compile(r'\[\[[^\[\]]+?\]\]|\{\{[^{}]+?\}\}')
+
+
+def _company(c: Dict[str, Any]) -> str:
+    return c.get('enriched_company') or c.get('company') or ''
+
+
+def _title(c: Dict[str, Any]) -> str:
+    return c.get('enriched_title') or c.get('title') or ''
+
+
+def _phone(c: Dict[str, Any]) -> str:
+    return c.get('enriched_phone') or c.get('phone') or ''
+
+
+def _field(name: str) -> Callable[[Dict[str, Any]], str]:
+    return lambda c: c.get(name) or ''
+
+
+# Contact-level fields (double curly braces)
+CONTACT_FIELDS: Dict[str, Callable[[Dict[str, Any]], str]] = {
+    '{{FirstName}}': _field('first_name'),
+    '{{LastName}}': _field('last_name'),
+    '{{Neighborhood_1}}': _field('neighborhood'),
+    '{{Email}}': _field('email'),
+    '{{Company}}': _company,
+    '{{Title}}': _title,
+    '{{Phone}}': _phone,
+    # Legacy field names for backward compatibility
+    '{{first_name}}': _field('first_name'),
+    '{{last_name}}': _field('last_name'),
+    '{{neighborhood}}': _field('neighborhood'),
+    '{{email}}': _field('email'),
+    '{{company}}': _company,
+    '{{title}}': _title,
+    '{{phone}}': _phone,
+}
+
+# Contact columns the fields above read
+CONTACT_COLUMNS = [
+    'first_name', 'last_name', 'neighborhood', 'email', 'company', 'enriched_company',
+    'title', 'enriched_title', 'phone', 'enriched_phone',
+]
+
+
+def campaign_merge_fields(campaign) -> Dict[str, str]:
+    """Campaign-level replacements (double square brackets), built once per campaign"""
+    # Parse event slots into Date1/Time1, Date2/Time2, Date3/Time3
+    dates = ['', '', '']
+    times = ['', '', '']
+    calendly_links = ['', '', '']
+
+    # Use event_slots if available, otherwise fall back to old structure
+    event_slots = getattr(campaign, 'event_slots', []) or []
+    if event_slots:
+        for i, slot in enumerate(event_slots[:3]):
+            dates[i] = slot.get('date', '')
+            times[i] = slot.get('time', '')
+            calendly_links[i] = slot.get('calendly_link', '')
+    elif campaign.event_times:
+        for i, event_time in enumerate(campaign.event_times[:3]):
+            dates[i] = campaign.event_date.strftime('%A, %B %d')
+            times[i] = event_time or ''
+
+    # Use city and state fields directly if available
+    city = getattr(campaign, 'city', '')
+    state = getattr(campaign, 'state', '')
+
+    # Fall back to extracting from target_cities if city/state not set
+    if not city and not state and campaign.target_cities:
+        parts = campaign.target_cities.split(',')
+        city = parts[0].strip() if parts else ''
+        state = parts[1].strip() if len(parts) > 1 else ''
+
+    fields = {
+        '[[VIDEO-LINK]]': getattr(campaign, 'video_link', 'https://vimeo.com/adtv-intro'),
+        '[[City]]': city,
+        '[[State]]': state,
+        '[[Event-Link]]': getattr(campaign, 'event_link', campaign.calendly_link or ''),
+        '[[Date1]]': dates[0],
+        '[[Time1]]': times[0],
+        '[[Date2]]': dates[1],
+        '[[Time2]]': times[1],
+        '[[Date3]]': dates[2],
+        '[[Time3]]': times[2],
+        '[[Hotel Name]]': campaign.hotel_name or '',
+        '[[Hotel Address]]': campaign.hotel_address or '',
+        '[[Associate Name]]': campaign.owner_name,
+        '[[Associate email]]': campaign.owner_email,
+        '[[Associate Phone]]': getattr(campaign, 'owner_phone', ''),
+        '[[Calendly Link]]': campaign.calendly_link or '',
+        '[[Calendly Link 1]]': calendly_links[0],
+        '[[Calendly Link 2]]': calendly_links[1],
+        '[[Calendly Link 3]]': calendly_links[2],
+        # Legacy field names for backward compatibility
+        '[[HotelName]]': campaign.hotel_name or '',
+        '[[HotelAddress]]': campaign.hotel_address or '',
+        '[[AssociateName]]': campaign.owner_name,
+        '[[AssociatePhone]]': getattr(campaign, 'owner_phone', ''),
+    }
+    # Unset columns render as empty text rather than failing the merge
+    return {token: value or '' for token, value in fields.items()}
+
+
+class CompiledTemplate:
+    """A template parsed into literal strings and contact field getters"""
+
+    def __init__(self, segments: List[Union[str, Callable[[Dict[str, Any]], str]]]):
+        self.segments = segments
+        self.is_static = all(isinstance(segment, str) for segment in segments)
+        self._static_text = ''.join(segments) if self.is_static else None
+
+    def render(self, contact: Dict[str, Any]) -> str:
+        if self.is_static:
+            return self._static_text
+        return ''.join(
+            segment if isinstance(segment, str) else segment(contact)
+            for segment in self.segments
+        )
+
+
+def compile_template(template: str, campaign_fields: Dict[str, str]) -> CompiledTemplate:
+    """Parse `template` once, folding campaign fields into the literal text"""
+    segments: List[Union[str, Callable[[Dict[str, Any]], str]]] = []
+    literal: List[str] = []
+    position = 0
+
+    for match in _TOKEN_RE.finditer(template or ''):
+        literal.append(template[position:match.start()])
+        token = match.group(0)
+        if token in CONTACT_FIELDS:
+            segments.append(''.join(literal))
+            literal = []
+            segments.append(CONTACT_FIELDS[token])
+        else:
+            literal.append(campaign_fields.get(token, token))
+        position = match.end()
+
+    literal.append((template or '')[position:])
+    segments.append(''.join(literal))
+    return CompiledTemplate([segment for segment in segments if segment != ''])
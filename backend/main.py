@@ -180,6 +180,24 @@ def on_startup():
     except Exception as e:
         logger.warning(f"Ad traffic tables migration failed: {e}")
     
+    # Add content-addressed video assets table
+    try:
+        from scripts.add_video_assets_table import add_video_assets_table
+        logger.info("Adding ad_traffic_video_assets table...")
+        add_video_assets_table()
+        logger.info("ad_traffic_video_assets table added.")
+    except Exception as e:
+        logger.warning(f"Video assets table migration failed: {e}")
+    
+    # Add frame description cache table
+    try:
+        from scripts.add_frame_descriptions_table import add_frame_descriptions_table
+        logger.info("Adding ad_traffic_frame_descriptions table...")
+        add_frame_descriptions_table()
+        logger.info("ad_traffic_frame_descriptions table added.")
+    except Exception as e:
+        logger.warning(f"Frame descriptions table migration failed: {e}")
+    
     # Update ad traffic enums
     try:
         from scripts.update_ad_traffic_enums import update_ad_traffic_enums
@@ -225,6 +243,78 @@ def on_startup():
     except Exception as e:
         logger.warning(f"Error field migration failed: {e}")
     
+    # Add background job queue table
+    try:
+        from scripts.add_background_jobs_table import add_background_jobs_table
+        logger.info("Adding background_jobs table...")
+        add_background_jobs_table()
+        logger.info("background_jobs table added.")
+    except Exception as e:
+        logger.warning(f"Background jobs table migration failed: {e}")
+    
+    # Add SERP response cache table
+    try:
+        from scripts.add_serp_query_cache_table import add_serp_query_cache_table
+        logger.info("Adding serp_query_cache table...")
+        add_serp_query_cache_table()
+        logger.info("serp_query_cache table added.")
+    except Exception as e:
+        logger.warning(f"SERP cache table migration failed: {e}")
+    
+    # Add materialised campaign contact stats table
+    try:
+        from scripts.add_campaign_contact_stats_table import add_campaign_contact_stats_table
+        logger.info("Adding campaign_contact_stats table...")
+        add_campaign_contact_stats_table()
+        logger.info("campaign_contact_stats table added.")
+    except Exception as e:
+        logger.warning(f"Campaign contact stats table migration failed: {e}")
+    
+    # Add campaign_contacts indexes
+    try:
+        from scripts.add_campaign_contact_indexes import add_campaign_contact_indexes
+        logger.info("Adding campaign_contacts indexes...")
+        add_campaign_contact_indexes()
+        logger.info("campaign_contacts indexes added.")
+    except Exception as e:
+        logger.warning(f"Campaign contacts index migration failed: {e}")
+    
+    # Add realtor_contacts (job_id, profile_url) unique index for scrape batch upserts
+    try:
+        from scripts.add_realtor_contact_unique_index import add_realtor_contact_unique_index
+        logger.info("Adding realtor_contacts unique index...")
+        add_realtor_contact_unique_index()
+        logger.info("realtor_contacts unique index added.")
+    except Exception as e:
+        logger.warning(f"Realtor contacts unique index migration failed: {e}")
+    
+    # Add realtor scrape checkpoint columns (resumable scrape jobs)
+    try:
+        from scripts.add_scrape_checkpoint_fields import add_scrape_checkpoint_fields
+        logger.info("Adding scrape checkpoint columns...")
+        add_scrape_checkpoint_fields()
+        logger.info("Scrape checkpoint columns added.")
+    except Exception as e:
+        logger.warning(f"Scrape checkpoint migration failed: {e}")
+    
+    # Add email delivery log table
+    try:
+        from scripts.add_email_delivery_log_table import add_email_delivery_log_table
+        logger.info("Adding email_delivery_log table...")
+        add_email_delivery_log_table()
+        logger.info("email_delivery_log table added.")
+    except Exception as e:
+        logger.warning(f"Email delivery log table migration failed: {e}")
+    
+    # Add email outbox table
+    try:
+        from scripts.add_email_outbox_table import add_email_outbox_table
+        logger.info("Adding email_outbox table...")
+        add_email_outbox_table()
+        logger.info("email_outbox table added.")
+    except Exception as e:
+        logger.warning(f"Email outbox table migration failed: {e}")
+    
     # Create all tables with error handling
     try:
         Base.metadata.create_all(bind=engine)
@@ -251,18 +341,56 @@ def on_startup():
     except Exception as e:
         logger.error(f"Error running migrations: {e}")
     
-    # Safeguard: If server restarted during enrichment, mark campaigns as paused and reset in-flight contacts
+    # Safeguard: If server restarted during enrichment, mark campaigns as paused and reset in-flight contacts.
+    # Campaigns with a queued/running enrichment job are left alone; a worker will resume them.
     try:
         with SessionLocal() as db:
-            from core.database import Campaign, CampaignContact
-            paused_count = db.query(Campaign).filter(Campaign.status == 'enriching').update({Campaign.status: 'paused'}, synchronize_session=False)
-            reset_count = db.query(CampaignContact).filter(CampaignContact.enrichment_status == 'processing').update({CampaignContact.enrichment_status: 'pending'}, synchronize_session=False)
+            from core.database import Campaign, CampaignContact, BackgroundJob
+            active_campaign_ids = db.query(BackgroundJob.campaign_id).filter(
+                BackgroundJob.job_type == 'enrich_campaign_contacts',
+                BackgroundJob.status.in_(['queued', 'running']),
+                BackgroundJob.campaign_id.isnot(None)
+            )
+            paused_count = db.query(Campaign).filter(
+                Campaign.status == 'enriching',
+                Campaign.id.notin_(active_campaign_ids)
+            ).update({Campaign.status: 'paused'}, synchronize_session=False)
+            reset_count = db.query(CampaignContact).filter(
+                CampaignContact.enrichment_status == 'processing',
+                CampaignContact.campaign_id.notin_(active_campaign_ids)
+            ).update({CampaignContact.enrichment_status: 'pending'}, synchronize_session=False)
             db.commit()
+            if reset_count:
+                from core.contact_stats import invalidate_contact_stats
+                invalidate_contact_stats(db)
             if paused_count or reset_count:
                 logger.info(f"Startup recovery: paused {paused_count} campaigns and reset {reset_count} contacts from 'processing' to 'pending'.")
     except Exception as e:
         logger.warning(f"Startup recovery step failed: {e}")
     
+    # Scrape jobs interrupted by a restart go back to PENDING and resume from their checkpoint
+    try:
+        from realtor_importer import tasks as realtor_tasks
+        from realtor_importer.api import ensure_task_processor_running
+        requeued = realtor_tasks.requeue_stale_jobs()
+        if requeued:
+            logger.info(f"Startup recovery: requeued {requeued} interrupted scrape jobs.")
+        # Start the scheduler now rather than on the first request so queued jobs don't wait
+        ensure_task_processor_running()
+    except Exception as e:
+        logger.warning(f"Scrape job recovery failed: {e}")
+    
+    # Outbox messages left behind by a deploy get a drain job if nothing else will pick them up
+    try:
+        from core.email_outbox import has_pending_messages
+        from core.job_queue import enqueue_job
+        if has_pending_messages():
+            with SessionLocal() as db:
+                enqueue_job(db, 'drain_email_outbox', {}, dedupe_key='drain_email_outbox:all')
+                logger.info("Startup recovery: queued a drain job for pending outbox emails.")
+    except Exception as e:
+        logger.warning(f"Outbox recovery step failed: {e}")
+    
     # Add campaign fields
     try:
         from scripts.add_campaign_fields import add_campaign_fields
@@ -346,6 +474,13 @@ def on_startup():
         logger.info("Agreements table check completed.")
     except Exception as e:
         logger.warning(f"Could not ensure agreements table: {e}, continuing anyway...")
+
+    # Agreement PDF store columns (moving the base64 PDFs is a manual one-off: scripts/migrate_agreement_pdfs.py)
+    try:
+        from scripts.migrate_agreement_pdfs import add_agreement_pdf_columns
+        add_agreement_pdf_columns()
+    except Exception as e:
+        logger.warning(f"Could not add agreement PDF columns: {e}, continuing anyway...")
     
     # Ensure danny@nbrain.ai has ad-traffic permission
     try:
@@ -377,6 +512,20 @@ def on_startup():
     except Exception as e:
         logger.error(f"Error updating facebook-automation permissions: {e}")
 
+    # Create the shared LLM clients now so the first chat request doesn't pay for client setup
+    try:
+        llm_handler.warm_up_clients()
+    except Exception as e:
+        logger.warning(f"LLM client warm-up failed: {e}")
+
+    # Run background job workers in this process unless dedicated workers are deployed
+    # (set JOB_QUEUE_EMBEDDED_WORKERS=0 on the web service when running worker.py)
+    try:
+        from core.job_queue import start_embedded_workers
+        start_embedded_workers()
+    except Exception as e:
+        logger.error(f"Error starting embedded job workers: {e}")
+
     # Import ad_traffic_router after startup
     # from ad_traffic.api import router as ad_traffic_router
     # app.include_router(ad_traffic_router, prefix="/api/ad-traffic", tags=["ad-traffic"])
@@ -569,6 +718,7 @@ async def generator_process(
     is_preview: str = Form(...), # Comes in as a string 'true' or 'false'
     generation_goal: str = Form(""), # Optional field for extra instructions
     selected_templates: str = Form("[]"),  # JSON string of template IDs
+    row_order: str = Form("input"),  # 'input' or 'completion'; rows carry their input index either way
     db: Session = Depends(get_db)
 ):
     preview_mode = is_preview.lower() == 'true'
@@ -594,7 +744,8 @@ async def generator_process(
         core_content=core_content,
         is_preview=preview_mode,
         generation_goal=generation_goal,
-        templates=templates
+        templates=templates,
+        ordered=row_order.lower() != 'completion'
     )
 
     # ALWAYS stream the response to avoid timeouts. The frontend will handle
@@ -606,8 +757,8 @@ async def generator_process(
             yield json.dumps({"type": "header", "data": header}) + "\n"
 
             # Yield each subsequent row
-            async for row in content_generator:
-                yield json.dumps({"type": "row", "data": row}) + "\n"
+            async for index, row in content_generator:
+                yield json.dumps({"type": "row", "index": index, "data": row}) + "\n"
             
             yield json.dumps({"type": "done"}) + "\n"
             logger.info("Successfully streamed all CSV content.")
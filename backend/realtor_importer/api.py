@@ -4,12 +4,14 @@ from typing import List, Optional
 from datetime import datetime
 import threading
 import logging
+import os
 from sqlalchemy import text
 
 from core import auth
-from core.database import get_db, User, engine, ScrapingJob, RealtorContact
+from core.database import get_db, User, engine, ScrapingJob, RealtorContact, ScrapingJobStatus
 from . import schemas
 from . import tasks
+from .scheduler import notify_scrape_jobs
 
 router = APIRouter()
 
@@ -17,12 +19,18 @@ router = APIRouter()
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Queued or running jobs allowed per user; the scheduler decides how many actually run at once
+MAX_ACTIVE_JOBS_PER_USER = int(os.getenv("SCRAPE_MAX_ACTIVE_JOBS_PER_USER", "5"))
+
 # Start the background task processor in a separate thread
+# (set SCRAPE_SCHEDULER_EMBEDDED=false when running realtor_importer.scheduler on its own)
 task_thread = None
 
 def ensure_task_processor_running():
     """Ensure the background task processor is running"""
     global task_thread
+    if os.getenv("SCRAPE_SCHEDULER_EMBEDDED", "true").lower() not in ("1", "true", "yes"):
+        return
     if task_thread is None or not task_thread.is_alive():
         logger.info("Starting background task processor thread...")
         task_thread = threading.Thread(target=tasks.run_task_processor, daemon=True)
@@ -86,16 +94,17 @@ def create_scraping_job(
     # Ensure task processor is running
     ensure_task_processor_running()
     
-    # Check if there's already an active job
-    active_job = db.query(ScrapingJob).filter(
+    # Jobs from different users queue side by side; cap how many one user can stack up
+    active_jobs = db.query(ScrapingJob).filter(
+        ScrapingJob.user_id == current_user.id,
         ScrapingJob.status.in_(["PENDING", "IN_PROGRESS"])
-    ).first()
+    ).count()
     
-    if active_job:
-        logger.warning(f"Active job already exists: {active_job.id}")
+    if active_jobs >= MAX_ACTIVE_JOBS_PER_USER:
+        logger.warning(f"User {current_user.id} already has {active_jobs} active jobs")
         raise HTTPException(
             status_code=400, 
-            detail="Another job is already in progress. Please wait for it to complete."
+            detail=f"You already have {active_jobs} jobs queued or in progress. Please wait for one to complete."
         )
     
     # Create the job in the database
@@ -106,6 +115,7 @@ def create_scraping_job(
         status="PENDING"
     )
     db.add(new_job)
+    notify_scrape_jobs(db)
     db.commit()
     db.refresh(new_job)
     
@@ -267,6 +277,48 @@ def stop_job(
     
     return {"message": "Job stopped successfully"}
 
+@router.post("/{job_id}/resume")
+def resume_job(
+    job_id: str,
+    db: Session = Depends(get_db),
+    current_user: User = Depends(auth.get_current_active_user),
+):
+    """
+    Resume a failed, cancelled or interrupted scraping job from its checkpoint.
+    Profiles already scraped are skipped; if the list pages were never fully
+    collected, the job starts again from its list URL.
+    """
+    job = db.query(ScrapingJob).filter(
+        ScrapingJob.id == job_id,
+        ScrapingJob.user_id == current_user.id
+    ).first()
+    
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    
+    if job.status == ScrapingJobStatus.PENDING:
+        raise HTTPException(status_code=400, detail="Job is already queued")
+    if job.status == ScrapingJobStatus.IN_PROGRESS and not tasks.is_stale(job):
+        raise HTTPException(status_code=400, detail="Job is still running")
+    
+    remaining = len(tasks.remaining_profile_urls(db, job.id)) if job.frontier_size is not None else None
+    if remaining == 0:
+        raise HTTPException(status_code=400, detail="Nothing left to scrape for this job")
+    
+    job.status = ScrapingJobStatus.PENDING
+    job.error_message = None
+    notify_scrape_jobs(db)
+    db.commit()
+    
+    ensure_task_processor_running()
+    
+    logger.info(f"Resuming scraping job {job.id} ({remaining if remaining is not None else 'all'} profiles left)")
+    return {
+        "message": "Job resumed",
+        "remaining_profiles": remaining,
+        "frontier_size": job.frontier_size
+    }
+
 @router.post("/process-selected", response_model=schemas.ProcessedJobResponse)
 async def process_selected_jobs(
     request: schemas.ProcessJobsRequest,
@@ -4,11 +4,27 @@ from typing import List, Dict, Optional, Any
 from playwright.async_api import async_playwright, Page, Browser
 import random
 import logging
+from .browser_pool import BrowserPool, HostBudget
 
 # Set up logging
 logger = logging.getLogger(__name__)
 logger.setLevel(logging.INFO)
 
+# Concurrent profile scrapes, each on its own pooled browser session
+PROFILE_WORKERS = int(os.getenv('BRIGHTDATA_PROFILE_WORKERS', '4'))
+# Navigations before a browser session is closed and replaced (1 restores a
+# fresh session per URL, for zones that require it). A profile that fails on a
+# reused session is retried once on a fresh one before it counts as failed.
+SESSION_MAX_NAVIGATIONS = int(os.getenv('BRIGHTDATA_SESSION_MAX_NAVIGATIONS', '25'))
+# Politeness budget per host: navigations in flight and seconds between navigation starts.
+# Shared by every scrape job in the process (the scheduler runs several at once);
+# each process running jobs gets its own budget.
+HOST_CONCURRENCY = int(os.getenv('SCRAPER_HOST_CONCURRENCY', '4'))
+HOST_MIN_INTERVAL = float(os.getenv('SCRAPER_HOST_MIN_INTERVAL', '2.5'))
+# Extra pause for a host after it serves a captcha or access denied page
+HOST_BLOCK_BACKOFF = float(os.getenv('SCRAPER_HOST_BLOCK_BACKOFF', '60'))
+HOST_BUDGET = HostBudget(HOST_CONCURRENCY, HOST_MIN_INTERVAL)
+
 class BrightDataScraper:
     """
     Scraper that uses Bright Data's Browser API for maximum success
@@ -22,11 +38,30 @@ class BrightDataScraper:
         
         logger.info(f"Initialized BrightDataScraper with endpoint: {self.ws_endpoint[:50]}...")
         
+        # One Playwright driver for every connection this scraper makes
+        self._playwright = None
+        self._playwright_lock = asyncio.Lock()
+        self.pool = BrowserPool(self.connect_to_brightdata, PROFILE_WORKERS, SESSION_MAX_NAVIGATIONS)
+        self.host_budget = HOST_BUDGET
+        
+    async def _get_playwright(self):
+        async with self._playwright_lock:
+            if self._playwright is None:
+                self._playwright = await async_playwright().start()
+                logger.info("[BRIGHTDATA CONNECTION] Playwright started successfully")
+            return self._playwright
+    
+    async def close(self):
+        """Close pooled browser sessions and stop Playwright"""
+        await self.pool.close()
+        if self._playwright is not None:
+            await self._playwright.stop()
+            self._playwright = None
+        
     async def connect_to_brightdata(self):
         """Connect to Bright Data browser instance with better error handling"""
         try:
-            playwright = await async_playwright().start()
-            logger.info("[BRIGHTDATA CONNECTION] Playwright started successfully")
+            playwright = await self._get_playwright()
             
             logger.info(f"[BRIGHTDATA CONNECTION] Connecting to Bright Data Browser API...")
             print(f"[BRIGHTDATA CONNECTION] Connecting to: {self.ws_endpoint[:50]}...")
@@ -82,7 +117,7 @@ class BrightDataScraper:
         """Fallback to regular Playwright when Bright Data is unavailable"""
         try:
             logger.info("[FALLBACK] Starting regular Playwright browser...")
-            playwright = await async_playwright().start()
+            playwright = await self._get_playwright()
             
             # Launch a regular browser with some stealth settings
             browser = await playwright.chromium.launch(
@@ -143,13 +178,15 @@ class BrightDataScraper:
     
     async def scrape_homes_list(self, list_url: str) -> List[str]:
         """Scrape homes.com list page using Bright Data browser"""
-        browser = None
+        session = None
         try:
-            browser, page = await self.connect_to_brightdata()
+            session = await self.pool.acquire()
+            page = session.page
             
             print(f"Navigating to: {list_url}")
             # Use domcontentloaded instead of networkidle for better reliability
-            await page.goto(list_url, wait_until='domcontentloaded', timeout=30000)
+            async with self.host_budget.navigation(list_url):
+                await page.goto(list_url, wait_until='domcontentloaded', timeout=30000)
             
             # Wait for agent cards to appear
             print("Waiting for page to load...")
@@ -217,10 +254,12 @@ class BrightDataScraper:
             
         except Exception as e:
             print(f"Error during list scraping: {e}")
+            if session:
+                session.discard()
             return []
         finally:
-            if browser:
-                await browser.close()
+            if session:
+                await self.pool.release(session)
     
     async def scrape_homes_list_with_pagination(self, list_url: str, max_profiles: int = 700, batch_callback=None) -> List[str]:
         """Scrape homes.com list pages with pagination support"""
@@ -290,13 +329,15 @@ class BrightDataScraper:
             logger.info(f"Profiles collected so far: {len(all_profile_urls)}")
             logger.info(f"{'='*80}")
             
-            browser = None
+            session = None
             
             try:
-                browser, page = await self.connect_to_brightdata()
+                session = await self.pool.acquire()
+                page = session.page
                 
                 logger.info(f"[Page {page_num}] Navigating to URL...")
-                await page.goto(current_url, wait_until='domcontentloaded', timeout=60000)
+                async with self.host_budget.navigation(current_url):
+                    await page.goto(current_url, wait_until='domcontentloaded', timeout=60000)
                 
                 # Wait for content
                 logger.info(f"[Page {page_num}] Waiting for page to load...")
@@ -380,8 +421,10 @@ class BrightDataScraper:
                     page_content = await page.content()
                     if "captcha" in page_content.lower():
                         logger.error(f"[Page {page_num}] CAPTCHA detected!")
+                        session.discard()
                     elif "access denied" in page_content.lower():
                         logger.error(f"[Page {page_num}] ACCESS DENIED!")
+                        session.discard()
                     
                     # Log a snippet of the page content for debugging
                     logger.debug(f"[Page {page_num}] Page content snippet: {page_content[:500]}...")
@@ -404,14 +447,16 @@ class BrightDataScraper:
                 logger.error(f"[Page {page_num}] Error type: {type(e).__name__}")
                 import traceback
                 logger.error(f"[Page {page_num}] Traceback: {traceback.format_exc()}")
+                if session:
+                    session.discard()
                 
                 # Continue to next page even if this one failed
                 if page_num < start_page + MAX_PAGES - 1:
                     logger.info(f"[Page {page_num}] Continuing to next page despite error...")
                 
             finally:
-                if browser:
-                    await browser.close()
+                if session:
+                    await self.pool.release(session)
             
             # Wait 20 seconds between pages as requested
             if page_num < start_page + MAX_PAGES - 1 and len(all_profile_urls) < max_profiles:
@@ -429,13 +474,35 @@ class BrightDataScraper:
         return all_profile_urls[:max_profiles]  # Ensure we don't exceed max
     
     async def scrape_agent_profile(self, profile_url: str) -> Optional[Dict[str, Any]]:
-        """Scrape individual agent profile"""
-        browser = None
+        """
+        Scrape individual agent profile on a pooled browser session. If the
+        scrape fails on a reused session and the session was discarded
+        (captcha, access denied, navigation error), it is retried once on a
+        fresh session before the profile counts as failed.
+        """
+        session = await self.pool.acquire()
+        reused = session.navigations > 0
+        try:
+            data = await self._scrape_agent_profile(session, profile_url)
+        finally:
+            await self.pool.release(session)
+        if data is None and reused and session.broken:
+            logger.info(f"Retrying {profile_url} on a fresh browser session")
+            session = await self.pool.acquire(fresh=True)
+            try:
+                data = await self._scrape_agent_profile(session, profile_url)
+            finally:
+                await self.pool.release(session)
+        return data
+
+    async def _scrape_agent_profile(self, session, profile_url: str) -> Optional[Dict[str, Any]]:
+        """One attempt at a profile on the given session; returns None on failure"""
         try:
-            browser, page = await self.connect_to_brightdata()
+            page = session.page
             
             print(f"Scraping profile: {profile_url}")
-            await page.goto(profile_url, wait_until='domcontentloaded', timeout=30000)
+            async with self.host_budget.navigation(profile_url):
+                await page.goto(profile_url, wait_until='domcontentloaded', timeout=30000)
             await self.human_delay(2000, 3000)
             
             # Log page title to verify we're on the right page
@@ -446,9 +513,13 @@ class BrightDataScraper:
             page_text = await page.inner_text('body')
             if 'captcha' in page_text.lower() and ('solve' in page_text.lower() or 'verify' in page_text.lower()):
                 logger.error("CAPTCHA detected on page!")
+                session.discard()
+                self.host_budget.backoff(profile_url, HOST_BLOCK_BACKOFF)
                 return None
             elif 'access denied' in page_text.lower() and len(page_text) < 500:
                 logger.error("Access denied on page!")
+                session.discard()
+                self.host_budget.backoff(profile_url, HOST_BLOCK_BACKOFF)
                 return None
             elif '404' in await page.title() or 'not found' in await page.title():
                 logger.error("Page not found (404)!")
@@ -837,14 +908,17 @@ class BrightDataScraper:
             logger.error(f"Error scraping profile {profile_url}: {e}")
             import traceback
             logger.error(f"Traceback: {traceback.format_exc()}")
+            session.discard()
             return None
-        finally:
-            if browser:
-                await browser.close()
 
 
-async def scrape_with_brightdata(list_url: str, max_profiles: int = 10, batch_callback=None) -> List[Dict[str, Any]]:
-    """Main entry point for Bright Data scraping with pagination and batch support"""
+async def scrape_with_brightdata(list_url: str, max_profiles: int = 10, batch_callback=None,
+                                 frontier_callback=None) -> List[Dict[str, Any]]:
+    """
+    Main entry point for Bright Data scraping with pagination and batch support.
+    With a frontier_callback, the collected profile URLs are handed to it once
+    (to be checkpointed) and only the URLs it returns are scraped.
+    """
     import logging
     logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
     logger = logging.getLogger(__name__)
@@ -864,10 +938,19 @@ async def scrape_with_brightdata(list_url: str, max_profiles: int = 10, batch_ca
     
     if not profile_urls:
         logger.error("No profiles found on list pages!")
+        await scraper.close()
         return []
 
-    # If we have a batch callback, save URLs immediately before phase 2
-    if batch_callback:
+    if frontier_callback:
+        logger.info(f"\nSaving frontier of {len(profile_urls)} profile URLs...")
+        try:
+            profile_urls = await asyncio.to_thread(frontier_callback, profile_urls)
+        except BaseException:
+            await scraper.close()
+            raise
+        logger.info(f"✓ Frontier saved, {len(profile_urls)} profiles left to scrape")
+    # Otherwise, if we have a batch callback, save URLs immediately before phase 2
+    elif batch_callback:
         logger.info(f"\nSaving {len(profile_urls)} profile URLs immediately...")
         url_batch_data = []
         URL_BATCH_SIZE = 20
@@ -877,14 +960,15 @@ async def scrape_with_brightdata(list_url: str, max_profiles: int = 10, batch_ca
                 'profile_url': url,
                 'source': 'homes.com',
                 'first_name': 'Pending',
-                'last_name': 'Scrape'
+                'last_name': 'Scrape',
+                'scrape_status': 'pending'
             }
             url_batch_data.append(profile)
             
             if len(url_batch_data) >= URL_BATCH_SIZE:
                 logger.info(f"[URL BATCH] Saving batch of {len(url_batch_data)} profiles...")
                 try:
-                    batch_callback(url_batch_data)
+                    await asyncio.to_thread(batch_callback, url_batch_data)
                     logger.info(f"[URL BATCH] ✓ Batch saved successfully")
                 except Exception as e:
                     logger.error(f"[URL BATCH] ✗ Error saving batch: {str(e)}")
@@ -894,7 +978,7 @@ async def scrape_with_brightdata(list_url: str, max_profiles: int = 10, batch_ca
         if url_batch_data:
             logger.info(f"[URL BATCH] Saving final batch of {len(url_batch_data)} profiles...")
             try:
-                batch_callback(url_batch_data)
+                await asyncio.to_thread(batch_callback, url_batch_data)
                 logger.info(f"[URL BATCH] ✓ Final batch saved successfully")
             except Exception as e:
                 logger.error(f"[URL BATCH] ✗ Error saving final batch: {str(e)}")
@@ -903,70 +987,109 @@ async def scrape_with_brightdata(list_url: str, max_profiles: int = 10, batch_ca
         logger.info("Now continuing to scrape full profile details...")
         # Don't return here - continue to Phase 2!
     
+    return await scrape_profiles_with_brightdata(profile_urls, batch_callback, scraper)
+
+
+async def scrape_profiles_with_brightdata(profile_urls: List[str], batch_callback=None,
+                                          scraper: Optional[BrightDataScraper] = None) -> List[Dict[str, Any]]:
+    """
+    Phase 2: scrape the given profile URLs. Also used on its own to resume a
+    job from its saved frontier. Profiles that can't be scraped are reported to
+    batch_callback as {'profile_url': ..., 'scrape_status': 'failed'}.
+    """
+    scraper = scraper or BrightDataScraper()
+    if not profile_urls:
+        await scraper.close()
+        return []
+    
     logger.info(f"\nPHASE 2: Scraping individual profiles...")
     logger.info(f"Total profiles to scrape: {len(profile_urls)}")
+    logger.info(f"Workers: {PROFILE_WORKERS}, host budget: {HOST_CONCURRENCY} in flight, {HOST_MIN_INTERVAL}s between navigations")
     
-    # Scrape individual profiles
-    results = []
+    # Scrape individual profiles with PROFILE_WORKERS concurrent workers; the
+    # host budget, not a fixed sleep, paces requests to homes.com
+    scraped = {}
     batch_data = []
     BATCH_SIZE = 20  # Changed from 50 to match tasks.py
+    save_lock = asyncio.Lock()
+    queue = asyncio.Queue()
+    for item in enumerate(profile_urls):
+        queue.put_nowait(item)
     
-    for i, url in enumerate(profile_urls):
-        logger.info(f"\n{'='*60}")
-        logger.info(f"PROFILE {i+1} of {len(profile_urls)}")
-        logger.info(f"URL: {url}")
-        logger.info(f"Progress: {((i+1)/len(profile_urls)*100):.1f}%")
-        logger.info(f"{'='*60}")
-        
-        try:
-            profile_data = await scraper.scrape_agent_profile(url)
-            if profile_data:
-                logger.info(f"✓ Successfully scraped profile:")
-                logger.info(f"  Name: {profile_data.get('first_name', 'Unknown')} {profile_data.get('last_name', 'Unknown')}")
-                logger.info(f"  Company: {profile_data.get('company', 'N/A')}")
-                logger.info(f"  Location: {profile_data.get('city', 'N/A')}, {profile_data.get('state', 'N/A')}")
-                logger.info(f"  Phone: {profile_data.get('cell_phone', 'N/A')}")
-                logger.info(f"  Website: {profile_data.get('fb_or_website', 'N/A')}")
-                logger.info(f"  Sales Stats:")
-                logger.info(f"    - Closed Sales: {profile_data.get('closed_sales', 'None')}")
-                logger.info(f"    - Total Value: {profile_data.get('total_value', 'None')}")
-                logger.info(f"    - Price Range: {profile_data.get('price_range', 'None')}")
-                logger.info(f"    - Average Price: {profile_data.get('average_price', 'None')}")
-                
-                results.append(profile_data)
-                batch_data.append(profile_data)
-                
-                # Call batch callback when we have BATCH_SIZE profiles
-                if batch_callback and len(batch_data) >= BATCH_SIZE:
-                    logger.info(f"\n[BATCH] Saving batch of {BATCH_SIZE} profiles...")
-                    try:
-                        batch_callback(batch_data)
-                        logger.info(f"[BATCH] ✓ Batch saved successfully")
-                    except Exception as e:
-                        logger.error(f"[BATCH] ✗ Error saving batch: {str(e)}")
-                    batch_data = []
-            else:
+    async def record(entry: Dict[str, Any]):
+        """
+        Queue a scraped profile or failure for saving; call batch callback when we
+        have BATCH_SIZE. The callback commits to the database, so it runs in a
+        thread to keep the other workers' navigations moving, one batch at a
+        time since callers save through a single session.
+        """
+        nonlocal batch_data
+        if not batch_callback:
+            return
+        batch_data.append(entry)
+        if len(batch_data) >= BATCH_SIZE:
+            batch, batch_data = batch_data, []
+            logger.info(f"\n[BATCH] Saving batch of {len(batch)} profiles...")
+            try:
+                async with save_lock:
+                    await asyncio.to_thread(batch_callback, batch)
+                logger.info(f"[BATCH] ✓ Batch saved successfully")
+            except Exception as e:
+                logger.error(f"[BATCH] ✗ Error saving batch: {str(e)}")
+    
+    async def profile_worker(worker_id: int):
+        while True:
+            try:
+                i, url = queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+            
+            logger.info(f"\n{'='*60}")
+            logger.info(f"[WORKER {worker_id}] PROFILE {i+1} of {len(profile_urls)}")
+            logger.info(f"URL: {url}")
+            logger.info(f"Progress: {len(scraped)} scraped, {queue.qsize()} queued")
+            logger.info(f"{'='*60}")
+            
+            try:
+                profile_data = await scraper.scrape_agent_profile(url)
+                if profile_data:
+                    logger.info(f"✓ Successfully scraped profile:")
+                    logger.info(f"  Name: {profile_data.get('first_name', 'Unknown')} {profile_data.get('last_name', 'Unknown')}")
+                    logger.info(f"  Company: {profile_data.get('company', 'N/A')}")
+                    logger.info(f"  Location: {profile_data.get('city', 'N/A')}, {profile_data.get('state', 'N/A')}")
+                    logger.info(f"  Phone: {profile_data.get('cell_phone', 'N/A')}")
+                    logger.info(f"  Website: {profile_data.get('fb_or_website', 'N/A')}")
+                    logger.info(f"  Sales Stats:")
+                    logger.info(f"    - Closed Sales: {profile_data.get('closed_sales', 'None')}")
+                    logger.info(f"    - Total Value: {profile_data.get('total_value', 'None')}")
+                    logger.info(f"    - Price Range: {profile_data.get('price_range', 'None')}")
+                    logger.info(f"    - Average Price: {profile_data.get('average_price', 'None')}")
+                    
+                    scraped[i] = profile_data
+                    await record(profile_data)
+                    continue
                 logger.warning(f"✗ Failed to extract data from profile")
-        except Exception as e:
-            logger.error(f"✗ ERROR scraping profile: {str(e)}")
-            logger.error(f"  Error type: {type(e).__name__}")
-            import traceback
-            logger.error(f"  Traceback: {traceback.format_exc()}")
-            continue
-        
-        # Wait 10 seconds between profiles as requested
-        if i < len(profile_urls) - 1:
-            wait_time = 10
-            logger.info(f"\n[DELAY] Waiting {wait_time} seconds before next profile...")
-            logger.info(f"[DELAY] Scraped so far: {len(results)} profiles")
-            logger.info(f"[DELAY] Remaining: {len(profile_urls) - i - 1} profiles")
-            await asyncio.sleep(wait_time)
+            except Exception as e:
+                logger.error(f"✗ ERROR scraping profile: {str(e)}")
+                logger.error(f"  Error type: {type(e).__name__}")
+                import traceback
+                logger.error(f"  Traceback: {traceback.format_exc()}")
+            
+            await record({'profile_url': url, 'scrape_status': 'failed'})
+    
+    try:
+        await asyncio.gather(*[profile_worker(n + 1) for n in range(PROFILE_WORKERS)])
+    finally:
+        await scraper.close()
+    
+    results = [scraped[i] for i in sorted(scraped)]
     
     # Don't forget remaining batch data
     if batch_callback and batch_data:
         logger.info(f"\n[BATCH] Saving final batch of {len(batch_data)} profiles...")
         try:
-            batch_callback(batch_data)
+            async with save_lock:
+                await asyncio.to_thread(batch_callback, batch_data)
             logger.info(f"[BATCH] ✓ Final batch saved successfully")
         except Exception as e:
             logger.error(f"[BATCH] ✗ Error saving final batch: {str(e)}")
@@ -980,10 +1103,16 @@ async def scrape_with_brightdata(list_url: str, max_profiles: int = 10, batch_ca
     return results
 
 
-# Synchronous wrapper
-def scrape_homes_brightdata(list_url: str, max_profiles: int = 10, batch_callback=None) -> List[Dict[str, Any]]:
+# Synchronous wrappers
+def scrape_homes_brightdata(list_url: str, max_profiles: int = 10, batch_callback=None,
+                            frontier_callback=None) -> List[Dict[str, Any]]:
     """Synchronous wrapper for Bright Data scraping"""
-    return asyncio.run(scrape_with_brightdata(list_url, max_profiles, batch_callback))
+    return asyncio.run(scrape_with_brightdata(list_url, max_profiles, batch_callback, frontier_callback))
+
+
+def scrape_profiles_brightdata(profile_urls: List[str], batch_callback=None) -> List[Dict[str, Any]]:
+    """Synchronous wrapper for scraping a saved list of profile URLs"""
+    return asyncio.run(scrape_profiles_with_brightdata(profile_urls, batch_callback))
 
 
 if __name__ == "__main__":
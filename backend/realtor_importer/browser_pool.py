@@ -0,0 +1,158 @@
+"""
+Long-lived browser sessions and per-host politeness for the Playwright scrapers.
+
+BrowserPool keeps up to `size` (browser, page) sessions open and lends them out
+one scrape at a time, replacing a session when it disconnects, when a scrape
+marks it bad (captcha, access denied, navigation error) or after
+`max_navigations` uses. HostBudget spaces out navigations to the same host so
+concurrent workers, across every job in the process, stay within a polite
+request rate.
+"""
+import asyncio
+import logging
+import random
+import threading
+import time
+from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Dict, List, Tuple
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+
+class BrowserSession:
+    """A pooled (browser, page) pair"""
+
+    def __init__(self, browser, page):
+        self.browser = browser
+        self.page = page
+        self.navigations = 0
+        self.broken = False
+
+    def discard(self):
+        """Don't reuse this session; it's closed when released"""
+        self.broken = True
+
+    def healthy(self) -> bool:
+        return not self.broken and self.browser.is_connected() and not self.page.is_closed()
+
+
+class BrowserPool:
+    """Up to `size` browser sessions shared by concurrent scrapes, each used for one navigation at a time"""
+
+    def __init__(self, connect: Callable[[], Awaitable[Tuple]], size: int, max_navigations: int):
+        self._connect = connect
+        self._size = max(1, size)
+        self._max_navigations = max(1, max_navigations)
+        self._slots = asyncio.Semaphore(self._size)
+        self._idle: List[BrowserSession] = []
+        self._closed = False
+
+    async def acquire(self, fresh: bool = False) -> BrowserSession:
+        """
+        Wait for a free slot and return a healthy session, connecting a new one
+        if needed. With `fresh`, always connect a new session.
+        """
+        await self._slots.acquire()
+        try:
+            while self._idle and not fresh:
+                session = self._idle.pop()
+                if session.healthy():
+                    return session
+                await self._close_session(session)
+            browser, page = await self._connect()
+            return BrowserSession(browser, page)
+        except BaseException:
+            self._slots.release()
+            raise
+
+    async def release(self, session: BrowserSession):
+        """Return a session after one navigation; broken or worn-out sessions are closed"""
+        try:
+            session.navigations += 1
+            if self._closed or not session.healthy() or session.navigations >= self._max_navigations:
+                if session.navigations >= self._max_navigations:
+                    logger.info(f"[BROWSER POOL] Recycling session after {session.navigations} navigations")
+                await self._close_session(session)
+            else:
+                self._idle.append(session)
+        finally:
+            self._slots.release()
+
+    async def close(self):
+        self._closed = True
+        while self._idle:
+            await self._close_session(self._idle.pop())
+
+    @staticmethod
+    async def _close_session(session: BrowserSession):
+        try:
+            await session.browser.close()
+        except Exception as e:
+            logger.debug(f"[BROWSER POOL] Error closing browser session: {e}")
+
+
+class _HostState:
+    def __init__(self):
+        self.in_flight = 0
+        self.next_start = 0.0
+
+
+class HostBudget:
+    """
+    Per-host politeness: at most `concurrency` navigations in flight per host,
+    and navigation starts spaced `min_interval` seconds apart (with jitter).
+
+    Thread-safe and not tied to an event loop, so one budget can be shared by
+    every scrape job running in the process, each on its own loop.
+    """
+
+    # How often a navigation waiting for a free in-flight slot checks again
+    POLL_SECONDS = 0.1
+
+    def __init__(self, concurrency: int, min_interval: float, jitter: float = 0.3):
+        self._concurrency = max(1, concurrency)
+        self._min_interval = max(0.0, min_interval)
+        self._jitter = jitter
+        self._hosts: Dict[str, _HostState] = {}
+        self._lock = threading.Lock()
+
+    def _state(self, url: str) -> _HostState:
+        host = urlparse(url).netloc.lower()
+        if host not in self._hosts:
+            self._hosts[host] = _HostState()
+        return self._hosts[host]
+
+    def _try_start(self, url: str) -> float:
+        """Take a slot and a start time for `url`; returns 0 on success, else how long to wait"""
+        with self._lock:
+            state = self._state(url)
+            now = time.monotonic()
+            if state.next_start > now:
+                return state.next_start - now
+            if state.in_flight >= self._concurrency:
+                return self.POLL_SECONDS
+            state.in_flight += 1
+            state.next_start = now + self._min_interval * random.uniform(1 - self._jitter, 1 + self._jitter)
+            return 0
+
+    @asynccontextmanager
+    async def navigation(self, url: str):
+        """Hold one of the host's in-flight slots, starting only once the host's spacing allows"""
+        while True:
+            wait = self._try_start(url)
+            if not wait:
+                break
+            await asyncio.sleep(wait)
+        try:
+            yield
+        finally:
+            with self._lock:
+                self._state(url).in_flight -= 1
+
+    def backoff(self, url: str, seconds: float):
+        """Push the host's next navigation back, e.g. after a captcha or access denied page"""
+        with self._lock:
+            state = self._state(url)
+            state.next_start = max(state.next_start, time.monotonic() + seconds)
+        logger.warning(f"[HOST BUDGET] Backing off {urlparse(url).netloc} for {seconds:.0f}s")
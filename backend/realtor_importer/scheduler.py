@@ -0,0 +1,234 @@
+"""
+Scrape job scheduler.
+
+Claims PENDING scraping_jobs with SELECT ... FOR UPDATE SKIP LOCKED, so any
+number of schedulers (web workers, dedicated processes) can run side by side
+without two of them taking the same job. Each scheduler runs up to
+SCRAPE_SCHEDULER_CONCURRENCY jobs at once, never more than
+SCRAPE_MAX_RUNNING_PER_USER for one user, and prefers users with fewer jobs
+running. While a job runs, a heartbeat keeps its updated_at fresh, so only
+jobs whose scheduler died look stale (tasks.requeue_stale_jobs). Jobs in one
+process share a single per-host politeness budget (brightdata_scraper.HOST_BUDGET),
+so running more of them doesn't multiply the request rate to homes.com.
+
+New work wakes idle schedulers through LISTEN/NOTIFY on PostgreSQL; on other
+databases they poll with a backoff. Runs embedded in the web process
+(SCRAPE_SCHEDULER_EMBEDDED, default on) or on its own with:
+
+    python -m realtor_importer.scheduler --concurrency 4
+"""
+import logging
+import os
+import select
+import socket
+import threading
+import time
+import uuid
+from typing import Dict, Optional
+
+from sqlalchemy import func, text, update
+from sqlalchemy.orm import aliased
+
+from core.database import SessionLocal, ScrapingJob, ScrapingJobStatus, engine
+from . import tasks
+
+logger = logging.getLogger(__name__)
+
+CONCURRENCY = int(os.getenv("SCRAPE_SCHEDULER_CONCURRENCY", "2"))
+MAX_RUNNING_PER_USER = int(os.getenv("SCRAPE_MAX_RUNNING_PER_USER", "1"))
+HEARTBEAT_SECONDS = int(os.getenv("SCRAPE_HEARTBEAT_SECONDS", "60"))
+# Idle waits grow from MIN to MAX while there's no work; a notification ends them early
+MIN_IDLE_SECONDS = 1.0
+MAX_IDLE_SECONDS = float(os.getenv("SCRAPE_SCHEDULER_MAX_IDLE_SECONDS", "30"))
+NOTIFY_CHANNEL = "scrape_jobs"
+
+
+def make_worker_id() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+def notify_scrape_jobs(db):
+    """Wake idle schedulers when the caller's transaction commits (PostgreSQL only)"""
+    if engine.dialect.name == 'postgresql':
+        db.execute(text(f"NOTIFY {NOTIFY_CHANNEL}"))
+
+
+def claim_job(worker_id: str) -> Optional[str]:
+    """Claim the next PENDING job whose user is under the running cap; returns its id"""
+    running = aliased(ScrapingJob)
+    with SessionLocal() as db:
+        running_for_user = (
+            db.query(func.count(running.id))
+            .filter(running.user_id == ScrapingJob.user_id, running.status == ScrapingJobStatus.IN_PROGRESS)
+            .correlate(ScrapingJob)
+            .scalar_subquery()
+        )
+        # The running count is read without locks, so the per-user cap can be
+        # exceeded briefly when two schedulers claim for one user at the same moment
+        job = db.query(ScrapingJob).filter(
+            ScrapingJob.status == ScrapingJobStatus.PENDING,
+            running_for_user < MAX_RUNNING_PER_USER
+        ).order_by(
+            running_for_user, ScrapingJob.created_at
+        ).with_for_update(skip_locked=True, of=ScrapingJob).first()
+        if not job:
+            return None
+
+        job.status = ScrapingJobStatus.IN_PROGRESS
+        job.updated_at = func.now()
+        db.commit()
+        logger.info(f"Scheduler {worker_id} claimed scrape job {job.id}")
+        return job.id
+
+
+def _heartbeat(job_id: str):
+    with SessionLocal() as db:
+        db.execute(
+            update(ScrapingJob)
+            .where(ScrapingJob.id == job_id, ScrapingJob.status == ScrapingJobStatus.IN_PROGRESS)
+            .values(updated_at=func.now())
+        )
+        db.commit()
+
+
+class _Listener:
+    """LISTEN on the scrape_jobs channel and set `wake` on every notification"""
+
+    def __init__(self, wake: threading.Event):
+        self.wake = wake
+
+    def run(self, stop_event: threading.Event):
+        while not stop_event.is_set():
+            connection = None
+            try:
+                connection = engine.raw_connection()
+                dbapi_connection = connection.dbapi_connection
+                dbapi_connection.autocommit = True
+                with dbapi_connection.cursor() as cursor:
+                    cursor.execute(f"LISTEN {NOTIFY_CHANNEL}")
+                logger.info(f"Listening for {NOTIFY_CHANNEL} notifications")
+                while not stop_event.is_set():
+                    if select.select([dbapi_connection], [], [], 5)[0]:
+                        dbapi_connection.poll()
+                        if dbapi_connection.notifies:
+                            dbapi_connection.notifies.clear()
+                            self.wake.set()
+            except Exception as e:
+                logger.warning(f"Scrape job listener error, reconnecting: {e}")
+                stop_event.wait(5)
+            finally:
+                if connection is not None:
+                    try:
+                        connection.invalidate()
+                    except Exception:
+                        pass
+
+
+class ScrapeScheduler:
+    """Claims scrape jobs and runs up to `concurrency` of them in threads"""
+
+    def __init__(self, concurrency: int = CONCURRENCY, worker_id: Optional[str] = None):
+        self.concurrency = max(1, concurrency)
+        self.worker_id = worker_id or make_worker_id()
+        self.wake = threading.Event()
+        self.running: Dict[str, threading.Thread] = {}
+        self._lock = threading.Lock()
+
+    def _run_job(self, job_id: str):
+        stop = threading.Event()
+
+        def heartbeat():
+            while not stop.wait(HEARTBEAT_SECONDS):
+                try:
+                    _heartbeat(job_id)
+                except Exception as e:
+                    logger.warning(f"Heartbeat for scrape job {job_id} failed: {e}")
+
+        beat = threading.Thread(target=heartbeat, daemon=True)
+        beat.start()
+        try:
+            tasks.process_scrape_job(job_id)
+        except Exception as e:
+            logger.error(f"Scrape job {job_id} crashed: {e}")
+        finally:
+            stop.set()
+            with self._lock:
+                self.running.pop(job_id, None)
+            # A slot is free; look for more work straight away
+            self.wake.set()
+
+    def _fill_slots(self) -> int:
+        """Claim jobs until every slot is busy or nothing is claimable; returns how many were started"""
+        started = 0
+        while True:
+            with self._lock:
+                if len(self.running) >= self.concurrency:
+                    return started
+            job_id = claim_job(self.worker_id)
+            if not job_id:
+                return started
+            thread = threading.Thread(target=self._run_job, args=(job_id,), daemon=True)
+            with self._lock:
+                self.running[job_id] = thread
+            thread.start()
+            started += 1
+
+    def run(self, stop_event: Optional[threading.Event] = None):
+        """Schedule jobs until `stop_event` is set (jobs already running are left to finish)"""
+        stop_event = stop_event or threading.Event()
+        logger.info(f"Scrape scheduler {self.worker_id} started (concurrency {self.concurrency}, "
+                    f"{MAX_RUNNING_PER_USER} running per user)")
+
+        if engine.dialect.name == 'postgresql':
+            threading.Thread(target=_Listener(self.wake).run, args=(stop_event,), daemon=True).start()
+
+        idle = MIN_IDLE_SECONDS
+        last_sweep = 0.0
+        while not stop_event.is_set():
+            self.wake.clear()
+            try:
+                if time.monotonic() - last_sweep > HEARTBEAT_SECONDS:
+                    tasks.requeue_stale_jobs()
+                    last_sweep = time.monotonic()
+                if self._fill_slots():
+                    idle = MIN_IDLE_SECONDS
+            except Exception as e:
+                logger.error(f"Error in scrape scheduler loop: {e}")
+
+            self.wake.wait(idle)
+            if stop_event.is_set():
+                break
+            # Back off while nothing happens; any wake-up (notification, finished job) resets it
+            idle = MIN_IDLE_SECONDS if self.wake.is_set() else min(idle * 2, MAX_IDLE_SECONDS)
+
+        logger.info(f"Scrape scheduler {self.worker_id} stopping with {len(self.running)} job(s) still running")
+
+
+if __name__ == "__main__":
+    import argparse
+    import signal
+
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    logging.basicConfig(level=logging.INFO)
+
+    parser = argparse.ArgumentParser(description="Run the realtor scrape job scheduler")
+    parser.add_argument("--concurrency", type=int, default=CONCURRENCY, help="Jobs to run at once")
+    args = parser.parse_args()
+
+    stop_event = threading.Event()
+    scheduler = ScrapeScheduler(concurrency=args.concurrency)
+
+    def handle_signal(signum, frame):
+        logger.info("Shutdown requested, no new scrape jobs will be claimed")
+        stop_event.set()
+        scheduler.wake.set()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    scheduler.run(stop_event)
+    # Let running jobs finish; anything cut short is requeued as stale and resumes from its checkpoint
+    for thread in list(scheduler.running.values()):
+        thread.join()
@@ -18,7 +18,7 @@ except ImportError:
 # Import Bright Data scraper as second priority
 try:
     from .brightdata_scraper import scrape_homes_brightdata
-    from .brightdata_scraper import scrape_homes_brightdata
+    from .brightdata_scraper import scrape_profiles_brightdata
     BRIGHTDATA_AVAILABLE = True
 except ImportError:
     BRIGHTDATA_AVAILABLE = False
@@ -254,7 +254,19 @@ def scrape_realtor_profile_page(profile_url: str) -> Optional[Dict[str, Any]]:
     return data
 
 
-def scrape_realtor_list_with_playwright(list_url: str, max_profiles: int = 10, use_google_search: bool = True, batch_callback=None) -> List[Dict[str, Any]]:
+def scrape_realtor_profiles(profile_urls: List[str], batch_callback=None) -> List[Dict[str, Any]]:
+    """
+    Scrape a saved list of profile URLs, skipping the list pages.
+    Used to resume a job from its checkpointed frontier.
+    """
+    logger.info(f"REALTOR SCRAPER - RESUMING {len(profile_urls)} profiles")
+    if not BRIGHTDATA_AVAILABLE:
+        raise RuntimeError("Resuming a scrape requires the Bright Data scraper")
+    return scrape_profiles_brightdata(profile_urls, batch_callback=batch_callback)
+
+
+def scrape_realtor_list_with_playwright(list_url: str, max_profiles: int = 10, use_google_search: bool = True, batch_callback=None,
+                                        frontier_callback=None) -> List[Dict[str, Any]]:
     """
     Alternative scraping method using Playwright for better bot detection evasion.
     Tries Web Unlocker first, then Bright Data, then proxy, then other methods.
@@ -264,6 +276,8 @@ def scrape_realtor_list_with_playwright(list_url: str, max_profiles: int = 10, u
         max_profiles: Maximum number of profiles to scrape
         use_google_search: Whether to use Google search for additional info
         batch_callback: Optional callback function to call with batches of results
+        frontier_callback: Optional callback given every collected profile URL once,
+            returning the URLs still to scrape (Bright Data only)
     """
     logger.info(f"\n{'='*80}")
     logger.info(f"REALTOR SCRAPER - STARTING")
@@ -292,7 +306,8 @@ def scrape_realtor_list_with_playwright(list_url: str, max_profiles: int = 10, u
         
         try:
             logger.info("  Calling scrape_homes_brightdata...")
-            result = scrape_homes_brightdata(list_url, max_profiles, batch_callback=batch_callback)
+            result = scrape_homes_brightdata(list_url, max_profiles, batch_callback=batch_callback,
+                                             frontier_callback=frontier_callback)
             logger.info(f"  ✓ SUCCESS: Scraped {len(result)} profiles")
             return result
         except Exception as e:
@@ -1,15 +1,18 @@
 """
 Background task processor for handling Realtor imports
 """
-import time
+import asyncio
 import logging
 import sys
-from typing import List, Dict, Any, Optional
+from typing import Any, Awaitable, Dict, List, Optional, Tuple
+from sqlalchemy import and_, func, insert, or_, select, update
 from sqlalchemy.orm import Session
 from . import scraper
 from core.database import engine, ScrapingJob, RealtorContact, SessionLocal, ScrapingJobStatus
-from datetime import datetime
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlparse
 import os
+import uuid
 
 # Set up logging to ensure output is visible
 logging.basicConfig(
@@ -27,10 +30,65 @@ MAX_PROFILES_PER_JOB = 700
 # Batch size for saving results
 BATCH_SIZE = 20  # Reduced from 50 for more frequent saves
 
+# A profile URL that failed this many times is left out when a job resumes
+MAX_PROFILE_ATTEMPTS = int(os.getenv('REALTOR_MAX_PROFILE_ATTEMPTS', '3'))
+
+# An IN_PROGRESS job whose updated_at is older than this has lost its worker and can be resumed
+STALE_JOB_MINUTES = int(os.getenv('REALTOR_STALE_JOB_MINUTES', '15'))
+
+# Merged-job enrichment: website crawls and ZeroBounce checks in flight at once,
+# and how many MergedContacts are enriched and inserted per chunk
+CRAWL_CONCURRENCY = int(os.getenv('REALTOR_CRAWL_CONCURRENCY', '16'))
+ZEROBOUNCE_CONCURRENCY = int(os.getenv('REALTOR_ZEROBOUNCE_CONCURRENCY', '5'))
+MERGED_INSERT_CHUNK = int(os.getenv('REALTOR_MERGED_INSERT_CHUNK', '200'))
+
+ZEROBOUNCE_API_KEY = os.getenv('ZEROBOUNCE_API_KEY', "848cbcd03ba043eaa677fc9f56c77da6")
+
+
+def remaining_profile_urls(session: Session, job_id: str) -> List[str]:
+    """Frontier URLs of a job still to scrape: pending, or failed fewer than MAX_PROFILE_ATTEMPTS times"""
+    rows = session.query(RealtorContact.profile_url).filter(
+        RealtorContact.job_id == job_id,
+        or_(
+            RealtorContact.scrape_status == 'pending',
+            and_(
+                RealtorContact.scrape_status == 'failed',
+                func.coalesce(RealtorContact.scrape_attempts, 0) < MAX_PROFILE_ATTEMPTS
+            )
+        )
+    ).order_by(RealtorContact.created_at, RealtorContact.id).all()
+    return [url for url, in rows]
+
+
+def is_stale(job: ScrapingJob) -> bool:
+    """Whether an IN_PROGRESS job has stopped making progress (its worker thread or dyno died)"""
+    if job.updated_at is None:
+        return True
+    updated_at = job.updated_at if job.updated_at.tzinfo else job.updated_at.replace(tzinfo=timezone.utc)
+    return updated_at < datetime.now(timezone.utc) - timedelta(minutes=STALE_JOB_MINUTES)
+
+
+def requeue_stale_jobs() -> int:
+    """Put IN_PROGRESS jobs that lost their worker back to PENDING so they resume from their checkpoint"""
+    with SessionLocal() as session:
+        stale = [
+            job for job in session.query(ScrapingJob).filter(
+                ScrapingJob.status == ScrapingJobStatus.IN_PROGRESS
+            ).with_for_update(skip_locked=True).all()
+            if is_stale(job)
+        ]
+        for job in stale:
+            logger.warning(f"Requeueing stale scrape job {job.id} (last update {job.updated_at})")
+            job.status = ScrapingJobStatus.PENDING
+        session.commit()
+        return len(stale)
+
 
 def process_scrape_job(job_id: str):
     """
-    Process a single scrape job
+    Process a single scrape job. A job whose frontier was already saved (it was
+    interrupted or resumed) skips the list pages and only scrapes the profile
+    URLs that aren't done yet.
     """
     with SessionLocal() as session:
         job = session.query(ScrapingJob).filter_by(id=job_id).first()
@@ -45,11 +103,12 @@ def process_scrape_job(job_id: str):
         logger.info(f"{'='*60}\n")
         
         job.status = ScrapingJobStatus.IN_PROGRESS
+        job.error_message = None
         session.commit()
         
         try:
             # Create a callback that also checks for cancellation
-            def save_batch_with_cancel_check(batch: List[Dict[str, Any]]):
+            def save_batch_with_cancel_check(batch: List[Dict[str, Any]], frontier_size: Optional[int] = None):
                 # Check if job has been cancelled
                 session.refresh(job)
                 if job.status == "CANCELLED":
@@ -57,27 +116,42 @@ def process_scrape_job(job_id: str):
                     raise Exception("Job cancelled by user")
                 
                 # Save the batch
-                save_batch(session, job_id, batch)
+                save_batch(session, job_id, batch, frontier_size=frontier_size)
             
-            # Use the new Playwright scraper for better bot detection evasion
-            # This will automatically fall back to Selenium if Playwright is not available
-            scraped_data = scraper.scrape_realtor_list_with_playwright(
-                job.start_url, 
-                max_profiles=MAX_PROFILES_PER_JOB,
-                batch_callback=save_batch_with_cancel_check
-            )
+            # Checkpoint every collected profile URL in one commit, then scrape those not done yet
+            def save_frontier(profile_urls: List[str]) -> List[str]:
+                save_batch_with_cancel_check([
+                    {'profile_url': url, 'source': 'homes.com', 'first_name': 'Pending',
+                     'last_name': 'Scrape', 'scrape_status': 'pending'}
+                    for url in profile_urls
+                ], frontier_size=len(profile_urls))
+                return remaining_profile_urls(session, job_id)
+            
+            if job.frontier_size is not None:
+                todo = remaining_profile_urls(session, job_id)
+                logger.info(f"Resuming job {job_id} from its checkpoint: "
+                            f"{len(todo)} of {job.frontier_size} profiles left to scrape")
+                scraped_data = scraper.scrape_realtor_profiles(
+                    todo,
+                    batch_callback=save_batch_with_cancel_check
+                ) if todo else []
+            else:
+                # Use the new Playwright scraper for better bot detection evasion
+                # This will automatically fall back to Selenium if Playwright is not available
+                scraped_data = scraper.scrape_realtor_list_with_playwright(
+                    job.start_url, 
+                    max_profiles=MAX_PROFILES_PER_JOB,
+                    batch_callback=save_batch_with_cancel_check,
+                    frontier_callback=save_frontier
+                )
             
             logger.info(f"\n{'='*60}")
             logger.info(f"Scraping completed for job {job_id}")
             logger.info(f"Total profiles scraped: {len(scraped_data)}")
             logger.info(f"{'='*60}\n")
             
-            # Save any remaining data that wasn't part of a full batch
-            if scraped_data:
-                remaining_count = len(scraped_data) % BATCH_SIZE
-                if remaining_count > 0:
-                    remaining_batch = scraped_data[-remaining_count:]
-                    save_batch_with_cancel_check(remaining_batch)
+            # The scraper already handed every profile, including the final
+            # partial batch, to the batch callback
             
             # Final check for cancellation
             session.refresh(job)
@@ -98,49 +172,134 @@ def process_scrape_job(job_id: str):
             logger.error(f"Job {job_id} failed with error: {str(e)}")
 
 
-def save_batch(session: Session, job_id: str, batch: List[Dict[str, Any]]):
-    """Save a batch of scraped data"""
+# Columns a scraped profile may fill in; anything else in the scraper's dicts is ignored
+CONTACT_COLUMNS = {
+    column.name for column in RealtorContact.__table__.columns
+    if column.name not in ('id', 'job_id', 'created_at')
+}
+
+
+def _is_placeholder(data: Dict[str, Any]) -> bool:
+    """URL-only rows saved before a profile is scraped"""
+    return data.get('scrape_status') == 'pending' or (
+        data.get('first_name') == 'Pending' and data.get('last_name') == 'Scrape'
+    )
+
+
+def save_batch(session: Session, job_id: str, batch: List[Dict[str, Any]], frontier_size: Optional[int] = None):
+    """
+    Upsert a batch of scraped data by (job_id, profile_url).
+    Placeholder rows are only inserted for new URLs; scraped profiles fill in
+    the existing row, keeping values the new data doesn't have; failures
+    ({'profile_url': ..., 'scrape_status': 'failed'}) count an attempt on the
+    URL's row. `frontier_size` marks the job's frontier as saved, in the same
+    transaction.
+    """
     logger.info(f"\n{'='*50}")
     logger.info(f"SAVING BATCH: {len(batch)} profiles")
     logger.info(f"Job ID: {job_id}")
     logger.info(f"{'='*50}")
     
-    saved_count = 0
+    # One entry per URL; a profile seen twice in a batch keeps the later values
+    rows = {}
+    kinds = {}
     for i, data in enumerate(batch):
-        try:
-            # Log the data being saved for debugging
-            logger.info(f"  Profile {i+1}: {data.get('first_name', 'Unknown')} {data.get('last_name', 'Unknown')} - {data.get('profile_url', 'No URL')}")
-            
-            # Ensure profile_url exists (it's required)
-            if not data.get('profile_url'):
-                logger.warning(f"  WARNING: Skipping profile without profile_url: {data}")
-                continue
-
-            contact = RealtorContact(
-                job_id=job_id,
-                **data
-            )
-            session.add(contact)
-            saved_count += 1
-        except Exception as e:
-            logger.error(f"  ERROR saving profile {i+1}: {str(e)}")
-            logger.error(f"  Data: {data}")
-            # Continue with other profiles instead of failing the whole batch
+        # Log the data being saved for debugging
+        logger.info(f"  Profile {i+1}: {data.get('first_name', 'Unknown')} {data.get('last_name', 'Unknown')} - {data.get('profile_url', 'No URL')}")
+        
+        # Ensure profile_url exists (it's required)
+        profile_url = data.get('profile_url')
+        if not profile_url:
+            logger.warning(f"  WARNING: Skipping profile without profile_url: {data}")
             continue
+        
+        if data.get('scrape_status') == 'failed':
+            if kinds.get(profile_url) != 'scraped':
+                kinds[profile_url] = 'failed'
+            continue
+        
+        unknown = set(data) - CONTACT_COLUMNS
+        if unknown:
+            logger.warning(f"  Ignoring unknown fields for {profile_url}: {sorted(unknown)}")
+        values = {k: v for k, v in data.items() if k in CONTACT_COLUMNS and v is not None}
+        
+        if _is_placeholder(data):
+            if profile_url not in kinds:
+                kinds[profile_url] = 'pending'
+                rows[profile_url] = {**values, 'scrape_status': 'pending', 'scrape_attempts': 0}
+        else:
+            previous = rows.get(profile_url, {}) if kinds.get(profile_url) == 'scraped' else {}
+            kinds[profile_url] = 'scraped'
+            rows[profile_url] = {**previous, **values, 'scrape_status': 'scraped'}
+    
+    if engine.dialect.name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    
+    def upsert(urls, update: bool):
+        if not urls:
+            return
+        # Multi-row INSERTs need the same keys on every row
+        columns = sorted({key for url in urls for key in rows[url]})
+        stmt = insert(RealtorContact).values([
+            {'id': str(uuid.uuid4()), 'job_id': job_id, **{c: rows[url].get(c) for c in columns}}
+            for url in urls
+        ])
+        conflict = [RealtorContact.job_id, RealtorContact.profile_url]
+        if update:
+            stmt = stmt.on_conflict_do_update(
+                index_elements=conflict,
+                set_={
+                    c: func.coalesce(stmt.excluded[c], RealtorContact.__table__.c[c])
+                    for c in columns if c != 'profile_url'
+                }
+            )
+        else:
+            stmt = stmt.on_conflict_do_nothing(index_elements=conflict)
+        session.execute(stmt)
+    
+    pending = [url for url, kind in kinds.items() if kind == 'pending']
+    scraped = [url for url, kind in kinds.items() if kind == 'scraped']
+    failed = [url for url, kind in kinds.items() if kind == 'failed']
     
     try:
+        upsert(pending, update=False)
+        upsert(scraped, update=True)
+        if failed:
+            session.execute(
+                update(RealtorContact)
+                .where(
+                    RealtorContact.job_id == job_id,
+                    RealtorContact.profile_url.in_(failed),
+                    RealtorContact.scrape_status.in_(['pending', 'failed'])
+                )
+                .values(
+                    scrape_status='failed',
+                    scrape_attempts=func.coalesce(RealtorContact.scrape_attempts, 0) + 1
+                ),
+                execution_options={'synchronize_session': False}
+            )
+        
+        # Show activity on the job and read back its contact count in the same statement
+        job_values = {'updated_at': func.now()}
+        if frontier_size is not None:
+            job_values['frontier_size'] = frontier_size
+        total_count = session.execute(
+            update(ScrapingJob)
+            .where(ScrapingJob.id == job_id)
+            .values(**job_values)
+            .returning(
+                select(func.count()).select_from(RealtorContact)
+                .where(RealtorContact.job_id == job_id)
+                .scalar_subquery()
+            )
+        ).scalar()
         session.commit()
-        logger.info(f"✓ Batch saved successfully: {saved_count}/{len(batch)} profiles")
         
-        # Get total count for this job
-        total_count = session.query(RealtorContact).filter_by(job_id=job_id).count()
+        logger.info(f"✓ Batch saved successfully: {len(scraped)} scraped, {len(pending)} URL placeholders, "
+                    f"{len(failed)} failed ({len(batch)} entries)")
         logger.info(f"Total profiles saved for this job: {total_count}")
-        
-        # Update job's updated_at to show activity
-        job = session.query(ScrapingJob).filter_by(id=job_id).first()
-        if job:
-            job.updated_at = datetime.utcnow()
-            session.commit()
             
     except Exception as e:
         logger.error(f"ERROR committing batch: {str(e)}")
@@ -150,7 +309,7 @@ def save_batch(session: Session, job_id: str, batch: List[Dict[str, Any]]):
 
 def run_task_processor():
     """
-    Main task processor loop
+    Main task processor loop: run a scrape scheduler in this thread
     """
     logger.info("Starting Realtor importer task processor...")
     logger.info(f"Python version: {sys.version}")
@@ -162,30 +321,10 @@ def run_task_processor():
     logger.info(f"BRIGHTDATA_API_TOKEN set: {'Yes' if os.getenv('BRIGHTDATA_API_TOKEN') else 'No'}")
     logger.info(f"RESIDENTIAL_PROXY_URL set: {'Yes' if os.getenv('RESIDENTIAL_PROXY_URL') else 'No'}")
     
-    while True:
-        try:
-            with SessionLocal() as session:
-                # Find pending jobs
-                pending_job = session.query(ScrapingJob).filter_by(
-                    status=ScrapingJobStatus.PENDING
-                ).first()
-                
-                if pending_job:
-                    logger.info(f"Found pending job: {pending_job.id}")
-                    logger.info(f"Job name: {pending_job.name}")
-                    logger.info(f"Job URL: {pending_job.start_url}")
-                    process_scrape_job(pending_job.id)
-                else:
-                    # No jobs, wait
-                    logger.debug("No pending jobs, waiting 5 seconds...")
-                    time.sleep(5)
-        except Exception as e:
-            logger.error(f"Error in task processor loop: {str(e)}")
-            logger.error(f"Error type: {type(e).__name__}")
-            import traceback
-            logger.error(f"Traceback: {traceback.format_exc()}")
-            # Continue running even if there's an error
-            time.sleep(5)
+    # Jobs are claimed with SKIP LOCKED, so this can run in every web worker
+    # and in dedicated scheduler processes at the same time
+    from .scheduler import ScrapeScheduler
+    ScrapeScheduler().run()
 
 
 def process_merged_jobs(processed_job_id: str, job_ids: List[str]):
@@ -237,64 +376,8 @@ def process_merged_jobs(processed_job_id: str, job_ids: List[str]):
             
             logger.info(f"After deduplication: {len(merged_contacts)} unique contacts, {duplicates} duplicates removed")
             
-            # Step 3: Create MergedContact records and enrich data
-            for i, (key, contact) in enumerate(merged_contacts.items()):
-                merged = models.MergedContact(
-                    processed_job_id=processed_job_id,
-                    first_name=contact.first_name,
-                    last_name=contact.last_name,
-                    company=contact.company,
-                    city=contact.city,
-                    state=contact.state,
-                    dma=contact.dma,
-                    cell_phone=contact.cell_phone,
-                    phone2=contact.phone2,
-                    email=contact.email,
-                    personal_email=contact.personal_email,
-                    agent_website=contact.agent_website or contact.fb_or_website,
-                    facebook_profile=contact.facebook_profile,
-                    fb_or_website=contact.fb_or_website,
-                    profile_url=contact.profile_url,
-                    years_exp=contact.years_exp,
-                    # Add sales stats if available
-                    closed_sales=getattr(contact, 'closed_sales', None),
-                    total_value=getattr(contact, 'total_value', None),
-                    price_range=getattr(contact, 'price_range', None),
-                    average_price=getattr(contact, 'average_price', None)
-                )
-                
-                # Step 4: Crawl website content if available
-                website_url = contact.agent_website or contact.fb_or_website
-                if website_url and website_url.startswith('http'):
-                    try:
-                        website_content = crawl_website(website_url)
-                        if website_content:
-                            merged.website_content = website_content[:5000]  # Limit to 5000 chars
-                            processed_job.websites_crawled += 1
-                    except Exception as e:
-                        logger.error(f"Error crawling website {website_url}: {e}")
-                
-                # Step 5: Validate email with ZeroBounce
-                email_to_validate = contact.email or contact.personal_email
-                if email_to_validate:
-                    try:
-                        validation_result = validate_email_zerobounce(email_to_validate)
-                        if validation_result:
-                            merged.email_valid = validation_result.get('status') == 'valid'
-                            merged.email_status = validation_result.get('status')
-                            merged.email_score = validation_result.get('score', 0)
-                            processed_job.emails_validated += 1
-                    except Exception as e:
-                        logger.error(f"Error validating email {email_to_validate}: {e}")
-                
-                session.add(merged)
-                
-                # Commit in batches
-                if i % 50 == 0:
-                    session.commit()
-            
-            # Final commit
-            session.commit()
+            # Steps 3-5: enrich contacts concurrently and bulk insert MergedContact rows in chunks
+            asyncio.run(_enrich_and_store(session, processed_job, list(merged_contacts.values())))
             
             # Update processed job stats
             processed_job.total_contacts = len(merged_contacts)
@@ -306,6 +389,7 @@ def process_merged_jobs(processed_job_id: str, job_ids: List[str]):
             
         except Exception as e:
             logger.error(f"Error processing merged jobs: {e}")
+            session.rollback()
             processed_job.status = "FAILED"
             session.commit()
 
@@ -346,54 +430,185 @@ def merge_contact_records(existing, new):
     return MergedContactObj(**merged_dict)
 
 
-def crawl_website(url: str) -> Optional[str]:
-    """Crawl website and extract text content"""
-    import requests
+def _merged_contact_row(processed_job_id: str, contact) -> Dict[str, Any]:
+    return {
+        'processed_job_id': processed_job_id,
+        'first_name': contact.first_name,
+        'last_name': contact.last_name,
+        'company': contact.company,
+        'city': contact.city,
+        'state': contact.state,
+        'dma': contact.dma,
+        'cell_phone': contact.cell_phone,
+        'phone2': contact.phone2,
+        'email': contact.email,
+        'personal_email': contact.personal_email,
+        'agent_website': contact.agent_website or contact.fb_or_website,
+        'facebook_profile': contact.facebook_profile,
+        'fb_or_website': contact.fb_or_website,
+        'profile_url': contact.profile_url,
+        'years_exp': contact.years_exp,
+        # Add sales stats if available
+        'closed_sales': getattr(contact, 'closed_sales', None),
+        'total_value': getattr(contact, 'total_value', None),
+        'price_range': getattr(contact, 'price_range', None),
+        'average_price': getattr(contact, 'average_price', None),
+        'website_content': None,
+        'email_valid': None,
+        'email_status': None,
+        'email_score': None,
+    }
+
+
+def _website_key(url: str) -> str:
+    """
+    Cache key for a crawl: the URL without scheme, port, leading www. or
+    trailing slash. Agents of one brokerage usually list the same site, in any
+    mix of http/https, www and trailing slashes; the query string is kept, since
+    agent pages often differ only by it (/agent.aspx?id=123).
+    """
+    parsed = urlparse(url.strip())
+    host = (parsed.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    key = host + parsed.path.rstrip('/')
+    return f"{key}?{parsed.query}" if parsed.query else key
+
+
+class _Enricher:
+    """
+    Website crawls and email validations for one merge, sharing HTTP clients
+    and caching results by website and by email. Concurrent lookups of the same
+    key wait on a single request.
+    """
+
+    def __init__(self, web, zerobounce):
+        self.web = web
+        self.zerobounce = zerobounce
+        self.crawl_slots = asyncio.Semaphore(max(1, CRAWL_CONCURRENCY))
+        self.validation_slots = asyncio.Semaphore(max(1, ZEROBOUNCE_CONCURRENCY))
+        self.websites: Dict[str, asyncio.Task] = {}
+        self.emails: Dict[str, asyncio.Task] = {}
+
+    async def _crawl(self, url: str) -> Optional[str]:
+        async with self.crawl_slots:
+            return await crawl_website(self.web, url)
+
+    async def _validate(self, email: str) -> Optional[Dict[str, Any]]:
+        async with self.validation_slots:
+            return await validate_email_zerobounce(self.zerobounce, email)
+
+    def website(self, url: str) -> Awaitable[Optional[str]]:
+        key = _website_key(url)
+        if key not in self.websites:
+            self.websites[key] = asyncio.ensure_future(self._crawl(url))
+        return self.websites[key]
+
+    def email(self, email: str) -> Awaitable[Optional[Dict[str, Any]]]:
+        key = email.lower().strip()
+        if key not in self.emails:
+            self.emails[key] = asyncio.ensure_future(self._validate(key))
+        return self.emails[key]
+
+    async def enrich(self, contact, row: Dict[str, Any]) -> Tuple[bool, bool]:
+        """Fill the row's website and email fields; returns (website crawled, email validated)"""
+        website_url = contact.agent_website or contact.fb_or_website
+        email_to_validate = contact.email or contact.personal_email
+        crawl = self.website(website_url) if website_url and website_url.startswith('http') else None
+        validation = self.email(email_to_validate) if email_to_validate else None
+
+        website_content = await crawl if crawl else None
+        if website_content:
+            row['website_content'] = website_content[:5000]  # Limit to 5000 chars
+
+        validation_result = await validation if validation else None
+        if validation_result:
+            row['email_valid'] = validation_result.get('status') == 'valid'
+            row['email_status'] = validation_result.get('status')
+            row['email_score'] = validation_result.get('score', 0)
+
+        return bool(website_content), bool(validation_result)
+
+
+async def _enrich_and_store(session: Session, processed_job, contacts: List[Any]):
+    """
+    Crawl websites and validate emails for the merged contacts with bounded
+    concurrency, inserting each chunk of MergedContacts in one statement and
+    committing progress counters as chunks finish.
+    """
+    import httpx
+    from . import models
+
+    web = httpx.AsyncClient(
+        timeout=10,
+        follow_redirects=True,
+        headers={'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'},
+        limits=httpx.Limits(max_connections=CRAWL_CONCURRENCY, max_keepalive_connections=CRAWL_CONCURRENCY)
+    )
+    zerobounce = httpx.AsyncClient(
+        timeout=10,
+        limits=httpx.Limits(max_connections=ZEROBOUNCE_CONCURRENCY, max_keepalive_connections=ZEROBOUNCE_CONCURRENCY)
+    )
+    async with web, zerobounce:
+        enricher = _Enricher(web, zerobounce)
+        for start in range(0, len(contacts), MERGED_INSERT_CHUNK):
+            chunk = contacts[start:start + MERGED_INSERT_CHUNK]
+            rows = [_merged_contact_row(processed_job.id, contact) for contact in chunk]
+            results = await asyncio.gather(*(enricher.enrich(contact, row) for contact, row in zip(chunk, rows)))
+
+            session.execute(insert(models.MergedContact), rows)
+            processed_job.websites_crawled = (processed_job.websites_crawled or 0) + sum(crawled for crawled, _ in results)
+            processed_job.emails_validated = (processed_job.emails_validated or 0) + sum(validated for _, validated in results)
+            session.commit()
+            logger.info(
+                f"Enriched {start + len(chunk)}/{len(contacts)} merged contacts "
+                f"({len(enricher.websites)} websites, {len(enricher.emails)} emails looked up)"
+            )
+
+
+def _page_text(html: str) -> str:
     from bs4 import BeautifulSoup
+
+    soup = BeautifulSoup(html, 'html.parser')
+    
+    # Remove script and style elements
+    for script in soup(["script", "style"]):
+        script.decompose()
+    
+    # Get text
+    text = soup.get_text()
     
+    # Clean up text
+    lines = (line.strip() for line in text.splitlines())
+    chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
+    text = ' '.join(chunk for chunk in chunks if chunk)
+    
+    return text[:5000]  # Limit to 5000 characters
+
+
+async def crawl_website(http, url: str) -> Optional[str]:
+    """Crawl website and extract text content, using a shared httpx.AsyncClient"""
     try:
-        # Add timeout and headers
-        headers = {
-            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
-        }
-        response = requests.get(url, headers=headers, timeout=10)
+        response = await http.get(url)
         response.raise_for_status()
-        
-        soup = BeautifulSoup(response.text, 'html.parser')
-        
-        # Remove script and style elements
-        for script in soup(["script", "style"]):
-            script.decompose()
-        
-        # Get text
-        text = soup.get_text()
-        
-        # Clean up text
-        lines = (line.strip() for line in text.splitlines())
-        chunks = (phrase.strip() for line in lines for phrase in line.split("  "))
-        text = ' '.join(chunk for chunk in chunks if chunk)
-        
-        return text[:5000]  # Limit to 5000 characters
+        # Parsing is CPU-bound; keep it off the event loop so other fetches continue
+        return await asyncio.to_thread(_page_text, response.text)
 
     except Exception as e:
         logger.error(f"Error crawling {url}: {e}")
         return None
 
 
-def validate_email_zerobounce(email: str) -> Optional[Dict[str, Any]]:
-    """Validate email using ZeroBounce API"""
-    import requests
-    
-    api_key = "848cbcd03ba043eaa677fc9f56c77da6"
-    
+async def validate_email_zerobounce(http, email: str) -> Optional[Dict[str, Any]]:
+    """Validate email using ZeroBounce API, using a shared httpx.AsyncClient"""
     try:
         url = f"https://api.zerobounce.net/v2/validate"
         params = {
-            'api_key': api_key,
+            'api_key': ZEROBOUNCE_API_KEY,
             'email': email
         }
         
-        response = requests.get(url, params=params, timeout=10)
+        response = await http.get(url, params=params)
         response.raise_for_status()
         
         result = response.json()
@@ -405,4 +620,4 @@ def validate_email_zerobounce(email: str) -> Optional[Dict[str, Any]]:
 
     except Exception as e:
         logger.error(f"Error validating email {email}: {e}")
-        return None 
\ No newline at end of file
+        return None
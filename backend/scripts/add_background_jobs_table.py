@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+Add background_jobs table backing the durable job queue (core/job_queue.py)
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from core.database import engine
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def add_background_jobs_table():
+    """Create the background_jobs table and the indexes workers claim on"""
+    
+    with engine.connect() as conn:
+        trans = conn.begin()
+        
+        try:
+            logger.info("Creating background_jobs table...")
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS background_jobs (
+                    id VARCHAR PRIMARY KEY,
+                    job_type VARCHAR NOT NULL,
+                    payload JSON DEFAULT '{}',
+                    status VARCHAR DEFAULT 'queued',
+                    campaign_id VARCHAR,
+                    dedupe_key VARCHAR,
+                    attempts INTEGER DEFAULT 0,
+                    max_attempts INTEGER DEFAULT 3,
+                    locked_by VARCHAR,
+                    lease_expires_at TIMESTAMP,
+                    heartbeat_at TIMESTAMP,
+                    progress_current INTEGER DEFAULT 0,
+                    progress_total INTEGER DEFAULT 0,
+                    progress_message VARCHAR,
+                    error TEXT,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    started_at TIMESTAMP,
+                    finished_at TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """))
+            
+            for column in ('job_type', 'status', 'campaign_id', 'dedupe_key', 'lease_expires_at'):
+                conn.execute(text(f"""
+                    CREATE INDEX IF NOT EXISTS ix_background_jobs_{column}
+                    ON background_jobs ({column})
+                """))
+            
+            trans.commit()
+            logger.info("✅ background_jobs table ready")
+            
+        except Exception as e:
+            trans.rollback()
+            logger.error(f"❌ Error creating background_jobs table: {e}")
+            raise
+
+
+if __name__ == "__main__":
+    add_background_jobs_table()
@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+"""
+Add composite and partial indexes on campaign_contacts for the per-campaign
+list, stats, enrichment and send queries in core/campaign_routes.py
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text, inspect
+from core.database import engine
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# name -> (columns, partial index predicate)
+CAMPAIGN_CONTACT_INDEXES = {
+    # Contact lists, exports, stats scans and keyset pages ordered by id
+    'ix_campaign_contacts_campaign_id_id': ('campaign_id, id', None),
+    # Enrichment keyset pages (status = 'pending' ORDER BY id), status breakdown, failed samples
+    'ix_campaign_contacts_campaign_enrichment': ('campaign_id, enrichment_status, id', None),
+    # Email generation / sending picks contacts by email_status
+    'ix_campaign_contacts_campaign_email_status': ('campaign_id, email_status', None),
+    # RSVP lists and sends only ever look at RSVP contacts
+    'ix_campaign_contacts_campaign_rsvp': ('campaign_id, id', 'is_rsvp = TRUE'),
+    # Excluded contacts are the minority; the common excluded = FALSE case uses campaign_id_id
+    'ix_campaign_contacts_campaign_excluded': ('campaign_id, id', 'excluded = TRUE'),
+}
+
+
+def add_campaign_contact_indexes():
+    """Create the campaign_contacts indexes (CONCURRENTLY on PostgreSQL)"""
+
+    concurrently = engine.dialect.name == 'postgresql'
+    inspector = inspect(engine)
+    if 'campaign_contacts' not in inspector.get_table_names():
+        logger.warning("campaign_contacts table does not exist yet, skipping indexes...")
+        return
+    existing = {index['name'] for index in inspector.get_indexes('campaign_contacts')}
+    created = 0
+
+    # CREATE INDEX CONCURRENTLY cannot run inside a transaction block
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for name, (columns, where) in CAMPAIGN_CONTACT_INDEXES.items():
+            try:
+                if concurrently:
+                    # A failed concurrent build leaves an INVALID index behind; drop it so it gets rebuilt
+                    invalid = conn.execute(text("""
+                        SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+                        WHERE c.relname = :name AND NOT i.indisvalid
+                    """), {"name": name}).first()
+                    if invalid:
+                        logger.warning(f"Dropping invalid index {name}")
+                        conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+                        existing.discard(name)
+
+                if name in existing:
+                    continue
+                logger.info(f"Creating index {name}...")
+                conn.execute(text(f"""
+                    CREATE INDEX {'CONCURRENTLY ' if concurrently else ''}IF NOT EXISTS {name}
+                    ON campaign_contacts ({columns})
+                    {f'WHERE {where}' if where else ''}
+                """))
+                created += 1
+            except Exception as e:
+                logger.error(f"❌ Error creating index {name}: {e}")
+                raise
+
+        # Planner statistics only need refreshing when there are new indexes
+        if concurrently and created:
+            conn.execute(text("ANALYZE campaign_contacts"))
+
+    logger.info(f"✅ campaign_contacts indexes ready ({created} created)")
+
+
+def drop_campaign_contact_indexes():
+    """Drop the indexes again (used by scripts/benchmark_campaign_contacts.py)"""
+
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for name in CAMPAIGN_CONTACT_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+    logger.info("✅ campaign_contacts indexes dropped")
+
+
+if __name__ == "__main__":
+    add_campaign_contact_indexes()
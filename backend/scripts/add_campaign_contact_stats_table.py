@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+"""
+Add campaign_contact_stats table holding materialised per-campaign contact counts
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from core.database import engine
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def add_campaign_contact_stats_table():
+    """Create the campaign_contact_stats table"""
+    
+    with engine.connect() as conn:
+        trans = conn.begin()
+        
+        try:
+            logger.info("Creating campaign_contact_stats table...")
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS campaign_contact_stats (
+                    campaign_id VARCHAR PRIMARY KEY,
+                    total_contacts INTEGER DEFAULT 0,
+                    contacts_with_email INTEGER DEFAULT 0,
+                    contacts_with_phone INTEGER DEFAULT 0,
+                    contacts_missing_email INTEGER DEFAULT 0,
+                    contacts_missing_phone INTEGER DEFAULT 0,
+                    contacts_missing_both INTEGER DEFAULT 0,
+                    enrichment_pending INTEGER DEFAULT 0,
+                    enrichment_processing INTEGER DEFAULT 0,
+                    enrichment_success INTEGER DEFAULT 0,
+                    enrichment_failed INTEGER DEFAULT 0,
+                    refreshed_at TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """))
+            
+            trans.commit()
+            logger.info("✅ campaign_contact_stats table ready")
+            
+        except Exception as e:
+            trans.rollback()
+            logger.error(f"❌ Error creating campaign_contact_stats table: {e}")
+            raise
+
+
+if __name__ == "__main__":
+    add_campaign_contact_stats_table()
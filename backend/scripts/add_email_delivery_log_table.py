@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+"""
+Add email_delivery_log table recording every outgoing email delivery attempt
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from core.database import engine
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def add_email_delivery_log_table():
+    """Create the email_delivery_log table and its lookup indexes"""
+    
+    with engine.connect() as conn:
+        trans = conn.begin()
+        
+        try:
+            logger.info("Creating email_delivery_log table...")
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS email_delivery_log (
+                    id VARCHAR PRIMARY KEY,
+                    to_email VARCHAR NOT NULL,
+                    subject VARCHAR(500),
+                    category VARCHAR,
+                    campaign_id VARCHAR,
+                    contact_id VARCHAR,
+                    status VARCHAR NOT NULL,
+                    attempts INTEGER DEFAULT 0,
+                    error TEXT,
+                    sent_at TIMESTAMP,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """))
+            
+            for column in ('to_email', 'campaign_id', 'contact_id', 'created_at'):
+                conn.execute(text(f"""
+                    CREATE INDEX IF NOT EXISTS ix_email_delivery_log_{column}
+                    ON email_delivery_log ({column})
+                """))
+            
+            trans.commit()
+            logger.info("✅ email_delivery_log table ready")
+            
+        except Exception as e:
+            trans.rollback()
+            logger.error(f"❌ Error creating email_delivery_log table: {e}")
+            raise
+
+
+if __name__ == "__main__":
+    add_email_delivery_log_table()
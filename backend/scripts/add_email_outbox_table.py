@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Add email_outbox table backing idempotent, resumable email sends (core/email_outbox.py)
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from core.database import engine
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def add_email_outbox_table():
+    """Create the email_outbox table and the indexes drainers claim on"""
+    
+    with engine.connect() as conn:
+        trans = conn.begin()
+        
+        try:
+            logger.info("Creating email_outbox table...")
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS email_outbox (
+                    id VARCHAR PRIMARY KEY,
+                    idempotency_key VARCHAR NOT NULL UNIQUE,
+                    batch_id VARCHAR,
+                    category VARCHAR NOT NULL,
+                    campaign_id VARCHAR,
+                    contact_id VARCHAR,
+                    payload JSON,
+                    to_email VARCHAR NOT NULL,
+                    subject VARCHAR NOT NULL,
+                    html_body TEXT NOT NULL,
+                    text_body TEXT,
+                    status VARCHAR DEFAULT 'pending',
+                    attempts INTEGER DEFAULT 0,
+                    max_attempts INTEGER DEFAULT 3,
+                    locked_by VARCHAR,
+                    lease_expires_at TIMESTAMP,
+                    last_error TEXT,
+                    sent_at TIMESTAMP,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """))
+            
+            for column in ('batch_id', 'campaign_id', 'status', 'lease_expires_at'):
+                conn.execute(text(f"""
+                    CREATE INDEX IF NOT EXISTS ix_email_outbox_{column}
+                    ON email_outbox ({column})
+                """))
+            
+            trans.commit()
+            logger.info("✅ email_outbox table ready")
+            
+        except Exception as e:
+            trans.rollback()
+            logger.error(f"❌ Error creating email_outbox table: {e}")
+            raise
+
+
+if __name__ == "__main__":
+    add_email_outbox_table()
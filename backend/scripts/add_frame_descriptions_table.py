@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+"""
+Add ad_traffic_frame_descriptions table caching vision model frame descriptions (ad_traffic/frame_cache.py)
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from core.database import engine
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def add_frame_descriptions_table():
+    """Create the ad_traffic_frame_descriptions table"""
+    
+    with engine.connect() as conn:
+        trans = conn.begin()
+        
+        try:
+            logger.info("Creating ad_traffic_frame_descriptions table...")
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS ad_traffic_frame_descriptions (
+                    public_id VARCHAR NOT NULL,
+                    timestamp_ms INTEGER NOT NULL,
+                    description TEXT NOT NULL,
+                    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+                    PRIMARY KEY (public_id, timestamp_ms)
+                )
+            """))
+            
+            trans.commit()
+            logger.info("✅ ad_traffic_frame_descriptions table ready")
+            
+        except Exception as e:
+            trans.rollback()
+            logger.error(f"❌ Error creating ad_traffic_frame_descriptions table: {e}")
+            raise
+
+
+if __name__ == "__main__":
+    add_frame_descriptions_table()
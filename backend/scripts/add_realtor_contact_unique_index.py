@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Add a unique index on realtor_contacts (job_id, profile_url) so scrape batches
+can upsert by profile URL. Duplicate rows left by earlier scrapes (a
+'Pending'/'Scrape' placeholder plus the scraped profile) are removed first,
+keeping the scraped row, or the newest one if there are several.
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text, inspect
+from core.database import engine
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+INDEX_NAME = 'ux_realtor_contacts_job_profile_url'
+
+
+def add_realtor_contact_unique_index():
+    """Remove duplicate (job_id, profile_url) rows and create the unique index"""
+    inspector = inspect(engine)
+    if 'realtor_contacts' not in inspector.get_table_names():
+        logger.warning("realtor_contacts table does not exist yet, skipping unique index...")
+        return
+    if INDEX_NAME in {index['name'] for index in inspector.get_indexes('realtor_contacts')}:
+        logger.info("✅ realtor_contacts unique index already exists")
+        return
+
+    try:
+        with engine.connect() as conn:
+            with conn.begin():
+                result = conn.execute(text("""
+                    DELETE FROM realtor_contacts WHERE id IN (
+                        SELECT id FROM (
+                            SELECT id, ROW_NUMBER() OVER (
+                                PARTITION BY job_id, profile_url
+                                ORDER BY
+                                    CASE WHEN first_name = 'Pending' AND last_name = 'Scrape' THEN 1 ELSE 0 END,
+                                    created_at DESC,
+                                    id
+                            ) AS rn
+                            FROM realtor_contacts
+                        ) ranked
+                        WHERE rn > 1
+                    )
+                """))
+                if result.rowcount:
+                    logger.info(f"Removed {result.rowcount} duplicate realtor_contacts rows")
+
+                conn.execute(text(f"""
+                    CREATE UNIQUE INDEX IF NOT EXISTS {INDEX_NAME}
+                    ON realtor_contacts (job_id, profile_url)
+                """))
+        logger.info("✅ realtor_contacts unique index ready")
+    except Exception as e:
+        logger.error(f"❌ Error creating realtor_contacts unique index: {e}")
+        raise
+
+
+if __name__ == "__main__":
+    add_realtor_contact_unique_index()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Add the scrape checkpoint columns: scraping_jobs.frontier_size and
+realtor_contacts.scrape_status / scrape_attempts. Existing 'Pending'/'Scrape'
+placeholder rows become pending URLs; every other row counts as scraped.
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text, inspect
+from core.database import engine
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_COLUMNS = {
+    'scraping_jobs': [('frontier_size', 'INTEGER')],
+    'realtor_contacts': [('scrape_status', 'VARCHAR'), ('scrape_attempts', 'INTEGER DEFAULT 0')],
+}
+
+
+def add_scrape_checkpoint_fields():
+    """Add the checkpoint columns and backfill realtor_contacts.scrape_status"""
+    inspector = inspect(engine)
+    tables = inspector.get_table_names()
+
+    try:
+        with engine.begin() as conn:
+            for table, columns in CHECKPOINT_COLUMNS.items():
+                if table not in tables:
+                    logger.warning(f"{table} table does not exist yet, skipping checkpoint columns...")
+                    continue
+                existing_columns = [col['name'] for col in inspector.get_columns(table)]
+                for field_name, field_type in columns:
+                    if field_name not in existing_columns:
+                        conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {field_name} {field_type}"))
+                        logger.info(f"Added column {table}.{field_name}")
+
+            if 'realtor_contacts' in tables:
+                conn.execute(text("""
+                    UPDATE realtor_contacts
+                    SET scrape_status = CASE
+                            WHEN first_name = 'Pending' AND last_name = 'Scrape' THEN 'pending'
+                            ELSE 'scraped'
+                        END,
+                        scrape_attempts = COALESCE(scrape_attempts, 0)
+                    WHERE scrape_status IS NULL
+                """))
+        logger.info("✅ Scrape checkpoint columns ready")
+    except Exception as e:
+        logger.error(f"❌ Error adding scrape checkpoint columns: {e}")
+        raise
+
+
+if __name__ == "__main__":
+    add_scrape_checkpoint_fields()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Add serp_query_cache table used to cache Serper.dev responses across enrichment runs
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from core.database import engine
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def add_serp_query_cache_table():
+    """Create the serp_query_cache table and its eviction indexes"""
+    
+    with engine.connect() as conn:
+        trans = conn.begin()
+        
+        try:
+            logger.info("Creating serp_query_cache table...")
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS serp_query_cache (
+                    query_hash VARCHAR(64) PRIMARY KEY,
+                    query TEXT NOT NULL,
+                    response JSON NOT NULL,
+                    fetched_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    last_accessed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                    hit_count INTEGER DEFAULT 0
+                )
+            """))
+            
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_serp_query_cache_fetched_at
+                ON serp_query_cache (fetched_at)
+            """))
+            conn.execute(text("""
+                CREATE INDEX IF NOT EXISTS ix_serp_query_cache_last_accessed_at
+                ON serp_query_cache (last_accessed_at)
+            """))
+            
+            trans.commit()
+            logger.info("✅ serp_query_cache table ready")
+            
+        except Exception as e:
+            trans.rollback()
+            logger.error(f"❌ Error creating serp_query_cache table: {e}")
+            raise
+
+
+if __name__ == "__main__":
+    add_serp_query_cache_table()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Add ad_traffic_video_assets table for content-addressed campaign videos (ad_traffic/video_assets.py)
+"""
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text
+from core.database import engine
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def add_video_assets_table():
+    """Create the ad_traffic_video_assets table"""
+    
+    with engine.connect() as conn:
+        trans = conn.begin()
+        
+        try:
+            logger.info("Creating ad_traffic_video_assets table...")
+            conn.execute(text("""
+                CREATE TABLE IF NOT EXISTS ad_traffic_video_assets (
+                    sha256 VARCHAR PRIMARY KEY,
+                    size BIGINT NOT NULL,
+                    storage_path VARCHAR NOT NULL,
+                    content_type VARCHAR,
+                    cloudinary_public_id VARCHAR,
+                    cloudinary_url VARCHAR,
+                    duration FLOAT,
+                    ffmpeg_outputs JSON,
+                    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+                    updated_at TIMESTAMP WITH TIME ZONE
+                )
+            """))
+            
+            trans.commit()
+            logger.info("✅ ad_traffic_video_assets table ready")
+            
+        except Exception as e:
+            trans.rollback()
+            logger.error(f"❌ Error creating ad_traffic_video_assets table: {e}")
+            raise
+
+
+if __name__ == "__main__":
+    add_video_assets_table()
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+"""
+Benchmark the campaign contact endpoints with and without the
+campaign_contacts indexes (scripts/add_campaign_contact_indexes.py).
+
+Seeds a campaign with 100k contacts (plus contacts in other campaigns so the
+campaign_id filter is selective), then reports p50/p95 latency of the main
+list/stat/export endpoints before and after creating the indexes.
+
+Meant for a LOCAL PostgreSQL only: it drops and recreates indexes on
+campaign_contacts. Usage:
+
+    DATABASE_URL=postgresql://localhost/adtv_bench python scripts/benchmark_campaign_contacts.py
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime
+from urllib.parse import urlparse
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import text
+from core import auth
+from core.database import Base, engine, SessionLocal, User, Campaign
+from core.campaign_routes import router as campaign_router
+from scripts.add_campaign_contact_indexes import add_campaign_contact_indexes, drop_campaign_contact_indexes
+import logging
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+ENDPOINTS = [
+    ('contacts page', '/api/campaigns/{id}/contacts?skip=50000&limit=100'),
+    ('excluded contacts', '/api/campaigns/{id}/contacts?excluded=true&fetch_all=true'),
+    ('contact stats', '/api/campaigns/{id}/contacts/stats'),
+    ('enrichment status', '/api/campaigns/{id}/enrichment-status'),
+    ('analytics', '/api/campaigns/{id}/analytics'),
+    ('rsvp contacts', '/api/campaigns/{id}/contacts/rsvp'),
+    ('export all', '/api/campaigns/{id}/export-all'),
+]
+
+EXPLAIN_QUERIES = [
+    ('enrichment page', """
+        SELECT id, first_name, last_name, company FROM campaign_contacts
+        WHERE campaign_id = :id AND enrichment_status = 'pending' ORDER BY id LIMIT 500
+    """),
+    ('email generation', """
+        SELECT id FROM campaign_contacts
+        WHERE campaign_id = :id AND enrichment_status = 'success'
+          AND excluded = FALSE AND email_status = 'pending'
+    """),
+    ('rsvp contacts', "SELECT id FROM campaign_contacts WHERE campaign_id = :id AND is_rsvp = TRUE"),
+]
+
+
+def seed_campaign(db, user_id: str, name: str, contacts: int) -> str:
+    """Insert a campaign and `contacts` synthetic contacts with generate_series"""
+    campaign = Campaign(
+        user_id=user_id,
+        name=name,
+        owner_name='Benchmark',
+        owner_email='benchmark@example.com',
+        launch_date=datetime.utcnow(),
+        event_type='virtual',
+        event_date=datetime.utcnow(),
+        total_contacts=contacts,
+        status='ready_for_personalization'
+    )
+    db.add(campaign)
+    db.commit()
+
+    # Roughly: 60% enriched, 25% pending, 15% failed; 70% with email;
+    # 5% RSVP; 3% excluded
+    db.execute(text("""
+        INSERT INTO campaign_contacts (
+            id, campaign_id, first_name, last_name, email, company, title, phone,
+            neighborhood, state, enrichment_status, email_status,
+            excluded, manually_edited, is_rsvp, created_at, updated_at
+        )
+        SELECT
+            md5(:campaign_id || '-' || i),
+            :campaign_id,
+            'First' || i,
+            'Last' || i,
+            CASE WHEN i % 10 < 7 THEN 'contact' || i || '@example.com' ELSE NULL END,
+            'Company ' || (i % 5000),
+            'Agent',
+            CASE WHEN i % 4 = 0 THEN NULL ELSE '555-' || lpad((i % 10000)::text, 4, '0') END,
+            'City ' || (i % 200),
+            'CA',
+            CASE WHEN i % 20 < 12 THEN 'success' WHEN i % 20 < 17 THEN 'pending' ELSE 'failed' END,
+            CASE WHEN i % 3 = 0 THEN 'generated' ELSE 'pending' END,
+            i % 33 = 0,
+            FALSE,
+            i % 20 = 0,
+            now(),
+            now()
+        FROM generate_series(1, :contacts) AS i
+    """), {"campaign_id": campaign.id, "contacts": contacts})
+    db.commit()
+    return campaign.id
+
+
+def time_endpoints(client: TestClient, campaign_id: str, iterations: int, export_iterations: int) -> dict:
+    results = {}
+    for label, path in ENDPOINTS:
+        url = path.format(id=campaign_id)
+        runs = export_iterations if 'export' in url else iterations
+        client.get(url)  # Warm up caches and the connection pool
+        samples = []
+        for _ in range(runs):
+            start = time.perf_counter()
+            response = client.get(url)
+            samples.append((time.perf_counter() - start) * 1000)
+            if response.status_code != 200:
+                raise RuntimeError(f"{url} returned {response.status_code}: {response.text[:200]}")
+        samples.sort()
+        results[label] = (
+            statistics.median(samples),
+            samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))]
+        )
+    return results
+
+
+def explain(campaign_id: str):
+    with engine.connect() as conn:
+        for label, sql in EXPLAIN_QUERIES:
+            plan = conn.execute(text(f"EXPLAIN (ANALYZE, BUFFERS) {sql}"), {"id": campaign_id}).fetchall()
+            print(f"\n-- {label}")
+            for line in plan:
+                print(f"   {line[0]}")
+
+
+def print_report(before: dict, after: dict):
+    print(f"\n{'endpoint':<20} {'p50 before':>11} {'p95 before':>11} {'p50 after':>10} {'p95 after':>10} {'speedup':>8}")
+    for label, _ in ENDPOINTS:
+        b50, b95 = before[label]
+        a50, a95 = after[label]
+        print(f"{label:<20} {b50:>9.1f}ms {b95:>9.1f}ms {a50:>8.1f}ms {a95:>8.1f}ms {b50 / a50 if a50 else 0:>7.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--contacts', type=int, default=100000, help='Contacts in the benchmarked campaign')
+    parser.add_argument('--other-campaigns', type=int, default=9, help='Extra campaigns seeded alongside it')
+    parser.add_argument('--other-contacts', type=int, default=30000, help='Contacts per extra campaign')
+    parser.add_argument('--iterations', type=int, default=20)
+    parser.add_argument('--export-iterations', type=int, default=5)
+    parser.add_argument('--explain', action='store_true', help='Print EXPLAIN ANALYZE plans before and after')
+    parser.add_argument('--keep', action='store_true', help='Keep the seeded data')
+    parser.add_argument('--force', action='store_true', help='Allow a non-local database')
+    args = parser.parse_args()
+
+    if engine.dialect.name != 'postgresql':
+        sys.exit("This benchmark needs PostgreSQL")
+    host = urlparse(os.getenv("DATABASE_URL", "")).hostname
+    if host not in (None, '', 'localhost', '127.0.0.1') and not args.force:
+        sys.exit(f"Refusing to drop indexes on non-local database {host}; pass --force to override")
+
+    Base.metadata.create_all(bind=engine)
+
+    db = SessionLocal()
+    user = User(email=f"benchmark-{uuid.uuid4().hex[:8]}@example.com", hashed_password='!', role='admin')
+    db.add(user)
+    db.commit()
+    db.refresh(user)
+    db.expunge(user)  # Handed to request threads by the auth override
+    campaign_ids = []
+
+    try:
+        print(f"Seeding {args.contacts} contacts (+{args.other_campaigns} x {args.other_contacts} in other campaigns)...")
+        start = time.perf_counter()
+        campaign_id = seed_campaign(db, user.id, 'Benchmark campaign', args.contacts)
+        campaign_ids.append(campaign_id)
+        for n in range(args.other_campaigns):
+            campaign_ids.append(seed_campaign(db, user.id, f'Benchmark filler {n}', args.other_contacts))
+        print(f"Seeded in {time.perf_counter() - start:.1f}s")
+
+        app = FastAPI()
+        app.include_router(campaign_router, prefix="/api/campaigns")
+        app.dependency_overrides[auth.get_current_active_user] = lambda: user
+        client = TestClient(app)
+
+        drop_campaign_contact_indexes()
+        with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+            conn.execute(text("ANALYZE campaign_contacts"))
+        if args.explain:
+            explain(campaign_id)
+        print("Timing without indexes...")
+        before = time_endpoints(client, campaign_id, args.iterations, args.export_iterations)
+
+        add_campaign_contact_indexes()
+        if args.explain:
+            explain(campaign_id)
+        print("Timing with indexes...")
+        after = time_endpoints(client, campaign_id, args.iterations, args.export_iterations)
+
+        print_report(before, after)
+    finally:
+        if args.keep:
+            print(f"Kept seeded data for campaigns: {', '.join(campaign_ids)}")
+        else:
+            db.rollback()
+            for cid in campaign_ids:
+                db.execute(text("DELETE FROM campaign_contacts WHERE campaign_id = :id"), {"id": cid})
+                db.execute(text("DELETE FROM campaign_contact_stats WHERE campaign_id = :id"), {"id": cid})
+                db.execute(text("DELETE FROM campaign_analytics WHERE campaign_id = :id"), {"id": cid})
+                db.execute(text("DELETE FROM campaigns WHERE id = :id"), {"id": cid})
+            db.execute(text("DELETE FROM users WHERE id = :id"), {"id": user.id})
+            db.commit()
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
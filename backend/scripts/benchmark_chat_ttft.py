@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""
+Measure time to first token of the /chat/stream answer (llm_handler.stream_answer),
+idle and while batch LLM work (generate_text, as used by the CSV generator and
+ad-traffic captions) keeps the process busy.
+
+Calls Gemini for real, so it needs GEMINI_API_KEY and spends tokens. To compare
+before/after, run it on both commits, e.g.:
+
+    git checkout <commit before the change> && python scripts/benchmark_chat_ttft.py
+    git checkout - && python scripts/benchmark_chat_ttft.py
+
+Only stream_answer and generate_text are used, which exist with the same
+signatures on either side of the llm_handler client/lane changes.
+"""
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+import logging
+
+logging.basicConfig(level=logging.WARNING)
+logger = logging.getLogger(__name__)
+
+QUERY = "What is American Dream TV and where can I watch it?"
+BATCH_PROMPT = "Write a two-sentence social media caption for a luxury home tour video."
+
+
+async def time_to_first_token(llm_handler) -> float:
+    started = time.monotonic()
+    stream = llm_handler.stream_answer(QUERY, [], [])
+    try:
+        async for _ in stream:
+            return time.monotonic() - started
+    finally:
+        await stream.aclose()
+    return time.monotonic() - started
+
+
+async def batch_load(llm_handler, stop: asyncio.Event):
+    while not stop.is_set():
+        try:
+            await llm_handler.generate_text(BATCH_PROMPT)
+        except Exception as e:
+            logger.warning(f"Batch request failed: {e}")
+
+
+async def measure(llm_handler, runs: int, batch_workers: int):
+    stop = asyncio.Event()
+    load = [asyncio.create_task(batch_load(llm_handler, stop)) for _ in range(batch_workers)]
+    if load:
+        # Let the batch work fill the queue before timing chat
+        await asyncio.sleep(2)
+    try:
+        samples = []
+        for _ in range(runs):
+            samples.append(await time_to_first_token(llm_handler))
+        return samples
+    finally:
+        stop.set()
+        await asyncio.gather(*load, return_exceptions=True)
+
+
+def report(label: str, samples):
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    print(f"{label:<28} p50 {statistics.median(ordered):6.2f}s   p95 {p95:6.2f}s   (n={len(ordered)})")
+
+
+async def main(runs: int, batch_workers: int):
+    from core import llm_handler
+    if hasattr(llm_handler, 'warm_up_clients'):
+        llm_handler.warm_up_clients()
+
+    # Untimed first call so connection setup isn't charged to either scenario
+    await time_to_first_token(llm_handler)
+
+    report("idle", await measure(llm_handler, runs, 0))
+    report(f"with {batch_workers} batch workers", await measure(llm_handler, runs, batch_workers))
+
+
+if __name__ == "__main__":
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Benchmark chat time to first token")
+    parser.add_argument("--runs", type=int, default=10, help="Chat requests per scenario")
+    parser.add_argument("--batch-workers", type=int, default=24, help="Concurrent batch callers during the loaded run")
+    args = parser.parse_args()
+    asyncio.run(main(args.runs, args.batch_workers))
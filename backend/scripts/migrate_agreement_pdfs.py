@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+Move agreement PDFs off the base64 agreements.pdf_data column into the PDF
+store (core/agreement_pdf_store.py), recording their hash, size and render
+version. Safe to re-run: only rows still holding pdf_data are touched.
+
+This is a one-off, run by hand once a durable store is configured
+(AGREEMENT_PDF_S3_BUCKET, or AGREEMENT_PDF_DIR on a persistent disk):
+
+    python scripts/migrate_agreement_pdfs.py
+
+It refuses to run against the default ephemeral directory, and pdf_data is
+only cleared after the stored copy has been read back and its hash checked.
+Startup only adds the columns (add_agreement_pdf_columns).
+"""
+import base64
+import os
+import sys
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import text, inspect
+from core.database import engine
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PDF_COLUMNS = [
+    ('pdf_sha256', 'VARCHAR'),
+    ('pdf_size', 'INTEGER'),
+    ('pdf_version', 'VARCHAR'),
+]
+
+
+def add_agreement_pdf_columns():
+    """Add the PDF store reference columns to agreements"""
+    inspector = inspect(engine)
+    if 'agreements' not in inspector.get_table_names():
+        logger.warning("agreements table does not exist yet, skipping PDF columns...")
+        return False
+
+    existing_columns = [col['name'] for col in inspector.get_columns('agreements')]
+    with engine.begin() as conn:
+        for field_name, field_type in PDF_COLUMNS:
+            if field_name not in existing_columns:
+                conn.execute(text(f"ALTER TABLE agreements ADD COLUMN {field_name} {field_type}"))
+                logger.info(f"Successfully added column: {field_name}")
+    return True
+
+
+def migrate_agreement_pdfs(batch_size: int = 50):
+    """Copy every base64 PDF into the store and clear pdf_data, one batch per commit"""
+    if not add_agreement_pdf_columns():
+        return
+
+    from sqlalchemy.orm import undefer
+    from core.database import SessionLocal
+    from core.agreements import Agreement, store_agreement_pdf
+    from core.agreement_pdf_store import get_pdf_store
+
+    if not get_pdf_store().durable:
+        logger.error("❌ No durable PDF store configured (set AGREEMENT_PDF_S3_BUCKET, or AGREEMENT_PDF_DIR "
+                     "on a persistent disk); leaving pdf_data in place")
+        return
+
+    migrated = 0
+    failed = 0
+    after_id = ''
+    with SessionLocal() as db:
+        while True:
+            agreements = db.query(Agreement).options(undefer(Agreement.pdf_data)).filter(
+                Agreement.pdf_data.isnot(None),
+                Agreement.id > after_id
+            ).order_by(Agreement.id).limit(batch_size).all()
+            if not agreements:
+                break
+
+            for agreement in agreements:
+                try:
+                    if store_agreement_pdf(agreement, base64.b64decode(agreement.pdf_data), clear_legacy=True):
+                        migrated += 1
+                    else:
+                        failed += 1
+                        logger.error(f"Stored PDF for agreement {agreement.id} did not verify, keeping pdf_data")
+                except Exception as e:
+                    failed += 1
+                    logger.error(f"Could not migrate PDF for agreement {agreement.id}: {e}")
+            after_id = agreements[-1].id
+            db.commit()
+            # Drop the decoded documents before loading the next batch
+            db.expunge_all()
+
+    if migrated or failed:
+        logger.info(f"✅ Moved {migrated} agreement PDFs to the PDF store ({failed} failed)")
+    else:
+        logger.info("No agreement PDFs left to migrate")
+
+
+if __name__ == "__main__":
+    migrate_agreement_pdfs()
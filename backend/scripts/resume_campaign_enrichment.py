@@ -11,6 +11,7 @@ if PROJECT_ROOT not in sys.path:
 
 from core.database import SessionLocal, Campaign, CampaignContact
 from core.campaign_routes import enrich_campaign_contacts
+from core.contact_stats import sync_contact_stats
 
 
 def resume_enrichment(campaign_id: str, reset_processing: bool = True) -> None:
@@ -31,6 +32,7 @@ def resume_enrichment(campaign_id: str, reset_processing: bool = True) -> None:
                 CampaignContact.enrichment_status == 'processing'
             ).update({CampaignContact.enrichment_status: 'pending'}, synchronize_session=False)
             db.commit()
+            sync_contact_stats(db, campaign_id)
             print(f"Reset {reset_count} contacts from 'processing' to 'pending'")
 
         # Ensure status reflects enrichment in progress
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Standalone job worker for the durable background job queue.
+
+Runs campaign enrichment, email generation, RSVP sends and agreement sends
+outside the web process. Start N worker processes with:
+
+    python worker.py --processes 4
+
+When dedicated workers are deployed, set JOB_QUEUE_EMBEDDED_WORKERS=0 on the
+web service so API traffic doesn't compete with background work.
+"""
+import argparse
+import logging
+import multiprocessing
+import signal
+import sys
+import threading
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def worker_process(job_types):
+    # Import inside the child so each process builds its own engine/connection pool
+    from core import campaign_routes  # noqa: F401  (registers job handlers)
+    from core.job_queue import run_worker
+
+    stop_event = threading.Event()
+
+    def handle_signal(signum, frame):
+        logger.info("Shutdown requested, finishing current job...")
+        stop_event.set()
+
+    signal.signal(signal.SIGTERM, handle_signal)
+    signal.signal(signal.SIGINT, handle_signal)
+
+    run_worker(job_types=job_types, stop_event=stop_event)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run background job workers")
+    parser.add_argument("--processes", type=int, default=1, help="Number of worker processes")
+    parser.add_argument("--job-types", nargs="*", default=None, help="Only run these job types")
+    args = parser.parse_args()
+
+    if args.processes <= 1:
+        worker_process(args.job_types)
+        return
+
+    ctx = multiprocessing.get_context("spawn")
+    processes = [
+        ctx.Process(target=worker_process, args=(args.job_types,), daemon=False)
+        for _ in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    logger.info(f"Started {len(processes)} worker processes")
+
+    def forward_signal(signum, frame):
+        for process in processes:
+            if process.is_alive():
+                process.terminate()
+
+    signal.signal(signal.SIGTERM, forward_signal)
+    signal.signal(signal.SIGINT, forward_signal)
+
+    for process in processes:
+        process.join()
+    sys.exit(0)
+
+
+if __name__ == "__main__":
+    main()
@@ -131,13 +131,22 @@ export const CampaignDataHub = () => {
             const campaignsData = campaignsResponse.data;
             setCampaigns(campaignsData);
 
-            // Fetch all contacts in one request
+            // Fetch all contacts page by page (keyset cursor)
             try {
-                const contactsResponse = await api.get('/api/campaigns/all-contacts');
-                setContacts(contactsResponse.data);
+                const allContacts: Contact[] = [];
+                let cursor: string | null = null;
+                do {
+                    const contactsResponse: { data: { contacts: Contact[]; next_cursor: string | null } } =
+                        await api.get('/api/campaigns/all-contacts', {
+                            params: { limit: 5000, ...(cursor ? { cursor } : {}) }
+                        });
+                    allContacts.push(...contactsResponse.data.contacts);
+                    cursor = contactsResponse.data.next_cursor;
+                } while (cursor);
+                setContacts(allContacts);
                 
                 // Process geocoded locations
-                processGeocodedLocations(contactsResponse.data);
+                processGeocodedLocations(allContacts);
             } catch (contactsErr) {
                 console.error('Failed to fetch all contacts:', contactsErr);
                 // Set empty contacts but don't break the entire component